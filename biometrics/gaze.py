@@ -0,0 +1,258 @@
+import math
+import time
+import bisect
+import random
+import threading
+from collections import deque
+
+# Gaze from tracker sample to zoom anchor. The tracker thread pushes raw
+# samples through a GazePipeline: the sample layout is resolved once, each
+# sample is kept in state.gaze_samples, a One-Euro filter (smooth at rest,
+# near zero lag in motion) produces the position, and a short least-squares
+# fit over the raw samples the velocity. Both are published with the sample
+# time, so the renderer can extrapolate the gaze to when its frame will
+# actually be on screen (predict_gaze). SyntheticGaze
+# replays fixations, saccades and smooth pursuit with known ground truth, for
+# headless tests and running without a tracker.
+
+MIN_CUTOFF = 1.0 # Hz; smoothing while the eye is still
+BETA = 20.0 # How fast the cutoff rises with gaze speed (screen widths/s)
+D_CUTOFF = 5.0 # Hz; smoothing of the velocity estimate
+MAX_PREDICTION = 0.05 # s; never extrapolate further than this
+SACCADE_SPEED = 1.0 # Screen sizes/s (~40 deg/s); faster is ballistic, not worth extrapolating
+VELOCITY_WINDOW = 0.1 # s of raw samples the published velocity is fitted over
+FIXATION_SPEED = 0.1 # Below this the velocity is mostly noise; prediction fades in up to 2x
+
+
+def resolve_accessor(sample):
+    # Tobii bindings differ in how a gaze point exposes its coordinates.
+    # Decide once, from the first sample, and return a plain (x, y) getter.
+    if hasattr(sample, 'position_xy'):
+        if hasattr(sample.position_xy, 'x'):
+            return lambda s: (s.position_xy.x, s.position_xy.y)
+        return lambda s: (s.position_xy[0], s.position_xy[1])
+    if hasattr(sample, 'x'):
+        return lambda s: (s.x, s.y)
+    return lambda s: (s[0], s[1])
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    # Casiez, Roussel & Vogel 2012, on 2D points: one cutoff from the speed of
+    # the point, so both axes smooth and release together. Call with (t, x, y);
+    # returns (x, y, vx, vy), velocity in units per second.
+
+    def __init__(self, min_cutoff=MIN_CUTOFF, beta=BETA, d_cutoff=D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.t = None
+        self.x = self.y = 0.0
+        self.vx = self.vy = 0.0
+
+    def __call__(self, t, x, y):
+        if self.t is None or t <= self.t:
+            if self.t is None:
+                self.x, self.y = x, y
+            self.t = t
+            return self.x, self.y, self.vx, self.vy
+        dt = t - self.t
+        self.t = t
+        a = _alpha(self.d_cutoff, dt)
+        self.vx += a * ((x - self.x) / dt - self.vx)
+        self.vy += a * ((y - self.y) / dt - self.vy)
+        cutoff = self.min_cutoff + self.beta * math.hypot(self.vx, self.vy)
+        a = _alpha(cutoff, dt)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+        return self.x, self.y, self.vx, self.vy
+
+
+def predict_gaze(snap, t, horizon=MAX_PREDICTION, saccade_speed=SACCADE_SPEED,
+                 fixation_speed=FIXATION_SPEED):
+    # Filtered gaze extrapolated to time t (same clock as gaze_t), clamped to
+    # the screen. Smooth pursuit is extrapolated. A saccade is not, since its
+    # landing point is not on the line it starts along, and neither is a
+    # fixation, where extrapolating velocity noise would only add jitter.
+    speed = math.hypot(snap.gaze_vx, snap.gaze_vy)
+    if speed > saccade_speed or speed < fixation_speed:
+        return snap.gaze_x, snap.gaze_y
+    gain = min((speed - fixation_speed) / fixation_speed, 1.0)
+    dt = gain * min(max(t - snap.gaze_t, 0.0), horizon)
+    x = snap.gaze_x + snap.gaze_vx * dt
+    y = snap.gaze_y + snap.gaze_vy * dt
+    return min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+
+
+class GazePipeline:
+    # Tracker callback -> state. Samples are timed on the local clock; if the
+    # tracker supplies its own timestamps (seconds), they set the spacing and
+    # are mapped onto the local clock by the smallest offset seen so far, which
+    # keeps USB/driver delivery jitter out of the filter.
+
+    def __init__(self, state, filter=None, clock=time.perf_counter):
+        self.state = state
+        self.samples = state.gaze_samples
+        self.filter = filter or OneEuroFilter()
+        self.clock = clock
+        self.accessor = None
+        self.offset = math.inf
+        self.dropped = 0
+        self.recent = deque(maxlen=32) # (t, x, y) for the velocity fit
+
+    def on_sample(self, sample, timestamp=None):
+        if self.accessor is None:
+            self.accessor = resolve_accessor(sample)
+        x, y = self.accessor(sample)
+        self.push(x, y, timestamp)
+
+    def push(self, x, y, timestamp=None):
+        with self.state.profiler.span('gaze'):
+            now = self.clock()
+            if timestamp is None:
+                t = now
+            else:
+                self.offset = min(self.offset, now - timestamp)
+                t = timestamp + self.offset
+            if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0): # NaN or off screen: tracking lost
+                self.dropped += 1
+                return
+            self.samples.append(t, (x, y))
+            recorder = self.state.recorder
+            if recorder is not None:
+                recorder.gaze.append(t, x, y)
+            fx, fy, _, _ = self.filter(t, x, y)
+            vx, vy = self.velocity(t, x, y)
+            # One publish so a frame never sees position and velocity from different samples
+            self.state.publish(gaze_x=fx, gaze_y=fy, gaze_vx=vx, gaze_vy=vy, gaze_t=t)
+
+    def velocity(self, t, x, y):
+        # Least-squares slope of the raw samples over the last VELOCITY_WINDOW.
+        # Unlike the filter's own derivative it forgets a saccade as soon as
+        # the saccade leaves the window, so fixations are not extrapolated.
+        recent = self.recent
+        recent.append((t, x, y))
+        while recent[0][0] < t - VELOCITY_WINDOW:
+            recent.popleft()
+        n = len(recent)
+        if n < 3:
+            return 0.0, 0.0
+        mt = sum(s[0] for s in recent) / n
+        mx = sum(s[1] for s in recent) / n
+        my = sum(s[2] for s in recent) / n
+        stt = stx = sty = 0.0
+        for st, sx, sy in recent:
+            d = st - mt
+            stt += d * d
+            stx += d * (sx - mx)
+            sty += d * (sy - my)
+        if stt <= 0.0:
+            return 0.0, 0.0
+        return stx / stt, sty / stt
+
+
+# --- Synthetic source ---
+
+class SyntheticGaze:
+    # Ground-truth gaze: fixations with saccades between them (minimum-jerk
+    # profile, duration from the main-sequence relation) and occasional smooth
+    # pursuit. samples() adds tracker noise and dropouts at the tracker rate.
+
+    def __init__(self, rate=90.0, noise=0.004, dropout=0.01, pursuit=0.25, seed=0):
+        self.rate = rate
+        self.noise = noise
+        self.dropout = dropout
+        self.pursuit = pursuit
+        self.rng = random.Random(seed)
+        self.starts = [] # Segment start times, for bisect
+        self.segments = [] # (t0, t1, kind, params)
+        self.end = 0.0
+        self.pos = (0.5, 0.5)
+        self._thread = None
+        self._running = False
+
+    def _extend(self, until):
+        rng = self.rng
+        while self.end <= until:
+            t0 = self.end
+            x0, y0 = self.pos
+            if self.segments and self.segments[-1][2] != 'fix':
+                # Fixate after every movement
+                t1 = t0 + rng.uniform(0.15, 0.6)
+                self._add(t0, t1, 'fix', (x0, y0), (x0, y0))
+            elif rng.random() < self.pursuit:
+                speed = rng.uniform(0.15, 0.5)
+                angle = rng.uniform(0.0, 2.0 * math.pi)
+                duration = rng.uniform(0.4, 1.2)
+                vx, vy = speed * math.cos(angle), speed * math.sin(angle)
+                x1 = min(max(x0 + vx * duration, 0.05), 0.95)
+                y1 = min(max(y0 + vy * duration, 0.05), 0.95)
+                self._add(t0, t0 + duration, 'pursuit', (x0, y0, x1, y1), (x1, y1))
+            else:
+                x1, y1 = rng.uniform(0.05, 0.95), rng.uniform(0.05, 0.95)
+                amplitude = math.hypot(x1 - x0, y1 - y0) * 40.0 # ~40 deg across the screen
+                duration = (21.0 + 2.2 * amplitude) / 1000.0
+                self._add(t0, t0 + duration, 'saccade', (x0, y0, x1, y1), (x1, y1))
+
+    def _add(self, t0, t1, kind, params, end_pos):
+        self.starts.append(t0)
+        self.segments.append((t0, t1, kind, params))
+        self.end = t1
+        self.pos = end_pos
+
+    def segment(self, t):
+        self._extend(t)
+        return self.segments[bisect.bisect_right(self.starts, t) - 1]
+
+    def truth(self, t):
+        t0, t1, kind, p = self.segment(t)
+        if kind == 'fix':
+            return p
+        u = (t - t0) / (t1 - t0)
+        if kind == 'saccade':
+            u = u * u * u * (10.0 - 15.0 * u + 6.0 * u * u) # Minimum jerk
+        return p[0] + (p[2] - p[0]) * u, p[1] + (p[3] - p[1]) * u
+
+    def samples(self, duration, t0=0.0):
+        # (t, x, y) as the tracker reports them; lost samples come as NaN
+        rng = self.rng
+        for k in range(int(duration * self.rate)):
+            t = t0 + k / self.rate
+            if rng.random() < self.dropout:
+                yield t, math.nan, math.nan
+                continue
+            x, y = self.truth(t)
+            yield t, x + rng.gauss(0.0, self.noise), y + rng.gauss(0.0, self.noise)
+
+    def start(self, pipeline):
+        # Stream into a pipeline in real time from a daemon thread, like a tracker
+        def run():
+            t_start = time.perf_counter()
+            k = 0
+            while self._running:
+                for t, x, y in self.samples(1.0, k):
+                    delay = t_start + t - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    if not self._running:
+                        return
+                    pipeline.push(x, y, t)
+                k += 1
+
+        self._running = True
+        self._thread = threading.Thread(target=run, name="synthetic-gaze", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
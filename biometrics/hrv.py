@@ -0,0 +1,248 @@
+import math
+
+import numpy as np
+
+# Streaming HRV. Every accepted RR interval enters each time window once and
+# leaves it once, and the window keeps running sums, so RMSSD, SDNN, pNN50 and
+# mean HR cost O(1) per beat however long the window is. LF/HF power comes from
+# a generalised Lomb-Scargle periodogram, which works on the unevenly spaced
+# beat series directly. Its per-frequency sums are additive too, so they are
+# updated per beat instead of re-fitting the window. Ectopic beats and
+# artifacts are rejected before they reach any sum.
+
+WINDOWS = (30.0, 60.0, 300.0) # Seconds; 300 s is the standard short-term HRV window
+SPECTRAL_WINDOW = 300.0
+
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+FREQUENCIES = np.arange(0.04, 0.4001, 0.005) # Hz, covers LF and HF
+
+MIN_RR = 300.0 # ms, 200 bpm
+MAX_RR = 2000.0 # ms, 30 bpm
+ECTOPIC_TOLERANCE = 0.2 # Reject beats more than 20% off the recent median
+MEDIAN_BEATS = 9
+
+REBUILD_EVERY = 4096 # Beats between exact re-summations, bounds float drift
+
+
+class _Window:
+    def __init__(self, length, freqs=None):
+        self.length = length
+        self.start = 0 # Absolute index of the oldest beat in the window
+        self.n = 0
+        self.s1 = 0.0 # Sum of (rr - shift)
+        self.s2 = 0.0 # Sum of (rr - shift)^2
+        self.nd = 0 # Successive differences between two accepted, adjacent beats
+        self.d2 = 0.0 # Sum of squared successive differences
+        self.nn50 = 0 # Successive differences over 50 ms
+        self.freqs = freqs
+        self.omega = None if freqs is None else 2.0 * math.pi * freqs
+        # Per-frequency sums of cos(wt), sin(wt), y cos(wt), y sin(wt),
+        # cos^2(wt) and cos(wt) sin(wt), one row each
+        self.terms = None if freqs is None else np.zeros((6, len(freqs)))
+
+    def reset(self, start):
+        self.__init__(self.length, self.freqs)
+        self.start = start
+
+
+class HrvEngine:
+    # Feed it with add(t, rr) or consume(ring_buffer); read metrics() at any
+    # rate. Internal storage is a fixed ring sized for the longest window.
+
+    def __init__(self, windows=WINDOWS, spectral_window=SPECTRAL_WINDOW, freqs=FREQUENCIES, capacity=4096):
+        if max(windows) * 1000.0 / MIN_RR >= capacity:
+            raise ValueError(f"capacity {capacity} cannot hold a {max(windows):.0f}s window")
+        self.capacity = capacity
+        self.times = np.zeros(capacity) # Seconds since the first beat
+        self.rr = np.zeros(capacity) # ms
+        self.diff = np.full(capacity, np.nan) # rr[i] - rr[i - 1], NaN after a rejected beat
+        self.count = 0 # Accepted beats ever
+        self.freqs = freqs
+        self.windows = {w: _Window(w, freqs if w == spectral_window else None) for w in windows}
+        self.spectral_window = spectral_window if spectral_window in windows else None
+        self.t0 = None
+        self.shift = None # First accepted RR; sums are taken around it for precision
+        self.recent = [0.0] * MEDIAN_BEATS # Raw RR history for the ectopic filter
+        self.recent_count = 0
+        self.scratch = np.zeros((6, len(freqs))) # Spectral terms of one beat
+        self.lf_mask = (freqs >= LF_BAND[0]) & (freqs < LF_BAND[1])
+        self.hf_mask = (freqs >= HF_BAND[0]) & (freqs <= HF_BAND[1])
+        self.gap = True # The next accepted beat has no valid successive difference
+        self.rejected = 0
+        self.consumed = 0 # ring_buffer.count already read by consume()
+
+    # --- Input ---
+
+    def consume(self, ring_buffer):
+        # Pull beats appended to a TimedRingBuffer since the last call.
+        # Returns the number of new beats seen.
+        new = ring_buffer.count - self.consumed
+        if new <= 0:
+            return 0
+        times, values = ring_buffer.latest(new)
+        if new > len(times):
+            self.gap = True # The ring lapped us; beats were lost
+        for t, rr in zip(times.tolist(), values.tolist()):
+            self.add(t, rr)
+        self.consumed = ring_buffer.count
+        return new
+
+    def is_artifact(self, rr):
+        if rr < MIN_RR or rr > MAX_RR:
+            return True
+        if self.recent_count >= 3:
+            n = min(self.recent_count, MEDIAN_BEATS)
+            recent = sorted(self.recent[:n])
+            median = recent[n // 2] if n % 2 else 0.5 * (recent[n // 2 - 1] + recent[n // 2])
+            return abs(rr - median) > ECTOPIC_TOLERANCE * median
+        return False
+
+    def add(self, t, rr):
+        # One RR interval (ms) ending at time t (s). Returns False if rejected.
+        artifact = self.is_artifact(rr)
+        if MIN_RR <= rr <= MAX_RR:
+            # The median follows raw beats, so a real, sustained change in
+            # rate is accepted after a few beats instead of locking out
+            self.recent[self.recent_count % MEDIAN_BEATS] = rr
+            self.recent_count += 1
+        if artifact:
+            self.rejected += 1
+            self.gap = True
+            return False
+
+        if self.t0 is None:
+            self.t0 = t
+            self.shift = rr
+        i = self.count
+        slot = i % self.capacity
+        prev = (i - 1) % self.capacity
+        self.times[slot] = t - self.t0
+        self.rr[slot] = rr
+        self.diff[slot] = np.nan if self.gap or i == 0 else rr - self.rr[prev]
+        self.gap = False
+        self.count += 1
+
+        if self.count % REBUILD_EVERY == 0:
+            self.rebuild()
+            return True
+        for w in self.windows.values():
+            self._add(w, i)
+            self._expire(w)
+        return True
+
+    # --- Window sums ---
+
+    def _add(self, w, i):
+        slot = i % self.capacity
+        y = self.rr[slot] - self.shift
+        w.n += 1
+        w.s1 += y
+        w.s2 += y * y
+        d = self.diff[slot]
+        if i > w.start and d == d: # d == d: not NaN
+            w.nd += 1
+            w.d2 += d * d
+            w.nn50 += abs(d) > 50.0
+        if w.terms is not None:
+            w.terms += self._spectral_terms(w, slot, y)
+
+    def _remove(self, w, i):
+        slot = i % self.capacity
+        y = self.rr[slot] - self.shift
+        w.n -= 1
+        w.s1 -= y
+        w.s2 -= y * y
+        nxt = (i + 1) % self.capacity
+        d = self.diff[nxt]
+        if d == d:
+            # The pair (i, i + 1) leaves with beat i; _expire keeps i + 1 added
+            w.nd -= 1
+            w.d2 -= d * d
+            w.nn50 -= abs(d) > 50.0
+        if w.terms is not None:
+            w.terms -= self._spectral_terms(w, slot, y)
+
+    def _spectral_terms(self, w, slot, y):
+        # The six Lomb-Scargle terms of one beat, written into self.scratch
+        t = self.scratch
+        np.multiply(w.omega, self.times[slot], out=t[5])
+        np.cos(t[5], out=t[0])
+        np.sin(t[5], out=t[1])
+        np.multiply(t[0], y, out=t[2])
+        np.multiply(t[1], y, out=t[3])
+        np.multiply(t[0], t[0], out=t[4])
+        np.multiply(t[0], t[1], out=t[5])
+        return t
+
+    def _expire(self, w):
+        newest = self.times[(self.count - 1) % self.capacity]
+        while w.start < self.count - 1 and newest - self.times[w.start % self.capacity] > w.length:
+            self._remove(w, w.start)
+            w.start += 1
+
+    def rebuild(self):
+        # Re-sum every window from the stored beats (amortised over REBUILD_EVERY)
+        for w in self.windows.values():
+            start = w.start
+            w.reset(start)
+            for i in range(start, self.count):
+                self._add(w, i)
+            self._expire(w)
+
+    # --- Output ---
+
+    def metrics(self, window):
+        w = self.windows[window]
+        out = {'beats': w.n, 'rmssd': None, 'sdnn': None, 'pnn50': None, 'mean_rr': None, 'mean_hr': None}
+        if w.n >= 1:
+            mean_rr = self.shift + w.s1 / w.n
+            out['mean_rr'] = mean_rr
+            out['mean_hr'] = 60000.0 / mean_rr
+        if w.n >= 2:
+            out['sdnn'] = math.sqrt(max(0.0, (w.s2 - w.s1 * w.s1 / w.n) / (w.n - 1)))
+        if w.nd >= 1:
+            out['rmssd'] = math.sqrt(max(0.0, w.d2 / w.nd))
+            out['pnn50'] = 100.0 * w.nn50 / w.nd
+        if w.terms is not None:
+            out.update(self._band_powers(w))
+        return out
+
+    def spectrum(self, window=None):
+        # (freqs, power in ms^2 per independent frequency) for the spectral window
+        w = self.windows[window or self.spectral_window]
+        if w.terms is None or w.n < 8:
+            return self.freqs, np.zeros(len(self.freqs))
+        n = w.n
+        # Generalised Lomb-Scargle (Zechmeister & Kuerster 2009), equal weights
+        Y = w.s1 / n
+        YY = w.s2 / n - Y * Y
+        C, S, YC, YS, CC, CS = w.terms / n
+        YC = YC - Y * C
+        YS = YS - Y * S
+        SS = (1.0 - CC) - S * S
+        CC = CC - C * C
+        CS = CS - C * S
+        D = CC * SS - CS * CS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = (SS * YC * YC + CC * YS * YS - 2.0 * CS * YC * YS) / (YY * D)
+        p = np.nan_to_num(np.clip(p, 0.0, 1.0))
+        # Fraction of variance each sinusoid explains, in ms^2, scaled by how
+        # many bins share one independent frequency (1 / window span)
+        span = self.times[(self.count - 1) % self.capacity] - self.times[w.start % self.capacity]
+        df = self.freqs[1] - self.freqs[0]
+        return self.freqs, p * YY * max(df * span, 1e-9)
+
+    def _band_powers(self, w):
+        freqs, power = self.spectrum(w.length)
+        lf = float(power[self.lf_mask].sum())
+        hf = float(power[self.hf_mask].sum())
+        return {'lf': lf, 'hf': hf, 'lf_hf': lf / hf if hf > 0.0 else None}
+
+    def summary(self):
+        # Everything the state publishes: metrics per window plus filter stats
+        return {
+            'windows': {w: self.metrics(w) for w in self.windows},
+            'accepted': self.count,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,243 @@
+import math
+import time
+
+import numpy as np
+
+# Polar Measurement Data (PMD): the H10's 130 Hz ECG and accelerometer, the
+# Verity Sense's accelerometer in SDK mode. Every notification on the data
+# characteristic is one frame:
+#
+#   [0]     measurement type (ECG, ACC, ...)
+#   [1:9]   sensor timestamp of the last sample, uint64 ns since 2000-01-01
+#   [9]     frame type; bit 7 set = delta compressed
+#   [10:]   samples
+#
+# Raw frames are packed little-endian signed integers, channels interleaved.
+# Compressed frames hold one full reference sample, then blocks of
+# [bit width, sample count, deltas bit-packed LSB first], each sample being
+# the previous one plus its delta. decode_frame() does both with array
+# operations over a memoryview of the notification; the only Python loop is
+# over the (one or two) delta blocks of a frame. PmdDecoder times the
+# samples on the local clock and writes them into state.ecg_samples /
+# state.acc_samples (and the recorder) in one bulk write per frame.
+
+# ── UUIDs ──────────────────────────────────────────────────────────────────────
+PMD_CONTROL_UUID = "fb005c81-02e7-f387-1cad-8acd2d8df0c8"
+PMD_DATA_UUID = "fb005c82-02e7-f387-1cad-8acd2d8df0c8"
+
+# Measurement types
+ECG = 0
+PPG = 1
+ACC = 2
+PPI = 3
+GYRO = 5
+MAG = 6
+KIND_NAMES = {ECG: "ECG", PPG: "PPG", ACC: "ACC", PPI: "PPI", GYRO: "GYR", MAG: "MAG"}
+
+HEADER = 10 # Bytes before the samples
+COMPRESSED = 0x80 # Frame type flag
+EPOCH_2000 = 946684800.0 # Unix time of the sensor timestamp epoch
+
+# ── SDK mode commands (PVS only) ───────────────────────────────────────────────
+SDK_MODE_ENABLE = bytearray([0x02, 0x09])
+SDK_MODE_DISABLE = bytearray([0x03, 0x09])
+
+# Raw frames: bytes per channel value, by (measurement type, frame type)
+RAW_SAMPLE_BYTES = {(ECG, 0): 3, (ACC, 0): 1, (ACC, 1): 2, (ACC, 2): 3}
+
+
+class PmdSettings:
+    # One stream's settings: what start_command() asks the sensor for, and
+    # what the decoder needs to read compressed frames and time the samples
+    # (rate in Hz, resolution in bits per channel value, range in G).
+
+    def __init__(self, rate, resolution, channels=1, range=None, channel_setting=False):
+        self.rate = rate
+        self.resolution = resolution
+        self.channels = channels
+        self.range = range
+        self.channel_setting = channel_setting # The Verity Sense wants the channel count too
+
+    def start_command(self, kind):
+        # 0x02 <type> [<setting type> <array length> <value LE16>]...
+        cmd = bytearray([0x02, kind, 0x00, 0x01, self.rate & 0xFF, self.rate >> 8,
+                         0x01, 0x01, self.resolution & 0xFF, self.resolution >> 8])
+        if self.range is not None:
+            cmd += bytes([0x02, 0x01, self.range & 0xFF, self.range >> 8])
+        if self.channel_setting:
+            cmd += bytes([0x04, 0x01, self.channels, 0x00])
+        return cmd
+
+    @staticmethod
+    def stop_command(kind):
+        return bytearray([0x03, kind])
+
+
+# What each sensor is asked to stream
+H10_SETTINGS = {ECG: PmdSettings(130, 14), ACC: PmdSettings(200, 16, 3, range=8)}
+PVS_SETTINGS = {ACC: PmdSettings(52, 16, 3, range=8, channel_setting=True)} # Needs SDK mode
+
+
+# --- Decoding ---
+
+def _signed(buf, size, count, offset=0):
+    # count little-endian two's-complement integers of `size` bytes -> int32
+    if size in (1, 2, 4):
+        return np.frombuffer(buf, dtype=f'<i{size}', count=count, offset=offset).astype(np.int32)
+    if size != 3:
+        raise ValueError(f"unsupported sample size: {size} bytes")
+    b = np.frombuffer(buf, dtype=np.uint8, count=count * 3, offset=offset).reshape(count, 3).astype(np.int32)
+    v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+    return v - ((v & 0x800000) << 1)
+
+
+_WEIGHTS = {}
+
+
+def _weights(bits):
+    # Place values of a `bits`-wide two's-complement number, LSB first; the
+    # sign bit counts negative, so bits @ weights is the signed value
+    w = _WEIGHTS.get(bits)
+    if w is None:
+        w = 1 << np.arange(bits, dtype=np.int64)
+        w[-1] = -w[-1]
+        _WEIGHTS[bits] = w
+    return w
+
+
+def _delta_blocks(buf, offset, channels):
+    # The delta blocks of a compressed frame -> list of (count, channels) int64
+    blocks = []
+    end = len(buf)
+    while offset + 2 <= end:
+        bits, count = buf[offset], buf[offset + 1]
+        n = count * channels
+        size = (bits * n + 7) // 8
+        offset += 2
+        if offset + size > end:
+            raise ValueError("truncated delta block")
+        if bits == 0:
+            blocks.append(np.zeros((count, channels), dtype=np.int64))
+        else:
+            packed = np.frombuffer(buf, dtype=np.uint8, count=size, offset=offset)
+            flat = np.unpackbits(packed, bitorder='little')[:bits * n].reshape(n, bits)
+            blocks.append((flat @ _weights(bits)).reshape(count, channels))
+        offset += size
+    return blocks
+
+
+def decode_frame(data, settings=None):
+    # One PMD data notification -> (type, sensor timestamp ns, samples), the
+    # samples an int32 array of shape (n, channels). settings (PmdSettings)
+    # gives the channel count and, for compressed frames, the resolution; the
+    # H10 defaults are used when it is None.
+    buf = memoryview(data)
+    if len(buf) < HEADER:
+        raise ValueError(f"PMD frame too short: {len(buf)} bytes")
+    kind = buf[0]
+    timestamp = int.from_bytes(buf[1:9], 'little')
+    frame_type = buf[9]
+    if settings is None:
+        settings = H10_SETTINGS.get(kind) or PmdSettings(0, 16)
+    channels = settings.channels
+
+    if frame_type & COMPRESSED:
+        size = (settings.resolution + 7) // 8
+        ref = _signed(buf, size, channels, HEADER)
+        blocks = _delta_blocks(buf, HEADER + size * channels, channels)
+        count = 1 + sum(len(b) for b in blocks)
+        samples = np.empty((count, channels), dtype=np.int32)
+        samples[0] = ref
+        if count > 1:
+            samples[1:] = ref + np.cumsum(np.concatenate(blocks), axis=0)
+        return kind, timestamp, samples
+
+    size = RAW_SAMPLE_BYTES.get((kind, frame_type)) or (settings.resolution + 7) // 8
+    count = (len(buf) - HEADER) // (size * channels)
+    return kind, timestamp, _signed(buf, size, count * channels, HEADER).reshape(count, channels)
+
+
+# --- Encoding (fake sensor, tests, benchmarks) ---
+
+def _pack_signed(values, size):
+    values = np.asarray(values, dtype=np.int64)
+    if size in (1, 2, 4):
+        return values.astype(f'<i{size}').tobytes()
+    return (values & 0xFFFFFF).astype('<u4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+
+
+def encode_frame(kind, timestamp, samples, settings, compressed=False, block=255):
+    # The inverse of decode_frame: samples (n, channels) -> notification bytes.
+    # Compressed frames use the narrowest bit width per block of `block` samples.
+    samples = np.asarray(samples, dtype=np.int64).reshape(-1, settings.channels)
+    head = bytes([kind]) + int(timestamp).to_bytes(8, 'little')
+    if not compressed:
+        if kind == ECG:
+            frame_type, size = 0, 3
+        else:
+            size = (settings.resolution + 7) // 8
+            frame_type = {1: 0, 2: 1, 3: 2}[size]
+        return head + bytes([frame_type]) + _pack_signed(samples.ravel(), size)
+
+    size = (settings.resolution + 7) // 8
+    out = bytearray(head + bytes([COMPRESSED]) + _pack_signed(samples[0], size))
+    deltas = np.diff(samples, axis=0)
+    for start in range(0, len(deltas), block):
+        d = deltas[start:start + block]
+        peak = int(max(d.max(), -d.min() - 1)) if d.size else 0
+        bits = peak.bit_length() + 1
+        flat = ((d.ravel()[:, None] >> np.arange(bits)) & 1).astype(np.uint8)
+        out += bytes([bits, len(d)]) + np.packbits(flat.ravel(), bitorder='little').tobytes()
+    return bytes(out)
+
+
+# --- Decoder ---
+
+class PmdDecoder:
+    # PMD data callback -> ring buffers. One per connection: the sensor clock
+    # is mapped onto the local clock by the smallest (local - sensor) offset
+    # seen, as GazePipeline does for tracker timestamps, and restarts with the
+    # sensor. Sample spacing comes from consecutive frame timestamps, so the
+    # true rate (not the nominal one) sets it; after a gap the nominal rate does.
+
+    def __init__(self, state, settings=None, clock=time.time, sdk_mode=False):
+        self.state = state
+        self.settings = H10_SETTINGS if settings is None else settings
+        self.clock = clock
+        self.sdk_mode = sdk_mode
+        self.buffers = {ECG: state.ecg_samples, ACC: state.acc_samples}
+        self.offset = math.inf
+        self.last = {} # type -> sensor time (s) of the previous frame's last sample
+        self.frames = 0
+        self.samples = 0
+        self.errors = 0
+
+    def on_data(self, sender, data):
+        with self.state.profiler.span('polar.pmd'):
+            now = self.clock()
+            try:
+                kind, timestamp, samples = decode_frame(data, self.settings.get(data[0]))
+            except (ValueError, IndexError):
+                self.errors += 1
+                return
+            buffer = self.buffers.get(kind)
+            n = len(samples)
+            if buffer is None or n == 0:
+                return
+            end = timestamp / 1e9
+            nominal = 1.0 / self.settings[kind].rate if kind in self.settings else 0.0
+            prev = self.last.get(kind)
+            step = (end - prev) / n if prev is not None else nominal
+            if nominal and not 0.5 * nominal < step < 2.0 * nominal:
+                step = nominal
+            self.last[kind] = end
+            self.offset = min(self.offset, now - end)
+            times = (end + self.offset) - step * np.arange(n - 1, -1, -1)
+            buffer.extend(times, samples[:, 0] if buffer.width == 1 else samples)
+            self.frames += 1
+            self.samples += n
+
+            recorder = self.state.recorder
+            if recorder is not None:
+                stream = recorder.ecg if kind == ECG else recorder.acc
+                stream.extend(times, *samples.T)
@@ -0,0 +1,432 @@
+import math
+import time
+import random
+import asyncio
+import threading
+
+import numpy as np
+
+from biometrics.hrv import HrvEngine
+from biometrics.pmd import (
+    ACC, ECG, EPOCH_2000, H10_SETTINGS, PMD_CONTROL_UUID, PMD_DATA_UUID, PVS_SETTINGS,
+    SDK_MODE_DISABLE, SDK_MODE_ENABLE, PmdDecoder, PmdSettings, encode_frame,
+)
+
+# Heart rate from a Polar H10 / Verity Sense. A daemon thread runs its own
+# asyncio loop: scan, connect, subscribe to Heart Rate Measurement, and on any
+# failure or disconnect try again with exponential backoff. Notifications are
+# parsed straight into state.rr_intervals (a TimedRingBuffer) and
+# state.current_hr; each new beat also goes through an HrvEngine whose
+# summary is published as state.hrv. With pmd on, the sensor's PMD streams
+# (H10: ECG and accelerometer, Verity Sense: accelerometer) are started too
+# and decoded by biometrics.pmd into state.ecg_samples / state.acc_samples.
+# The BLE side is a pluggable backend: BleakBackend for
+# real straps, FakePolarBackend to replay synthetic packets without hardware.
+
+# ── UUIDs ──────────────────────────────────────────────────────────────────────
+HR_MEASUREMENT_UUID = "00002a37-0000-1000-8000-00805f9b34fb"
+
+# ── Device name prefixes ───────────────────────────────────────────────────────
+H10_PREFIX = "Polar H10"
+PVS_PREFIXES = ("Polar Sense", "Polar Verity Sense")
+DEFAULT_PREFIXES = (H10_PREFIX,) + PVS_PREFIXES
+
+MIN_BACKOFF = 1.0 # Seconds before the first retry
+MAX_BACKOFF = 30.0
+STABLE_SESSION = 30.0 # A session this long resets the backoff
+
+
+def pmd_settings(name):
+    # (streams to start, whether SDK mode is needed) for a sensor name
+    if name.startswith(PVS_PREFIXES):
+        return PVS_SETTINGS, True
+    return H10_SETTINGS, False
+
+
+def parse_hr_measurement(data, now, rr_buffer=None):
+    # Heart Rate Measurement (0x2A37): flags, HR as uint8 or uint16, optional
+    # energy expended, then RR intervals in 1/1024 s. Each RR beat is written
+    # to rr_buffer in ms, timed so the newest beat ends at `now`. Reads the
+    # bytes in place; nothing is allocated per packet. Returns bpm.
+    flags = data[0]
+    if flags & 0x01:
+        hr = data[1] | (data[2] << 8)
+        offset = 3
+    else:
+        hr = data[1]
+        offset = 2
+    if flags & 0x08:
+        offset += 2 # Energy Expended
+
+    if flags & 0x10 and rr_buffer is not None:
+        end = offset + ((len(data) - offset) // 2) * 2
+        total = 0
+        for i in range(offset, end, 2):
+            total += data[i] | (data[i + 1] << 8)
+        t = now - total / 1024.0
+        for i in range(offset, end, 2):
+            raw = data[i] | (data[i + 1] << 8)
+            t += raw / 1024.0
+            rr_buffer.append(t, raw * (1000.0 / 1024.0))
+    return hr
+
+
+# --- Backends ---
+
+class BleakBackend:
+    # Real hardware through bleak
+
+    def __init__(self, connect_timeout=30.0):
+        self.connect_timeout = connect_timeout
+
+    async def find(self, prefixes, timeout):
+        from bleak import BleakScanner
+        return await BleakScanner.find_device_by_filter(
+            lambda d, ad: d.name and d.name.startswith(prefixes),
+            timeout=timeout,
+        )
+
+    async def connect(self, device, on_hr, on_disconnect, pmd=None):
+        from bleak import BleakClient
+        client = BleakClient(device, disconnected_callback=lambda c: on_disconnect(),
+                             timeout=self.connect_timeout)
+        await client.connect()
+        try:
+            await client.start_notify(HR_MEASUREMENT_UUID, on_hr)
+        except Exception:
+            await client.disconnect()
+            raise
+        session = _BleakSession(client, device.name)
+        if pmd is not None:
+            try:
+                await session.start_pmd(pmd)
+            except Exception as e:
+                # HR alone is still worth having
+                print(f"Polar: PMD streams unavailable: {e}")
+        return session
+
+    def clock(self):
+        return time.time()
+
+
+class _BleakSession:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.pmd = None
+
+    async def start_pmd(self, pmd):
+        client = self.client
+        # Larger MTU for PMD frames, and pairing, which the PMD service requires
+        try:
+            await client._backend._acquire_mtu()
+        except Exception:
+            pass
+        try:
+            await client.pair()
+        except Exception:
+            pass
+        await client.start_notify(PMD_CONTROL_UUID, lambda s, d: None)
+        await client.start_notify(PMD_DATA_UUID, pmd.on_data)
+        self.pmd = pmd
+        if pmd.sdk_mode:
+            await client.write_gatt_char(PMD_CONTROL_UUID, SDK_MODE_ENABLE, response=True)
+        for kind, settings in pmd.settings.items():
+            await client.write_gatt_char(PMD_CONTROL_UUID, settings.start_command(kind), response=True)
+
+    async def close(self):
+        if self.pmd is not None:
+            commands = [PmdSettings.stop_command(kind) for kind in self.pmd.settings]
+            if self.pmd.sdk_mode:
+                commands.append(SDK_MODE_DISABLE)
+            for command in commands:
+                try:
+                    await self.client.write_gatt_char(PMD_CONTROL_UUID, command, response=True)
+                except Exception:
+                    pass
+            for uuid in (PMD_DATA_UUID, PMD_CONTROL_UUID):
+                try:
+                    await self.client.stop_notify(uuid)
+                except Exception:
+                    pass
+        try:
+            await self.client.stop_notify(HR_MEASUREMENT_UUID)
+        except Exception:
+            pass
+        try:
+            await self.client.disconnect()
+        except Exception:
+            pass
+
+
+class FakePolarBackend:
+    # Stands in for a chest strap. Beats follow a resting heart rate with
+    # respiratory sinus arrhythmia and noise, and are sent the way an H10 does:
+    # one notification a second carrying the RR intervals completed since the
+    # last one. speed > 1 replays faster than real time (timestamps come from
+    # the simulated clock, so they stay consistent). session_s drops the link
+    # after that many simulated seconds; missing_scans makes the first scans
+    # come up empty. With a PMD decoder attached it also streams ECG (raw
+    # frames, QRS complexes on the same beats) and accelerometer (breathing
+    # motion, delta-compressed as the Verity Sense sends it, so both decoder
+    # paths run), in frames of the sizes the sensors use.
+
+    def __init__(self, bpm=64.0, rsa_ms=45.0, breath_s=10.0, noise_ms=12.0, speed=1.0,
+                 session_s=None, missing_scans=0, name="Polar H10 FAKE0001", seed=0):
+        self.bpm = bpm
+        self.rsa_ms = rsa_ms
+        self.breath_s = breath_s
+        self.noise_ms = noise_ms
+        self.speed = speed
+        self.session_s = session_s
+        self.missing_scans = missing_scans
+        self.name = name
+        self.rng = random.Random(seed)
+        self.sim_time = time.time() # Simulated wall clock
+        self.next_beat = self.sim_time
+        self.np_rng = np.random.default_rng(seed)
+        self.beats = [] # Recent beat times, for the ECG waveform
+        self.pmd_time = {} # type -> time of the last PMD sample sent
+        self.connects = 0
+        self.packets = 0
+
+    def clock(self):
+        return self.sim_time
+
+    async def _sleep(self, seconds):
+        await asyncio.sleep(seconds / self.speed if self.speed > 0 else 0.0)
+
+    async def find(self, prefixes, timeout):
+        await self._sleep(0.2)
+        if self.missing_scans > 0:
+            self.missing_scans -= 1
+            return None
+        return self.name if self.name.startswith(tuple(prefixes)) else None
+
+    async def connect(self, device, on_hr, on_disconnect, pmd=None):
+        await self._sleep(0.5)
+        self.connects += 1
+        self.pmd_time = {}
+        session = _FakeSession(self, device, on_hr, on_disconnect, pmd)
+        session.task = asyncio.get_running_loop().create_task(session.stream())
+        return session
+
+    def rr_ms(self):
+        base = 60000.0 / self.bpm
+        rsa = self.rsa_ms * math.sin(2.0 * math.pi * self.next_beat / self.breath_s)
+        return max(300.0, base + rsa + self.rng.gauss(0.0, self.noise_ms))
+
+    def packet(self, until):
+        # One notification: flags (RR present, uint8 HR), HR, RR intervals
+        rrs = []
+        while self.next_beat <= until:
+            rr = self.rr_ms()
+            self.next_beat += rr / 1000.0
+            rrs.append(int(round(rr * 1.024)))
+            self.beats.append(self.next_beat)
+        del self.beats[:-8]
+        hr = int(round(60000.0 / (sum(rrs) / 1.024 / len(rrs)))) if rrs else int(round(self.bpm))
+        data = bytearray(2 + 2 * len(rrs))
+        data[0] = 0x10 if rrs else 0x00
+        data[1] = min(hr, 255)
+        for k, raw in enumerate(rrs):
+            data[2 + 2 * k] = raw & 0xFF
+            data[3 + 2 * k] = raw >> 8
+        return data
+
+
+    def pmd_samples(self, kind, times):
+        # Synthetic ECG (uV) or accelerometer (mG) values at the given times
+        n = len(times)
+        breath = np.sin(2.0 * np.pi * times / self.breath_s)
+        if kind == ECG:
+            beats = np.asarray(self.beats + [self.next_beat])
+            since = times - beats[np.clip(np.searchsorted(beats, times) - 1, 0, None)]
+            until = beats[np.clip(np.searchsorted(beats, times), None, len(beats) - 1)] - times
+            qrs = 1200.0 * (np.exp(-(since / 0.012) ** 2) + np.exp(-(until / 0.012) ** 2))
+            t_wave = 250.0 * np.exp(-((since - 0.25) / 0.04) ** 2)
+            return (qrs + t_wave + 80.0 * breath + self.np_rng.normal(0.0, 10.0, n)).astype(np.int32)
+        noise = self.np_rng.normal(0.0, 4.0, (n, 3))
+        acc = noise + np.array([30.0, -990.0, 120.0]) + np.outer(breath, [15.0, 6.0, 40.0])
+        return acc.astype(np.int32)
+
+    def pmd_frames(self, until, settings):
+        # (send time, frame) for every PMD frame due since the last call, up
+        # to `until`, in the order they are sent
+        frames = []
+        for kind, s in settings.items():
+            start = self.pmd_time.setdefault(kind, until - 1.0)
+            n = int((until - start) * s.rate)
+            if n <= 0:
+                continue
+            times = start + np.arange(1, n + 1) / s.rate
+            self.pmd_time[kind] = float(times[-1])
+            samples = self.pmd_samples(kind, times)
+            per_frame = 73 if kind == ECG else 36
+            for k in range(0, n, per_frame):
+                end = float(times[min(k + per_frame, n) - 1])
+                stamp = int(round((end - EPOCH_2000) * 1e9))
+                frames.append((end, encode_frame(kind, stamp, samples[k:k + per_frame], s, compressed=kind == ACC)))
+        frames.sort(key=lambda f: f[0])
+        return frames
+
+
+class _FakeSession:
+    def __init__(self, backend, name, on_hr, on_disconnect, pmd=None):
+        self.backend = backend
+        self.name = name
+        self.on_hr = on_hr
+        self.on_disconnect = on_disconnect
+        self.pmd = pmd
+        self.task = None
+
+    async def stream(self):
+        backend = self.backend
+        started = backend.sim_time
+        while True:
+            await backend._sleep(1.0)
+            tick = backend.sim_time + 1.0
+            if backend.session_s is not None and tick - started >= backend.session_s:
+                backend.sim_time = tick
+                self.on_disconnect()
+                return
+            packet = backend.packet(tick)
+            if self.pmd is not None:
+                # Each frame goes out as soon as its last sample is taken
+                for sent, frame in backend.pmd_frames(tick, self.pmd.settings):
+                    backend.sim_time = max(backend.sim_time, sent)
+                    self.pmd.on_data(None, frame)
+            backend.sim_time = tick
+            self.on_hr(None, packet)
+            backend.packets += 1
+
+    async def close(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+
+# --- Worker ---
+
+class PolarWorker:
+    def __init__(self, state, backend=None, prefixes=DEFAULT_PREFIXES, scan_timeout=10.0,
+                 min_backoff=MIN_BACKOFF, max_backoff=MAX_BACKOFF, pmd=True):
+        self.state = state
+        self.backend = backend or BleakBackend()
+        self.prefixes = tuple(prefixes)
+        self.scan_timeout = scan_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.rr_buffer = state.rr_intervals
+        self.hrv = HrvEngine()
+        self.clock = self.backend.clock
+        self.use_pmd = pmd
+        self.pmd = None # biometrics.pmd.PmdDecoder of the current connection
+        self.packets = 0
+        self.sessions = 0
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="polar", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        asyncio.run(self._main())
+
+    def _status(self, text):
+        if self.state.polar_status != text:
+            self.state.polar_status = text
+
+    def on_hr(self, sender, data):
+        with self.state.profiler.span('polar.hr'):
+            first = self.rr_buffer.count
+            now = self.clock()
+            hr = parse_hr_measurement(data, now, self.rr_buffer)
+            self.packets += 1
+            recorder = self.state.recorder
+            if recorder is not None:
+                recorder.heart(now, hr, self.rr_buffer, first)
+            if self.hrv.consume(self.rr_buffer):
+                self.state.publish(current_hr=hr, hrv=self.hrv.summary())
+            elif hr != self.state.current_hr:
+                self.state.current_hr = hr
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._ready.set()
+        backoff = self.min_backoff
+
+        while not self._stop.is_set():
+            self._status("scanning")
+            try:
+                device = await self.backend.find(self.prefixes, self.scan_timeout)
+                if device is None:
+                    print("Polar: no sensor found.")
+                else:
+                    started = time.monotonic()
+                    await self._session(device)
+                    if time.monotonic() - started >= STABLE_SESSION:
+                        backoff = self.min_backoff
+            except Exception as e:
+                print(f"Polar: connection error: {e}")
+
+            if self._stop.is_set():
+                break
+            self._status(f"retrying in {backoff:.0f}s")
+            try:
+                await asyncio.wait_for(self._stop.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2.0, self.max_backoff)
+
+        self.state.publish(current_hr=0, polar_status="off")
+
+    async def _session(self, device):
+        disconnected = asyncio.Event()
+        if self.use_pmd:
+            settings, sdk_mode = pmd_settings(getattr(device, 'name', None) or str(device))
+            self.pmd = PmdDecoder(self.state, settings, self.clock, sdk_mode)
+        session = await self.backend.connect(device, self.on_hr, disconnected.set, self.pmd)
+        self.sessions += 1
+        print(f"Polar: streaming from {session.name}")
+        self._status(f"connected: {session.name}")
+        waits = [asyncio.ensure_future(disconnected.wait()), asyncio.ensure_future(self._stop.wait())]
+        try:
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waits:
+                w.cancel()
+            await session.close()
+            self.state.current_hr = 0
+        if disconnected.is_set():
+            print(f"Polar: {session.name} disconnected.")
+
+
+def setup_and_start_polar(state, backend=None):
+    # Like setup_and_start_tobii(): start streaming in the background, never raise
+    try:
+        if backend is None:
+            import bleak # noqa: F401 - fail here, not inside the worker thread
+        worker = PolarWorker(state, backend).start()
+        print("Polar: worker started in background thread.")
+        return worker
+    except Exception as e:
+        print(f"Polar Initialization Error: {e}")
+        return None
@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+
+# Fixed-size, timestamped sample history for the sensor threads. Storage is
+# allocated once; append() only writes a timestamp and value into it, so a
+# sensor running for hours neither grows memory nor allocates per sample.
+# width > 1 stores a vector per sample (gaze x, y; accelerometer x, y, z).
+# extend() writes a block of samples at once. Readers get copies.
+
+
+class TimedRingBuffer:
+    def __init__(self, capacity=4096, width=1):
+        self.capacity = capacity
+        self.width = width
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity if width == 1 else (capacity, width), dtype=np.float64)
+        self.count = 0 # Samples ever written; the newest is at (count - 1) % capacity
+        self.lock = threading.Lock()
+
+    def append(self, t, value):
+        with self.lock:
+            i = self.count % self.capacity
+            self.times[i] = t
+            self.values[i] = value
+            self.count += 1
+
+    def extend(self, times, values):
+        # Bulk append: one or two slice writes for a whole block of samples
+        # (a PMD frame), same result as appending them one by one
+        n = len(times)
+        if n == 0:
+            return
+        with self.lock:
+            cap = self.capacity
+            skip = max(n - cap, 0) # Only the newest capacity samples survive anyway
+            start = (self.count + skip) % cap
+            first = min(n - skip, cap - start)
+            self.times[start:start + first] = times[skip:skip + first]
+            self.values[start:start + first] = values[skip:skip + first]
+            rest = n - skip - first
+            if rest:
+                self.times[:rest] = times[skip + first:]
+                self.values[:rest] = values[skip + first:]
+            self.count += n
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
+
+    def last(self):
+        # (time, value) of the newest sample, or None
+        with self.lock:
+            if self.count == 0:
+                return None
+            i = (self.count - 1) % self.capacity
+            if self.width == 1:
+                return float(self.times[i]), float(self.values[i])
+            return float(self.times[i]), tuple(self.values[i].tolist())
+
+    def latest(self, n=None):
+        # Copies of the newest n samples (all if None), oldest first: (times, values)
+        with self.lock:
+            size = min(self.count, self.capacity)
+            n = size if n is None else min(n, size)
+            end = self.count % self.capacity
+            idx = np.arange(end - n, end) % self.capacity
+            return self.times[idx], self.values[idx]
+
+    def since(self, t0):
+        # Copies of every buffered sample with time >= t0, oldest first
+        times, values = self.latest()
+        keep = times >= t0
+        return times[keep], values[keep]
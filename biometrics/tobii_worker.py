@@ -1,59 +1,60 @@
 import threading
-from tobii_stream_engine import Api, Device, Stream
+from biometrics.gaze import GazePipeline
 
-# Global references prevent Python's garbage collector from destroying the connection
+# Global references prevent Python's garbage collector from destroying the connection.
+# One API handle per process; one (device, pipeline) per connected tracker, by
+# URL, so several states (engine/server.py sessions) can each own a tracker.
 _api = None
-_device = None
+_connections = {}
 
-def setup_and_start_tobii(state):
-    global _api, _device
+def setup_and_start_tobii(state, url=None):
+    # url=None takes the first tracker no other state is connected to
+    global _api
     try:
+        # Imported here so a machine without the Tobii SDK still starts (without eye tracking)
+        from tobii_stream_engine import Api, Device, Stream
+
         print("Tobii: Initializing connection...")
-        _api = Api()
-        urls = _api.enumerate_local_device_urls()
-        
+        if _api is None:
+            _api = Api()
+        urls = [u for u in _api.enumerate_local_device_urls() if u not in _connections]
+        if url is not None:
+            urls = [u for u in urls if u == url]
+
         if not urls:
-            print("Tobii: No devices found. Running without eye tracking.")
+            print("Tobii: No free devices found. Running without eye tracking.")
             return False
-            
+
         url = urls[0]
         print(f"Tobii found at: {url}")
-        
+
         # Initialize the device synchronously on the main thread!
-        _device = Device(api=_api, url=url)
-        
+        device = Device(api=_api, url=url)
+
+        # Layout resolution, ring buffer, One-Euro filter and the state publish
+        # all live in the pipeline; the callback only hands samples over
+        pipeline = GazePipeline(state)
+        _connections[url] = (device, pipeline)
+
         def on_gaze_point(timestamp, gaze_point):
             try:
-                if hasattr(gaze_point, 'position_xy'):
-                    if hasattr(gaze_point.position_xy, 'x'):
-                        raw_x = gaze_point.position_xy.x
-                        raw_y = gaze_point.position_xy.y
-                    else:
-                        raw_x = gaze_point.position_xy[0]
-                        raw_y = gaze_point.position_xy[1]
-                else:
-                    raw_x = gaze_point.x
-                    raw_y = gaze_point.y
-                    
-                smoothing = 0.15
-                state.gaze_x = (1.0 - smoothing) * state.gaze_x + (smoothing * raw_x)
-                state.gaze_y = (1.0 - smoothing) * state.gaze_y + (smoothing * raw_y)
+                pipeline.on_sample(gaze_point, timestamp / 1e6) # Device clock, microseconds
             except Exception:
                 pass # Suppress spam if tracking drops
 
-        if _device.is_supported_stream(Stream.GAZE_POINT):
+        if device.is_supported_stream(Stream.GAZE_POINT):
             # Subscribe synchronously
-            _device.subscribe_gaze_point(callback=on_gaze_point)
-            
+            device.subscribe_gaze_point(callback=on_gaze_point)
+
             # ONLY put the blocking listener loop in the background thread
-            t = threading.Thread(target=_device.run, daemon=True)
+            t = threading.Thread(target=device.run, daemon=True)
             t.start()
             print("Tobii: Streaming started in background thread.")
             return True
         else:
             print("Tobii: Gaze stream not supported.")
             return False
-            
+
     except Exception as e:
         print(f"Tobii Initialization Error: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,226 @@
+import io
+import math
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# Vision snapshots without stalling the frame. A capture copies the finished
+# scene into a texture, shrinks it on the GPU (shaders/downsample.glsl) and
+# starts an asynchronous glReadPixels into one of a ring of pixel-pack
+# buffers. Nothing waits: the buffer is mapped `delay` frames later, when the
+# GPU has long finished with it, and the JPEG/PNG encode runs on a worker
+# thread. Finished captures go to state.captures, a bounded queue that drops
+# the oldest, so a consumer that falls behind (the LLM controller) only ever
+# sees recent frames.
+
+CAPTURE_LOCATION = 4 # Texture unit for the downsample source
+FORMATS = ('JPEG', 'PNG', 'RAW') # RAW = RGB bytes, top row first
+
+
+class Capture:
+    def __init__(self, t, frame, width, height, format, data):
+        self.t = t # time.perf_counter() of the captured frame
+        self.frame = frame # Renderer frame index
+        self.width = width
+        self.height = height
+        self.format = format
+        self.data = data
+
+    def image(self):
+        # As a PIL image (decodes JPEG/PNG)
+        if self.format == 'RAW':
+            return Image.frombytes('RGB', (self.width, self.height), self.data)
+        return Image.open(io.BytesIO(self.data))
+
+
+class CaptureQueue:
+    # Bounded, drops the oldest capture when full. put() from the encoder
+    # thread, get()/latest() from anywhere.
+
+    def __init__(self, maxlen=4):
+        self._items = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.delivered = 0
+        self.dropped = 0 # Pushed out unread
+
+    def put(self, capture):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(capture)
+            self.delivered += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        # Oldest unread capture, waiting up to timeout; None if there is none
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+    def latest(self):
+        # Newest capture without consuming it
+        with self._cond:
+            return self._items[-1] if self._items else None
+
+    def __len__(self):
+        return len(self._items)
+
+
+def encode(pixels, width, height, format='JPEG', quality=80):
+    # GL rows (bottom row first, RGB) -> Capture data
+    image = Image.frombuffer('RGB', (width, height), pixels, 'raw', 'RGB', 0, -1)
+    if format == 'RAW':
+        return image.tobytes()
+    out = io.BytesIO()
+    if format == 'JPEG':
+        image.save(out, 'JPEG', quality=quality)
+    else:
+        image.save(out, format)
+    return out.getvalue()
+
+
+def capture_size(source_size, width):
+    # Target size for a source, keeping its aspect; never larger than the source
+    sw, sh = source_size
+    w = min(width, sw)
+    return w, max(1, round(sh * w / sw))
+
+
+class FrameCapture:
+    # The program is shaders/downsample.glsl with its source sampler set to
+    # CAPTURE_LOCATION. Call update() once per frame after the scene is drawn
+    # (before the UI, which should not be in the picture).
+
+    def __init__(self, ctx, program, queue, width=256, format='JPEG', quality=80, ring=3, delay=2,
+                 backlog=2):
+        assert format in FORMATS and ring > delay >= 1
+        self.ctx = ctx
+        self.program = program
+        self.program['source'].value = CAPTURE_LOCATION
+        self.queue = queue
+        self.width = width
+        self.format = format
+        self.quality = quality
+        self.delay = delay # Frames between issuing a readback and mapping it
+        self.ring = ring
+        self.backlog = backlog # Captures waiting for the encoder before new ones are dropped
+        self.buffers = []
+        self.free = [] # Pixel-pack buffers not in flight
+        self.in_flight = deque() # (buffer, frame, t, size) oldest first
+        self.source = None # Full-size copy of the frame
+        self.target = None
+        self.fbo = None
+        self.requested = False
+        self.next_time = 0.0
+        self.frame = 0
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        self._encoding = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            'captured': 0,
+            'skipped': 0, # Due while every buffer was in flight
+            'dropped': 0, # Encoder still busy with earlier captures
+            'errors': 0,
+        }
+
+    def _allocate(self, source_size):
+        self._release_textures()
+        self.source = self.ctx.texture(source_size, 3)
+        self.source.repeat_x = False
+        self.source.repeat_y = False
+        size = capture_size(source_size, self.width)
+        self.target = self.ctx.texture(size, 3)
+        self.fbo = self.ctx.framebuffer(color_attachments=[self.target])
+        # Buffers still in flight are released when they come back (collect)
+        self.free = [self.ctx.buffer(reserve=size[0] * size[1] * 3) for _ in range(self.ring - len(self.in_flight))]
+        self.buffers.extend(self.free)
+        # Bilinear taps two source pixels apart cover the footprint
+        ratio = max(source_size[0] / size[0], source_size[1] / size[1])
+        self.program['footprint'].value = (1.0 / size[0], 1.0 / size[1])
+        self.program['taps'].value = max(1, math.ceil(ratio / 2.0))
+
+    def request(self):
+        # Capture the next frame regardless of the interval
+        self.requested = True
+
+    def update(self, quad, source_fbo, interval, now=None):
+        # interval: seconds between captures, 0 = only on request()
+        now = time.perf_counter() if now is None else now
+        self.collect()
+        if self.requested or (interval > 0.0 and now >= self.next_time):
+            if self.issue(quad, source_fbo, now):
+                self.requested = False
+                self.next_time = now + interval
+        self.frame += 1
+
+    def issue(self, quad, source_fbo, now):
+        # Queue the GPU side of a capture of source_fbo; False if no buffer is free
+        if self.source is None or self.source.size != source_fbo.size:
+            self._allocate(source_fbo.size)
+        if not self.free:
+            self.counters['skipped'] += 1
+            return False
+        buffer = self.free.pop()
+        self.ctx.copy_framebuffer(self.source, source_fbo)
+        self.ctx.disable(self.ctx.BLEND)
+        self.fbo.use()
+        self.source.use(location=CAPTURE_LOCATION)
+        quad.render(self.program)
+        self.fbo.read_into(buffer, components=3, alignment=1)
+        source_fbo.use()
+        self.in_flight.append((buffer, self.frame, now, self.target.size))
+        self.counters['captured'] += 1
+        return True
+
+    def collect(self, force=False):
+        # Map the readbacks issued at least `delay` frames ago (all if force)
+        while self.in_flight and (force or self.frame - self.in_flight[0][1] >= self.delay):
+            buffer, frame, t, (w, h) = self.in_flight.popleft()
+            pixels = buffer.read(size=w * h * 3)
+            if self.target is not None and self.target.size == (w, h):
+                self.free.append(buffer)
+            else:
+                self.buffers.remove(buffer) # From before a resize
+                buffer.release()
+            with self._lock:
+                busy = self._encoding >= self.backlog and not force
+                if not busy:
+                    self._encoding += 1
+            if busy:
+                self.counters['dropped'] += 1
+                continue
+            future = self._encoder.submit(encode, pixels, w, h, self.format, self.quality)
+            future.add_done_callback(lambda f, t=t, frame=frame, w=w, h=h: self._finish(f, t, frame, w, h))
+
+    def _finish(self, future, t, frame, w, h):
+        with self._lock:
+            self._encoding -= 1
+        try:
+            data = future.result()
+        except Exception as e:
+            self.counters['errors'] += 1
+            print(f"Capture: encoding failed: {e}")
+            return
+        self.queue.put(Capture(t, frame, w, h, self.format, data))
+
+    def _release_textures(self):
+        for obj in (self.fbo, self.target, self.source):
+            if obj is not None:
+                obj.release()
+        self.fbo = self.target = self.source = None
+        for buffer in self.free:
+            self.buffers.remove(buffer)
+            buffer.release()
+        self.free = []
+
+    def release(self):
+        self.collect(force=True)
+        self._encoder.shutdown(wait=True)
+        self._release_textures()
+        for buffer in self.buffers:
+            buffer.release()
+        self.buffers = []
@@ -0,0 +1,345 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine.injections import SDF_HEIGHT, SDF_WIDTH, visible_injections
+from engine.perturbation import (
+    BAILOUT, DEEP_ZOOM_THRESHOLD, compute_reference_orbit,
+    iterate_perturbed, precision_for_zoom,
+)
+from engine.programs import GENERAL_POWER, power_variant
+from engine.precision import FLOAT64_ZOOM_LIMIT, iterate_double, pixel_coordinates, view_center
+from engine.sdf_pyramid import (
+    TILE, TILE_INSIDE, TILE_OUTSIDE, TILE_TEXELS, UV_SCALE, page_window, tile_sdf, window_corner,
+)
+
+# Headless NumPy version of shaders/fractal.glsl. Every step below mirrors a
+# line of the fragment shader so frames can be rendered, diffed and timed
+# without a window or GPU.
+
+TILE_SIZE = 128
+
+
+def frame_uniforms(state, width, height, elapsed=None):
+    # Same values on_render pushes into the program, read from one snapshot
+    if hasattr(state, 'snapshot'):
+        state = state.snapshot()
+    if elapsed is None:
+        elapsed = time.time() - state.time_started
+    center = (state.offset_x, state.offset_y, state.offset_x_lo, state.offset_y_lo)
+    return {
+        'resolution': (width, height),
+        'offset': (state.offset_x, state.offset_y),
+        'offset_lo': (state.offset_x_lo, state.offset_y_lo), # Double-double tails
+        'zoom': state.zoom,
+        'max_iter': int(state.max_iter),
+        'time': elapsed * state.pulse_speed,
+        'power': state.power,
+        'color_tint': (state.color_r, state.color_g, state.color_b),
+        # (text, dx, dy, scale, alpha) for each injection that survives
+        # culling, dx, dy its anchor's offset from the view centre
+        'injections': [(inj.text, *inj.offset_from(*center), inj.scale, a) for inj, a in
+                       visible_injections(state, width, height, state.time_started + elapsed)],
+        'deep_zoom': bool(state.deep_zoom),
+    }
+
+
+# --- Shader Math ---
+
+def _smoothstep(edge0, edge1, x):
+    t = np.clip((x - edge0) / (edge1 - edge0), 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def _sample_linear(tex, u, v):
+    # texture() with LINEAR filtering, clamped at the edges. tex rows are the
+    # uploaded byte rows, so row 0 sits at v = 0 like on the GPU.
+    h, w = tex.shape
+    x = np.clip(u * w - 0.5, 0.0, w - 1.0)
+    y = np.clip(v * h - 0.5, 0.0, h - 1.0)
+    x0 = np.floor(x).astype(np.intp)
+    y0 = np.floor(y).astype(np.intp)
+    x1 = np.minimum(x0 + 1, w - 1)
+    y1 = np.minimum(y0 + 1, h - 1)
+    fx = x - x0
+    fy = y - y0
+    top = tex[y0, x0] * (1.0 - fx) + tex[y0, x1] * fx
+    bottom = tex[y1, x0] * (1.0 - fx) + tex[y1, x1] * fx
+    return (top * (1.0 - fy) + bottom * fy) / 255.0
+
+
+def pyramid_sdf(d, text, dx, dy, scale, u, tiles):
+    # pyramid_sdf() from fractal.glsl with every tile of the window resident:
+    # raw SDF values at offsets d from the view centre, for an injection
+    # anchored at dx, dy from it; NaN where the base layer applies. tiles maps
+    # (text, level, tx, ty) -> engine.sdf_pyramid.tile_sdf()
+    raw = np.full(d.shape, np.nan)
+    level, tx0, ty0, tx1, ty1 = page_window(dx, dy, scale, (0.0, 0.0), u['zoom'], *u['resolution'])
+    if level == 0:
+        return raw
+    corner_x, corner_y = window_corner(dx, dy, scale, (0.0, 0.0), level, tx0, ty0)
+    k = scale * UV_SCALE * (1 << level)
+    qx = (d.real - corner_x) * k * SDF_WIDTH
+    qy = -(d.imag - corner_y) * k * SDF_HEIGHT
+    cell_x = np.floor(qx / TILE).astype(np.intp)
+    cell_y = np.floor(qy / TILE).astype(np.intp)
+    in_window = (cell_x >= 0) & (cell_x < tx1 - tx0) & (cell_y >= 0) & (cell_y < ty1 - ty0)
+    for cx, cy in set(zip(cell_x[in_window].tolist(), cell_y[in_window].tolist())):
+        sel = in_window & (cell_x == cx) & (cell_y == cy)
+        tile = tiles((text, level, tx0 + cx, ty0 + cy))
+        if tile == TILE_OUTSIDE or tile == TILE_INSIDE:
+            raw[sel] = 0.0 if tile == TILE_OUTSIDE else 1.0
+            continue
+        tex = np.frombuffer(tile, dtype=np.uint8).reshape(TILE_TEXELS, TILE_TEXELS)
+        raw[sel] = _sample_linear(tex, (qx[sel] - cx * TILE + 1.0) / TILE_TEXELS,
+                                  (qy[sel] - cy * TILE + 1.0) / TILE_TEXELS)
+    return raw
+
+
+def melt_factor(d, u, sdfs, tiles=None):
+    # INJECTION BLENDING from fractal.glsl at offsets d from the view centre;
+    # sdfs maps text -> uint8 base SDF array, tiles (optional) gives pyramid tiles
+    melt = np.zeros(d.shape)
+    for text, dx, dy, scale, alpha in u['injections']:
+        sdf = sdfs.get(text)
+        if sdf is None:
+            continue
+        inject = (d - complex(dx, dy)) * scale * 0.2 + (0.5 + 0.5j)
+        iu, iv = inject.real, inject.imag
+        raw_dist = _sample_linear(sdf, np.clip(iu, 0.0, 1.0), np.clip(1.0 - iv, 0.0, 1.0))
+        if tiles is not None:
+            fine = pyramid_sdf(d, text, dx, dy, scale, u, tiles)
+            raw_dist = np.where(np.isnan(fine), raw_dist, fine)
+        sdf_dist = 0.5 - raw_dist
+        in_bounds = (iu >= 0.0) & (iu <= 1.0) & (iv >= 0.0) & (iv <= 1.0)
+        np.maximum(melt, _smoothstep(-0.05, 0.05, sdf_dist) * in_bounds * alpha, out=melt)
+    return melt
+
+
+def in_main_bulbs(c):
+    # in_main_bulbs() from fractal.glsl: main cardioid or period-2 bulb
+    q = c - 0.25
+    r2 = q.real * q.real + q.imag * q.imag
+    b = c + 1.0
+    return ((r2 * (r2 + q.real) <= 0.25 * c.imag * c.imag)
+            | (b.real * b.real + b.imag * b.imag <= 0.0625))
+
+
+def cycle_eps(u):
+    # The integer-power kernels' periodicity match radius, squared (None for
+    # the polar kernel, which has no check)
+    if power_variant(u['power']) == GENERAL_POWER:
+        return None
+    return 1e-12 / (u['zoom'] * u['zoom'])
+
+
+def iterate_power(c, power, max_iter, cycle_eps=None):
+    # The shader's polar loop: z = |z|^p * (cos p*theta, sin p*theta) + c.
+    # With cycle_eps, the integer kernels' periodicity check: an orbit that
+    # comes back within sqrt(cycle_eps) of the point saved at iterations 8,
+    # 24, 56, ... is interior. Returns (iterations, final z).
+    shape = c.shape
+    c = c.ravel()
+    z = np.zeros_like(c)
+    iters = np.zeros(c.size, dtype=np.int32)
+    z_out = np.zeros_like(c)
+    idx = np.arange(c.size)
+    square = power == 2.0
+
+    if square:
+        # The POWER 2 kernel: bulb points are interior without iterating
+        inside = in_main_bulbs(c)
+        iters[inside] = max_iter
+        idx, c, z = idx[~inside], c[~inside], z[~inside]
+
+    saved = np.zeros_like(c)
+    since, interval = 0, 8
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        if square:
+            z = z * z + c
+        else:
+            r = np.abs(z) ** power
+            theta = np.arctan2(z.imag, z.real) * power
+            z = r * (np.cos(theta) + 1j * np.sin(theta)) + c
+        mag = z.real * z.real + z.imag * z.imag
+        escaped = mag > BAILOUT
+        if escaped.any():
+            z_out[idx[escaped]] = z[escaped]
+            keep = ~escaped
+            idx, z, c, saved = idx[keep], z[keep], c[keep], saved[keep]
+        iters[idx] += 1
+        if cycle_eps is not None:
+            d = z - saved
+            cycled = d.real * d.real + d.imag * d.imag < cycle_eps
+            if cycled.any():
+                iters[idx[cycled]] = max_iter
+                z_out[idx[cycled]] = z[cycled]
+                keep = ~cycled
+                idx, z, c, saved = idx[keep], z[keep], c[keep], saved[keep]
+            since += 1
+            if since == interval:
+                saved = z.copy()
+                since, interval = 0, interval * 2
+
+    z_out[idx] = z
+    return iters.reshape(shape), z_out.reshape(shape)
+
+
+def shade(iters, z, u):
+    # Smooth colouring from fractal.glsl, returned as float RGB in [0, 1]
+    max_iter = u['max_iter']
+    mag = np.maximum(z.real * z.real + z.imag * z.imag, 0.00001)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        float_iter = iters - np.log2(np.log2(mag)) + 4.0
+    t = float_iter / float(max_iter)
+    tint = np.asarray(u['color_tint'], dtype=np.float64)
+    rgb = 0.5 + 0.5 * np.cos(6.28318 * ((t + u['time'])[..., np.newaxis] + tint))
+    rgb[iters == max_iter] = (0.0, 0.0, 0.02)
+    return rgb
+
+
+def render_tile(u, x0, y0, w, h, sdfs=None, ref=None, tiles=None):
+    # Shades the w x h block at (x0, y0) of the frame (row 0 = top).
+    # Returns (uint8 RGB tile, total loop iterations run).
+    width, height = u['resolution']
+    aspect_x = width / min(width, height)
+    aspect_y = height / min(width, height)
+    uv_x = (np.arange(x0, x0 + w) + 0.5) / width
+    uv_y = 1.0 - (np.arange(y0, y0 + h) + 0.5) / height
+    pixel = ((uv_x - 0.5) * aspect_x)[np.newaxis, :] + 1j * ((uv_y - 0.5) * aspect_y)[:, np.newaxis]
+
+    c = pixel / u['zoom'] + complex(*u['offset'])
+    melt = melt_factor(pixel / u['zoom'], u, sdfs or {}, tiles)
+
+    if ref is not None:
+        center_x, center_y = view_center(u['offset'], u['offset_lo'])
+        delta = complex(float(center_x - ref.center_x), float(center_y - ref.center_y))
+        ref_center = complex(float(ref.center_x), float(ref.center_y))
+        dc = pixel / u['zoom'] + delta
+        dc = dc * (1.0 - melt) - ref_center * melt
+        iters, z = iterate_perturbed(dc, ref, u['max_iter'])
+    elif uses_double_double(u):
+        # Past float64's zoom limit: c and z as double-doubles (engine/precision.py)
+        cx, cy = pixel_coordinates(u['offset'], u['offset_lo'], pixel, u['zoom'])
+        cx = (cx[0] * (1.0 - melt), cx[1] * (1.0 - melt))
+        cy = (cy[0] * (1.0 - melt), cy[1] * (1.0 - melt))
+        iters, z = iterate_double(cx, cy, u['power'], u['max_iter'])
+    else:
+        c = c * (1.0 - melt)
+        iters, z = iterate_power(c, u['power'], u['max_iter'], cycle_eps(u))
+
+    rgb = shade(iters, z, u)
+    tile = np.clip(np.rint(rgb * 255.0), 0, 255).astype(np.uint8)
+    work = int(np.minimum(iters + 1, u['max_iter']).sum())
+    return tile, work
+
+
+def uses_deep_zoom(u):
+    return u['deep_zoom'] and u['zoom'] >= DEEP_ZOOM_THRESHOLD and abs(u['power'] - 2.0) < 1e-6
+
+
+def uses_double_double(u):
+    # Integer powers only, like the shader's double-float kernels
+    return u['zoom'] >= FLOAT64_ZOOM_LIMIT and float(u['power']).is_integer() and u['power'] >= 2
+
+
+
+# --- Process Pool ---
+
+# Per-worker caches so each process builds an SDF, pyramid tile or reference orbit once
+_sdf_cache = {}
+_tile_cache = {}
+_ref_cache = {}
+
+
+def _load_sdf(text, width=SDF_WIDTH, height=SDF_HEIGHT):
+    from engine.sdf_maker import create_sdf
+    if text not in _sdf_cache:
+        data, w, h = create_sdf(text, width, height)
+        if len(_sdf_cache) >= 32:
+            _sdf_cache.clear()
+        _sdf_cache[text] = np.frombuffer(data, dtype=np.uint8).reshape(h, w)
+    return _sdf_cache[text]
+
+
+def _load_tile(key):
+    if key not in _tile_cache:
+        if len(_tile_cache) >= 256:
+            _tile_cache.clear()
+        _tile_cache[key] = tile_sdf(*key)
+    return _tile_cache[key]
+
+
+def _load_ref(u):
+    key = (u['offset'], u['offset_lo'], u['max_iter'], precision_for_zoom(u['zoom']))
+    if key not in _ref_cache:
+        _ref_cache.clear()
+        _ref_cache[key] = compute_reference_orbit(*view_center(u['offset'], u['offset_lo']), key[2], key[3])
+    return _ref_cache[key]
+
+
+def _render_tile_task(u, x0, y0, w, h):
+    sdfs = {text: _load_sdf(text) for text, *_ in u['injections']}
+    ref = _load_ref(u) if uses_deep_zoom(u) else None
+    tile, work = render_tile(u, x0, y0, w, h, sdfs=sdfs, ref=ref, tiles=_load_tile)
+    return x0, y0, tile, work
+
+
+def tiles(width, height, tile_size=TILE_SIZE):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield x0, y0, min(tile_size, width - x0), min(tile_size, height - y0)
+
+
+class CpuRenderer:
+    # Renders frames in tiles across a process pool. Use as a context manager
+    # (or call close()) so the pool is reused across frames.
+
+    def __init__(self, workers=None, tile_size=TILE_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.last_work = 0 # Loop iterations run by the last frame, for pixel*iter/s
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def render(self, u):
+        width, height = u['resolution']
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        jobs = list(tiles(width, height, self.tile_size))
+
+        if self.workers == 1 or len(jobs) == 1:
+            results = (_render_tile_task(u, *job) for job in jobs)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self._pool.submit(_render_tile_task, u, *job) for job in jobs]
+            results = (f.result() for f in futures)
+
+        self.last_work = 0
+        for x0, y0, tile, work in results:
+            frame[y0:y0 + tile.shape[0], x0:x0 + tile.shape[1]] = tile
+            self.last_work += work
+        return frame
+
+    def render_state(self, state, width, height, elapsed=None):
+        return self.render(frame_uniforms(state, width, height, elapsed))
+
+
+def render_frame(state, width, height, elapsed=None, workers=None, tile_size=TILE_SIZE):
+    # One-shot helper: RGB uint8 array (height, width, 3), row 0 = top
+    with CpuRenderer(workers, tile_size) as renderer:
+        return renderer.render_state(state, width, height, elapsed)
@@ -0,0 +1,506 @@
+import os
+import json
+import math
+import hashlib
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image
+
+from engine.state import FractalState
+from engine.cpu_renderer import _render_tile_task, frame_uniforms, tiles, uses_deep_zoom
+from engine.injections import Injection, InjectionPool
+from engine.perturbation import compute_reference_orbit, orbit_texture_data, precision_for_zoom
+from engine.precision import split_float32, view_center, view_precision
+from engine.programs import SHADER_PATH, variant_defines, variant_key
+from engine.recorder import SessionReader, SessionReplayer
+from engine.sdf_pyramid import tile_sdf
+from engine.uniforms import UniformBuffer
+
+# Offline export of zoom paths to image sequences, independent of the
+# interactive window. A path (keyframes in a JSON file, or a recorded session
+# replayed with its view) gives the uniforms of every frame; each frame is cut
+# into tiles that are rendered at `supersample` x the output resolution and box
+# filtered down, by worker processes that each own a headless GL context (or
+# the NumPy renderer, backend 'cpu'). Finished tiles land in a memory-mapped
+# <frame>.partial file next to a <frame>.tiles flag per tile, written after the
+# pixels, so an interrupted export resumes at the first missing tile; a frame
+# becomes frame_NNNNNN.png (atomically) once its last tile is in.
+
+EXPORTS_DIR = "exports"
+EXPORT_TILE = 256 # Output pixels per tile side
+MANIFEST = "export.json"
+BACKENDS = ('gl', 'cpu')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fields a keyframe may set. zoom is interpolated geometrically (constant zoom
+# speed), deep_zoom holds until the next keyframe, the rest are linear.
+PATH_FIELDS = ('offset_x', 'offset_y', 'zoom', 'max_iter', 'power', 'color_r', 'color_g', 'color_b',
+               'pulse_speed', 'deep_zoom')
+STEPPED_FIELDS = ('deep_zoom',)
+
+
+def frame_name(index):
+    return f"frame_{index:06d}.png"
+
+
+# --- Paths ---
+
+class ScriptedPath:
+    # keyframes: dicts with "t" (seconds) and any of PATH_FIELDS; fields a
+    # keyframe leaves out carry over from the one before (or FractalState's
+    # defaults). One keyframe is a still.
+
+    def __init__(self, keyframes, fps=30.0):
+        if not keyframes:
+            raise ValueError("a scripted path needs at least one keyframe")
+        defaults = FractalState()
+        current = {field: getattr(defaults, field) for field in PATH_FIELDS}
+        self.keyframes = []
+        for key in sorted(keyframes, key=lambda k: k.get('t', 0.0)):
+            unknown = set(key) - set(PATH_FIELDS) - {'t'}
+            if unknown:
+                raise ValueError(f"unknown keyframe fields: {', '.join(sorted(unknown))}")
+            current = dict(current, **{f: key[f] for f in PATH_FIELDS if f in key})
+            if current['zoom'] <= 0.0:
+                raise ValueError("zoom must be positive")
+            self.keyframes.append((float(key.get('t', 0.0)), current))
+        self.fps = fps
+        self.start = 0.0
+        self.duration = self.keyframes[-1][0] - self.keyframes[0][0]
+        self.count = int(round(self.duration * fps)) + 1
+        self.state = defaults
+
+    @classmethod
+    def load(cls, path, fps=None):
+        # {"fps": 30, "keyframes": [{"t": 0, "zoom": 1.0, ...}, ...]}
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data['keyframes'], fps or data.get('fps', 30.0))
+
+    def digest(self):
+        # Identifies the keyframes, for the export manifest
+        return hashlib.sha1(json.dumps(self.keyframes, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def fields_at(self, t):
+        if len(self.keyframes) == 1:
+            return dict(self.keyframes[0][1])
+        t = t + self.keyframes[0][0]
+        times = [k[0] for k in self.keyframes]
+        i = max(0, min(int(np.searchsorted(times, t, side='right')) - 1, len(times) - 2))
+        (t0, a), (t1, b) = self.keyframes[i], self.keyframes[i + 1]
+        s = min(max((t - t0) / (t1 - t0), 0.0), 1.0) if t1 > t0 else 1.0
+        out = {}
+        for field in PATH_FIELDS:
+            if field in STEPPED_FIELDS:
+                out[field] = b[field] if s >= 1.0 else a[field]
+            elif field == 'zoom':
+                out[field] = a['zoom'] * (b['zoom'] / a['zoom']) ** s
+            else:
+                out[field] = a[field] + (b[field] - a[field]) * s
+        out['max_iter'] = int(round(out['max_iter']))
+        out['deep_zoom'] = bool(out['deep_zoom'])
+        return out
+
+    def uniforms(self, index, width, height):
+        t = index / self.fps
+        self.state.publish(**self.fields_at(t))
+        return frame_uniforms(self.state, width, height, elapsed=t)
+
+
+class SessionPath:
+    # A recording's view and parameters, sampled at fps from `start` to `end`
+    # seconds. Replays forward only, so uniforms() must be called with
+    # non-decreasing indices (skipping is fine).
+
+    def __init__(self, session, fps=30.0, start=0.0, end=None):
+        self.session = session
+        self.state = FractalState()
+        self.replayer = SessionReplayer(session, self.state, speed=0.0, drive_view=True)
+        end = self.replayer.end if end is None else min(end, self.replayer.end)
+        self.fps = fps
+        self.start = start
+        self.duration = max(0.0, end - start)
+        self.count = int(math.floor(self.duration * fps)) + 1
+        self._last = -1
+        self._seen = set()
+
+    def digest(self):
+        # Identifies the recording (its layout and every record in it), for
+        # the export manifest
+        reader = SessionReader(self.session)
+        h = hashlib.sha1(json.dumps(reader.meta, sort_keys=True).encode("utf-8"))
+        for stream in sorted(reader.meta['streams']):
+            for col, values in reader.stream(stream).items():
+                h.update(f"{stream}.{col}".encode("utf-8"))
+                h.update(np.ascontiguousarray(values).tobytes())
+        return h.hexdigest()
+
+    def uniforms(self, index, width, height):
+        if index < self._last:
+            raise ValueError("a session path can only move forward")
+        self._last = index
+        t = self.start + index / self.fps
+        self.replayer.advance(t)
+        # Replayed injections are born at replay (wall) time; move them onto
+        # the session clock. Good to one frame, which is all the fade needs.
+        for inj in self.state.injections:
+            if id(inj) not in self._seen:
+                self._seen.add(id(inj))
+                inj.born = self.state.time_started + t
+        return frame_uniforms(self.state, width, height, elapsed=t)
+
+
+def load_path(source, fps=None, start=0.0, end=None):
+    # A session directory (recordings/<name>) or a keyframe JSON file
+    if os.path.isdir(source):
+        return SessionPath(source, fps or 30.0, start, end)
+    return ScriptedPath.load(source, fps)
+
+
+# --- Tile Rendering (worker processes) ---
+
+class _InlineSdfs:
+    # The request()/get() interface InjectionPool expects from engine.sdf_cache,
+    # built synchronously: a worker has nothing else to do meanwhile. With a
+    # cache_dir, SDFs go through engine.sdf_cache's on-disk cache (and its glyph
+    # atlas if use_atlas), which every process shares.
+    def __init__(self, cache_dir=None, use_atlas=False):
+        self.cache = {}
+        self.cache_dir = cache_dir
+        self.use_atlas = use_atlas
+
+    def request(self, text, width, height):
+        return (text, width, height)
+
+    def get(self, key):
+        if key not in self.cache:
+            if len(self.cache) >= 32:
+                self.cache.clear()
+            if self.cache_dir:
+                from engine.sdf_cache import _generate, sdf_key
+                self.cache[key] = _generate(sdf_key(*key), self.cache_dir, self.use_atlas)
+            else:
+                from engine.sdf_maker import create_sdf
+                self.cache[key] = create_sdf(*key)
+        return self.cache[key]
+
+
+class _InlineTiles:
+    # Same for engine.sdf_pyramid.TileCache: every tile a tile needs, built on
+    # the spot, so exported frames never show a coarser level
+    def __init__(self):
+        self.cache = {}
+
+    def request(self, key):
+        pass
+
+    def get(self, key):
+        if key not in self.cache:
+            if len(self.cache) >= 256:
+                self.cache.clear()
+            self.cache[key] = tile_sdf(*key)
+        return self.cache[key]
+
+    def retain(self, keys):
+        pass
+
+
+class GlTileRenderer:
+    # fractal.glsl (PASS 0) on a standalone context. A tile is a quad whose
+    # texture coordinates cover just its part of the frame, so the shader sees
+    # the same uv (and resolution) as for the whole frame and the tiles join
+    # without seams. Programs are compiled once per renderer and shared by
+    # every frame it draws; sdf_cache_dir and use_atlas go to _InlineSdfs.
+
+    def __init__(self, sdf_cache_dir=None, use_atlas=False):
+        import moderngl
+        import moderngl_window as mglw
+        from moderngl_window import resources
+        from moderngl_window.meta import ProgramDescription
+        try:
+            self.ctx = moderngl.create_standalone_context(backend='egl')
+        except Exception:
+            self.ctx = moderngl.create_standalone_context()
+        mglw.activate_context(ctx=self.ctx)
+        resources.register_dir(ROOT)
+        self._load = lambda defines: resources.programs.load(ProgramDescription(path=SHADER_PATH, defines=defines))
+        self.uniforms = UniformBuffer(self.ctx)
+        self.pool = InjectionPool(self.ctx, _InlineSdfs(sdf_cache_dir, use_atlas), tiles=_InlineTiles())
+        self.ref_tex = self.ctx.texture((1, 1), 2, dtype='f4')
+        self.ref_key = None
+        self.vbo = self.ctx.buffer(reserve=4 * 5 * 4)
+        self.programs = {} # variant key -> (program, vao)
+        self.fbo = None
+
+    def _program(self, key):
+        if key not in self.programs:
+            program = self._load(variant_defines(key))
+            self.uniforms.attach(program)
+            if key[2]:
+                self.pool.attach(program, texture_location=0, block_binding=0)
+            if program.get('ref_orbit', None) is not None:
+                program['ref_orbit'].value = 1
+            vao = self.ctx.vertex_array(program, [(self.vbo, '3f 2f', 'in_position', 'in_texcoord_0')])
+            self.programs[key] = (program, vao)
+        return self.programs[key]
+
+    def _deep_zoom(self, u):
+        # One orbit around the frame's centre, kept while the tiles of a frame come in
+        if not uses_deep_zoom(u):
+            return 0, 0
+        center_x, center_y = view_center(u['offset'], u['offset_lo'])
+        key = (center_x, center_y, u['max_iter'], precision_for_zoom(u['zoom']))
+        if key != self.ref_key:
+            ref = compute_reference_orbit(center_x, center_y, key[2], key[3])
+            data, w, h = orbit_texture_data(ref)
+            if self.ref_tex.size != (w, h):
+                self.ref_tex.release()
+                self.ref_tex = self.ctx.texture((w, h), 2, dtype='f4')
+                self.ref_tex.filter = (self.ctx.NEAREST, self.ctx.NEAREST)
+            self.ref_tex.write(data)
+            self.ref_key = key
+            self.ref = ref
+        self.ref_tex.use(location=1)
+        ref = self.ref
+        self.uniforms.set('deep', float(center_x - ref.center_x), float(center_y - ref.center_y),
+                          float(ref.center_x), float(ref.center_y))
+        return 1, len(ref)
+
+    def _target(self, w, h):
+        if self.fbo is None or self.fbo.size[0] < w or self.fbo.size[1] < h:
+            if self.fbo is not None:
+                self.fbo.release()
+            size = (w, h) if self.fbo is None else (max(w, self.fbo.size[0]), max(h, self.fbo.size[1]))
+            self.fbo = self.ctx.simple_framebuffer(size, components=3)
+        return self.fbo
+
+    def render(self, u, x0, y0, w, h):
+        # RGB uint8 (h, w, 3) of the frame's pixels x0..x0+w, y0..y0+h (row 0 = top)
+        width, height = u['resolution']
+        deep_active, ref_len = self._deep_zoom(u)
+        precision = 0 if deep_active else view_precision(u['zoom'])
+        key = variant_key(0, u['power'], bool(u['injections']), precision)
+        program, vao = self._program(key)
+        x, x_lo = split_float32(u['offset'][0], u['offset_lo'][0])
+        y, y_lo = split_float32(u['offset'][1], u['offset_lo'][1])
+        self.uniforms.set('view', x, y, u['zoom'], u['time'])
+        self.uniforms.set('view_lo', x_lo, y_lo)
+        self.uniforms.set('shape', u['power'], *u['color_tint'])
+        self.uniforms.set('screen', width, height)
+        self.uniforms.set('flags', u['max_iter'], deep_active, ref_len, u['max_iter'])
+        self.uniforms.upload()
+        if key[2]:
+            # Anchors come as offsets from the view centre, so the centre is the origin
+            visible = [(Injection(text, dx, dy, scale), a) for text, dx, dy, scale, a in u['injections']]
+            self.pool.update(visible, 0.0, (0.0, 0.0), u['zoom'], (width, height))
+            self.pool.use()
+
+        # GL rows count up from the bottom of the frame
+        u0, u1 = x0 / width, (x0 + w) / width
+        v0, v1 = 1.0 - (y0 + h) / height, 1.0 - y0 / height
+        self.vbo.write(np.array([-1, -1, 0, u0, v0, 1, -1, 0, u1, v0,
+                                 -1, 1, 0, u0, v1, 1, 1, 0, u1, v1], dtype='f4').tobytes())
+        fbo = self._target(w, h)
+        fbo.use()
+        self.ctx.viewport = (0, 0, w, h)
+        vao.render(self.ctx.TRIANGLE_STRIP)
+        data = fbo.read(viewport=(0, 0, w, h), components=3)
+        return np.frombuffer(data, dtype=np.uint8).reshape(h, w, 3)[::-1]
+
+
+def downsample(tile, factor):
+    # Box filter: the mean of each factor x factor block
+    if factor == 1:
+        return tile
+    h, w = tile.shape[0] // factor, tile.shape[1] // factor
+    blocks = tile.reshape(h, factor, w, factor, 3).astype(np.float32)
+    return (blocks.mean(axis=(1, 3)) + 0.5).astype(np.uint8)
+
+
+_gl = None # This process's GlTileRenderer
+
+
+def render_export_tile(backend, u, supersample, x0, y0, w, h):
+    # One output tile; u is in supersampled pixels, x0..h in output pixels
+    s = supersample
+    if backend == 'gl':
+        global _gl
+        if _gl is None:
+            _gl = GlTileRenderer()
+        tile = _gl.render(u, x0 * s, y0 * s, w * s, h * s)
+    else:
+        tile = _render_tile_task(u, x0 * s, y0 * s, w * s, h * s)[2]
+    return downsample(tile, s)
+
+
+def _export_tile_task(backend, u, supersample, index, k, x0, y0, w, h):
+    return index, k, render_export_tile(backend, u, supersample, x0, y0, w, h)
+
+
+# --- Output ---
+
+class _PartialFrame:
+    # A frame with tiles still to come: pixels and done flags, both mapped
+    # from disk so a restart picks up where the last run stopped
+
+    def __init__(self, directory, index, width, height, jobs):
+        base = os.path.join(directory, frame_name(index)[:-4])
+        self.paths = (base + ".partial", base + ".tiles")
+        self.jobs = jobs
+        self.pixels = self._map(self.paths[0], (height, width, 3))
+        self.done = self._map(self.paths[1], (len(jobs),))
+
+    @staticmethod
+    def _map(path, shape):
+        exists = os.path.exists(path) and os.path.getsize(path) == int(np.prod(shape))
+        return np.memmap(path, dtype=np.uint8, mode='r+' if exists else 'w+', shape=shape)
+
+    def missing(self):
+        return [k for k in range(len(self.jobs)) if not self.done[k]]
+
+    def put(self, k, tile):
+        x0, y0, w, h = self.jobs[k]
+        self.pixels[y0:y0 + h, x0:x0 + w] = tile
+        self.pixels.flush()
+        self.done[k] = 1 # Last, so a flagged tile is always on disk
+        self.done.flush()
+
+    def complete(self):
+        return bool(self.done.all())
+
+    def save(self, path):
+        tmp = path + ".tmp"
+        Image.fromarray(np.asarray(self.pixels)).save(tmp, format='PNG')
+        os.replace(tmp, path)
+
+    def remove(self):
+        del self.pixels, self.done
+        for path in self.paths:
+            os.remove(path)
+
+
+class Exporter:
+    # Renders path.count frames of width x height into out_dir. Settings are
+    # kept in export.json; running again with the same ones resumes, different
+    # ones are refused rather than mixed into the same sequence. They include
+    # the time range and a digest of the keyframes or recording, so an edited
+    # path does not pass for the same one.
+
+    def __init__(self, path, out_dir, width, height, supersample=1, backend='gl', workers=None,
+                 tile_size=EXPORT_TILE, source=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}")
+        self.path = path
+        self.out_dir = out_dir
+        self.width = width
+        self.height = height
+        self.supersample = max(1, int(supersample))
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.settings = {
+            'source': os.path.abspath(source) if source else None,
+            'width': width, 'height': height, 'supersample': self.supersample,
+            'fps': path.fps, 'frames': path.count, 'backend': backend, 'tile': tile_size,
+            'start': path.start, 'end': path.start + path.duration, 'path': path.digest(),
+        }
+        self.jobs = list(tiles(width, height, tile_size))
+        # Counters for the progress line and the benchmark
+        self.frames_written = 0
+        self.frames_skipped = 0
+        self.tiles_rendered = 0
+        self._pool = None
+
+    def _check_manifest(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        manifest = os.path.join(self.out_dir, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                old = json.load(f)
+            if old != self.settings:
+                changed = sorted(k for k in self.settings if old.get(k) != self.settings[k])
+                raise ValueError(f"{self.out_dir} holds an export with different settings "
+                                 f"({', '.join(changed)}); use a new directory")
+            return
+        with open(manifest + ".tmp", 'w') as f:
+            json.dump(self.settings, f, indent=2)
+        os.replace(manifest + ".tmp", manifest)
+
+    def _tasks(self, partials, frames):
+        # (index, k, uniforms, job) for every tile still missing, frame by frame
+        s = self.supersample
+        for index in frames:
+            if os.path.exists(os.path.join(self.out_dir, frame_name(index))):
+                self.frames_skipped += 1
+                continue
+            u = self.path.uniforms(index, self.width * s, self.height * s)
+            partial = partials[index] = _PartialFrame(self.out_dir, index, self.width, self.height, self.jobs)
+            missing = partial.missing()
+            if not missing:
+                self._finish(index, partials)
+            for k in missing:
+                yield index, k, u, self.jobs[k]
+
+    def _finish(self, index, partials):
+        partial = partials.pop(index)
+        partial.save(os.path.join(self.out_dir, frame_name(index)))
+        partial.remove()
+        self.frames_written += 1
+        elapsed = time.perf_counter() - self._started
+        print(f"Export: {frame_name(index)} ({self.frames_written} written, "
+              f"{elapsed / self.frames_written:.2f} s/frame)")
+
+    def _store(self, index, k, tile, partials):
+        partial = partials[index]
+        partial.put(k, tile)
+        self.tiles_rendered += 1
+        if partial.complete():
+            self._finish(index, partials)
+
+    def run(self, frames=None):
+        # Renders every frame (or the given indices) not already on disk; returns out_dir
+        self._check_manifest()
+        self._started = time.perf_counter()
+        frames = range(self.path.count) if frames is None else sorted(frames)
+        partials = {}
+        tasks = self._tasks(partials, frames)
+
+        if self.workers == 1:
+            for index, k, u, job in tasks:
+                self._store(index, k, render_export_tile(self.backend, u, self.supersample, *job), partials)
+            return self.out_dir
+
+        # Keep a couple of tiles queued per worker: enough to never starve
+        # them, few enough that frames finish (and leave memory) in order
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        pending = set()
+        try:
+            for index, k, u, job in tasks:
+                pending.add(self._pool.submit(_export_tile_task, self.backend, u, self.supersample, index, k, *job))
+                if len(pending) >= 2 * self.workers:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        self._store(*future.result(), partials)
+            for future in pending:
+                self._store(*future.result(), partials)
+            pending = set()
+        finally:
+            for future in pending:
+                future.cancel()
+        return self.out_dir
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,165 @@
+import math
+
+import moderngl
+import numpy as np
+
+# Gaze-contingent foveated rendering. Away from the fixation the eye resolves
+# far less detail, so instead of running the full max_iter at full resolution
+# everywhere the frame is drawn in layers: a full-resolution, full-iteration
+# fovea around the fixation, a middle ring at half resolution and fewer
+# iterations, and the whole frame at quarter resolution with fewer still.
+# Each layer is fractal.glsl (PASS 0) drawn on a quad whose texture
+# coordinates cover only that layer's rectangle, into a texture of the
+# rectangle's size times the layer scale, so the shader itself does not change.
+# shaders/foveate.glsl then blends them with smooth bands at each radius.
+# Palette scale (color_iter) stays at max_iter, so the layers agree on colour.
+
+# (resolution scale, fraction of the iteration cap) from the fovea outwards;
+# the last layer covers the whole frame. Three, as shaders/foveate.glsl blends.
+LAYERS = ((1.0, 1.0), (0.5, 0.6), (0.25, 0.35))
+RING_GROWTH = 2.5 # Each ring's radius over the one inside it
+LAYER_LOCATIONS = (5, 6, 7) # Texture units (0-4 are taken by the renderer)
+GAZE_STALE_S = 0.5 # Tracker samples older than this no longer place the fovea
+
+
+def layer_radii(radius, count=len(LAYERS), growth=RING_GROWTH):
+    # Outer radius of each layer but the last (px)
+    return [radius * growth ** k for k in range(count - 1)]
+
+
+def plan_layers(size, gaze, radius, layers=LAYERS, growth=RING_GROWTH):
+    # Per layer: the pixel rectangle (x0, y0, x1, y1) it must cover and the
+    # texture size it renders at. gaze is in framebuffer pixels, y up.
+    width, height = size
+    plans = []
+    radii = layer_radii(radius, len(layers), growth)
+    for k, (scale, _) in enumerate(layers):
+        if k == len(layers) - 1:
+            rect = (0, 0, width, height)
+        else:
+            r = radii[k]
+            rect = (max(0, int(math.floor(gaze[0] - r))), max(0, int(math.floor(gaze[1] - r))),
+                    min(width, int(math.ceil(gaze[0] + r))), min(height, int(math.ceil(gaze[1] + r))))
+        w, h = max(0, rect[2] - rect[0]), max(0, rect[3] - rect[1])
+        tex = (max(1, int(math.ceil(w * scale))), max(1, int(math.ceil(h * scale)))) if w and h else (0, 0)
+        plans.append((rect, tex))
+    return plans
+
+
+def foveated_work(size, gaze, radius, layers=LAYERS, growth=RING_GROWTH):
+    # (fragments, iteration budget) as fractions of one full-resolution,
+    # full-iteration frame; the composite pass is not counted
+    full = float(size[0] * size[1])
+    fragments = budget = 0.0
+    for (rect, tex), (_, fraction) in zip(plan_layers(size, gaze, radius, layers, growth), layers):
+        n = tex[0] * tex[1]
+        fragments += n
+        budget += n * fraction
+    return fragments / full, budget / full
+
+
+def fixation(snap, mouse, now, predicted=None):
+    # Where the fovea goes, as (x, y) with 0 = top left like the tracker, and
+    # which source placed it: the tracker while it streams, else the mouse,
+    # else the centre of the screen
+    if snap.gaze_t and now - snap.gaze_t < GAZE_STALE_S:
+        return (predicted if predicted is not None else (snap.gaze_x, snap.gaze_y)), 'gaze'
+    if mouse is not None:
+        return mouse, 'mouse'
+    return (0.5, 0.5), 'centre'
+
+
+class FoveatedRenderer:
+    # Draws the layers and composites them into the target. The caller binds
+    # the fractal's textures and uploads its uniforms as for a normal frame;
+    # render() only lowers the iteration cap per layer.
+
+    def __init__(self, ctx, composite_program, layers=LAYERS, growth=RING_GROWTH):
+        self.ctx = ctx
+        self.layers = layers
+        self.growth = growth
+        self.composite = composite_program
+        for name, location in zip(('fovea', 'middle', 'periphery'), LAYER_LOCATIONS):
+            self.composite[name].value = location
+        self.vbo = ctx.buffer(reserve=4 * 5 * 4)
+        self.vaos = {} # program.glo -> vertex array over self.vbo
+        self.textures = [None] * len(layers)
+        self.fbos = [None] * len(layers)
+        self.fragments = 0.0 # Last frame's work, as fractions of a full frame
+        self.budget = 0.0
+
+    def _target(self, k, size):
+        # A layer's texture, grown when needed and otherwise reused (drawn into
+        # its lower-left corner)
+        tex = self.textures[k]
+        if tex is None or tex.size[0] < size[0] or tex.size[1] < size[1]:
+            if tex is not None:
+                size = (max(size[0], tex.size[0]), max(size[1], tex.size[1]))
+                self.fbos[k].release()
+                tex.release()
+            tex = self.textures[k] = self.ctx.texture(size, 3)
+            tex.repeat_x = False
+            tex.repeat_y = False
+            self.fbos[k] = self.ctx.framebuffer(color_attachments=[tex])
+        return self.fbos[k]
+
+    def _vao(self, program):
+        vao = self.vaos.get(program.glo)
+        if vao is None:
+            vao = self.vaos[program.glo] = self.ctx.vertex_array(
+                program, [(self.vbo, '3f 2f', 'in_position', 'in_texcoord_0')])
+        return vao
+
+    def render(self, quad, target, program, uniforms, size, gaze, radius, falloff):
+        # size: target framebuffer pixels; gaze: fixation in those pixels (y up);
+        # radius, falloff: fovea radius and blend width in pixels
+        width, height = size
+        falloff = max(1.0, min(falloff, radius))
+        flags = uniforms.values[uniforms.index['flags']]
+        vao = self._vao(program)
+        plans = plan_layers(size, gaze, radius, self.layers, self.growth)
+        fragments = budget = 0
+        self.ctx.disable(moderngl.BLEND) # ImGui leaves it on
+        for k, ((rect, tex), (scale, fraction)) in enumerate(zip(plans, self.layers)):
+            fbo = self._target(k, (max(1, tex[0]), max(1, tex[1])))
+            texture = self.textures[k]
+            if tex[0]:
+                uniforms.set('flags', max(10, int(round(flags[0] * fraction))), *flags[1:])
+                uniforms.upload()
+                u0, v0 = rect[0] / width, rect[1] / height
+                u1, v1 = rect[2] / width, rect[3] / height
+                self.vbo.write(np.array([-1, -1, 0, u0, v0, 1, -1, 0, u1, v0,
+                                         -1, 1, 0, u0, v1, 1, 1, 0, u1, v1], dtype='f4').tobytes())
+                fbo.use()
+                self.ctx.viewport = (0, 0, tex[0], tex[1])
+                vao.render(moderngl.TRIANGLE_STRIP)
+                fragments += tex[0] * tex[1]
+                budget += tex[0] * tex[1] * fraction
+                # Window uv -> this texture's uv
+                sx = tex[0] / texture.size[0] / max(u1 - u0, 1e-9)
+                sy = tex[1] / texture.size[1] / max(v1 - v0, 1e-9)
+                mapping = (-u0 * sx, -v0 * sy, sx, sy)
+            else:
+                mapping = (0.0, 0.0, 0.0, 0.0) # Off screen; its weight is zero everywhere
+            self.composite[('fovea_map', 'middle_map', 'periphery_map')[k]].value = mapping
+            texture.use(location=LAYER_LOCATIONS[k])
+
+        radii = layer_radii(radius, len(self.layers), self.growth)
+        self.composite['gaze'].value = tuple(gaze)
+        self.composite['radii'].value = (radii[0], radii[1])
+        self.composite['falloff'].value = falloff
+        uniforms.set('flags', *flags) # Uploaded with next frame's changes
+        target.use()
+        quad.render(self.composite)
+        full = float(width * height)
+        self.fragments = fragments / full
+        self.budget = budget / full
+
+    def release(self):
+        for tex, fbo in zip(self.textures, self.fbos):
+            if tex is not None:
+                fbo.release()
+                tex.release()
+        for vao in self.vaos.values():
+            vao.release()
+        self.vbo.release()
@@ -0,0 +1,249 @@
+import os
+import json
+import string
+import hashlib
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import scipy.ndimage
+
+from engine.sdf_maker import DEFAULT_FONT, create_text_sdf
+
+# Per-glyph SDFs are built once per font, packed into one atlas, and phrases are
+# composited from them with no distance transform at injection time. The
+# composite uses the same encoding as create_text_sdf (value = dist * 4 + 128,
+# positive inside the letters) so the shader does not care where it came from.
+
+DEFAULT_CHARSET = string.printable.strip() + " "
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fractalmassage", "atlas")
+
+ATLAS_WIDTH = 2048
+
+
+def _load_font(font, size):
+    try:
+        return ImageFont.truetype(font, size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+class Glyph:
+    __slots__ = ('x', 'y', 'w', 'h', 'offset_x', 'offset_y', 'advance')
+
+    def __init__(self, x, y, w, h, offset_x, offset_y, advance):
+        self.x, self.y, self.w, self.h = x, y, w, h
+        # Top-left of the glyph box relative to the pen position, in atlas pixels
+        self.offset_x, self.offset_y = offset_x, offset_y
+        self.advance = advance
+
+
+def glyph_sdf(font, char, glyph_size, spread, oversample):
+    # Rasterise one glyph at oversample x resolution, run the EDT there, then
+    # box-filter down. Returns (signed distance in atlas pixels, offset_x, offset_y).
+    hi_font = _load_font(font, glyph_size * oversample)
+    left, top, right, bottom = hi_font.getbbox(char)
+    pad = spread * oversample
+    # Round the box up to a multiple of oversample so the downsample is exact
+    w = -(-(right - left + 2 * pad) // oversample) * oversample
+    h = -(-(bottom - top + 2 * pad) // oversample) * oversample
+
+    img = Image.new('L', (w, h), 0)
+    ImageDraw.Draw(img).text((pad - left, pad - top), char, font=hi_font, fill=255)
+    inside = np.array(img) > 128
+    if inside.any():
+        sdf = scipy.ndimage.distance_transform_edt(inside) - scipy.ndimage.distance_transform_edt(~inside)
+    else:
+        sdf = np.full((h, w), -float(pad)) # Whitespace: everything is far outside
+
+    sdf = sdf.reshape(h // oversample, oversample, w // oversample, oversample).mean(axis=(1, 3))
+    sdf /= oversample
+    return sdf, (left - pad) / oversample, (top - pad) / oversample
+
+
+class GlyphAtlas:
+    # Atlas of uint8 glyph SDFs: value = dist * (127.5 / spread) + 127.5, with
+    # `spread` atlas pixels of range on each side of the edge (wider than the
+    # 32 px create_text_sdf keeps, so composites can be scaled down).
+
+    def __init__(self, font=DEFAULT_FONT, glyph_size=150, spread=48, oversample=2,
+                 charset=DEFAULT_CHARSET):
+        self.font = font
+        self.glyph_size = glyph_size
+        self.spread = spread
+        self.oversample = oversample
+        self.charset = charset
+        self.glyphs = {}
+        self.kerning = {}
+        self.atlas = np.zeros((1, ATLAS_WIDTH), dtype=np.uint8)
+
+    # --- Building ---
+
+    def build(self):
+        metrics_font = _load_font(self.font, self.glyph_size)
+        scale = 127.5 / self.spread
+        tiles = {}
+        for char in self.charset:
+            sdf, ox, oy = glyph_sdf(self.font, char, self.glyph_size, self.spread, self.oversample)
+            tiles[char] = (np.clip(np.rint(sdf * scale + 127.5), 0, 255).astype(np.uint8), ox, oy,
+                           metrics_font.getlength(char))
+
+        # Shelf packing, tallest glyphs first
+        x = y = shelf_h = 0
+        placed = {}
+        for char in sorted(tiles, key=lambda ch: -tiles[ch][0].shape[0]):
+            tile = tiles[char][0]
+            th, tw = tile.shape
+            if x + tw > ATLAS_WIDTH:
+                x, y, shelf_h = 0, y + shelf_h, 0
+            placed[char] = (x, y)
+            x += tw
+            shelf_h = max(shelf_h, th)
+
+        self.atlas = np.zeros((y + shelf_h, ATLAS_WIDTH), dtype=np.uint8)
+        self.glyphs = {}
+        for char, (gx, gy) in placed.items():
+            tile, ox, oy, advance = tiles[char]
+            th, tw = tile.shape
+            self.atlas[gy:gy + th, gx:gx + tw] = tile
+            self.glyphs[char] = Glyph(gx, gy, tw, th, ox, oy, advance)
+
+        # Kerning: how much a pair's advance differs from the sum of its parts
+        self.kerning = {}
+        for a in self.charset:
+            for b in self.charset:
+                kern = metrics_font.getlength(a + b) - self.glyphs[a].advance - self.glyphs[b].advance
+                if abs(kern) > 1e-3:
+                    self.kerning[a + b] = kern
+        return self
+
+    def cache_key(self):
+        key = repr((self.font, self.glyph_size, self.spread, self.oversample, self.charset))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def save(self, path):
+        meta = {
+            'glyphs': {ch: [g.x, g.y, g.w, g.h, g.offset_x, g.offset_y, g.advance]
+                       for ch, g in self.glyphs.items()},
+            'kerning': self.kerning,
+        }
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, atlas=self.atlas, meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with np.load(path) as f:
+            self.atlas = f['atlas']
+            meta = json.loads(f['meta'].tobytes().decode("utf-8"))
+        self.glyphs = {ch: Glyph(*values) for ch, values in meta['glyphs'].items()}
+        self.kerning = meta['kerning']
+        return self
+
+    # --- Layout ---
+
+    def layout(self, text, width=1024, height=512, font_size=150):
+        # Glyph quads for text centred on a width x height canvas, the way
+        # create_text_sdf centres it. Each quad is (glyph, x, y, scale) with
+        # (x, y) the canvas position of the glyph box's top-left corner.
+        s = font_size / self.glyph_size
+        pen = 0.0
+        placed = []
+        ink_left = ink_top = float('inf')
+        ink_right = ink_bottom = float('-inf')
+        prev = None
+        for char in text:
+            glyph = self.glyphs.get(char)
+            if glyph is None:
+                glyph = self.glyphs.get('?')
+                if glyph is None:
+                    continue
+            if prev is not None:
+                pen += self.kerning.get(prev + char, 0.0)
+            placed.append((glyph, pen))
+            if not char.isspace():
+                # Ink box = glyph box minus the SDF padding
+                ink_left = min(ink_left, pen + glyph.offset_x + self.spread)
+                ink_top = min(ink_top, glyph.offset_y + self.spread)
+                ink_right = max(ink_right, pen + glyph.offset_x + glyph.w - self.spread)
+                ink_bottom = max(ink_bottom, glyph.offset_y + glyph.h - self.spread)
+            pen += glyph.advance
+            prev = char
+
+        if ink_left == float('inf'):
+            return []
+
+        # create_text_sdf puts the pen origin at ((W - w) / 2, (H - h) / 2) with
+        # w/h the size of the text's ink box
+        text_w = (ink_right - ink_left) * s
+        text_h = (ink_bottom - ink_top) * s
+        origin_x = (width - text_w) / 2.0
+        origin_y = (height - text_h) / 2.0
+        return [(glyph, origin_x + (pen + glyph.offset_x) * s, origin_y + glyph.offset_y * s, s)
+                for glyph, pen in placed]
+
+    def compose(self, text, width=1024, height=512, font_size=150):
+        # Blit-composite a phrase into a create_text_sdf-compatible buffer.
+        # Returns (bytes, width, height).
+        canvas = np.full((height, width), -np.inf, dtype=np.float32)
+        to_dist = self.spread / 127.5
+        for glyph, x, y, s in self.layout(text, width, height, font_size):
+            tile = self.atlas[glyph.y:glyph.y + glyph.h, glyph.x:glyph.x + glyph.w]
+            dist = (tile.astype(np.float32) - 127.5) * to_dist
+            if s != 1.0:
+                dist = scipy.ndimage.zoom(dist, s, order=1)
+            dist *= s # Distances are in canvas pixels from here on
+
+            x0, y0 = int(round(x)), int(round(y))
+            th, tw = dist.shape
+            cx0, cy0 = max(x0, 0), max(y0, 0)
+            cx1, cy1 = min(x0 + tw, width), min(y0 + th, height)
+            if cx0 >= cx1 or cy0 >= cy1:
+                continue
+            region = canvas[cy0:cy1, cx0:cx1]
+            # Union of shapes = max of (positive inside) signed distances
+            np.maximum(region, dist[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0], out=region)
+
+        sdf_scaled = np.clip(canvas * 4 + 128, 0, 255).astype(np.uint8)
+        return sdf_scaled.tobytes(), width, height
+
+
+_atlases = {}
+
+
+def get_atlas(font=DEFAULT_FONT, glyph_size=150, cache_dir=DEFAULT_CACHE_DIR):
+    # Process-wide atlas per font, loaded from disk or built once and saved
+    key = (font, glyph_size)
+    if key in _atlases:
+        return _atlases[key]
+
+    atlas = GlyphAtlas(font, glyph_size)
+    path = os.path.join(cache_dir, f"{atlas.cache_key()}.npz") if cache_dir else None
+    loaded = False
+    if path and os.path.exists(path):
+        try:
+            atlas.load(path)
+            loaded = True
+        except Exception as e:
+            print(f"Glyph Atlas: could not read {path}: {e}")
+    if not loaded:
+        atlas.build()
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                atlas.save(path)
+            except OSError as e:
+                print(f"Glyph Atlas: could not write {path}: {e}")
+    _atlases[key] = atlas
+    return atlas
+
+
+def covers(text, charset=DEFAULT_CHARSET):
+    # Whether an atlas of charset has a glyph for every character of text
+    return all(char in charset for char in text)
+
+
+def compose_text_sdf(text, width=1024, height=512, font_size=150, font=DEFAULT_FONT):
+    # Drop-in replacement for create_text_sdf backed by the glyph atlas; text
+    # with characters the atlas lacks (accents, other scripts) takes the EDT
+    if not covers(text):
+        return create_text_sdf(text, width, height, font_size, font)
+    return get_atlas(font).compose(text, width, height, font_size)
@@ -0,0 +1,84 @@
+# Holds a GPU frame-time budget by trading render resolution and iteration
+# count. The renderer feeds it one GPU timing per frame; it answers with the
+# offscreen render scale and the effective iteration cap. Changes only happen
+# outside a hysteresis band and after a cooldown, so it does not oscillate.
+
+
+class FrameGovernor:
+    def __init__(self, budget_ms=16.0, min_scale=0.4, min_iter_fraction=0.2,
+                 scale_step=0.05, iter_step=0.85, cooldown=15):
+        self.budget_ms = budget_ms
+        self.min_scale = min_scale
+        self.min_iter_fraction = min_iter_fraction
+        self.scale_step = scale_step
+        self.iter_step = iter_step
+        self.cooldown = cooldown
+
+        self.scale = 1.0 # Offscreen resolution / window resolution
+        self.scale_locked = False # Something else owns the resolution; see lock_scale()
+        self.iter_fraction = 1.0 # Effective max_iter / state.max_iter
+        self.gpu_ms = None # Smoothed GPU frame time
+        self.last_decision = "none"
+        self.counters = {
+            'samples': 0,
+            'scale_down': 0,
+            'scale_up': 0,
+            'iter_down': 0,
+            'iter_up': 0,
+        }
+        self._wait = 0
+
+    def reset(self):
+        self.scale = 1.0
+        self.iter_fraction = 1.0
+        self.gpu_ms = None
+        self._wait = 0
+
+    def lock_scale(self, locked):
+        # While another path sets the resolution (foveated rendering) the scale
+        # stays at 1.0 and only the iteration cap moves
+        if locked != self.scale_locked:
+            self.scale_locked = locked
+            self.gpu_ms = None # A different renderer: re-measure
+            if locked:
+                self.scale = 1.0
+
+    def update(self, gpu_ms):
+        self.counters['samples'] += 1
+        self.gpu_ms = gpu_ms if self.gpu_ms is None else 0.9 * self.gpu_ms + 0.1 * gpu_ms
+        if self._wait > 0:
+            self._wait -= 1
+            return
+
+        if self.gpu_ms > self.budget_ms * 1.05:
+            # Over budget: shed resolution first, then iterations
+            if not self.scale_locked and self.scale > self.min_scale:
+                # Pixel cost goes with scale^2, so far over budget takes a bigger step
+                target = self.scale * (self.budget_ms / self.gpu_ms) ** 0.5
+                scale = min(self.scale - self.scale_step, target)
+                scale = round(scale / self.scale_step) * self.scale_step
+                self.scale = round(max(self.min_scale, scale), 2)
+                self._decide('scale_down')
+            elif self.iter_fraction > self.min_iter_fraction:
+                self.iter_fraction = max(self.min_iter_fraction, self.iter_fraction * self.iter_step)
+                self._decide('iter_down')
+        elif self.gpu_ms < self.budget_ms * 0.7:
+            # Comfortably under: give iterations back first, then resolution
+            if self.iter_fraction < 1.0:
+                self.iter_fraction = min(1.0, self.iter_fraction / self.iter_step)
+                self._decide('iter_up')
+            elif not self.scale_locked and self.scale < 1.0:
+                self.scale = round(min(1.0, self.scale + self.scale_step), 2)
+                self._decide('scale_up')
+
+    def _decide(self, decision):
+        self.counters[decision] += 1
+        self.last_decision = decision
+        self._wait = self.cooldown
+        self.gpu_ms = None # Re-measure at the new settings
+
+    def iter_cap(self, max_iter):
+        return min(max_iter, max(10, int(round(max_iter * self.iter_fraction))))
+
+    def render_size(self, width, height):
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
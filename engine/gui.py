@@ -1,6 +1,11 @@
 import sys
 import traceback
 
+# The tkinter control panel. shared_state is anything indexable by field name:
+# setup_and_start_control_window runs it in its own process on a RemoteState
+# (engine/shared_state.py), so the panel's event loop never holds the render
+# process's GIL.
+
 def run_control_window(shared_state):
     try:
         import tkinter as tk
@@ -36,4 +41,15 @@ def run_control_window(shared_state):
         print("GUI PROCESS CRASHED!")
         print(traceback.format_exc())
         print("="*50 + "\n")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+def setup_and_start_control_window(state):
+    try:
+        from engine.shared_state import start_state_process
+        process = start_state_process(state, run_control_window, name="control-window")
+        print(f"GUI: control window running in process {process.pid}.")
+        return process
+    except Exception as e:
+        print(f"GUI: could not start the control window ({e}).")
+        return None
@@ -0,0 +1,209 @@
+import time
+import struct
+
+from engine.precision import dd_add
+from engine.sdf_maker import register_mask
+from engine.sdf_pyramid import SDF_HEIGHT, SDF_WIDTH, TileAtlas
+
+# Several depth-locked injections at once. Each one is anchored at a point in
+# the complex plane and locked to the zoom it was made at, and fades in and out
+# over its lifetime. The GPU side keeps their SDFs in one pooled texture array
+# and passes the visible ones to fractal.glsl as a std140 uniform block.
+# Anchors are double-doubles like the view centre (x + x_lo), and everything
+# downstream works on anchor - centre, so they stay put at any depth.
+
+# Must match MAX_INJECTIONS in fractal.glsl
+MAX_INJECTIONS = 16
+
+# An injection covers inject_uv in [0, 1], i.e. +-0.5 / (scale * 0.2) around its anchor
+FOOTPRINT = 0.5 / 0.2
+
+
+class Injection:
+    def __init__(self, text, x, y, scale, lifetime=None, fade=1.0, born=None, x_lo=0.0, y_lo=0.0):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.x_lo = x_lo # Double-double tails, as FractalState.offset_x_lo
+        self.y_lo = y_lo
+        self.scale = scale # Zoom depth the injection is locked to
+        self.lifetime = lifetime # Seconds, None = until cleared
+        self.fade = fade # Fade in/out time in seconds
+        self.born = time.time() if born is None else born
+
+    def alpha(self, now):
+        age = now - self.born
+        if age < 0.0:
+            return 0.0
+        a = 1.0 if self.fade <= 0.0 else min(1.0, age / self.fade)
+        if self.lifetime is not None:
+            left = self.lifetime - age
+            if left <= 0.0:
+                return 0.0
+            if self.fade > 0.0:
+                a = min(a, left / self.fade)
+        return a
+
+    def expired(self, now):
+        return self.lifetime is not None and now - self.born >= self.lifetime
+
+    def offset_from(self, x, y, x_lo=0.0, y_lo=0.0):
+        # Anchor minus the point (x + x_lo, y + y_lo), taken in double-double;
+        # the difference is small and fits a float without losing the digits
+        dx, dx_lo = dd_add(self.x, self.x_lo, -x, -x_lo)
+        dy, dy_lo = dd_add(self.y, self.y_lo, -y, -y_lo)
+        return dx + dx_lo, dy + dy_lo
+
+    def visible(self, dx, dy, zoom, aspect_x, aspect_y, min_pixels=1.0, resolution=720):
+        # dx, dy: offset_from() the view centre. Cull anything outside the view
+        # window, or so far behind the camera that the whole injection is
+        # smaller than a pixel
+        half = FOOTPRINT / self.scale
+        if half * zoom * resolution < min_pixels:
+            return False
+        view_x = 0.5 * aspect_x / zoom
+        view_y = 0.5 * aspect_y / zoom
+        return abs(dx) <= half + view_x and abs(dy) <= half + view_y
+
+
+def inject(state, text, x, y, scale, lifetime=None, fade=1.0, x_lo=0.0, y_lo=0.0):
+    injection = Injection(text, x, y, scale, lifetime, fade, x_lo=x_lo, y_lo=y_lo)
+    with state.lock:
+        state.injections = state.injections + [injection]
+    return injection
+
+
+def inject_image(state, image, x, y, scale, lifetime=None, fade=1.0):
+    # A PIL image as a mask: inside where its alpha (or luminance) is above half
+    return inject(state, register_mask(image), x, y, scale, lifetime, fade)
+
+
+def clear_injections(state):
+    with state.lock:
+        state.injections = []
+
+
+def visible_injections(state, width, height, now):
+    # (injection, alpha) pairs for this frame, oldest first, at most MAX_INJECTIONS
+    aspect_x = width / min(width, height)
+    aspect_y = height / min(width, height)
+    out = []
+    for inj in state.injections:
+        a = inj.alpha(now)
+        if a <= 0.0:
+            continue
+        dx, dy = inj.offset_from(state.offset_x, state.offset_y, state.offset_x_lo, state.offset_y_lo)
+        if not inj.visible(dx, dy, state.zoom, aspect_x, aspect_y, resolution=min(width, height)):
+            continue
+        out.append((inj, a))
+    return out[-MAX_INJECTIONS:]
+
+
+def prune_injections(state, now):
+    with state.lock:
+        if any(inj.expired(now) for inj in state.injections):
+            state.injections = [inj for inj in state.injections if not inj.expired(now)]
+
+
+# --- GPU Pool ---
+
+class InjectionPool:
+    # One R8 texture array with MAX_INJECTIONS layers, reused for the whole
+    # session. Layers are keyed by SDF text and reference counted per frame, so
+    # the same phrase injected twice shares one layer, and a freed layer is
+    # overwritten in place instead of allocating a new texture. Past the depth
+    # the base layer resolves, the view samples finer tiles of the injection's
+    # SDF pyramid from `tiles` (engine/sdf_pyramid.py).
+
+    def __init__(self, ctx, sdf_cache, layers=MAX_INJECTIONS, tiles=None):
+        self.ctx = ctx
+        self.sdf_cache = sdf_cache
+        self.atlas = TileAtlas(ctx, tiles, MAX_INJECTIONS)
+        self.texture = ctx.texture_array((SDF_WIDTH, SDF_HEIGHT, layers), 1)
+        self.layers = {} # text -> layer index
+        self.last_used = [0.0] * layers
+        self.free = list(range(layers))
+        # Layout: ivec4 count, vec4 anchor[MAX], vec4 params[MAX], vec4 window[MAX]
+        self.ubo = ctx.buffer(bytes(16 + 48 * MAX_INJECTIONS))
+        self.count = 0
+        self.texture_location = 0
+        self.block_binding = 0
+
+    def _layer_for(self, text, in_use, now):
+        layer = self.layers.get(text)
+        if layer is not None:
+            self.last_used[layer] = now
+            return layer
+
+        key = self.sdf_cache.request(text, SDF_WIDTH, SDF_HEIGHT)
+        result = self.sdf_cache.get(key)
+        if result is None:
+            return None # Still being generated; shows up on a later frame
+
+        if self.free:
+            layer = self.free.pop()
+        else:
+            # Recycle the least recently drawn layer that is not needed this frame
+            candidates = [(self.last_used[l], t) for t, l in self.layers.items() if l not in in_use]
+            if not candidates:
+                return None
+            _, old_text = min(candidates)
+            layer = self.layers.pop(old_text)
+
+        data, w, h = result
+        self.texture.write(data, viewport=(0, 0, layer, w, h, 1))
+        self.layers[text] = layer
+        self.last_used[layer] = now
+        return layer
+
+    def update(self, visible, now, center, zoom, size, center_lo=(0.0, 0.0)):
+        # visible: (injection, alpha) pairs from visible_injections(); center
+        # (+ center_lo, a double-double), zoom and size (pixels) describe the
+        # view. Anchors go up relative to the view centre so float32 keeps
+        # their digits at depth.
+        anchors = []
+        params = []
+        windows = []
+        in_use = set()
+        self.atlas.begin()
+        for inj, a in visible:
+            layer = self._layer_for(inj.text, in_use, now)
+            if layer is None:
+                continue
+            in_use.add(layer)
+            dx, dy = inj.offset_from(center[0], center[1], *center_lo)
+            # The tile window only depends on where the anchor is from the centre
+            level, tx0, ty0, corner_x, corner_y = self.atlas.page(
+                len(anchors), inj.text, dx, dy, inj.scale, (0.0, 0.0), zoom, size)
+            anchors.append((dx, dy, inj.scale, a))
+            params.append((float(layer), float(level), float(tx0), float(ty0)))
+            windows.append((corner_x, corner_y, 0.0, 0.0))
+        self.atlas.end()
+
+        if not anchors and self.count == 0:
+            return # Nothing drawn last frame either; the block is already empty
+        self.count = len(anchors)
+        pad = MAX_INJECTIONS - self.count
+        blob = struct.pack('4i', self.count, 0, 0, 0)
+        blob += b''.join(struct.pack('4f', *v) for v in anchors) + bytes(16 * pad)
+        blob += b''.join(struct.pack('4f', *v) for v in params) + bytes(16 * pad)
+        blob += b''.join(struct.pack('4f', *v) for v in windows) + bytes(16 * pad)
+        self.ubo.write(blob)
+
+    def attach(self, program, texture_location=0, block_binding=0):
+        # Resolve the sampler and block once; use() rebinds per frame
+        self.texture_location = texture_location
+        self.block_binding = block_binding
+        program['sdf_textures'].value = texture_location
+        program['Injections'].binding = block_binding
+        self.atlas.attach(program)
+
+    def use(self):
+        self.texture.use(location=self.texture_location)
+        self.atlas.use()
+        self.ubo.bind_to_uniform_block(self.block_binding)
+
+    def release(self):
+        self.texture.release()
+        self.atlas.release()
+        self.ubo.release()
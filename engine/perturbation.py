@@ -0,0 +1,244 @@
+import math
+import threading
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+# Matches the `dot(z, z) > 16.0` escape test in fractal.glsl
+BAILOUT = 16.0
+
+# Below this zoom the plain float32 shader loop is still sharp, so there is no
+# point paying for perturbation.
+DEEP_ZOOM_THRESHOLD = 1e4
+
+# How far (in screen units) the view may drift from the reference center before
+# the orbit is recomputed. Beyond this the float32 pixel deltas start losing bits.
+REBASE_DISTANCE = 0.5
+
+# Orbit texture layout: RG32F texels, ORBIT_TEX_WIDTH per row, read with texelFetch
+ORBIT_TEX_WIDTH = 1024
+
+
+def precision_for_zoom(zoom):
+    # Decimal digits needed to resolve a pixel at this zoom, plus headroom
+    return max(30, int(math.log10(max(zoom, 1.0))) + 30)
+
+
+class ReferenceOrbit:
+    # One high-precision orbit Z_0..Z_n of z -> z^2 + C around a fixed center.
+    # `orbit` is the double-precision copy the GPU/CPU perturbation loops read.
+
+    def __init__(self, center_x, center_y, digits):
+        self.center_x = Decimal(center_x)
+        self.center_y = Decimal(center_y)
+        self.digits = digits
+        self.orbit = np.zeros(1, dtype=np.complex128)
+        self.escaped = False
+        # Last high-precision Z, kept so the orbit can be extended later
+        self._zx = Decimal(0)
+        self._zy = Decimal(0)
+
+    def __len__(self):
+        return len(self.orbit)
+
+    @property
+    def max_iter(self):
+        return len(self.orbit) - 1
+
+    def covers(self, center_x, center_y, zoom, max_iter):
+        if self.digits < precision_for_zoom(zoom):
+            return False
+        if not self.escaped and self.max_iter < max_iter:
+            return False
+        # Differences in Decimal: the centre may carry more digits than a float
+        dx = float(Decimal(center_x) - self.center_x) * zoom
+        dy = float(Decimal(center_y) - self.center_y) * zoom
+        return math.hypot(dx, dy) <= REBASE_DISTANCE
+
+    def extended(self, max_iter):
+        # Returns a new orbit continued up to max_iter; self is left untouched so
+        # a reader holding it never sees a half-written array.
+        out = ReferenceOrbit(self.center_x, self.center_y, self.digits)
+        if self.escaped or max_iter <= self.max_iter:
+            out.orbit, out.escaped = self.orbit, self.escaped
+            out._zx, out._zy = self._zx, self._zy
+            return out
+
+        values = []
+        cx, cy = self.center_x, self.center_y
+        zx, zy = self._zx, self._zy
+        bailout = Decimal(BAILOUT)
+        escaped = False
+        with localcontext() as ctx:
+            ctx.prec = self.digits
+            for _ in range(max_iter - self.max_iter):
+                zx, zy = zx * zx - zy * zy + cx, 2 * zx * zy + cy
+                values.append(complex(float(zx), float(zy)))
+                # Keep the escaping value too: it is still an exact orbit point,
+                # and it guarantees the orbit has at least Z_0 and Z_1.
+                if zx * zx + zy * zy > bailout:
+                    escaped = True
+                    break
+
+        out.orbit = np.concatenate([self.orbit, np.array(values, dtype=np.complex128)])
+        out.escaped = escaped
+        out._zx, out._zy = zx, zy
+        return out
+
+
+def compute_reference_orbit(center_x, center_y, max_iter, digits=30):
+    # center_x/center_y can be anything Decimal() accepts (float, str, Decimal)
+    return ReferenceOrbit(center_x, center_y, digits).extended(max_iter)
+
+
+def orbit_texture_data(ref):
+    # Packs the orbit into RG32F rows for the shader's texelFetch lookups
+    n = len(ref.orbit)
+    height = max(1, -(-n // ORBIT_TEX_WIDTH))
+    data = np.zeros((height * ORBIT_TEX_WIDTH, 2), dtype=np.float32)
+    data[:n, 0] = ref.orbit.real
+    data[:n, 1] = ref.orbit.imag
+    return data.tobytes(), ORBIT_TEX_WIDTH, height
+
+
+# --- Background Worker ---
+
+class ReferenceOrbitWorker:
+    # Computes reference orbits off the render thread. The renderer calls
+    # request() every frame and poll() to pick up finished orbits.
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = None
+        self._finished = None
+        self._current = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def request(self, center_x, center_y, zoom, max_iter):
+        with self._cond:
+            self._pending = (center_x, center_y, zoom, max_iter)
+            self._cond.notify()
+
+    def poll(self):
+        # Newest finished orbit, or None if nothing changed since the last poll
+        with self._cond:
+            ref, self._finished = self._finished, None
+        return ref
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                center_x, center_y, zoom, max_iter = self._pending
+                self._pending = None
+
+            ref = self._current
+            if ref is not None and ref.covers(center_x, center_y, zoom, max_iter):
+                continue
+
+            try:
+                digits = precision_for_zoom(zoom)
+                if (ref is not None and ref.digits >= digits
+                        and ref.covers(center_x, center_y, zoom, ref.max_iter)):
+                    # Same anchor, only the iteration budget grew
+                    ref = ref.extended(max_iter)
+                else:
+                    ref = compute_reference_orbit(center_x, center_y, max_iter, digits)
+            except Exception as e:
+                print(f"Deep Zoom: reference orbit failed: {e}")
+                continue
+
+            self._current = ref
+            with self._cond:
+                self._finished = ref
+
+
+# --- NumPy CPU Implementation ---
+# Mirrors the shader loops so iteration counts can be checked and timed headless.
+
+def pixel_deltas(width, height, zoom):
+    # Offsets from the view center for every pixel, same mapping as fractal.glsl.
+    # Row 0 is the top of the image.
+    aspect = np.array([width, height], dtype=np.float64) / min(width, height)
+    u = (np.arange(width) + 0.5) / width
+    v = 1.0 - (np.arange(height) + 0.5) / height
+    px = (u - 0.5) * aspect[0] / zoom
+    py = (v - 0.5) * aspect[1] / zoom
+    return px[np.newaxis, :] + 1j * py[:, np.newaxis]
+
+
+def iterate_direct(c, max_iter):
+    # Plain z -> z^2 + c in float64. Returns (iterations, final z).
+    c = np.asarray(c, dtype=np.complex128)
+    shape = c.shape
+    c = c.ravel()
+    z = np.zeros_like(c)
+    iters = np.zeros(c.size, dtype=np.int32)
+    z_out = np.zeros_like(c)
+    idx = np.arange(c.size)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        z = z * z + c
+        mag = z.real * z.real + z.imag * z.imag
+        escaped = mag > BAILOUT
+        if escaped.any():
+            z_out[idx[escaped]] = z[escaped]
+            keep = ~escaped
+            idx, z, c = idx[keep], z[keep], c[keep]
+        iters[idx] += 1
+
+    z_out[idx] = z
+    return iters.reshape(shape), z_out.reshape(shape)
+
+
+def iterate_perturbed(dc, ref, max_iter):
+    # Iterates only the deltas dz against the reference orbit, with rebasing:
+    # whenever |Z + dz| < |dz| (or the orbit runs out) the pixel restarts at Z_0
+    # with dz = Z + dz. Returns (iterations, final z) like iterate_direct.
+    orbit = ref.orbit if isinstance(ref, ReferenceOrbit) else np.asarray(ref, dtype=np.complex128)
+    last = len(orbit) - 1
+    dc = np.asarray(dc, dtype=np.complex128)
+    shape = dc.shape
+    dc = dc.ravel()
+    dz = np.zeros_like(dc)
+    m = np.zeros(dc.size, dtype=np.intp)
+    iters = np.zeros(dc.size, dtype=np.int32)
+    z_out = np.zeros_like(dc)
+    z = np.zeros_like(dc)
+    idx = np.arange(dc.size)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        dz = (2.0 * orbit[m] + dz) * dz + dc
+        m += 1
+        z = orbit[m] + dz
+        mag = z.real * z.real + z.imag * z.imag
+        escaped = mag > BAILOUT
+        if escaped.any():
+            z_out[idx[escaped]] = z[escaped]
+            keep = ~escaped
+            idx, dz, dc, m, z, mag = idx[keep], dz[keep], dc[keep], m[keep], z[keep], mag[keep]
+        iters[idx] += 1
+
+        rebase = (mag < dz.real * dz.real + dz.imag * dz.imag) | (m == last)
+        dz[rebase] = z[rebase]
+        m[rebase] = 0
+
+    z_out[idx] = z
+    return iters.reshape(shape), z_out.reshape(shape)
+
+
+def render_iterations(center_x, center_y, zoom, width, height, max_iter, ref=None):
+    # Headless deep-zoom frame: iteration counts for every pixel
+    if ref is None:
+        ref = compute_reference_orbit(center_x, center_y, max_iter, precision_for_zoom(zoom))
+    delta = complex(float(Decimal(center_x) - ref.center_x), float(Decimal(center_y) - ref.center_y))
+    iters, _ = iterate_perturbed(pixel_deltas(width, height, zoom) + delta, ref, max_iter)
+    return iters
@@ -0,0 +1,190 @@
+import math
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+from engine.perturbation import BAILOUT
+
+# Precision ladder. A pixel needs a few units in the last place of c to
+# itself, or neighbouring pixels collapse onto the same value and the image
+# turns to blocks. Each rung carries more bits than the one before it:
+#   float        fractal.glsl's plain float32 loop (24 bits)
+#   double-float the same loop on unevaluated sums hi + lo of two float32s
+#                (~48 bits), the GPU's version of double-double; PRECISION 1
+#   perturbation engine/perturbation.py, any depth, z^2 + c with Deep Zoom on
+# The view centre is kept as a double-double in FractalState (offset_x +
+# offset_x_lo, ~106 bits), so pulling it towards the gaze every frame does not
+# drift at depth, and is uploaded as a float32 pair for the double-float kernel.
+#
+# The NumPy loop below runs the same error-free transformations on float32
+# arrays, to check the GPU kernel against, or on float64 arrays, where it is
+# plain double-double and takes the CPU renderer past float64.
+
+ULPS_PER_PIXEL = 8 # Beyond this many ulps of c per pixel the image goes blocky
+REFERENCE_HEIGHT = 1080
+
+
+def zoom_limit(bits):
+    # Deepest zoom a mantissa of this many bits resolves at REFERENCE_HEIGHT
+    return 2.0 ** bits / (ULPS_PER_PIXEL * REFERENCE_HEIGHT)
+
+
+FLOAT32_ZOOM_LIMIT = zoom_limit(23) # ~1e3
+DOUBLE_FLOAT_ZOOM_LIMIT = zoom_limit(46) # ~8e9
+FLOAT64_ZOOM_LIMIT = zoom_limit(52) # ~5e11, the CPU renderer's plain loop
+DOUBLE_DOUBLE_ZOOM_LIMIT = zoom_limit(104)
+
+PRECISION_FLOAT = 0 # fractal.glsl PRECISION define values
+PRECISION_DOUBLE_FLOAT = 1
+PRECISION_NAMES = {PRECISION_FLOAT: 'float32', PRECISION_DOUBLE_FLOAT: 'double-float'}
+
+# Veltkamp splitters, 2^(ceil(mantissa / 2)) + 1
+_SPLITTERS = {np.dtype(np.float32): 4097.0, np.dtype(np.float64): 134217729.0}
+
+
+def view_precision(zoom):
+    # Kernel precision for this zoom; past DOUBLE_FLOAT_ZOOM_LIMIT the
+    # double-float kernel blurs too, and only perturbation stays sharp
+    return PRECISION_DOUBLE_FLOAT if zoom >= FLOAT32_ZOOM_LIMIT else PRECISION_FLOAT
+
+
+# --- Error-free Transformations ---
+# Work on Python floats and on NumPy arrays of either float dtype alike
+
+def two_sum(a, b):
+    # s + e == a + b exactly
+    s = a + b
+    v = s - a
+    return s, (a - (s - v)) + (b - v)
+
+
+def quick_two_sum(a, b):
+    # Same, when |a| >= |b|
+    s = a + b
+    return s, b - (s - a)
+
+
+def _split(a):
+    t = a * _SPLITTERS[np.result_type(a)]
+    hi = t - (t - a)
+    return hi, a - hi
+
+
+def two_prod(a, b):
+    # p + e == a * b exactly (no fused multiply-add needed)
+    p = a * b
+    a_hi, a_lo = _split(a)
+    b_hi, b_lo = _split(b)
+    return p, ((a_hi * b_hi - p) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+
+
+def dd_add(a_hi, a_lo, b_hi, b_lo):
+    s, e = two_sum(a_hi, b_hi)
+    t, f = two_sum(a_lo, b_lo)
+    s, e = quick_two_sum(s, e + t)
+    return quick_two_sum(s, e + f)
+
+
+def dd_mul(a_hi, a_lo, b_hi, b_lo):
+    p, e = two_prod(a_hi, b_hi)
+    return quick_two_sum(p, e + (a_hi * b_lo + a_lo * b_hi))
+
+
+# --- View Coordinates ---
+
+def add_offset(hi, lo, delta):
+    # (hi, lo) + delta as a normalised double-double of Python floats
+    return dd_add(hi, lo, delta, 0.0)
+
+
+def advance_view(state, zoom, zoom_speed, frame_time, target=(0.0, 0.0)):
+    # One frame of continuous zoom from `zoom` towards target (view units from
+    # the centre). 1/old_zoom - 1/zoom is (multiplier - 1) / zoom, taken
+    # without the cancellation, and added to the double-double centre.
+    # Offsets are re-read under the lock so a pan from another writer is not lost.
+    zoom = zoom * math.exp(zoom_speed * frame_time)
+    pull = math.expm1(zoom_speed * frame_time) / zoom
+    with state.lock:
+        x, x_lo = add_offset(state.offset_x, state.offset_x_lo, target[0] * pull)
+        y, y_lo = add_offset(state.offset_y, state.offset_y_lo, target[1] * pull)
+        return state.publish(zoom=zoom, offset_x=x, offset_x_lo=x_lo, offset_y=y, offset_y_lo=y_lo)
+
+
+def split_float32(hi, lo=0.0):
+    # A double-double as the float32 pair the shader reads: hi is hi rounded
+    # to float32, lo what that rounding and the tail leave over
+    hi32 = float(np.float32(hi))
+    return hi32, float(np.float32((hi - hi32) + lo))
+
+
+def view_center(offset, offset_lo=(0.0, 0.0)):
+    # Exact centre of the view as Decimals, for reference orbits
+    with localcontext() as ctx:
+        ctx.prec = 50
+        return (Decimal(offset[0]) + Decimal(offset_lo[0]), Decimal(offset[1]) + Decimal(offset_lo[1]))
+
+
+# --- NumPy Double-float / Double-double Loop ---
+
+def _complex_mul(ar, ar_lo, ai, ai_lo, br, br_lo, bi, bi_lo):
+    # (a.re + i a.im) * (b.re + i b.im) on double pairs
+    rr = dd_mul(ar, ar_lo, br, br_lo)
+    ii = dd_mul(ai, ai_lo, bi, bi_lo)
+    ri = dd_mul(ar, ar_lo, bi, bi_lo)
+    ir = dd_mul(ai, ai_lo, br, br_lo)
+    re = dd_add(*rr, -ii[0], -ii[1])
+    im = dd_add(*ri, *ir)
+    return re + im
+
+
+def iterate_double(cx, cy, power, max_iter):
+    # z -> z^power + c for an integer power, on pairs. cx, cy are (hi, lo)
+    # arrays of one dtype: float32 mirrors fractal.glsl's PRECISION 1 loop,
+    # float64 is double-double. Returns (iterations, final z as complex128).
+    power = int(power)
+    cx_hi, cx_lo = (np.asarray(a).ravel() for a in cx)
+    cy_hi, cy_lo = (np.asarray(a).ravel() for a in cy)
+    shape = np.shape(cx[0])
+    n = cx_hi.size
+    zx_hi, zx_lo, zy_hi, zy_lo = (np.zeros_like(cx_hi) for _ in range(4))
+    iters = np.zeros(n, dtype=np.int32)
+    z_out = np.zeros(n, dtype=np.complex128)
+    idx = np.arange(n)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        wx_hi, wx_lo, wy_hi, wy_lo = zx_hi, zx_lo, zy_hi, zy_lo
+        for _ in range(power - 1):
+            wx_hi, wx_lo, wy_hi, wy_lo = _complex_mul(wx_hi, wx_lo, wy_hi, wy_lo, zx_hi, zx_lo, zy_hi, zy_lo)
+        zx_hi, zx_lo = dd_add(wx_hi, wx_lo, cx_hi, cx_lo)
+        zy_hi, zy_lo = dd_add(wy_hi, wy_lo, cy_hi, cy_lo)
+        # Escape on the high words, like the shader
+        mag = zx_hi * zx_hi + zy_hi * zy_hi
+        escaped = mag > BAILOUT
+        if escaped.any():
+            z_out[idx[escaped]] = zx_hi[escaped] + 1j * zy_hi[escaped].astype(np.float64)
+            keep = ~escaped
+            idx = idx[keep]
+            zx_hi, zx_lo, zy_hi, zy_lo = zx_hi[keep], zx_lo[keep], zy_hi[keep], zy_lo[keep]
+            cx_hi, cx_lo, cy_hi, cy_lo = cx_hi[keep], cx_lo[keep], cy_hi[keep], cy_lo[keep]
+        iters[idx] += 1
+
+    z_out[idx] = zx_hi + 1j * zy_hi.astype(np.float64)
+    return iters.reshape(shape), z_out.reshape(shape)
+
+
+def pixel_coordinates(offset, offset_lo, pixel, zoom, dtype=np.float64):
+    # c = offset + pixel / zoom as (hi, lo) pairs of dtype, the way the
+    # shader builds it: the view centre as a pair, the pixel step in one word
+    cx = dd_add(*_pair(offset[0], offset_lo[0], dtype), *_pair(pixel.real / zoom, 0.0, dtype))
+    cy = dd_add(*_pair(offset[1], offset_lo[1], dtype), *_pair(pixel.imag / zoom, 0.0, dtype))
+    return cx, cy
+
+
+def _pair(hi, lo, dtype):
+    if np.dtype(dtype) == np.float32:
+        if np.ndim(hi):
+            return np.asarray(hi, dtype=np.float32), np.zeros(np.shape(hi), dtype=np.float32)
+        hi, lo = split_float32(hi, lo)
+    return np.asarray(hi, dtype=dtype), np.asarray(lo, dtype=dtype)
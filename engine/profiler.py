@@ -0,0 +1,204 @@
+import os
+import json
+import math
+import time
+
+# Where frame time goes. Every measurement lands in a Histogram keyed by name:
+# CPU laps for the phases of on_render (frame() then lap('phase') after
+# each), spans for work on other threads (sensor callbacks, SDF generation),
+# and GPU timer queries for the fractal and ImGui passes. Histograms are
+# log-binned and written without locks: each name has one writing thread, a
+# record is a few list/float updates under the GIL, and readers (the UI,
+# export) work from a copy of the bins. Percentiles come from the bins, so
+# they are within one bin width (9%) of exact.
+
+PROFILES_DIR = "profiles"
+BINS_PER_OCTAVE = 8
+MIN_MS = 1e-3 # Bottom of the first bin (1 us); everything below shares bin 0
+OCTAVES = 24 # Up to ~16 s
+NUM_BINS = OCTAVES * BINS_PER_OCTAVE + 1
+_INV_MIN_MS = 1.0 / MIN_MS
+
+
+def bin_index(ms):
+    if ms <= MIN_MS:
+        return 0
+    return min(int(math.log2(ms / MIN_MS) * BINS_PER_OCTAVE) + 1, NUM_BINS - 1)
+
+
+def bin_upper(index):
+    # Upper edge of a bin, in ms
+    return MIN_MS * 2.0 ** (index / BINS_PER_OCTAVE)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * NUM_BINS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, ms):
+        # bin_index(), inlined: this runs a dozen times a frame
+        if ms <= MIN_MS:
+            self.counts[0] += 1
+        else:
+            self.counts[min(int(math.log2(ms * _INV_MIN_MS) * BINS_PER_OCTAVE) + 1, NUM_BINS - 1)] += 1
+        self.count += 1
+        self.total += ms
+        self.last = ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q, counts=None):
+        # Geometric middle of the bin holding the q-th percentile (q in 0-100),
+        # never above the largest value seen
+        counts = list(self.counts) if counts is None else counts
+        n = sum(counts)
+        if n == 0:
+            return 0.0
+        rank = q / 100.0 * n
+        seen = 0
+        for index, c in enumerate(counts):
+            seen += c
+            if c and seen >= rank:
+                if index == 0:
+                    return min(MIN_MS, self.max)
+                if index == NUM_BINS - 1: # Open-ended
+                    return self.max
+                return min(bin_upper(index - 0.5), self.max)
+        return self.max
+
+    def summary(self):
+        counts = list(self.counts)
+        n = sum(counts)
+        return {
+            'count': n,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50.0, counts),
+            'p99_ms': self.percentile(99.0, counts),
+            'max_ms': self.max,
+            'last_ms': self.last,
+        }
+
+
+class _Span:
+    # Reused per name, so a name must only be timed from one thread at a time
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        self.histograms = {} # name -> Histogram
+        self.frames = 0
+        self.started = time.time()
+        self._spans = {}
+        self._laps = {} # phase -> 'cpu.<phase>'
+        self._frame_start = 0.0
+        self._lap = 0.0
+
+    def record(self, name, ms):
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = Histogram()
+        h.record(ms)
+
+    def span(self, name):
+        # with profiler.span('polar.hr'): ...
+        s = self._spans.get(name)
+        if s is None:
+            s = self._spans[name] = _Span(self, name)
+        return s
+
+    # --- Render thread ---
+
+    def frame(self):
+        # Start of a frame; the previous one is recorded as 'cpu.frame'
+        now = time.perf_counter()
+        if self.frames:
+            self.record('cpu.frame', (now - self._frame_start) * 1000.0)
+        self.frames += 1
+        self._frame_start = self._lap = now
+
+    def lap(self, name):
+        # Time since the last lap (or frame start) as 'cpu.<name>'
+        now = time.perf_counter()
+        key = self._laps.get(name)
+        if key is None:
+            key = self._laps[name] = 'cpu.' + name
+        self.record(key, (now - self._lap) * 1000.0)
+        self._lap = now
+
+    # --- Readers ---
+
+    def summary(self):
+        return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def reset(self):
+        # Writers start fresh histograms; one sample in flight may be lost
+        self.histograms = {}
+        self.frames = 0
+        self.started = time.time()
+
+    def export(self, path=None, root=PROFILES_DIR):
+        # Summaries and raw bins as JSON; returns the path
+        if path is None:
+            os.makedirs(root, exist_ok=True)
+            path = os.path.join(root, time.strftime("profile-%Y%m%d-%H%M%S.json"))
+        data = {
+            'started': self.started,
+            'exported': time.time(),
+            'frames': self.frames,
+            'bins_per_octave': BINS_PER_OCTAVE,
+            'min_ms': MIN_MS,
+            'spans': {},
+        }
+        for name, h in sorted(self.histograms.items()):
+            entry = h.summary()
+            entry['bins'] = {f"{bin_upper(i):.6g}": c for i, c in enumerate(list(h.counts)) if c}
+            data['spans'][name] = entry
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, path)
+        return path
+
+
+class GpuTimer:
+    # A ring of timer queries around one pass. A query's result is read just
+    # before it is reused, ring frames later, so that never waits on the GPU.
+    # Not nestable (GL_TIME_ELAPSED), so not inside the governor's query.
+
+    def __init__(self, ctx, profiler=None, name=None, ring=3):
+        self.queries = [ctx.query(time=True) for _ in range(ring)]
+        self.profiler = profiler
+        self.name = name
+        self.issued = 0
+        self.ms = 0.0 # Latest result
+
+    def __enter__(self):
+        ring = len(self.queries)
+        if self.issued >= ring:
+            # This query's previous result, issued ring frames ago
+            self.ms = self.queries[self.issued % ring].elapsed / 1e6
+            if self.profiler is not None:
+                self.profiler.record(self.name, self.ms)
+        self.queries[self.issued % ring].__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.queries[self.issued % len(self.queries)].__exit__(*exc)
+        self.issued += 1
+        return False
@@ -0,0 +1,106 @@
+import time
+
+# Specialised builds of shaders/fractal.glsl, compiled on first use and kept for
+# the session. A variant is (pass, power kernel, injections, precision): integer
+# powers get a complex-multiply loop with interior checks instead of
+# length/atan/pow/cos/sin per iteration, injection blending is compiled out
+# while nothing is injected, and past float32's zoom limit integer powers
+# iterate in double-float (engine/precision.py). Compiling a missing variant never happens inside a frame that needs
+# it: the frame draws with the general kernel and the variant is compiled on a
+# later frame, one per frame. Integer powers the power slider is approaching are
+# queued ahead of time, so crossing an integer does not hitch.
+
+SHADER_PATH = 'shaders/fractal.glsl'
+
+GENERAL_POWER = 0
+INTEGER_POWERS = (2, 3, 4, 5)
+
+
+def power_variant(power):
+    # Kernel for this exact power: the integer itself, or GENERAL_POWER
+    n = int(round(power))
+    if abs(power - n) < 1e-6 and n in INTEGER_POWERS:
+        return n
+    return GENERAL_POWER
+
+
+def variant_key(pass_number, power, injections, precision=0):
+    if pass_number == 2:
+        return (2, GENERAL_POWER, False, 0) # The shade pass does not iterate
+    kernel = power_variant(power)
+    # The polar kernel has no double-float build
+    return (pass_number, kernel, bool(injections), precision if kernel != GENERAL_POWER else 0)
+
+
+def variant_defines(key):
+    pass_number, power_kernel, injections, precision = key
+    # String values: moderngl_window skips falsy defines, and 0 is a real value here
+    return {'PASS': str(pass_number), 'POWER': str(power_kernel), 'INJECTIONS': '1' if injections else '0',
+            'PRECISION': str(precision)}
+
+
+class ProgramCache:
+    # load(defines) compiles a program, setup(program, key) binds its samplers
+    # and blocks once after compiling.
+
+    def __init__(self, load, setup=None):
+        self.load = load
+        self.setup = setup
+        self.programs = {}
+        self.queue = [] # Variants to compile on coming frames, in order
+        self.counters = {
+            'compiled': 0,
+            'hits': 0,
+            'fallbacks': 0,
+        }
+        self.compile_ms = {} # key -> compile time
+
+    def compile(self, key):
+        if key not in self.programs:
+            t0 = time.perf_counter()
+            program = self.load(variant_defines(key))
+            if self.setup is not None:
+                self.setup(program, key)
+            self.programs[key] = program
+            self.compile_ms[key] = (time.perf_counter() - t0) * 1000.0
+            self.counters['compiled'] += 1
+        if key in self.queue:
+            self.queue.remove(key)
+        return self.programs[key]
+
+    def request(self, key):
+        if key not in self.programs and key not in self.queue:
+            self.queue.append(key)
+
+    def get(self, pass_number, power, injections, precision=0):
+        # The best compiled program for this frame. The general kernel with
+        # injections compiled in can draw anything, so it is the fallback.
+        key = variant_key(pass_number, power, injections, precision)
+        program = self.programs.get(key)
+        if program is not None:
+            self.counters['hits'] += 1
+            return program
+        fallback = (key[0], GENERAL_POWER, True, 0) if pass_number != 2 else key
+        if fallback == key:
+            return self.compile(key)
+        self.request(key)
+        self.counters['fallbacks'] += 1
+        return self.compile(fallback)
+
+    def prefetch(self, pass_number, power, injections, precision=0):
+        # Queue the kernels for the integers on either side of the slider, and
+        # both injection builds, so the next switch finds them compiled
+        for p in (float(int(power)), float(int(power) + 1)):
+            for inj in (injections, not injections):
+                self.request(variant_key(pass_number, p, inj, precision))
+
+    def warm(self):
+        # Call once per frame, after drawing: compiles at most one queued variant
+        if self.queue:
+            self.compile(self.queue[0])
+
+    def release(self):
+        for program in self.programs.values():
+            program.release()
+        self.programs = {}
+        self.queue = []
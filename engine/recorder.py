@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+from biometrics.gaze import GazePipeline
+from biometrics.hrv import HrvEngine
+from engine.injections import clear_injections, inject
+
+# Session recording and replay. A session is a directory with one file per
+# column per stream (fixed-width little-endian records, memory-mapped and
+# preallocated in chunks), a <stream>.count file holding how many records are
+# valid (written after the record, so a crash leaves a readable session), and
+# session.json describing the layout. Writers append a handful of scalars into
+# the maps: no per-record allocation, no syscalls except when a chunk fills.
+# SessionReader maps the columns read-only, so analysis over many sessions
+# never loads whole files; SessionReplayer feeds a session back into a
+# FractalState at real time or as fast as it can.
+
+RECORDINGS_DIR = "recordings"
+CHUNK = 65536 # Records per column added when a stream fills up
+FORMAT_VERSION = 1
+
+# Every stream starts with t: seconds since the session started
+STREAMS = {
+    'gaze': (('t', '<f8'), ('x', '<f4'), ('y', '<f4')), # Raw tracker samples
+    'rr': (('t', '<f8'), ('rr', '<f4')), # Beat end time, RR in ms
+    'hr': (('t', '<f8'), ('bpm', '<u2')), # Per Heart Rate Measurement packet
+    'acc': (('t', '<f8'), ('x', '<i2'), ('y', '<i2'), ('z', '<i2')), # Accelerometer, mG
+    'ecg': (('t', '<f8'), ('uv', '<i4')), # Polar H10 ECG, microvolts
+    'params': (('t', '<f8'), ('field', '<u2'), ('value', '<f8')), # Index into session.json "fields"
+    'events': (('t', '<f8'), ('kind', '<u1'), ('x', '<f8'), ('y', '<f8'), ('scale', '<f8'),
+               ('lifetime', '<f4'), ('text', 'S64')),
+    'frames': (('t', '<f8'), ('frame_ms', '<f4'), ('gpu_ms', '<f4'), ('zoom', '<f8'),
+               ('offset_x', '<f8'), ('offset_y', '<f8')),
+}
+
+# Scalar state fields recorded whenever they are published (UI, LLM, replay)
+PARAM_FIELDS = (
+    'zoom_speed', 'max_iter', 'power', 'color_r', 'color_g', 'color_b', 'pulse_speed',
+    'governor_enabled', 'frame_budget_ms', 'reproject', 'use_eye_tracker', 'gaze_prediction',
+    'deep_zoom', 'inject_lifetime', 'foveated', 'fovea_radius', 'fovea_falloff',
+)
+
+# events.kind
+INJECT = 1
+CLEAR = 2
+TEXT = 3 # inject_text changed; the text column holds it
+
+
+class RecordStream:
+    # Append-only columns of one stream. append() may be called from any
+    # thread; a per-stream lock keeps it safe against close().
+
+    def __init__(self, directory, name, columns, offset=0.0, chunk=CHUNK):
+        self.directory = directory
+        self.name = name
+        self.columns = columns
+        self.offset = offset # Writer clock reading at session start; subtracted from t
+        self.chunk = chunk
+        self.count = 0
+        self.capacity = 0
+        self.arrays = []
+        self.lock = threading.Lock()
+        self.closed = False
+        count_path = os.path.join(directory, f"{name}.count")
+        with open(count_path, 'wb') as f:
+            f.write(bytes(8))
+        self.count_map = np.memmap(count_path, dtype='<i8', mode='r+', shape=(1,))
+        for col, _ in columns:
+            open(self._path(col), 'wb').close()
+        self._grow()
+
+    def _path(self, col):
+        return os.path.join(self.directory, f"{self.name}.{col}.bin")
+
+    def _grow(self):
+        capacity = self.capacity + self.chunk
+        arrays = []
+        for col, dtype in self.columns:
+            path = self._path(col)
+            with open(path, 'r+b') as f:
+                f.truncate(capacity * np.dtype(dtype).itemsize)
+            arrays.append(np.memmap(path, dtype=dtype, mode='r+', shape=(capacity,)))
+        for arr in self.arrays:
+            arr.flush()
+        self.arrays = arrays
+        self.capacity = capacity
+
+    def append(self, t, *values):
+        with self.lock:
+            if self.closed:
+                return
+            i = self.count
+            if i == self.capacity:
+                self._grow()
+            arrays = self.arrays
+            arrays[0][i] = t - self.offset
+            for k, v in enumerate(values, 1):
+                arrays[k][i] = v
+            self.count = i + 1
+            self.count_map[0] = i + 1 # Last, so a reader never sees a half-written record
+
+    def extend(self, times, *columns):
+        # A block of records at once (arrays of equal length), e.g. a PMD frame
+        n = len(times)
+        with self.lock:
+            if self.closed or n == 0:
+                return
+            i = self.count
+            while i + n > self.capacity:
+                self._grow()
+            arrays = self.arrays
+            arrays[0][i:i + n] = np.asarray(times) - self.offset
+            for k, col in enumerate(columns, 1):
+                arrays[k][i:i + n] = col
+            self.count = i + n
+            self.count_map[0] = i + n
+
+    def flush(self):
+        with self.lock:
+            for arr in self.arrays:
+                arr.flush()
+            self.count_map.flush()
+
+    def close(self):
+        # Flush and trim the columns to the records actually written
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for arr in self.arrays:
+                arr.flush()
+            self.count_map.flush()
+            self.arrays = []
+            for col, dtype in self.columns:
+                with open(self._path(col), 'r+b') as f:
+                    f.truncate(self.count * np.dtype(dtype).itemsize)
+
+
+class SessionRecorder:
+    # One recording. Attach it with state.recorder = recorder (start_recording
+    # does this); sensor workers and the renderer check state.recorder and
+    # append to the stream attributes (recorder.gaze, recorder.rr, ...), and
+    # FractalState.publish() reports parameter and injection changes.
+
+    def __init__(self, state, root=RECORDINGS_DIR, name=None):
+        self.state = state
+        name = name or time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(root, name)
+        os.makedirs(self.path, exist_ok=False)
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.field_ids = {f: i for i, f in enumerate(PARAM_FIELDS)}
+        self.field_types = {f: type(getattr(state, f)).__name__ for f in PARAM_FIELDS}
+        self.injections = list(state.injections)
+
+        # Which clock each stream's writer uses: gaze and the renderer run on
+        # perf_counter, the Polar worker on the backend clock (wall time)
+        clocks = {'gaze': self.t0, 'rr': self.started, 'hr': self.started, 'acc': self.started,
+                  'ecg': self.started, 'params': self.t0, 'events': self.t0, 'frames': self.t0}
+        self.streams = {}
+        for stream, columns in STREAMS.items():
+            self.streams[stream] = RecordStream(self.path, stream, columns, clocks[stream])
+            setattr(self, stream, self.streams[stream])
+
+        with open(os.path.join(self.path, "session.json"), 'w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'started': self.started,
+                'streams': {s: [list(c) for c in cols] for s, cols in STREAMS.items()},
+                'fields': list(PARAM_FIELDS),
+                'field_types': self.field_types,
+            }, f, indent=2)
+
+        # Initial values, so a replay starts from the same parameters
+        now = time.perf_counter()
+        for field in PARAM_FIELDS:
+            self.params.append(now, self.field_ids[field], float(getattr(state, field)))
+        self.events.append(now, TEXT, 0.0, 0.0, 0.0, 0.0, state.inject_text.encode('utf-8')[:64])
+
+    # --- Hooks ---
+
+    def on_publish(self, fields):
+        # Called by FractalState.publish() under the state lock
+        now = time.perf_counter()
+        ids = self.field_ids
+        for name, value in fields.items():
+            if name in ids:
+                self.params.append(now, ids[name], float(value))
+            elif name == 'injections':
+                self._injections_changed(now, value)
+            elif name == 'inject_text':
+                self.events.append(now, TEXT, 0.0, 0.0, 0.0, 0.0, value.encode('utf-8')[:64])
+
+    def _injections_changed(self, now, injections):
+        if not injections and self.injections:
+            self.events.append(now, CLEAR, 0.0, 0.0, 0.0, 0.0, b"")
+        known = {id(inj) for inj in self.injections}
+        for inj in injections:
+            if id(inj) not in known:
+                self.events.append(now, INJECT, inj.x, inj.y, inj.scale,
+                                   0.0 if inj.lifetime is None else inj.lifetime,
+                                   inj.text.encode('utf-8')[:64])
+        self.injections = list(injections)
+
+    def heart(self, t, bpm, rr_buffer, first):
+        # One Heart Rate Measurement packet: bpm, plus the beats it appended to
+        # rr_buffer from index `first` on
+        self.hr.append(t, bpm)
+        new = rr_buffer.count - first
+        if new > 0:
+            times, values = rr_buffer.latest(new)
+            for bt, rr in zip(times.tolist(), values.tolist()):
+                self.rr.append(bt, rr)
+
+    # --- Lifetime ---
+
+    def records(self):
+        return sum(s.count for s in self.streams.values())
+
+    def flush(self):
+        for s in self.streams.values():
+            s.flush()
+
+    def close(self):
+        for s in self.streams.values():
+            s.close()
+
+
+def start_recording(state, root=RECORDINGS_DIR, name=None):
+    recorder = SessionRecorder(state, root, name)
+    state.recorder = recorder
+    print(f"Recorder: writing {recorder.path}")
+    return recorder
+
+
+def stop_recording(state):
+    recorder = state.recorder
+    if recorder is None:
+        return None
+    state.recorder = None # Writers stop picking it up; late appends are dropped by close()
+    recorder.close()
+    print(f"Recorder: {recorder.records()} records in {recorder.path}")
+    return recorder
+
+
+# --- Reading ---
+
+class SessionReader:
+    # Read-only, memory-mapped view of a session. stream() returns a dict of
+    # column arrays backed by the files; nothing is read until it is touched.
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "session.json")) as f:
+            self.meta = json.load(f)
+        self.fields = self.meta['fields']
+        self.field_types = self.meta['field_types']
+        self.started = self.meta['started']
+
+    def count(self, stream):
+        with open(os.path.join(self.path, f"{stream}.count"), 'rb') as f:
+            return int(np.frombuffer(f.read(8), dtype='<i8')[0])
+
+    def stream(self, stream):
+        n = self.count(stream)
+        out = {}
+        for col, dtype in self.meta['streams'][stream]:
+            path = os.path.join(self.path, f"{stream}.{col}.bin")
+            if n == 0:
+                out[col] = np.zeros(0, dtype=dtype)
+            else:
+                out[col] = np.memmap(path, dtype=dtype, mode='r', shape=(n,))
+        return out
+
+    def chunks(self, stream, size=CHUNK):
+        # The stream in slices of `size` records, for passes over long sessions
+        columns = self.stream(stream)
+        n = self.count(stream)
+        for start in range(0, n, size):
+            yield {col: arr[start:start + size] for col, arr in columns.items()}
+
+    def duration(self):
+        end = 0.0
+        for stream in self.meta['streams']:
+            t = self.stream(stream)['t']
+            if len(t):
+                end = max(end, float(t[-1]))
+        return end
+
+
+def list_sessions(root=RECORDINGS_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, d) for d in os.listdir(root)
+                  if os.path.exists(os.path.join(root, d, "session.json")))
+
+
+# --- Replay ---
+
+class SessionReplayer:
+    # Feeds a recording into a FractalState as the sensors and UI did: gaze
+    # through a GazePipeline, beats into state.rr_intervals and an HrvEngine,
+    # parameter edits and injections through publish(). drive_view also
+    # replays the recorded zoom and offsets (for headless benchmarks; a live
+    # renderer integrates its own zoom). advance(t) applies everything up to
+    # session time t, so a harness can step it deterministically; start()
+    # replays on a thread at `speed` x real time (0 = as fast as possible).
+
+    def __init__(self, path, state, speed=1.0, drive_view=False):
+        self.reader = SessionReader(path)
+        self.state = state
+        self.speed = speed
+        self.drive_view = drive_view
+        self.streams = {s: self.reader.stream(s) for s in STREAMS if s in self.reader.meta['streams']}
+        self.cursors = {s: 0 for s in STREAMS}
+        self.time = 0.0 # Session time applied so far
+        self.end = self.reader.duration()
+        # Replayed sample times land on the local clocks from here on
+        self.base_perf = time.perf_counter()
+        self.base_wall = time.time()
+        self.clock_now = self.base_perf
+        self.gaze = GazePipeline(state, clock=lambda: self.clock_now)
+        self.hrv = HrvEngine()
+        self.applied = 0
+        self._thread = None
+        self._running = False
+
+    def advance(self, t):
+        # Apply every record with time <= t, in time order across streams
+        batch = []
+        for stream, cols in self.streams.items():
+            start = self.cursors[stream]
+            times = cols['t']
+            end = int(np.searchsorted(times, t, side='right'))
+            if end > start:
+                batch.extend((float(times[i]), stream, i) for i in range(start, end))
+                self.cursors[stream] = end
+        batch.sort()
+        for rt, stream, i in batch:
+            self._apply(rt, stream, i)
+        self.applied += len(batch)
+        self.time = max(self.time, t)
+        return len(batch)
+
+    def _apply(self, t, stream, i):
+        cols = self.streams[stream]
+        state = self.state
+        if stream == 'gaze':
+            self.clock_now = self.base_perf + t
+            self.gaze.push(float(cols['x'][i]), float(cols['y'][i]))
+        elif stream == 'rr':
+            state.rr_intervals.append(self.base_wall + t, float(cols['rr'][i]))
+            if self.hrv.consume(state.rr_intervals):
+                state.publish(hrv=self.hrv.summary())
+        elif stream == 'hr':
+            bpm = int(cols['bpm'][i])
+            if bpm != state.current_hr:
+                state.current_hr = bpm
+        elif stream == 'acc':
+            state.acc_samples.append(self.base_wall + t, (int(cols['x'][i]), int(cols['y'][i]), int(cols['z'][i])))
+        elif stream == 'ecg':
+            state.ecg_samples.append(self.base_wall + t, int(cols['uv'][i]))
+        elif stream == 'params':
+            field = self.reader.fields[int(cols['field'][i])]
+            kind = self.reader.field_types[field]
+            value = float(cols['value'][i])
+            value = bool(value) if kind == 'bool' else int(value) if kind == 'int' else value
+            if getattr(state, field) != value:
+                state.publish(**{field: value})
+        elif stream == 'events':
+            self._apply_event(cols, i)
+        elif stream == 'frames' and self.drive_view:
+            state.publish(zoom=float(cols['zoom'][i]), offset_x=float(cols['offset_x'][i]),
+                          offset_y=float(cols['offset_y'][i]))
+
+    def _apply_event(self, cols, i):
+        kind = int(cols['kind'][i])
+        text = bytes(cols['text'][i]).decode('utf-8', errors='replace')
+        if kind == INJECT:
+            lifetime = float(cols['lifetime'][i])
+            inject(self.state, text, float(cols['x'][i]), float(cols['y'][i]), float(cols['scale'][i]),
+                   lifetime=lifetime or None)
+        elif kind == CLEAR:
+            clear_injections(self.state)
+        elif kind == TEXT and self.state.inject_text != text:
+            self.state.inject_text = text
+
+    def finished(self):
+        return all(self.cursors[s] >= len(cols['t']) for s, cols in self.streams.items())
+
+    def run(self, step=0.005):
+        # Blocking replay at self.speed (0 = no waiting)
+        self._running = True
+        started = time.perf_counter()
+        t = 0.0
+        while self._running and not self.finished():
+            if self.speed > 0:
+                t = (time.perf_counter() - started) * self.speed
+                self.advance(t)
+                time.sleep(step)
+            else:
+                t += 1.0
+                self.advance(t)
+        self._running = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
@@ -1,10 +1,27 @@
 import os
 import time
-import math
+import moderngl
 import moderngl_window as mglw
 import imgui
 from moderngl_window.integrations.imgui import ModernglWindowRenderer
-from engine.sdf_maker import create_text_sdf # NEW
+from engine.sdf_cache import SdfCache
+from engine.sdf_pyramid import TileCache
+from engine.injections import (
+    InjectionPool, clear_injections, inject, prune_injections, visible_injections,
+)
+from engine.uniforms import UniformBuffer
+from engine.governor import FrameGovernor
+from engine.reprojection import HISTORY_LOCATION, TemporalReprojector
+from engine.programs import SHADER_PATH, ProgramCache, variant_key
+from engine.perturbation import (
+    DEEP_ZOOM_THRESHOLD, ReferenceOrbitWorker, orbit_texture_data,
+)
+from engine.recorder import start_recording, stop_recording
+from engine.capture import FrameCapture
+from engine.profiler import GpuTimer
+from engine.foveation import FoveatedRenderer, fixation
+from engine.precision import PRECISION_NAMES, add_offset, advance_view, split_float32, view_center, view_precision
+from biometrics.gaze import predict_gaze
 
 class FractalRenderer(mglw.WindowConfig):
     gl_version = (3, 3)
@@ -22,118 +39,414 @@ class FractalRenderer(mglw.WindowConfig):
         super().__init__(**kwargs)
         self.quad = mglw.geometry.quad_fs()
         
-        # Shader will now compile without Segfaulting
-        self.program = self.load_program(path='shaders/fractal.glsl')
-        
-        # Create a tiny 1x1 blank texture so the GPU has something to read initially
-        self.sdf_tex = self.ctx.texture((1, 1), 1, b'\x00')
-        self.sdf_tex.use(location=0)
+        # SDFs are built in a worker pool; the frame only uploads finished buffers
+        # into layers of one pooled texture array. Finer tiles of each SDF are
+        # built on demand in another worker as the view zooms past an injection.
+        self.sdf_cache = SdfCache(profiler=self.state.profiler)
+        self.sdf_tiles = TileCache(profiler=self.state.profiler)
+        self.injection_pool = InjectionPool(self.ctx, self.sdf_cache, tiles=self.sdf_tiles)
+
+        # Frame parameters go up as one std140 block, re-uploading only dirty slots
+        self.uniforms = UniformBuffer(self.ctx, binding=1)
+
+        # fractal.glsl is built per (pass, power kernel, injections) on first use.
+        # The general kernel is compiled now as the fallback; the rest follow
+        # one per frame, starting with the ones the current state needs.
+        self.programs = ProgramCache(
+            lambda defines: self.load_program(path=SHADER_PATH, defines=defines),
+            self.setup_program,
+        )
+        self.programs.compile(variant_key(0, 0.0, True))
+        self.programs.request(variant_key(0, self.state.power, False))
+        self.programs.request(variant_key(1, 0.0, True))
+        self.programs.request(variant_key(2, 0.0, False))
+
+        # Deep zoom: reference orbits are computed off-thread and uploaded as RG32F
+        self.ref_tex = self.ctx.texture((1, 1), 2, dtype='f4')
+        self.ref_tex.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        self.ref_tex.use(location=1)
+        self.ref_orbit = None
+        self.orbit_worker = ReferenceOrbitWorker()
+        self.orbit_worker.start()
+
+        # Temporal reprojection: an iteration pass (PASS 1) that reuses last
+        # frame's samples, and a pass (PASS 2) that shades the iteration buffer
+        self.reprojector = TemporalReprojector(self.ctx)
+
+        # Frame-time governor: renders offscreen at a reduced scale and caps
+        # iterations when the GPU runs over budget, then upscales with sharpening
+        self.governor = FrameGovernor(budget_ms=self.state.frame_budget_ms)
+        self.upscale_program = self.load_program(path='shaders/upscale.glsl')
+        self.upscale_program['scene'].value = 2
+        self.upscale_program['sharpness'].value = 0.5
+        self.scene_tex = None
+        self.scene_fbo = None
+        # Foveated rendering: full detail only around the fixation, coarser and
+        # shallower layers outwards, blended by foveate.glsl
+        self.foveation = FoveatedRenderer(self.ctx, self.load_program(path='shaders/foveate.glsl'))
+        self.fixation_source = None # 'gaze', 'mouse' or 'centre' while foveated
+        self.precision = PRECISION_NAMES[0] # Rung of the precision ladder last drawn with
+        self.mouse = None # Last pointer position, 0-1 from the top left
+        # A small ring of timer queries: reading the oldest never waits on the GPU
+        self.gpu_queries = [self.ctx.query(time=True) for _ in range(3)]
+        self.frame_index = 0
+        self.gpu_ms = 0.0
+        self.ui_timer = GpuTimer(self.ctx, self.state.profiler, 'gpu.ui')
+        self.profile_path = None # Last export
+        # Time from starting a frame to it being on screen, for gaze prediction
+        self.present_latency = 1.0 / 60.0
+
+        # Vision snapshots: downsampled on the GPU, read back a couple of frames
+        # later and encoded off-thread into state.captures
+        self.capture = FrameCapture(self.ctx, self.load_program(path='shaders/downsample.glsl'),
+                                    self.state.captures)
         
         # Initialize the floating GUI
         imgui.create_context()
         self.imgui = ModernglWindowRenderer(self.wnd)
 
     def on_render(self, current_time, frame_time):
+        # CPU time per phase goes to the profiler as cpu.<phase>
+        prof = self.state.profiler
+        prof.frame()
         self.ctx.clear(0.0, 0.0, 0.0)
-        elapsed = time.time() - self.state.time_started
-
-        # --- Handle New Text Injections ---
-        if self.state.injection_needs_update:
-            # Generate the math texture
-            data, w, h = create_text_sdf(self.state.inject_text)
-            self.sdf_tex = self.ctx.texture((w, h), 1, data)
-            self.state.injection_needs_update = False
-            self.state.inject_active = True
-
-        # Send textures and math to the GPU
-        if self.state.inject_active and hasattr(self, 'sdf_tex'):
-            self.sdf_tex.use(location=0)
-            self.program['sdf_texture'].value = 0
-            self.program['inject_active'].value = 1 # CHANGED TO 1
-            self.program['inject_pos'].value = (self.state.inject_x, self.state.inject_y)
-            self.program['inject_scale'].value = self.state.inject_scale
-        else:
-            self.program['inject_active'].value = 0 # CHANGED TO 0
-
+        # Writes from other processes (engine/shared_state.py), then parameter
+        # glides, so this frame sees their values
+        if self.state.shared is not None:
+            self.state.shared.pull()
+        self.state.tweens.step(time.perf_counter())
+        # One consistent view of the state for the whole frame
+        snap = self.state.snapshot()
+        elapsed = time.time() - snap.time_started
+        prof.lap('tweens')
 
         # 1. Calculate the aspect ratio scale for UV mapping
         aspect_x = self.window_size[0] / min(self.window_size)
         aspect_y = self.window_size[1] / min(self.window_size)
 
         # 2. Determine our zoom anchor point
-        if self.state.use_eye_tracker:
+        if frame_time > 0.0:
+            self.present_latency += 0.1 * (frame_time - self.present_latency)
+        # Where the eye will be when this frame is presented, not where the
+        # last sample was
+        predicted = None
+        if snap.gaze_prediction and (snap.use_eye_tracker or snap.foveated):
+            predicted = predict_gaze(snap, time.perf_counter() + self.present_latency)
+        if snap.use_eye_tracker:
+            gaze_x, gaze_y = predicted if predicted is not None else (snap.gaze_x, snap.gaze_y)
             # Map Tobii coordinates (0=top left, 1=bottom right) to OpenGL Shader space
-            target_uv_x = (self.state.gaze_x - 0.5) * aspect_x
-            target_uv_y = (0.5 - self.state.gaze_y) * aspect_y # Y is inverted in OpenGL
+            target_uv_x = (gaze_x - 0.5) * aspect_x
+            target_uv_y = (0.5 - gaze_y) * aspect_y # Y is inverted in OpenGL
         else:
             # If disabled, zoom straight into the center
             target_uv_x = 0.0
             target_uv_y = 0.0
 
-        # 3. Apply Continuous Zoom
-        old_zoom = self.state.zoom
-        zoom_multiplier = math.exp(self.state.zoom_speed * frame_time)
-        self.state.zoom *= zoom_multiplier
-
-        # 4. Apply Anchor Offset Math (Pulls the fractal towards the target point)
-        self.state.offset_x += target_uv_x * (1.0 / old_zoom - 1.0 / self.state.zoom)
-        self.state.offset_y += target_uv_y * (1.0 / old_zoom - 1.0 / self.state.zoom)
-
-        # Send math to the GPU
-        self.program['resolution'].value = (self.window_size[0], self.window_size[1])
-        self.program['offset'].value = (self.state.offset_x, self.state.offset_y)
-        self.program['zoom'].value = self.state.zoom
-        self.program['max_iter'].value = self.state.max_iter
-        self.program['time'].value = elapsed * self.state.pulse_speed
-        
-        self.program['power'].value = self.state.power
-        self.program['color_tint'].value = (self.state.color_r, self.state.color_g, self.state.color_b)
+        # 3-4. Apply Continuous Zoom, pulling the fractal towards the target
+        # point (engine/precision.py keeps the centre as a double-double)
+        snap = advance_view(self.state, snap.zoom, snap.zoom_speed, frame_time, (target_uv_x, target_uv_y))
+        prof.lap('view')
+
+        # 5. Injections: drop expired ones, cull the rest against the new view
+        now = time.time()
+        prune_injections(self.state, now)
+        visible = visible_injections(self.state.snapshot(), self.window_size[0], self.window_size[1], now)
+        self.injection_pool.update(visible, now, (snap.offset_x, snap.offset_y), snap.zoom, self.window_size,
+                                   (snap.offset_x_lo, snap.offset_y_lo))
+        self.injection_pool.use()
+        prof.lap('injections')
+
+        # 6. Deep Zoom: switch to perturbation once float32 runs out of digits
+        deep_active, ref_len = self.update_deep_zoom(snap)
+        prof.lap('deep_zoom')
+
+        # 7. Governor: pick the render scale and iteration cap from recent GPU timings
+        iter_cap = self.update_governor(snap)
+        prof.lap('governor')
+
+        # 8. Reprojection: warp last frame's iteration buffer by the offset/zoom change
+        # (not while foveated: the layers have no single iteration buffer)
+        reproject = snap.reproject and not snap.foveated
+        if reproject:
+            self.reprojector.prepare(
+                self.uniforms, self.governor.render_size(*self.wnd.buffer_size),
+                (snap.offset_x, snap.offset_y, snap.zoom),
+                (snap.power, snap.max_iter if iter_cap is None else iter_cap, deep_active),
+            )
+        else:
+            self.reprojector.invalidate()
+
+        # Send math to the GPU (only the slots that changed are uploaded)
+        self.uniforms.set('screen', self.window_size[0], self.window_size[1])
+        x, x_lo = split_float32(snap.offset_x, snap.offset_x_lo)
+        y, y_lo = split_float32(snap.offset_y, snap.offset_y_lo)
+        self.uniforms.set('view', x, y, snap.zoom, elapsed * snap.pulse_speed)
+        self.uniforms.set('view_lo', x_lo, y_lo)
+        self.uniforms.update_from_snapshot(snap, deep_active, ref_len, iter_cap)
+        self.uniforms.upload()
+        prof.lap('uniforms')
         
-        self.quad.render(self.program)
+        # 9. Kernel: compiled variant for this power, injections compiled out when
+        # idle, and double-float past float32's zoom limit unless perturbation runs
+        precision = 0 if deep_active else view_precision(snap.zoom)
+        kernel = (snap.power, self.injection_pool.count > 0, precision)
+        self.programs.prefetch(1 if reproject else 0, *kernel)
+        # The rung the zoom is heading for, compiled before it gets there
+        ahead = view_precision(snap.zoom * (4.0 if snap.zoom_speed >= 0.0 else 0.25))
+        if not deep_active and ahead != precision:
+            self.programs.request(variant_key(1 if reproject else 0, snap.power, kernel[1], ahead))
+        self.precision = 'perturbation' if deep_active else PRECISION_NAMES[precision]
+
+        query = self.gpu_queries[self.frame_index % len(self.gpu_queries)]
+        with query:
+            if snap.foveated:
+                self.render_foveated(snap, predicted, kernel)
+            else:
+                self.fixation_source = None
+                self.render_scene(reproject, kernel)
+        self.frame_index += 1
+        prof.lap('scene')
+        self.capture.update(self.quad, self.wnd.fbo, snap.capture_interval)
+        prof.lap('capture')
+        recorder = self.state.recorder
+        if recorder is not None:
+            recorder.frames.append(time.perf_counter(), frame_time * 1000.0, self.gpu_ms,
+                                   snap.zoom, snap.offset_x, snap.offset_y)
+        self.programs.warm()
+        prof.lap('compile')
         self.render_ui()
+        prof.lap('ui')
+
+    def setup_program(self, program, key):
+        # Runs once per compiled variant
+        pass_number, _, injections, _ = key
+        self.uniforms.attach(program)
+        if injections:
+            self.injection_pool.attach(program, texture_location=0, block_binding=0)
+        # Samplers of different types may not share a unit, even when unused
+        if program.get('ref_orbit', None) is not None:
+            program['ref_orbit'].value = 1
+        if pass_number != 0:
+            program['history'].value = HISTORY_LOCATION
+
+    def update_governor(self, snap):
+        # Foveated frames ignore the governor's scale, so it only moves the iteration cap
+        self.governor.lock_scale(snap.foveated)
+        ring = len(self.gpu_queries)
+        if self.frame_index >= ring - 1:
+            # The query issued ring - 1 frames ago
+            oldest = self.gpu_queries[(self.frame_index + 1) % ring]
+            self.gpu_ms = oldest.elapsed / 1e6
+            self.state.profiler.record('gpu.scene', self.gpu_ms)
+            if snap.governor_enabled:
+                self.governor.update(self.gpu_ms)
+
+        if not snap.governor_enabled:
+            if self.governor.scale != 1.0 or self.governor.iter_fraction != 1.0:
+                self.governor.reset()
+            return None
+        self.governor.budget_ms = snap.frame_budget_ms
+        return self.governor.iter_cap(snap.max_iter)
+
+    def render_scene(self, reproject, kernel):
+        if self.governor.scale >= 1.0:
+            self.draw_fractal(self.wnd, reproject, kernel)
+            return
+
+        size = self.governor.render_size(*self.wnd.buffer_size)
+        if self.scene_tex is None or self.scene_tex.size != size:
+            if self.scene_fbo is not None:
+                self.scene_fbo.release()
+                self.scene_tex.release()
+            self.scene_tex = self.ctx.texture(size, 3)
+            self.scene_tex.repeat_x = False
+            self.scene_tex.repeat_y = False
+            self.scene_fbo = self.ctx.framebuffer(color_attachments=[self.scene_tex])
+
+        self.draw_fractal(self.scene_fbo, reproject, kernel)
+        self.wnd.use()
+        self.scene_tex.use(location=2)
+        self.quad.render(self.upscale_program)
+
+    def render_foveated(self, snap, predicted, kernel):
+        # Replaces the governor's scaled render; its iteration cap still applies
+        (gx, gy), self.fixation_source = fixation(snap, self.mouse, time.perf_counter(), predicted)
+        width, height = self.wnd.buffer_size
+        self.foveation.render(self.quad, self.wnd, self.programs.get(0, *kernel), self.uniforms,
+                              (width, height), (gx * width, (1.0 - gy) * height),
+                              snap.fovea_radius * height, snap.fovea_falloff * height)
+
+    def draw_fractal(self, target, reproject, kernel):
+        if reproject:
+            self.reprojector.render(self.quad, target, self.programs.get(1, *kernel),
+                                    self.programs.get(2, *kernel))
+        else:
+            target.use()
+            self.quad.render(self.programs.get(0, *kernel))
+
+    def update_deep_zoom(self, snap):
+        wanted = (snap.deep_zoom
+                  and snap.zoom >= DEEP_ZOOM_THRESHOLD
+                  and abs(snap.power - 2.0) < 1e-6) # Perturbation only handles z^2 + c
+
+        if wanted:
+            center_x, center_y = view_center((snap.offset_x, snap.offset_y), (snap.offset_x_lo, snap.offset_y_lo))
+            self.orbit_worker.request(center_x, center_y, snap.zoom, snap.max_iter)
+            ref = self.orbit_worker.poll()
+            if ref is not None:
+                data, w, h = orbit_texture_data(ref)
+                if self.ref_tex.size != (w, h):
+                    self.ref_tex.release()
+                    self.ref_tex = self.ctx.texture((w, h), 2, dtype='f4')
+                    self.ref_tex.filter = (moderngl.NEAREST, moderngl.NEAREST)
+                self.ref_tex.write(data)
+                self.ref_orbit = ref
+
+        # Keep using the plain loop until the first orbit arrives
+        active = wanted and self.ref_orbit is not None
+        if active != snap.deep_zoom_active:
+            self.state.deep_zoom_active = active
+
+        if active:
+            ref = self.ref_orbit
+            self.ref_tex.use(location=1)
+            self.uniforms.set('deep', float(center_x - ref.center_x), float(center_y - ref.center_y),
+                              float(ref.center_x), float(ref.center_y))
+            return 1, len(ref)
+        return 0, 0
 
     def render_ui(self):
+        snap = self.state.snapshot()
+        edits = {} # Published together at the end, and only for widgets that changed
+
+        def edit(name, result):
+            changed, value = result
+            if changed:
+                edits[name] = value
+
         imgui.new_frame()
         imgui.begin("LLM Control Panel", True)
         
         # --- Eye Tracker Toggle ---
-        _, self.state.use_eye_tracker = imgui.checkbox("Eye Tracker Zoom", self.state.use_eye_tracker)
+        edit('use_eye_tracker', imgui.checkbox("Eye Tracker Zoom", snap.use_eye_tracker))
+        edit('gaze_prediction', imgui.checkbox("Gaze Prediction", snap.gaze_prediction))
         imgui.spacing()
         
         # Sliders
-        _, self.state.zoom_speed = imgui.slider_float("Zoom Speed", self.state.zoom_speed, -1.0, 1.0)
-        _, self.state.power = imgui.slider_float("Fractal Dimension", self.state.power, 1.0, 5.0)
-        _, self.state.max_iter = imgui.slider_int("Detail (Max Iter)", self.state.max_iter, 10, 500)
+        edit('zoom_speed', imgui.slider_float("Zoom Speed", snap.zoom_speed, -1.0, 1.0))
+        edit('power', imgui.slider_float("Fractal Dimension", snap.power, 1.0, 5.0))
+        edit('max_iter', imgui.slider_int("Detail (Max Iter)", snap.max_iter, 10, 500))
+        edit('deep_zoom', imgui.checkbox("Deep Zoom (Perturbation)", snap.deep_zoom))
+        imgui.text(f"Zoom: {snap.zoom:.3e}  [{self.precision}]")
+        gliding = self.state.tweens.active()
+        if gliding:
+            imgui.text(f"Gliding: {', '.join(gliding)}")
+        
+        imgui.spacing()
+        edit('color_r', imgui.slider_float("Red", snap.color_r, 0.0, 1.0))
+        edit('color_g', imgui.slider_float("Green", snap.color_g, 0.0, 1.0))
+        edit('color_b', imgui.slider_float("Blue", snap.color_b, 0.0, 1.0))
+        edit('pulse_speed', imgui.slider_float("Pulse Speed", snap.pulse_speed, 0.0, 2.0))
         
         imgui.spacing()
-        _, self.state.color_r = imgui.slider_float("Red", self.state.color_r, 0.0, 1.0)
-        _, self.state.color_g = imgui.slider_float("Green", self.state.color_g, 0.0, 1.0)
-        _, self.state.color_b = imgui.slider_float("Blue", self.state.color_b, 0.0, 1.0)
-        _, self.state.pulse_speed = imgui.slider_float("Pulse Speed", self.state.pulse_speed, 0.0, 2.0)
+        imgui.text("--- Frame Governor ---")
+        edit('governor_enabled', imgui.checkbox("Adaptive Quality", snap.governor_enabled))
+        edit('frame_budget_ms', imgui.slider_float("GPU Budget (ms)", snap.frame_budget_ms, 4.0, 33.0))
+        gov = self.governor
+        imgui.text(f"GPU: {self.gpu_ms:.2f} ms  Scale: {gov.scale:.2f}  Iter cap: {gov.iter_cap(snap.max_iter)}")
+        imgui.text(f"Res -{gov.counters['scale_down']}/+{gov.counters['scale_up']}  "
+                   f"Iter -{gov.counters['iter_down']}/+{gov.counters['iter_up']}  ({gov.last_decision})")
+        cache = self.programs
+        imgui.text(f"Kernels: {len(cache.programs)} compiled, {len(cache.queue)} queued, "
+                   f"{cache.counters['fallbacks']} fallback draws")
+        edit('reproject', imgui.checkbox("Temporal Reprojection", snap.reproject))
+        if snap.reproject:
+            imgui.text(f"History resets: {self.reprojector.counters['invalidations']}  "
+                       f"Refresh: 1/{self.reprojector.refine_period} px per frame")
+        edit('foveated', imgui.checkbox("Foveated Rendering", snap.foveated))
+        if snap.foveated:
+            edit('fovea_radius', imgui.slider_float("Fovea Radius", snap.fovea_radius, 0.05, 0.5))
+            edit('fovea_falloff', imgui.slider_float("Fovea Falloff", snap.fovea_falloff, 0.01, 0.2))
+            imgui.text(f"Foveation: {self.foveation.fragments * 100:.0f}% fragments, "
+                       f"{self.foveation.budget * 100:.0f}% iterations ({self.fixation_source})")
         
         imgui.spacing()
         imgui.text("--- Biometrics Data ---")
-        imgui.text(f"Heart Rate: {self.state.current_hr} BPM")
-        imgui.text(f"Gaze Point: ({self.state.gaze_x:.2f}, {self.state.gaze_y:.2f})")
+        imgui.text(f"Heart Rate: {snap.current_hr} BPM  ({len(snap.rr_intervals)} beats)")
+        imgui.text(f"Polar: {snap.polar_status}")
+        for window, m in snap.hrv.get('windows', {}).items():
+            if m['rmssd'] is not None and m['sdnn'] is not None:
+                line = f"HRV {window:.0f}s: RMSSD {m['rmssd']:.0f}ms  SDNN {m['sdnn']:.0f}ms  pNN50 {m['pnn50']:.0f}%"
+                if m.get('lf_hf') is not None:
+                    line += f"  LF/HF {m['lf_hf']:.2f}"
+                imgui.text(line)
+        if snap.hrv:
+            imgui.text(f"Beats rejected: {snap.hrv['rejected']} / {snap.hrv['accepted'] + snap.hrv['rejected']}")
+        imgui.text(f"Gaze Point: ({snap.gaze_x:.2f}, {snap.gaze_y:.2f})  "
+                   f"{len(snap.gaze_samples)} samples, +{self.present_latency * 1000.0:.0f}ms ahead")
+        imgui.text(f"LLM: {snap.llm_status}")
+        edit('capture_interval', imgui.slider_float("Vision Snapshot (s)", snap.capture_interval, 0.0, 30.0))
+        captures = self.state.captures
+        if captures.delivered:
+            imgui.text(f"Snapshots: {captures.delivered} ({captures.dropped} unread, "
+                       f"{self.capture.counters['skipped'] + self.capture.counters['dropped']} skipped)")
 
         # --- Injection Engine UI ---
         imgui.spacing()
         imgui.text("--- Text Injection ---")
-        _, self.state.inject_text = imgui.input_text("Word", self.state.inject_text, 256)
+        edit('inject_text', imgui.input_text("Word", snap.inject_text, 256))
+        
+        edit('inject_lifetime', imgui.slider_float("Lifetime (s, 0 = forever)", snap.inject_lifetime, 0.0, 120.0))
         
         if imgui.button("Inject Here"):
             # Lock the coordinates and scale to EXACTLY where the user is looking right now
-            self.state.inject_x = self.state.offset_x
-            self.state.inject_y = self.state.offset_y
-            self.state.inject_scale = self.state.zoom
-            self.state.injection_needs_update = True
+            inject(self.state, edits.get('inject_text', snap.inject_text), snap.offset_x, snap.offset_y,
+                   snap.zoom, lifetime=edits.get('inject_lifetime', snap.inject_lifetime) or None,
+                   x_lo=snap.offset_x_lo, y_lo=snap.offset_y_lo)
             
         if imgui.button("Clear Text"):
-            self.state.inject_active = False
+            clear_injections(self.state)
+        imgui.text(f"Injections: {self.injection_pool.count} drawn / {len(snap.injections)} live")
+        atlas = self.injection_pool.atlas
+        imgui.text(f"SDF tiles: {len(atlas.resident)} resident, {self.sdf_tiles.pending()} pending, "
+                   f"{atlas.misses} coarse")
+
+        # --- Session Recording ---
+        imgui.spacing()
+        recorder = self.state.recorder
+        changed, recording = imgui.checkbox("Record Session", recorder is not None)
+        if changed:
+            if recording:
+                start_recording(self.state)
+            else:
+                stop_recording(self.state)
+        if recorder is not None:
+            imgui.text(f"{recorder.path}: {recorder.records()} records")
+
+        # --- Profiler ---
+        imgui.spacing()
+        prof = self.state.profiler
+        expanded, _ = imgui.collapsing_header("Profiler")
+        if expanded:
+            imgui.text(f"{'':<18}{'p50':>8}{'p99':>8}{'max':>8}  ms")
+            for name, m in prof.summary().items():
+                imgui.text(f"{name:<18}{m['p50_ms']:8.3f}{m['p99_ms']:8.3f}{m['max_ms']:8.2f}")
+            if imgui.button("Export Profile"):
+                self.profile_path = prof.export()
+            imgui.same_line()
+            if imgui.button("Reset"):
+                prof.reset()
+            if self.profile_path:
+                imgui.text(f"Saved {self.profile_path}")
 
         imgui.end()
         imgui.render()
-        self.imgui.render(imgui.get_draw_data())
+        with self.ui_timer:
+            self.imgui.render(imgui.get_draw_data())
+
+        if edits:
+            self.state.tweens.cancel(*edits) # A hand on the slider wins over a glide
+            self.state.publish(**edits)
 
     # --- Mouse & Keyboard Event Forwarding ---
     def on_mouse_drag_event(self, x, y, dx, dy):
@@ -143,11 +456,15 @@ class FractalRenderer(mglw.WindowConfig):
             aspect = self.window_size[0] / self.window_size[1]
             scale_x = dx / self.window_size[0]
             scale_y = dy / self.window_size[1]
-            self.state.offset_x -= (scale_x * aspect) / self.state.zoom
-            self.state.offset_y += scale_y / self.state.zoom
+            with self.state.lock:
+                x, x_lo = add_offset(self.state.offset_x, self.state.offset_x_lo, -(scale_x * aspect) / self.state.zoom)
+                y, y_lo = add_offset(self.state.offset_y, self.state.offset_y_lo, scale_y / self.state.zoom)
+                self.state.publish(offset_x=x, offset_x_lo=x_lo, offset_y=y, offset_y_lo=y_lo)
 
     def on_mouse_position_event(self, x, y, dx, dy):
         self.imgui.mouse_position_event(x, y, dx, dy)
+        # Stand-in fixation for foveated rendering without a tracker
+        self.mouse = (x / self.window_size[0], y / self.window_size[1])
 
     def on_mouse_press_event(self, x, y, button):
         self.imgui.mouse_press_event(x, y, button)
@@ -159,4 +476,18 @@ class FractalRenderer(mglw.WindowConfig):
         self.imgui.key_event(key, action, modifiers)
 
     def on_resize(self, width, height):
-        self.imgui.resize(width, height)
\ No newline at end of file
+        self.imgui.resize(width, height)
+
+    def on_close(self):
+        stop_recording(self.state)
+        self.sdf_cache.close()
+        self.sdf_tiles.close()
+        self.injection_pool.release()
+        self.uniforms.release()
+        self.reprojector.release()
+        self.foveation.release()
+        self.capture.release()
+        self.programs.release()
+        if self.scene_fbo is not None:
+            self.scene_fbo.release()
+            self.scene_tex.release()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import moderngl
+
+# Temporal reprojection for continuous zoom. The iteration pass of fractal.glsl
+# (PASS 1) writes smooth iteration counts into a float buffer instead of
+# colours. Next frame it looks up where each pixel was in that buffer using the
+# known offset/zoom change and reuses the sample if it is close enough, so only
+# pixels that are new, melted by an injection, too far from any old sample, or
+# due for their periodic refresh run the escape loop. The shade pass (PASS 2)
+# turns the buffer into colour every frame, so palette cycling stays smooth.
+
+HISTORY_LOCATION = 3 # Texture unit for the history sampler
+
+
+class TemporalReprojector:
+    # The iterate and shade programs are passed to render() so the caller can
+    # pick a kernel variant per frame; their history sampler must be set to
+    # HISTORY_LOCATION.
+
+    def __init__(self, ctx, refine_period=8, max_error=0.75, max_zoom_step=4.0):
+        self.ctx = ctx
+        self.refine_period = refine_period # Every pixel is recomputed at least this often (frames)
+        self.max_error = max_error # Reuse a sample at most this far from the pixel centre (px)
+        self.max_zoom_step = max_zoom_step # A larger zoom change in one frame is a cut, not a zoom
+
+        self.size = None
+        self.textures = []
+        self.fbos = []
+        self.current = 0 # Index of the texture holding the last frame
+        self.view = None # (offset_x, offset_y, zoom) the history was rendered at, None = no history
+        self.key = None # Everything else the iteration values depend on
+        self.frame = 0
+        self.counters = {
+            'frames': 0,
+            'invalidations': 0,
+        }
+
+    def _allocate(self, size):
+        self.release()
+        for _ in range(2):
+            tex = self.ctx.texture(size, 4, dtype='f4')
+            tex.filter = (moderngl.NEAREST, moderngl.NEAREST)
+            self.textures.append(tex)
+            self.fbos.append(self.ctx.framebuffer(color_attachments=[tex]))
+        self.size = size
+        self.view = None
+
+    def invalidate(self):
+        if self.view is not None:
+            self.counters['invalidations'] += 1
+        self.view = None
+
+    def prepare(self, uniforms, size, view, key):
+        # Fills the warp/refine slots for this frame; call before uniforms.upload().
+        # view = (offset_x, offset_y, zoom), key = e.g. (power, iter cap, deep zoom)
+        if size != self.size:
+            self._allocate(size)
+        if key != self.key:
+            self.key = key
+            self.invalidate()
+        elif self.view is not None and self._jumped(size, view):
+            self.invalidate()
+
+        if self.view is None:
+            uniforms.set('warp', 0.0, 0.0, 1.0, self.max_error)
+            uniforms.set('refine', 0, self.refine_period, 0)
+        else:
+            # pixel_prev = pixel * (zoom_prev / zoom) + (offset - offset_prev) * zoom_prev,
+            # worked out here in double precision so it holds at deep zoom
+            prev_x, prev_y, prev_zoom = self.view
+            offset_x, offset_y, zoom = view
+            uniforms.set('warp', (offset_x - prev_x) * prev_zoom, (offset_y - prev_y) * prev_zoom,
+                         prev_zoom / zoom, self.max_error)
+            uniforms.set('refine', 1, self.refine_period, self.frame % self.refine_period)
+        self._next_view = view
+
+    def _jumped(self, size, view):
+        # A cut (bookmark, reset, a big zoom step): the new frame does not
+        # overlap the old one, or samples land too far apart to reuse
+        prev_x, prev_y, prev_zoom = self.view
+        offset_x, offset_y, zoom = view
+        ratio = prev_zoom / zoom
+        if not 1.0 / self.max_zoom_step <= ratio <= self.max_zoom_step:
+            return True
+        # Half extents of the view in (previous) pixel space, as in fractal.glsl
+        short = min(size)
+        half_x, half_y = 0.5 * size[0] / short, 0.5 * size[1] / short
+        return (abs(offset_x - prev_x) * prev_zoom >= half_x * (1.0 + ratio)
+                or abs(offset_y - prev_y) * prev_zoom >= half_y * (1.0 + ratio))
+
+    def render(self, quad, target, iterate_program, shade_program):
+        # Iteration pass into the back buffer, then shade it into target
+        history = self.textures[self.current]
+        back = 1 - self.current
+
+        # ImGui leaves blending on, and the buffer keeps data in its alpha channel
+        self.ctx.disable(moderngl.BLEND)
+        history.use(location=HISTORY_LOCATION)
+        self.fbos[back].use()
+        quad.render(iterate_program)
+
+        target.use()
+        self.textures[back].use(location=HISTORY_LOCATION)
+        quad.render(shade_program)
+
+        self.current = back
+        self.view = self._next_view
+        self.frame += 1
+        self.counters['frames'] += 1
+
+    def buffer(self):
+        # The iteration buffer of the last frame, for readback and benchmarks
+        return self.textures[self.current]
+
+    def release(self):
+        for fbo in self.fbos:
+            fbo.release()
+        for tex in self.textures:
+            tex.release()
+        self.fbos = []
+        self.textures = []
+        self.size = None
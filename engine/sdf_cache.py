@@ -0,0 +1,156 @@
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from engine.sdf_maker import DEFAULT_FONT, DEFAULT_MASK_DIR, create_sdf, is_mask
+from engine.glyph_atlas import compose_text_sdf, covers
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fractalmassage", "sdf")
+FAILED_RETRY = 30.0 # Seconds before a source that failed to build is tried again
+
+
+def sdf_key(text, width=1024, height=512, font_size=150, font=DEFAULT_FONT):
+    return (text, font, font_size, width, height)
+
+
+def _disk_path(cache_dir, key, use_atlas):
+    digest = hashlib.sha1(repr((key, use_atlas)).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.sdf")
+
+
+def _generate(key, cache_dir, use_atlas=True, mask_dir=DEFAULT_MASK_DIR):
+    # Runs in a worker process: disk hit, or build the SDF and store it
+    text, font, font_size, width, height = key
+    # Text the atlas has no glyphs for is built (and stored) as an exact EDT
+    use_atlas = use_atlas and not is_mask(text) and covers(text)
+    path = _disk_path(cache_dir, key, use_atlas) if cache_dir else None
+
+    if path and os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) == width * height:
+                return data, width, height
+        except OSError:
+            pass
+
+    if use_atlas:
+        # Glyph atlas: blit-composite, no distance transform per phrase
+        data, w, h = compose_text_sdf(text, width, height, font_size, font)
+    else:
+        data, w, h = create_sdf(text, width, height, font_size, font, mask_dir)
+
+    if path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path) # Atomic, so readers never see a partial file
+        except OSError as e:
+            print(f"SDF Cache: could not write {path}: {e}")
+    return data, w, h
+
+
+def submit_restarting(owner, fn, *args):
+    # Submits to owner._pool, a pool of owner.workers spawn processes started
+    # on first use (never fork a process that already owns a GL context). A
+    # worker that died (OOM, killed) breaks the pool for good: shut it down,
+    # start a fresh one and retry once.
+    for attempt in (0, 1):
+        if owner._pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            owner._pool = ProcessPoolExecutor(max_workers=owner.workers, mp_context=ctx)
+        try:
+            return owner._pool.submit(fn, *args)
+        except BrokenProcessPool:
+            if attempt:
+                raise
+            owner._pool.shutdown(wait=False, cancel_futures=True)
+            owner._pool = None
+
+
+class SdfCache:
+    # Generates text SDFs in a process pool so the render thread never runs the
+    # EDT. request() returns a key at once; get(key) returns (data, w, h) once
+    # the buffer is ready. Finished buffers sit in an in-memory LRU in front of
+    # an on-disk cache, so repeated phrases cost nothing. Image masks come in
+    # by their engine.sdf_maker.register_mask() name. A source that fails to
+    # build (say a mask missing on this machine) is logged once and not asked
+    # for again for FAILED_RETRY seconds; get() returns None for it meanwhile.
+    # Requests lost to a dying worker are not failures and go again at once.
+
+    def __init__(self, capacity=32, cache_dir=DEFAULT_CACHE_DIR, workers=2, use_atlas=True, profiler=None,
+                 mask_dir=DEFAULT_MASK_DIR):
+        self.capacity = capacity
+        self.mask_dir = mask_dir
+        self.profiler = profiler # engine.profiler.Profiler: request-to-ready time as 'sdf.generate'
+        self.use_atlas = use_atlas
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._pending = {}
+        self._failed = {} # key -> time.monotonic() after which it is retried
+        self._pool = None
+
+    def request(self, text, width=1024, height=512, font_size=150, font=DEFAULT_FONT):
+        key = sdf_key(text, width, height, font_size, font)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return key
+            if key in self._pending or time.monotonic() < self._failed.get(key, 0.0):
+                return key
+            future = submit_restarting(self, _generate, key, self.cache_dir, self.use_atlas, self.mask_dir)
+            self._pending[key] = future
+        t0 = time.perf_counter()
+        future.add_done_callback(lambda f, k=key, t0=t0: self._finish(k, f, t0))
+        return key
+
+    def _finish(self, key, future, t0):
+        if self.profiler is not None:
+            self.profiler.record('sdf.generate', (time.perf_counter() - t0) * 1000.0)
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            # A worker died, not the source: the next request() resubmits it
+            # to a fresh pool
+            with self._lock:
+                self._pending.pop(key, None)
+            return
+        except Exception as e:
+            if key not in self._failed:
+                print(f"SDF Cache: generating {key[0]!r} failed: {e}")
+            result = None
+        with self._lock:
+            self._pending.pop(key, None)
+            if result is None:
+                self._failed[key] = time.monotonic() + FAILED_RETRY
+            else:
+                self._failed.pop(key, None)
+                self._lru[key] = result
+                self._lru.move_to_end(key)
+                while len(self._lru) > self.capacity:
+                    self._lru.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            result = self._lru.get(key)
+            if result is not None:
+                self._lru.move_to_end(key)
+            return result
+
+    def is_pending(self, key):
+        with self._lock:
+            return key in self._pending
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
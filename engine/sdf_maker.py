@@ -1,15 +1,20 @@
+import os
+import hashlib
+
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import scipy.ndimage
 
-def create_text_sdf(text, width=1024, height=512, font_size=150):
+DEFAULT_FONT = "DejaVuSans-Bold.ttf"
+
+def create_text_sdf(text, width=1024, height=512, font_size=150, font=DEFAULT_FONT):
     # Create a black canvas
     img = Image.new('L', (width, height), 0)
     draw = ImageDraw.Draw(img)
     
     # Try to load a clean Linux font, fallback to default if not found
     try:
-        font = ImageFont.truetype("DejaVuSans-Bold.ttf", font_size)
+        font = ImageFont.truetype(font, font_size)
     except IOError:
         font = ImageFont.load_default()
     
@@ -34,4 +39,80 @@ def create_text_sdf(text, width=1024, height=512, font_size=150):
     # Map into a 0-255 grayscale texture where 128 is the exact edge
     sdf_scaled = np.clip(sdf * 4 + 128, 0, 255).astype(np.uint8)
     
-    return sdf_scaled.tobytes(), width, height
\ No newline at end of file
+    return sdf_scaled.tobytes(), width, height
+
+# --- Image Masks ---
+# A PIL image injected like a phrase. register_mask() stores it as a grayscale
+# PNG under a content hash and returns "mask:<hash>", which stands in for the
+# text everywhere an injection is keyed (SDF caches, recordings), and lets
+# worker processes load the image from disk instead of receiving it pickled.
+
+MASK_PREFIX = "mask:"
+DEFAULT_MASK_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fractalmassage", "masks")
+
+_masks = {} # name -> grayscale image, per process
+
+
+def mask_coverage(image):
+    # Coverage as 'L': the alpha channel when there is one, else luminance
+    if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+        return image.convert('RGBA').getchannel('A')
+    return image.convert('L')
+
+
+def is_mask(source):
+    name = source[len(MASK_PREFIX):]
+    return source.startswith(MASK_PREFIX) and len(name) == 16 and all(c in "0123456789abcdef" for c in name)
+
+
+def register_mask(image, mask_dir=DEFAULT_MASK_DIR):
+    coverage = mask_coverage(image)
+    digest = hashlib.sha1(repr(coverage.size).encode("utf-8") + coverage.tobytes()).hexdigest()[:16]
+    name = MASK_PREFIX + digest
+    path = os.path.join(mask_dir, f"{digest}.png")
+    if not os.path.exists(path):
+        os.makedirs(mask_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        coverage.save(tmp, format="PNG")
+        os.replace(tmp, path)
+    _masks[name] = coverage
+    return name
+
+
+def load_mask(name, mask_dir=DEFAULT_MASK_DIR):
+    if name not in _masks:
+        if len(_masks) >= 8:
+            _masks.clear()
+        with Image.open(os.path.join(mask_dir, f"{name[len(MASK_PREFIX):]}.png")) as img:
+            _masks[name] = img.convert('L')
+    return _masks[name]
+
+
+def mask_rect(size, width=1024, height=512):
+    # Where a mask of this pixel size sits in a width x height SDF canvas:
+    # (x, y, w, h) in canvas pixels, centred and as large as fits. The canvas
+    # is drawn onto a square of the plane, so a canvas pixel is
+    # (height / width) as wide as it is tall; the mask keeps its aspect on screen.
+    aspect = width / height
+    k = min(width / (size[0] * aspect), height / size[1])
+    w, h = size[0] * k * aspect, size[1] * k
+    return (width - w) / 2, (height - h) / 2, w, h
+
+
+def create_image_sdf(image, width=1024, height=512):
+    # create_text_sdf for a PIL image: inside where coverage is above half
+    coverage = mask_coverage(image)
+    x, y, w, h = mask_rect(coverage.size, width, height)
+    canvas = Image.new('L', (width, height), 0)
+    canvas.paste(coverage.resize((max(1, round(w)), max(1, round(h))), Image.BILINEAR), (round(x), round(y)))
+
+    inside = np.array(canvas) > 128
+    sdf = scipy.ndimage.distance_transform_edt(inside) - scipy.ndimage.distance_transform_edt(~inside)
+    return np.clip(sdf * 4 + 128, 0, 255).astype(np.uint8).tobytes(), width, height
+
+
+def create_sdf(source, width=1024, height=512, font_size=150, font=DEFAULT_FONT, mask_dir=DEFAULT_MASK_DIR):
+    # A registered mask name or a phrase
+    if is_mask(source):
+        return create_image_sdf(load_mask(source, mask_dir), width, height)
+    return create_text_sdf(source, width, height, font_size, font)
@@ -0,0 +1,395 @@
+import math
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import scipy.ndimage
+
+from engine.sdf_maker import DEFAULT_FONT, DEFAULT_MASK_DIR, is_mask, load_mask, mask_rect
+from engine.sdf_cache import submit_restarting
+
+# Sparse SDF pyramid for injections. Level 0 is the injection's one SDF_WIDTH x
+# SDF_HEIGHT texture; level k is the same canvas at 2^k times the resolution,
+# cut into TILE x TILE tiles that only exist once a view has asked for them.
+# A tile is rendered from the source itself (the phrase, or the image mask),
+# not upsampled from the level above, so edges stay a few pixels wide however
+# far the view zooms past the injection's own depth.
+#
+# Tiles are built in a background process (TileCache) and kept in a bounded
+# LRU; the GPU holds the ones in view in one texture array (TileAtlas), with a
+# page table per injection mapping its window of tiles to atlas layers. Tiles
+# that are entirely inside or outside the shape are never stored, only marked.
+
+# Level 0, the base layer InjectionPool keeps per injection
+SDF_WIDTH = 1024
+SDF_HEIGHT = 512
+
+UV_SCALE = 0.2 # inject_uv = (c - anchor) * scale * UV_SCALE + 0.5
+
+# Must match fractal.glsl
+TILE = 256
+PAGE_COLS = 16
+PAGE_ROWS = 12
+TILE_MISSING = -1 # Page table markers, in place of an atlas layer
+TILE_OUTSIDE = -2
+TILE_INSIDE = -3
+
+TILE_TEXELS = TILE + 2 # One texel of border each side, so filtering is seamless across tiles
+SPREAD = 32 # Texels of distance the uint8 encoding (dist * 4 + 128) holds each side of an edge
+MAX_LEVEL = 12
+PIXELS_PER_TEXEL = 2.0 # A level is fine enough once its texels cover at most this many pixels
+
+# Phrases are rasterised once at this level (font_size * 16) and resampled
+# for every tile; FreeType cannot draw a whole phrase much larger than that
+TEXT_RASTER_LEVEL = 4
+
+PAGES_LOCATION = 8 # Texture units of the page table and the tile array
+TILES_LOCATION = 9
+
+
+# --- Levels and Windows ---
+
+def level_size(level):
+    return SDF_WIDTH << level, SDF_HEIGHT << level
+
+
+def tile_grid(level):
+    w, h = level_size(level)
+    return w // TILE, h // TILE
+
+
+def level_for(scale, zoom, resolution):
+    # Coarsest level whose texels cover at most PIXELS_PER_TEXEL pixels of a
+    # view `resolution` pixels high. Canvas texels are twice as tall as they
+    # are wide on screen, so the height decides.
+    texel = 1.0 / (scale * UV_SCALE * SDF_HEIGHT)
+    pixel = 1.0 / (zoom * resolution)
+    ratio = texel / (pixel * PIXELS_PER_TEXEL)
+    if ratio <= 1.0:
+        return 0
+    return min(MAX_LEVEL, math.ceil(math.log2(ratio)))
+
+
+def canvas_position(px, py, x, y, scale, level):
+    # Point of the plane -> pixel position on the level's canvas (y down)
+    w, h = level_size(level)
+    return ((px - x) * scale * UV_SCALE + 0.5) * w, (0.5 - (py - y) * scale * UV_SCALE) * h
+
+
+def page_window(x, y, scale, center, zoom, width, height):
+    # (level, tx0, ty0, tx1, ty1): the tiles of one injection a width x height
+    # view needs. Level 0 means the base layer alone. Steps up a level while
+    # the window is larger than a page table holds.
+    short = min(width, height)
+    half_x, half_y = 0.5 * width / short / zoom, 0.5 * height / short / zoom
+    level = level_for(scale, zoom, short)
+    while level > 0:
+        left, top = canvas_position(center[0] - half_x, center[1] + half_y, x, y, scale, level)
+        right, bottom = canvas_position(center[0] + half_x, center[1] - half_y, x, y, scale, level)
+        cols, rows = tile_grid(level)
+        tx0, ty0 = max(0, math.floor(left / TILE)), max(0, math.floor(top / TILE))
+        tx1, ty1 = min(cols, math.floor(right / TILE) + 1), min(rows, math.floor(bottom / TILE) + 1)
+        if tx1 <= tx0 or ty1 <= ty0:
+            break # The canvas is out of view
+        if tx1 - tx0 <= PAGE_COLS and ty1 - ty0 <= PAGE_ROWS:
+            return level, tx0, ty0, tx1, ty1
+        level -= 1
+    return 0, 0, 0, 0, 0
+
+
+def window_corner(x, y, scale, center, level, tx0, ty0):
+    # Top-left corner of tile (tx0, ty0) relative to the view centre, so the
+    # shader measures from it in float32 without losing the view's digits
+    w, h = level_size(level)
+    corner_x = x + (tx0 * TILE / w - 0.5) / (scale * UV_SCALE)
+    corner_y = y + (0.5 - ty0 * TILE / h) / (scale * UV_SCALE)
+    return corner_x - center[0], corner_y - center[1]
+
+
+# --- Tile Rendering (worker processes) ---
+
+_coverages = OrderedDict() # Per process: a phrase at TEXT_RASTER_LEVEL is tens of MB
+
+
+def _load_font(font, size):
+    try:
+        return ImageFont.truetype(font, size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+def coverage(source, font_size=150, font=DEFAULT_FONT, mask_dir=DEFAULT_MASK_DIR):
+    # The source as float32 coverage (0..255), the level-0 canvas position of
+    # its top-left corner, and level-0 canvas pixels per coverage pixel
+    key = (source, font_size, font)
+    if key in _coverages:
+        _coverages.move_to_end(key)
+        return _coverages[key]
+
+    if is_mask(source):
+        image = load_mask(source, mask_dir)
+        x, y, w, h = mask_rect(image.size, SDF_WIDTH, SDF_HEIGHT)
+        result = (np.asarray(image, dtype=np.float32), (x, y), (w / image.size[0], h / image.size[1]))
+    else:
+        # Laid out as create_text_sdf lays it out, on the raster level's canvas
+        k = 1 << TEXT_RASTER_LEVEL
+        big = _load_font(font, font_size * k)
+        left, top, right, bottom = big.getbbox(source)
+        img = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(img).text((-left, -top), source, font=big, fill=255)
+        x = ((SDF_WIDTH * k - (right - left)) / 2 + left) / k
+        y = ((SDF_HEIGHT * k - (bottom - top)) / 2 + top) / k
+        result = (np.asarray(img, dtype=np.float32), (x, y), (1.0 / k, 1.0 / k))
+
+    _coverages[key] = result
+    while len(_coverages) > 2:
+        _coverages.popitem(last=False)
+    return result
+
+
+def tile_sdf(source, level, tx, ty, font_size=150, font=DEFAULT_FONT, mask_dir=DEFAULT_MASK_DIR):
+    # Tile (tx, ty) of a level: TILE_TEXELS^2 uint8 SDF bytes in the encoding
+    # of create_text_sdf, texel s of a row centred on canvas pixel
+    # tx * TILE - 1 + s. Uniform tiles come back as TILE_OUTSIDE / TILE_INSIDE.
+    values, (x0, y0), (pitch_x, pitch_y) = coverage(source, font_size, font, mask_dir)
+    # Texel centres plus SPREAD texels each side, so every stored distance
+    # that survives the clip is exact
+    n = TILE_TEXELS + 2 * SPREAD
+    k = float(1 << level)
+    cols = ((tx * TILE - 1 - SPREAD + np.arange(n) + 0.5) / k - x0) / pitch_x - 0.5
+    rows = ((ty * TILE - 1 - SPREAD + np.arange(n) + 0.5) / k - y0) / pitch_y - 0.5
+    h, w = values.shape
+    r0, r1 = max(0, int(np.floor(rows[0]))), min(h, int(np.floor(rows[-1])) + 2)
+    c0, c1 = max(0, int(np.floor(cols[0]))), min(w, int(np.floor(cols[-1])) + 2)
+    if r1 <= r0 or c1 <= c0:
+        return TILE_OUTSIDE
+    # Most tiles are nowhere near an edge: the coverage under them settles it
+    under = values[r0:r1, c0:c1]
+    if under.max() <= 128.0:
+        return TILE_OUTSIDE
+    within = rows[0] >= 0.0 and cols[0] >= 0.0 and rows[-1] <= h - 1.0 and cols[-1] <= w - 1.0
+    if within and under.min() > 128.0:
+        return TILE_INSIDE
+
+    grid = np.meshgrid(rows, cols, indexing='ij')
+    inside = scipy.ndimage.map_coordinates(values, grid, order=1, mode='grid-constant', cval=0.0) > 128.0
+    if not inside.any():
+        return TILE_OUTSIDE
+    if inside.all():
+        return TILE_INSIDE
+    sdf = scipy.ndimage.distance_transform_edt(inside) - scipy.ndimage.distance_transform_edt(~inside)
+    tile = np.clip(sdf[SPREAD:-SPREAD, SPREAD:-SPREAD] * 4 + 128, 0, 255).astype(np.uint8)
+    if not tile.any():
+        return TILE_OUTSIDE
+    if (tile == 255).all():
+        return TILE_INSIDE
+    return tile.tobytes()
+
+
+def _generate_tile(key, font_size, font, mask_dir):
+    return tile_sdf(*key, font_size=font_size, font=font, mask_dir=mask_dir)
+
+
+class TileCache:
+    # Builds tiles, keyed (source, level, tx, ty), in a background process and
+    # keeps finished ones in a bounded LRU: bytes, or a TILE_OUTSIDE /
+    # TILE_INSIDE marker. Same request()/get() shape as SdfCache. At most
+    # max_pending tiles are queued, and retain() cancels queued tiles the view
+    # has moved away from before a worker starts them. A tile that fails to
+    # build is cached as TILE_OUTSIDE (it is retried once the LRU drops it),
+    # and the failure is logged once per source; tiles lost to a dying worker
+    # are not cached and go again on the next request.
+
+    def __init__(self, capacity=384, workers=1, max_pending=24, font_size=150, font=DEFAULT_FONT,
+                 mask_dir=DEFAULT_MASK_DIR, profiler=None):
+        self.capacity = capacity
+        self.workers = workers
+        self.max_pending = max_pending
+        self.font_size = font_size
+        self.font = font
+        self.mask_dir = mask_dir
+        self.profiler = profiler # engine.profiler.Profiler: request-to-ready time as 'sdf.tile'
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._pending = {}
+        self._failed = set() # Sources with a tile that failed to build
+        self._pool = None
+
+    def request(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return # Asked for again next frame
+            future = submit_restarting(self, _generate_tile, key, self.font_size, self.font, self.mask_dir)
+            self._pending[key] = future
+        t0 = time.perf_counter()
+        future.add_done_callback(lambda f, k=key, t0=t0: self._finish(k, f, t0))
+
+    def _finish(self, key, future, t0):
+        if future.cancelled():
+            with self._lock:
+                self._pending.pop(key, None)
+            return
+        if self.profiler is not None:
+            self.profiler.record('sdf.tile', (time.perf_counter() - t0) * 1000.0)
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            # A worker died, not the tile: the view asks for it again next frame
+            with self._lock:
+                self._pending.pop(key, None)
+            return
+        except Exception as e:
+            if key[0] not in self._failed:
+                print(f"SDF Pyramid: tile {key[1:]} of {key[0]!r} failed: {e}")
+            self._failed.add(key[0])
+            result = TILE_OUTSIDE
+        with self._lock:
+            self._pending.pop(key, None)
+            self._lru[key] = result
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            result = self._lru.get(key)
+            if result is not None:
+                self._lru.move_to_end(key)
+            return result
+
+    def retain(self, keys):
+        # Cancel queued tiles outside keys (cancel() runs _finish, so not under the lock)
+        with self._lock:
+            stale = [f for k, f in self._pending.items() if k not in keys]
+        for future in stale:
+            future.cancel()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# --- GPU Atlas ---
+
+class TileAtlas:
+    # Resident tiles in one R8 texture array, plus the page table fractal.glsl
+    # reads: PAGE_ROWS rows per injection slot, one (layer or marker, levels
+    # up) texel per tile of the slot's window. A cell whose tile is not
+    # resident yet points at the finest resident tile above it, or is
+    # TILE_MISSING and falls through to the base layer. Layers are recycled
+    # least recently drawn first, never while this frame's pages use them.
+
+    def __init__(self, ctx, tiles, slots, layers=128, uploads_per_frame=8):
+        self.ctx = ctx
+        self.tiles = tiles # TileCache, anything with its request()/get()/retain(), or None
+        self.texture = ctx.texture_array((TILE_TEXELS, TILE_TEXELS, layers), 1)
+        self.pages = ctx.texture((PAGE_COLS, PAGE_ROWS * slots), 2, dtype='i4')
+        self.pages.filter = (ctx.NEAREST, ctx.NEAREST)
+        self.table = np.zeros((PAGE_ROWS * slots, PAGE_COLS, 2), dtype=np.int32)
+        self.table[..., 0] = TILE_MISSING
+        self.uploaded = None
+        self.resident = {} # tile key -> layer
+        self.last_used = [0] * layers
+        self.free = list(range(layers))
+        self.uploads_per_frame = uploads_per_frame
+        self.frame = 0
+        self.in_use = set()
+        self.wanted = set()
+        self.uploads = 0
+        self.misses = 0 # Window cells drawn from a coarser level or the base layer this frame
+
+    def begin(self):
+        self.frame += 1
+        self.in_use = set()
+        self.wanted = set()
+        self.uploads = 0
+        self.misses = 0
+        self.table[..., 0] = TILE_MISSING
+        self.table[..., 1] = 0
+
+    def _allocate(self):
+        if self.free:
+            return self.free.pop()
+        candidates = [(self.last_used[l], k) for k, l in self.resident.items() if l not in self.in_use]
+        if not candidates:
+            return None
+        _, old_key = min(candidates)
+        return self.resident.pop(old_key)
+
+    def _entry(self, key):
+        # Atlas layer or marker for a tile, uploading it if the cache has it; None if not available
+        layer = self.resident.get(key)
+        if layer is not None:
+            self.last_used[layer] = self.frame
+            self.in_use.add(layer)
+            return layer
+        data = self.tiles.get(key)
+        if data is None or isinstance(data, int):
+            return data
+        if self.uploads >= self.uploads_per_frame:
+            return None # Spread uploads over frames
+        layer = self._allocate()
+        if layer is None:
+            return None
+        self.texture.write(data, viewport=(0, 0, layer, TILE_TEXELS, TILE_TEXELS, 1))
+        self.uploads += 1
+        self.resident[key] = layer
+        self.last_used[layer] = self.frame
+        self.in_use.add(layer)
+        return layer
+
+    def page(self, slot, source, x, y, scale, center, zoom, size):
+        # Fills the slot's page table for this frame and requests the tiles it
+        # is missing, middle of the view first. Returns the (level, tx0, ty0,
+        # corner_x, corner_y) fractal.glsl needs for the slot.
+        if self.tiles is None:
+            return 0, 0, 0, 0.0, 0.0 # Base layers only
+        level, tx0, ty0, tx1, ty1 = page_window(x, y, scale, center, zoom, *size)
+        if level == 0:
+            return 0, 0, 0, 0.0, 0.0
+        rows = self.table[slot * PAGE_ROWS:(slot + 1) * PAGE_ROWS]
+        mid_x, mid_y = (tx0 + tx1 - 1) / 2.0, (ty0 + ty1 - 1) / 2.0
+        cells = sorted(((tx, ty) for ty in range(ty0, ty1) for tx in range(tx0, tx1)),
+                       key=lambda t: (t[0] - mid_x) ** 2 + (t[1] - mid_y) ** 2)
+        for tx, ty in cells:
+            key = (source, level, tx, ty)
+            self.wanted.add(key)
+            self.tiles.request(key)
+            for up in range(level):
+                entry = self._entry((source, level - up, tx >> up, ty >> up))
+                if entry is not None:
+                    rows[ty - ty0, tx - tx0] = (entry, up)
+                    break
+            if up > 0 or entry is None:
+                self.misses += 1
+        return (level, tx0, ty0) + window_corner(x, y, scale, center, level, tx0, ty0)
+
+    def end(self):
+        if self.tiles is not None:
+            self.tiles.retain(self.wanted)
+        if self.uploaded is None or not np.array_equal(self.table, self.uploaded):
+            self.pages.write(self.table.tobytes())
+            self.uploaded = self.table.copy()
+
+    def attach(self, program):
+        program['sdf_pages'].value = PAGES_LOCATION
+        program['sdf_tiles'].value = TILES_LOCATION
+
+    def use(self):
+        self.pages.use(location=PAGES_LOCATION)
+        self.texture.use(location=TILES_LOCATION)
+
+    def release(self):
+        self.texture.release()
+        self.pages.release()
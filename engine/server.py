@@ -0,0 +1,496 @@
+import json
+import math
+import time
+import socket
+import struct
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+
+from engine.state import FractalState
+from engine.capture import FORMATS, encode
+from engine.cpu_renderer import _render_tile_task, frame_uniforms
+from engine.injections import prune_injections
+from engine.precision import advance_view
+from engine.sdf_cache import DEFAULT_CACHE_DIR, submit_restarting
+from engine.shared_state import SHARED_FIELDS
+
+# Headless render server: N independent sessions (kiosks, remote viewers) on
+# one box, each with its own FractalState and frame size, none with a window.
+# The scheduler thread steps every session's view on its own frame clock and
+# hands due frames, earliest deadline first, to worker processes; each worker
+# owns one headless GL context (engine/export.py's GlTileRenderer, or the NumPy
+# renderer) whose compiled programs, SDFs and pyramid tiles serve every session
+# it is given, with text SDFs coming through the on-disk SDF cache and glyph
+# atlas that all processes share. A session has at most one frame in flight,
+# so its frames arrive in order; a session the workers cannot keep up with
+# skips frames on its clock instead of queueing them.
+#
+# Encoded frames stream over TCP on localhost. A client sends one JSON line,
+# {"session": id}, then reads frames: a FRAME_HEADER followed by `length`
+# bytes of the session's format (engine/capture.py). A slow client gets the
+# newest frame when it is ready for one, never a backlog. Further lines
+# {"publish": {field: value}} set SHARED_FIELDS on the session's state; a
+# field of the wrong type is reported and dropped, the rest still apply.
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 7620
+FRAME_MAGIC = b'FMFR'
+# magic, session id, frame index, width, height, format (index in FORMATS), payload length
+FRAME_HEADER = struct.Struct('<4sIIHHB3xI')
+FPS_WINDOW = 2.0 # Seconds of delivered frames behind a session's fps
+BACKENDS = ('gl', 'cpu')
+POSITIVE_FIELDS = ('zoom', 'max_iter', 'frame_budget_ms') # A client may not set these to zero or below
+
+
+# --- Sessions ---
+
+class RenderSession:
+    # One viewer's state, frame clock and delivery counters. The scheduler
+    # thread calls step(); the rest is safe to read from any thread.
+
+    def __init__(self, session_id, width, height, fps=30.0, format='JPEG', quality=80, state=None):
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}, not {format!r}")
+        if not fps > 0:
+            raise ValueError(f"fps must be positive, not {fps!r}")
+        self.id = session_id
+        self.state = state if state is not None else FractalState()
+        self.width, self.height = width, height
+        self.fps_target = fps
+        self.interval = 1.0 / fps
+        self.format, self.quality = format, quality
+        self.next_due = None # Scheduler clock (perf_counter) of the next frame
+        self.last_step = None
+        self.frame_index = 0
+        self.in_flight = False
+        self.delivered = 0
+        self.dropped = 0 # Frame slots skipped because the previous frame was still rendering
+        self.render_ms = 0.0 # Smoothed worker time per frame, render and encode
+        self.latest = None # (index, payload) of the newest frame
+        self._times = deque(maxlen=1024)
+        self._lock = threading.Lock()
+
+    def step(self, now):
+        # Advance the view to `now` and return the uniforms of the frame to render
+        state = self.state
+        if state.shared is not None:
+            state.shared.pull()
+        state.tweens.step(time.perf_counter())
+        snap = state.snapshot()
+        frame_time = 0.0 if self.last_step is None else now - self.last_step
+        self.last_step = now
+
+        # Same anchor as FractalRenderer.on_render: the gaze point, or the centre
+        target = (0.0, 0.0)
+        if snap.use_eye_tracker:
+            short = min(self.width, self.height)
+            target = ((snap.gaze_x - 0.5) * self.width / short, (0.5 - snap.gaze_y) * self.height / short)
+        advance_view(state, snap.zoom, snap.zoom_speed, frame_time, target)
+        prune_injections(state, time.time())
+        return frame_uniforms(state, self.width, self.height)
+
+    def deliver(self, index, payload, render_ms, now):
+        with self._lock:
+            self.latest = (index, payload)
+            self.delivered += 1
+            self.render_ms += 0.1 * (render_ms - self.render_ms) if self.delivered > 1 else render_ms
+            self._times.append(now)
+
+    def fps(self, now=None):
+        # Sustained frames per second over the last FPS_WINDOW seconds
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            times = [t for t in self._times if now - t <= FPS_WINDOW]
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / max(times[-1] - times[0], 1e-9)
+
+    def stats(self, now=None):
+        return {'session': self.id, 'fps': self.fps(now), 'target_fps': self.fps_target,
+                'delivered': self.delivered, 'dropped': self.dropped, 'render_ms': self.render_ms}
+
+
+# --- Rendering (worker processes) ---
+
+_renderer = None # This process's GlTileRenderer, shared by every session it renders
+
+
+def render_frame(backend, u, format='JPEG', quality=80, sdf_cache_dir=DEFAULT_CACHE_DIR):
+    # One whole frame, encoded; returns (payload, milliseconds)
+    t0 = time.perf_counter()
+    width, height = u['resolution']
+    if backend == 'gl':
+        global _renderer
+        if _renderer is None:
+            from engine.export import GlTileRenderer
+            _renderer = GlTileRenderer(sdf_cache_dir=sdf_cache_dir, use_atlas=True)
+        pixels = _renderer.render(u, 0, 0, width, height)
+    else:
+        pixels = _render_tile_task(u, 0, 0, width, height)[2]
+    # encode() takes GL rows, bottom row first
+    payload = encode(np.ascontiguousarray(pixels[::-1]), width, height, format, quality)
+    return payload, (time.perf_counter() - t0) * 1000.0
+
+
+def _render_frame_task(backend, session_id, index, u, format, quality, sdf_cache_dir):
+    return (session_id, index) + render_frame(backend, u, format, quality, sdf_cache_dir)
+
+
+# --- Streaming ---
+
+def _read_exact(stream, n):
+    data = stream.read(n)
+    return data if data is not None and len(data) == n else None
+
+
+class _Client:
+    # One connected viewer. The writer thread sends whatever frame is in the
+    # slot; a newer frame replaces one it has not sent yet.
+
+    def __init__(self, conn, session):
+        self.conn = conn
+        self.session = session
+        self.closed = False
+        self._slot = None
+        self._cond = threading.Condition()
+        threading.Thread(target=self._write, daemon=True).start()
+
+    def offer(self, index, payload):
+        with self._cond:
+            self._slot = (index, payload)
+            self._cond.notify()
+
+    def _write(self):
+        s = self.session
+        code = FORMATS.index(s.format)
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._slot is not None or self.closed)
+                if self.closed:
+                    return
+                (index, payload), self._slot = self._slot, None
+            try:
+                self.conn.sendall(FRAME_HEADER.pack(FRAME_MAGIC, s.id, index, s.width, s.height, code, len(payload)))
+                self.conn.sendall(payload)
+            except OSError:
+                self.close()
+                return
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+
+class FrameClient:
+    # Connects to a RenderServer and reads one session's frames
+    #   with FrameClient(0) as client:
+    #       index, width, height, format, payload = client.receive()
+
+    def __init__(self, session_id, host=SERVER_HOST, port=SERVER_PORT, timeout=10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self._stream = self.sock.makefile('rb')
+        self._send({'session': session_id})
+
+    def _send(self, message):
+        self.sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+    def receive(self):
+        # (index, width, height, format, payload), or None once the server closes
+        header = _read_exact(self._stream, FRAME_HEADER.size)
+        if header is None:
+            return None
+        magic, _, index, width, height, code, length = FRAME_HEADER.unpack(header)
+        if magic != FRAME_MAGIC:
+            raise ValueError("not a frame stream")
+        payload = _read_exact(self._stream, length)
+        if payload is None:
+            return None
+        return index, width, height, FORMATS[code], payload
+
+    def publish(self, **fields):
+        self._send({'publish': fields})
+
+    def close(self):
+        try:
+            self._stream.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Server ---
+
+def _field_value(kind, value):
+    # A JSON value as a bool, int or float field; ValueError for anything else
+    if kind is bool:
+        if not isinstance(value, (bool, int)):
+            raise ValueError(f"expected a bool, not {value!r}")
+        return bool(value)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"expected a number, not {value!r}")
+    if not math.isfinite(value):
+        raise ValueError(f"expected a finite number, not {value!r}")
+    return int(value) if kind is int else float(value)
+
+
+class RenderServer:
+    # Hosts the sessions, schedules their frames across `workers` processes
+    # and streams them to clients. workers=1 renders in the scheduler thread,
+    # as Exporter does. port=None serves no sockets; port=0 picks a free one.
+
+    def __init__(self, workers=None, backend='gl', host=SERVER_HOST, port=SERVER_PORT,
+                 sdf_cache_dir=DEFAULT_CACHE_DIR):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, not {backend!r}")
+        self.workers = workers or multiprocessing.cpu_count() or 1
+        self.backend = backend
+        self.sdf_cache_dir = sdf_cache_dir
+        self.max_in_flight = 2 * self.workers # Enough to keep every worker busy
+        self.sessions = {}
+        self._clients = {} # session id -> [_Client]
+        self._pending = {} # future -> session id
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pool = None
+        self._running = False
+        self._thread = None
+        self._listener = None
+        self.host, self.port = host, port
+        if port is not None:
+            self._listener = socket.create_server((host, port))
+            self.port = self._listener.getsockname()[1]
+            threading.Thread(target=self._accept, daemon=True).start()
+
+    def add_session(self, width, height, fps=30.0, format='JPEG', quality=80, state=None):
+        with self._lock:
+            session = RenderSession(self._next_id, width, height, fps, format, quality, state)
+            self._next_id += 1
+            self.sessions[session.id] = session
+            self._clients[session.id] = []
+        print(f"Server: session {session.id} ({width}x{height} at {fps:g} fps, {format})")
+        return session
+
+    def remove_session(self, session_id):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+            clients = self._clients.pop(session_id, [])
+        for client in clients:
+            client.close()
+
+    def stats(self):
+        now = time.perf_counter()
+        with self._lock:
+            sessions = list(self.sessions.values())
+            counts = {sid: len(clients) for sid, clients in self._clients.items()}
+        return [dict(s.stats(now), clients=counts.get(s.id, 0)) for s in sessions]
+
+    # --- Scheduling ---
+
+    def _due(self, now):
+        # Sessions whose frame is due, earliest deadline first. A session that
+        # missed frame slots skips them, staying on its own frame clock.
+        with self._lock:
+            sessions = list(self.sessions.values())
+        due = []
+        for s in sessions:
+            if s.next_due is None:
+                s.next_due = now
+            if s.in_flight or s.next_due > now:
+                continue
+            missed = int((now - s.next_due) / s.interval)
+            if missed:
+                s.dropped += missed
+                s.next_due += missed * s.interval
+            due.append(s)
+        due.sort(key=lambda s: s.next_due)
+        return due
+
+    def _deliver(self, session_id, index, payload, render_ms):
+        with self._lock:
+            session = self.sessions.get(session_id)
+            clients = list(self._clients.get(session_id, ()))
+        if session is None:
+            return
+        session.in_flight = False
+        session.deliver(index, payload, render_ms, time.perf_counter())
+        for client in clients:
+            if client.closed:
+                with self._lock:
+                    if client in self._clients.get(session_id, ()):
+                        self._clients[session_id].remove(client)
+            else:
+                client.offer(index, payload)
+
+    def _fail(self, session_id, error):
+        # The session's next frame can go out as if this one had been delivered
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session is not None:
+            session.in_flight = False
+        print(f"Server: session {session_id}: frame failed: {error}")
+
+    def _collect(self, futures):
+        for future in futures:
+            session_id = self._pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                self._fail(session_id, e)
+                continue
+            self._deliver(*result)
+
+    def tick(self, now=None):
+        # Start every due frame there is room for; returns the number started
+        now = time.perf_counter() if now is None else now
+        self._collect([f for f in list(self._pending) if f.done()])
+        started = 0
+        for s in self._due(now):
+            if len(self._pending) >= self.max_in_flight:
+                break
+            u = s.step(now)
+            index = s.frame_index
+            s.frame_index += 1
+            s.next_due += s.interval
+            s.in_flight = True
+            try:
+                if self.workers == 1:
+                    payload, ms = render_frame(self.backend, u, s.format, s.quality, self.sdf_cache_dir)
+                    self._deliver(s.id, index, payload, ms)
+                else:
+                    # spawn workers, each with its own GL context; a broken pool is restarted
+                    future = submit_restarting(self, _render_frame_task, self.backend, s.id, index, u,
+                                               s.format, s.quality, self.sdf_cache_dir)
+                    self._pending[future] = s.id
+            except Exception as e:
+                self._fail(s.id, e)
+                continue
+            started += 1
+        return started
+
+    def _wait(self, now):
+        # Until a frame finishes or the next one is due
+        with self._lock:
+            due = [s.next_due for s in self.sessions.values() if not s.in_flight and s.next_due is not None]
+        timeout = max(0.0, min(due) - now) if due else 0.05
+        if self._pending:
+            finished, _ = wait(list(self._pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            self._collect(finished)
+        elif timeout > 0.0:
+            time.sleep(min(timeout, 0.05))
+
+    def run(self, duration=None):
+        # Schedule frames until stop() (or `duration` seconds)
+        self._running = True
+        end = None if duration is None else time.perf_counter() + duration
+        while self._running and (end is None or time.perf_counter() < end):
+            self.tick()
+            self._wait(time.perf_counter())
+        self._collect(list(self._pending)) # Let the frames in flight land
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        with self._lock:
+            clients = [c for cs in self._clients.values() for c in cs]
+        for client in clients:
+            client.close()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Sockets ---
+
+    def _accept(self):
+        while self._listener is not None:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        # Handshake, then control messages until the client hangs up
+        stream = conn.makefile('rb')
+        client = None
+        try:
+            hello = json.loads(stream.readline() or b"{}")
+            session_id = hello.get('session') if isinstance(hello, dict) else None
+            with self._lock:
+                session = self.sessions.get(session_id) if isinstance(session_id, int) else None
+                if session is not None:
+                    client = _Client(conn, session)
+                    self._clients[session.id].append(client)
+            if client is None:
+                print(f"Server: no session {session_id!r}, closing connection")
+                return
+            for line in stream:
+                # A bad message is reported and skipped; the connection stays up
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError(f"expected a JSON object, not {message!r}")
+                    self._publish(session, message.get('publish') or {})
+                except ValueError as e:
+                    print(f"Server: session {session.id}: bad message: {e}")
+        except (OSError, ValueError) as e:
+            if client is None or not client.closed: # Not our own close()
+                print(f"Server: client dropped: {e}")
+        finally:
+            if client is not None:
+                client.close()
+            else:
+                conn.close()
+
+    def _publish(self, session, fields):
+        # Only the scalar fields a shared state carries, with the type they
+        # have; anything else is reported and dropped
+        if not isinstance(fields, dict):
+            raise ValueError(f"publish expects an object, not {fields!r}")
+        snap = session.state.snapshot()
+        values = {}
+        for name, value in fields.items():
+            try:
+                if name not in SHARED_FIELDS:
+                    raise ValueError("not a published field")
+                value = _field_value(type(getattr(snap, name)), value)
+                if name in POSITIVE_FIELDS and value <= 0:
+                    raise ValueError(f"must be positive, not {value!r}")
+                values[name] = value
+            except ValueError as e:
+                print(f"Server: session {session.id}: dropped {name!r}: {e}")
+        if values:
+            session.state.publish(**values)
@@ -0,0 +1,318 @@
+import os
+import sys
+import time
+import zlib
+import struct
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+from engine.state import StateSnapshot
+
+# FractalState's scalar fields in a fixed-layout shared memory block, so
+# control panels, controllers and analytics can run as separate processes
+# (each with its own GIL) instead of as threads competing with on_render.
+#
+# share_state(state) creates the block and mirrors every publish() of a
+# shared field into it. Other processes get a RemoteState (start_state_process
+# hands one to its target) that reads and publishes fields straight in the
+# block, no pipes or pickling. The renderer calls state.shared.pull() once a
+# frame, which costs one integer read when nothing changed, and publishes
+# fields written by other processes into the local FractalState.
+#
+# Writers (one process at a time, under a multiprocessing lock) make the
+# sequence number odd, store values and bump per-field versions, then make it
+# even again; readers copy the block without locking and retry if the number
+# was odd or moved meanwhile (a seqlock). This relies on stores becoming
+# visible in program order, as on x86; elsewhere readers should take the lock.
+# Objects (injections, ring buffers, hrv) stay in the render process.
+
+# Scalars, stored as float64 and converted back with the type the field had
+# in the creating state (as the recorder does)
+SHARED_FIELDS = (
+    'offset_x', 'offset_y', 'offset_x_lo', 'offset_y_lo', 'zoom', 'zoom_speed', 'max_iter', 'power',
+    'color_r', 'color_g', 'color_b', 'pulse_speed', 'governor_enabled', 'frame_budget_ms', 'reproject', 'foveated', 'fovea_radius',
+    'fovea_falloff', 'time_started',
+    'use_eye_tracker', 'gaze_x', 'gaze_y', 'gaze_vx', 'gaze_vy', 'gaze_t', 'gaze_prediction', 'current_hr',
+    'capture_interval', 'inject_lifetime', 'deep_zoom', 'deep_zoom_active',
+)
+# Strings, truncated to TEXT_BYTES of UTF-8
+TEXT_FIELDS = ('polar_status', 'llm_status', 'inject_text')
+TEXT_BYTES = 64
+
+# Header: int64 layout checksum, int64 sequence number. The rest is copied
+# whole by readers: int64 block version (bumped per write), float64 values,
+# int64 per-field versions (scalars then texts), texts.
+_SEQ = 1
+_VERSION = 2
+_VALUES = 3 # In 8-byte words
+SPINS = 100 # Retries before a reader starts yielding to the writer
+
+
+def _data_format(fields, texts):
+    return struct.Struct(f"<q{len(fields)}d{len(fields) + len(texts)}q" + f"{TEXT_BYTES}s" * len(texts))
+
+
+def _checksum(fields, texts, types):
+    return zlib.crc32(",".join(fields + texts + types).encode()) & 0x7fffffffffffffff
+
+
+def _attach(name):
+    # Python < 3.13 registers an attached segment with this process's resource
+    # tracker, which unlinks it when the process exits: only the creator may
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def _convert(value, kind):
+    return bool(value) if kind == 'bool' else int(value) if kind == 'int' else float(value)
+
+
+class SharedStateBlock:
+    # The block itself, used by both sides. handle() is what crosses to a
+    # child process (as a Process argument: the lock only pickles there).
+
+    def __init__(self, shm, lock, types, fields=SHARED_FIELDS, texts=TEXT_FIELDS, owner=False):
+        self.shm = shm
+        self.lock = lock
+        self.fields = tuple(fields)
+        self.texts = tuple(texts)
+        self.types = tuple(types)
+        self.owner = owner
+        self.names = self.fields + self.texts
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        n, m = len(self.fields), len(self.texts)
+        self.format = _data_format(self.fields, self.texts)
+        self.size = 16 + self.format.size
+        # Word views over the header, values and versions (the mapping is page
+        # aligned); item access on these is far cheaper than numpy scalars
+        words = _VALUES + n + n + m
+        self.ints = shm.buf[:8 * words].cast('q')
+        self.floats = shm.buf[:8 * words].cast('d')
+        self.versions_at = _VALUES + n
+        self.texts_at = 8 * words
+        self.retries = 0 # Reads that found a write in progress
+
+    @classmethod
+    def create(cls, state, fields=SHARED_FIELDS, texts=TEXT_FIELDS):
+        types = tuple(type(getattr(state, f)).__name__ for f in fields)
+        size = 16 + _data_format(fields, texts).size
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        block = cls(shm, multiprocessing.get_context('spawn').Lock(), types, fields, texts, owner=True)
+        block.ints[0] = _checksum(block.fields, block.texts, block.types)
+        block.write({name: getattr(state, name) for name in block.names})
+        return block
+
+    @classmethod
+    def attach(cls, handle):
+        name, lock, types, fields, texts = handle
+        block = cls(_attach(name), lock, types, fields, texts)
+        if block.ints[0] != _checksum(block.fields, block.texts, block.types):
+            block.close()
+            raise ValueError(f"shared state {name} has a different layout")
+        return block
+
+    def handle(self):
+        return (self.shm.name, self.lock, self.types, self.fields, self.texts)
+
+    # --- Writing ---
+
+    def write(self, fields):
+        # Stores the known fields among `fields`; returns [(id, new version)]
+        ids = self.ids
+        items = [(ids[name], value) for name, value in fields.items() if name in ids]
+        if not items:
+            return items
+        n = len(self.fields)
+        ints, floats, versions_at = self.ints, self.floats, self.versions_at
+        out = []
+        with self.lock:
+            ints[_SEQ] += 1 # Odd: write in progress
+            for i, value in items:
+                if i < n:
+                    floats[_VALUES + i] = float(value)
+                else:
+                    at = self.texts_at + TEXT_BYTES * (i - n)
+                    self.shm.buf[at:at + TEXT_BYTES] = str(value).encode('utf-8')[:TEXT_BYTES].ljust(TEXT_BYTES, b'\0')
+                version = ints[versions_at + i] + 1
+                ints[versions_at + i] = version
+                out.append((i, version))
+            ints[_VERSION] += 1
+            ints[_SEQ] += 1
+        return out
+
+    # --- Reading ---
+
+    def version(self):
+        # Bumped by every write; compare before paying for read()
+        return self.ints[_VERSION]
+
+    def read(self):
+        # One consistent copy: (version, values, versions, texts) as tuples
+        ints, buf = self.ints, self.shm.buf
+        attempt = 0
+        while True:
+            before = ints[_SEQ]
+            if not before & 1:
+                data = bytes(buf[16:self.size])
+                if ints[_SEQ] == before:
+                    break
+            attempt += 1
+            self.retries += 1
+            if attempt > SPINS:
+                time.sleep(0)
+        row = self.format.unpack(data)
+        n, m = len(self.fields), len(self.texts)
+        return row[0], row[1:1 + n], row[1 + n:1 + 2 * n + m], row[1 + 2 * n + m:]
+
+    def value(self, i, values, texts):
+        # Field i of a read(), as the type it has in the state
+        n = len(self.fields)
+        if i < n:
+            return _convert(values[i], self.types[i])
+        return texts[i - n].rstrip(b'\0').decode('utf-8', errors='replace')
+
+    def close(self):
+        # The views must go before the mapping
+        self.ints.release()
+        self.floats.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# --- Render Process ---
+
+class StateSharer:
+    # Kept on the FractalState as state.shared by share_state()
+
+    def __init__(self, state, block):
+        self.state = state
+        self.block = block
+        self.last_version, _, versions, _ = block.read()
+        self.seen = list(versions) # Versions the local state already has
+        self.pulling = False
+        self.pulled = 0 # Fields published from other processes
+
+    def on_publish(self, fields):
+        # Called by FractalState.publish() under the state lock
+        if self.pulling:
+            return
+        for i, version in self.block.write(fields):
+            self.seen[i] = version
+
+    def pull(self):
+        # Publishes fields other processes wrote since the last pull; returns
+        # the new snapshot, or None when there was nothing
+        block = self.block
+        if block.version() == self.last_version:
+            return None
+        version, values, versions, texts = block.read()
+        seen = self.seen
+        changed = [i for i, v in enumerate(versions) if v != seen[i]]
+        self.last_version = version
+        if not changed:
+            return None
+        fields = {block.names[i]: block.value(i, values, texts) for i in changed}
+        with self.state.lock:
+            for i in changed:
+                seen[i] = versions[i]
+            self.pulling = True
+            try:
+                snap = self.state.publish(**fields)
+            finally:
+                self.pulling = False
+        self.pulled += len(fields)
+        return snap
+
+    def handle(self):
+        return self.block.handle()
+
+    def close(self):
+        self.block.close()
+
+
+def share_state(state, fields=SHARED_FIELDS, texts=TEXT_FIELDS):
+    if state.shared is None:
+        with state.lock:
+            object.__setattr__(state, 'shared', StateSharer(state, SharedStateBlock.create(state, fields, texts)))
+    return state.shared
+
+
+def unshare_state(state):
+    sharer = state.shared
+    if sharer is not None:
+        object.__setattr__(state, 'shared', None)
+        sharer.close()
+
+
+# --- Other Processes ---
+
+class RemoteState:
+    # FractalState's scalar fields from another process. Reads and writes go
+    # to the block: state.zoom, state.publish(power=3.0), state.power = 3.0,
+    # and state['power'] for code written against a dict (engine/gui.py).
+
+    def __init__(self, handle):
+        object.__setattr__(self, 'block', SharedStateBlock.attach(handle))
+        object.__setattr__(self, '_snapshot', None)
+
+    def snapshot(self):
+        # A StateSnapshot of the shared fields, re-read only after a write
+        snap = self._snapshot
+        block = self.block
+        if snap is None or snap.version != block.version():
+            version, values, versions, texts = block.read()
+            snap = StateSnapshot({name: block.value(i, values, texts) for i, name in enumerate(block.names)},
+                                 version, dict(zip(block.names, versions)))
+            object.__setattr__(self, '_snapshot', snap)
+        return snap
+
+    def publish(self, **fields):
+        unknown = set(fields) - set(self.block.ids)
+        if unknown:
+            raise AttributeError(f"not shared: {', '.join(sorted(unknown))}")
+        self.block.write(fields)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.snapshot(), name)
+
+    def __setattr__(self, name, value):
+        self.publish(**{name: value})
+
+    def __getitem__(self, name):
+        return getattr(self.snapshot(), name)
+
+    def __setitem__(self, name, value):
+        self.publish(**{name: value})
+
+    def close(self):
+        self.block.close()
+
+
+def _process_main(handle, target, args, niceness):
+    if niceness:
+        os.nice(niceness)
+    remote = RemoteState(handle)
+    try:
+        target(remote, *args)
+    finally:
+        remote.close()
+
+
+def start_state_process(state, target, *args, niceness=0, name=None):
+    # Runs target(remote_state, *args) in a new (spawned, daemon) process; the
+    # state is shared first if it is not already. target must be importable.
+    sharer = share_state(state)
+    process = multiprocessing.get_context('spawn').Process(
+        target=_process_main, args=(sharer.handle(), target, args, niceness), name=name, daemon=True)
+    process.start()
+    return process
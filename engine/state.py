@@ -1,36 +1,150 @@
 import time
 import threading
 
+from biometrics.ring_buffer import TimedRingBuffer
+from engine.tweens import TweenScheduler
+from engine.capture import CaptureQueue
+from engine.profiler import Profiler
+
+RR_CAPACITY = 16384 # ~4 hours of beats at 70 bpm
+GAZE_CAPACITY = 4096 # ~45 s of samples at 90 Hz
+ECG_CAPACITY = 8192 # ~60 s at 130 Hz
+ACC_CAPACITY = 8192 # ~40 s at 200 Hz (H10), ~150 s at 52 Hz (Verity Sense)
+
+
+class StateSnapshot:
+    # Immutable view of every FractalState field at one publish. Reads are plain
+    # attribute lookups, so a snapshot can stand in for the state anywhere that
+    # only reads it (the renderer, injection culling, the CPU renderer).
+    __slots__ = ('_values', 'version', 'versions')
+
+    def __init__(self, values, version, versions):
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, 'version', version) # Bumped on every publish
+        object.__setattr__(self, 'versions', versions) # field -> publish count
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StateSnapshot is read-only; use FractalState.publish()")
+
+    def changed(self, other, *fields):
+        # True if any of fields was published between other and self
+        if other is None:
+            return True
+        return any(self.versions.get(f, 0) != other.versions.get(f, 0) for f in fields)
+
+
 class FractalState:
+    # Writers update one or more fields atomically with publish(); the renderer
+    # calls snapshot() once per frame and reads that consistent, immutable view
+    # without ever taking the lock. Plain `state.field = value` still works and
+    # publishes that single field.
+
     def __init__(self):
-        # Navigation & Zoom
+        object.__setattr__(self, 'lock', threading.RLock())
+        object.__setattr__(self, '_snapshot', StateSnapshot({}, 0, {}))
+        # engine.recorder.SessionRecorder while a session is being recorded;
+        # set it with state.recorder = ... (start_recording does)
+        object.__setattr__(self, 'recorder', None)
+        # Parameter glides (engine.tweens); advanced by the renderer every frame
+        object.__setattr__(self, 'tweens', TweenScheduler(self))
+        # Downsampled frames from engine.capture.FrameCapture, newest last
+        object.__setattr__(self, 'captures', CaptureQueue())
+        # Frame-time histograms (engine.profiler), fed by the renderer and sensor threads
+        object.__setattr__(self, 'profiler', Profiler())
+        # engine.shared_state.StateSharer once the scalar fields are shared with
+        # other processes (share_state); the renderer pulls their writes each frame
+        object.__setattr__(self, 'shared', None)
+
+        # Navigation & Zoom. The view centre is a double-double: offset_x +
+        # offset_x_lo (engine/precision.py). Publishing offset_x alone clears the tail.
         self.offset_x = -0.75
         self.offset_y = 0.0
+        self.offset_x_lo = 0.0
+        self.offset_y_lo = 0.0
         self.zoom = 1.0
         self.zoom_speed = 0.15
-        
+
         # Visuals & LLM Controls
-        self.max_iter = 150 
-        self.power = 2.0         
-        self.color_r = 0.0       
-        self.color_g = 0.1       
-        self.color_b = 0.2       
+        self.max_iter = 150
+        self.power = 2.0
+        self.color_r = 0.0
+        self.color_g = 0.1
+        self.color_b = 0.2
         self.pulse_speed = 0.2
-        
+
+        # --- Frame Governor ---
+        self.governor_enabled = True
+        self.frame_budget_ms = 16.0 # GPU time per frame to hold (60 fps = 16.7 ms)
+        self.reproject = False # Reuse last frame's iterations while zooming (engine/reprojection.py)
+        self.foveated = False # Full detail only around the fixation (engine/foveation.py)
+        self.fovea_radius = 0.15 # Fraction of the window height
+        self.fovea_falloff = 0.06 # Blend width at each layer's edge, same units
+
         self.time_started = time.time()
-        self.lock = threading.Lock()
-        
+
         # --- Biometrics ---
         self.use_eye_tracker = False # NEW: UI Toggle
-        self.gaze_x = 0.5 
-        self.gaze_y = 0.5 
+        self.gaze_x = 0.5 # One-Euro filtered, published by biometrics.gaze.GazePipeline
+        self.gaze_y = 0.5
+        self.gaze_vx = 0.0 # Screen widths/heights per second
+        self.gaze_vy = 0.0
+        self.gaze_t = 0.0 # time.perf_counter() of the sample behind gaze_x/y
+        self.gaze_prediction = True # Extrapolate gaze to the frame's presentation time
+        self.gaze_samples = TimedRingBuffer(GAZE_CAPACITY, width=2) # Raw (time, (x, y))
         self.current_hr = 0
-        self.rr_intervals = []
+        self.rr_intervals = TimedRingBuffer(RR_CAPACITY) # (time, RR ms); filled in place by polar_worker
+        self.polar_status = "off"
+        self.ecg_samples = TimedRingBuffer(ECG_CAPACITY) # (time, uV); filled a frame at a time by biometrics.pmd
+        self.acc_samples = TimedRingBuffer(ACC_CAPACITY, width=3) # (time, (x, y, z) mG)
+        self.hrv = {} # biometrics.hrv.HrvEngine.summary(), republished per beat by polar_worker
+
+        # --- AI Conductor ---
+        self.llm_status = "off" # Set by llm_logic.controller
+        self.capture_interval = 0.0 # Seconds between vision snapshots (state.captures), 0 = off
 
         # --- Injection Engine ---
         self.inject_text = "BREATHE"
-        self.inject_active = False
-        self.injection_needs_update = False
-        self.inject_x = 0.0
-        self.inject_y = 0.0
-        self.inject_scale = 1.0
\ No newline at end of file
+        self.inject_lifetime = 0.0 # Seconds for new injections, 0 = until cleared
+        self.injections = [] # engine.injections.Injection, replaced (not mutated) under lock
+
+        # --- Deep Zoom (Perturbation) ---
+        self.deep_zoom = False
+        self.deep_zoom_active = False # Set by the renderer once an orbit is on the GPU
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            self.publish(**{name: value})
+
+    def publish(self, **fields):
+        # Copy-on-write: build the next snapshot and swap it in with a single
+        # reference store, which readers pick up atomically. Returns it.
+        for name in ('offset_x', 'offset_y'):
+            if name in fields and name + '_lo' not in fields:
+                fields[name + '_lo'] = 0.0
+        with self.lock:
+            old = self._snapshot
+            values = dict(old._values)
+            versions = dict(old.versions)
+            for name, value in fields.items():
+                object.__setattr__(self, name, value)
+                values[name] = value
+                versions[name] = versions.get(name, 0) + 1
+            snap = StateSnapshot(values, old.version + 1, versions)
+            object.__setattr__(self, '_snapshot', snap)
+            if self.recorder is not None:
+                self.recorder.on_publish(fields)
+            if self.shared is not None:
+                self.shared.on_publish(fields)
+        return snap
+
+    def snapshot(self):
+        # Lock-free: the current snapshot is never mutated after it is published
+        return self._snapshot
@@ -0,0 +1,179 @@
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+# Parameter glides. Writers on any thread call tween(state, field, target,
+# duration) and the value eases there over the next frames instead of
+# snapping. Requests go through a deque (append/popleft are atomic, so
+# submitting never takes a lock or waits on the render thread); the renderer
+# calls state.tweens.step() at the top of each frame, which takes in pending
+# requests and advances every running tween at once with array operations,
+# publishing all of their values in one publish(). There is one slot per
+# tweenable field, so a new tween on a field replaces the running one, picking
+# up from wherever the field is now.
+
+# Scalar fields that can glide. The view (zoom, offsets) is integrated by the
+# renderer every frame and toggles have nothing in between, so neither can.
+TWEEN_FIELDS = (
+    'zoom_speed', 'max_iter', 'power', 'color_r', 'color_g', 'color_b', 'pulse_speed',
+    'frame_budget_ms', 'inject_lifetime',
+)
+INT_FIELDS = ('max_iter',) # Published rounded
+
+# Easings
+LINEAR = 0
+EASE_IN = 1 # Cubic
+EASE_OUT = 2
+EASE_IN_OUT = 3 # Smoothstep
+EASINGS = {'linear': LINEAR, 'ease_in': EASE_IN, 'ease_out': EASE_OUT, 'ease_in_out': EASE_IN_OUT}
+
+# Every easing is a cubic through (0, 0) and (1, 1): e = c1 u + c2 u^2 + c3 u^3
+EASE_COEFFS = np.array([
+    (1.0, 0.0, 0.0), # LINEAR
+    (0.0, 0.0, 1.0), # EASE_IN: u^3
+    (3.0, -3.0, 1.0), # EASE_OUT: 1 - (1 - u)^3
+    (0.0, 3.0, -2.0), # EASE_IN_OUT: 3u^2 - 2u^3
+])
+
+_CANCEL = math.nan # Target of a queued cancel
+
+
+def ease(u, easing):
+    # Eased progress for arrays of progress u in [0, 1] and easing codes
+    c = EASE_COEFFS[easing]
+    return ((c[:, 2] * u + c[:, 1]) * u + c[:, 0]) * u
+
+
+class TweenScheduler:
+    def __init__(self, state, fields=TWEEN_FIELDS):
+        self.state = state
+        self.fields = tuple(fields)
+        self.field_ids = {f: i for i, f in enumerate(self.fields)}
+        self.queue = deque()
+        # Running tweens, packed into [0, count); names mirrors field as a list
+        # so the published dict is built without a lookup per tween
+        size = len(self.fields)
+        self.field = np.zeros(size, dtype=np.intp)
+        self.names = []
+        self.origin = np.zeros(size)
+        self.target = np.zeros(size)
+        self.start = np.zeros(size)
+        self.rate = np.ones(size) # 1 / duration
+        # The easing's coefficients times (target - origin), so the value is
+        # origin + ((d3 u + d2) u + d1) u
+        self.d1 = np.zeros(size)
+        self.d2 = np.zeros(size)
+        self.d3 = np.zeros(size)
+        self.u = np.zeros(size) # Scratch
+        self.slot = np.full(size, -1, dtype=np.intp) # field id -> slot, -1 = idle
+        self.count = 0
+        self.next_end = math.inf # Earliest end of a running tween
+        self.finished = 0
+
+    def submit(self, field, target, duration=1.0, easing=EASE_IN_OUT):
+        # Any thread. Raises for fields that cannot glide, so the caller hears about it.
+        if field not in self.field_ids:
+            raise ValueError(f"'{field}' cannot be tweened (one of {', '.join(self.fields)})")
+        target = float(target)
+        if not math.isfinite(target):
+            raise ValueError(f"tween target for '{field}' must be finite, got {target}")
+        if isinstance(easing, str):
+            easing = EASINGS[easing]
+        self.queue.append((self.field_ids[field], target, max(float(duration), 0.0), easing))
+
+    def cancel(self, *fields):
+        # Stop gliding these fields where they are now (unknown names are ignored)
+        for field in fields:
+            i = self.field_ids.get(field)
+            if i is not None:
+                self.queue.append((i, _CANCEL, 0.0, LINEAR))
+
+    def active(self):
+        return list(self.names)
+
+    def _take_requests(self, now):
+        # Only what was queued when the frame started, and only the newest
+        # request per field: a flood of submits cannot stall the render thread
+        queue = self.queue
+        pending = {}
+        for _ in range(len(queue)):
+            request = queue.popleft()
+            pending[request[0]] = request
+        state = self.state
+        for i, target, duration, easing in pending.values():
+            k = self.slot[i]
+            if target != target: # Cancel
+                if k >= 0:
+                    self._remove(np.arange(self.count) == k)
+                continue
+            if k < 0:
+                k = self.count
+                self.count += 1
+                self.slot[i] = k
+                self.field[k] = i
+                self.names.append(self.fields[i])
+            origin = getattr(state, self.fields[i])
+            self.origin[k] = origin
+            self.target[k] = target
+            if duration > 0.0:
+                self.start[k] = now
+                self.rate[k] = 1.0 / duration
+            else:
+                self.start[k] = now - 1.0 # Already at the end: snaps this frame
+                self.rate[k] = 1.0
+            self.d1[k], self.d2[k], self.d3[k] = EASE_COEFFS[easing] * (target - origin)
+            self.next_end = min(self.next_end, now + duration)
+
+    def _remove(self, done):
+        # Drop the slots flagged in done (a mask over [0, count)) and repack
+        n = self.count
+        keep = ~done
+        m = int(keep.sum())
+        self.slot[self.field[:n][done]] = -1
+        for arr in (self.field, self.origin, self.target, self.start, self.rate, self.d1, self.d2, self.d3):
+            arr[:m] = arr[:n][keep]
+        self.count = m
+        self.slot[self.field[:m]] = np.arange(m)
+        self.names = [self.fields[i] for i in self.field[:m].tolist()]
+        self.next_end = float(np.min(self.start[:m] + 1.0 / self.rate[:m])) if m else math.inf
+
+    def step(self, now=None):
+        # Render thread, once per frame, with a clock that never goes back
+        # (tweens start at the `now` of the frame that takes them in, so
+        # progress is never negative). Returns the published values ({} if idle).
+        if now is None:
+            now = time.perf_counter()
+        if self.queue:
+            self._take_requests(now)
+        n = self.count
+        if n == 0:
+            return {}
+        u = self.u[:n]
+        np.subtract(now, self.start[:n], out=u)
+        u *= self.rate[:n]
+        np.minimum(u, 1.0, out=u)
+        e = self.d3[:n] * u
+        e += self.d2[:n]
+        e *= u
+        e += self.d1[:n]
+        e *= u
+        e += self.origin[:n]
+        done = None
+        if now >= self.next_end:
+            done = u >= 1.0
+            e[done] = self.target[:n][done] # Land exactly, not within rounding
+        out = dict(zip(self.names, e.tolist()))
+        for name in INT_FIELDS:
+            if name in out:
+                out[name] = int(round(out[name]))
+        self.state.publish(**out)
+        if done is not None:
+            self.finished += int(done.sum())
+            self._remove(done)
+        return out
+
+
+def tween(state, field, target, duration=1.0, easing=EASE_IN_OUT):
+    state.tweens.submit(field, target, duration, easing)
@@ -0,0 +1,82 @@
+import struct
+
+# Per-frame fractal parameters live in one std140 uniform block instead of a
+# dozen `program['name'].value = ...` calls. Each vec4 slot is packed from the
+# FractalState fields listed for it and re-uploaded only when they changed.
+# Must match the FrameParams block in fractal.glsl.
+
+# (slot name, struct format, FractalState fields the slot is packed from).
+# Slots with no fields are computed by the renderer and set() directly.
+SLOTS = (
+    ('view', '4f', ()),                       # xy = offset, z = zoom, w = time
+    ('deep', '4f', ()),                       # xy = ref_delta, zw = ref_center
+    ('shape', '4f', ('power', 'color_r', 'color_g', 'color_b')), # x = power, yzw = color_tint
+    ('screen', '4f', ()),                     # xy = resolution
+    ('flags', '4i', ('max_iter',)),           # x = max_iter (loop cap), y = deep_zoom_active, z = ref_len, w = color_iter
+    ('warp', '4f', ()),                       # xy = previous pixel-space offset, z = previous zoom / zoom, w = max error
+    ('refine', '4i', ()),                     # x = history valid, y = refine period, z = refine phase
+    ('view_lo', '4f', ()),                    # xy = offset low words (double-float kernels)
+)
+
+SLOT_SIZE = 16
+BLOCK_NAME = 'FrameParams'
+
+
+class UniformBuffer:
+    def __init__(self, ctx, program=None, binding=1):
+        self.index = {name: i for i, (name, _, _) in enumerate(SLOTS)}
+        self.formats = [fmt for _, fmt, _ in SLOTS]
+        self.values = [None] * len(SLOTS)
+        self.dirty = set()
+        self.data = bytearray(SLOT_SIZE * len(SLOTS))
+        self.buffer = ctx.buffer(bytes(self.data))
+        self.binding = binding
+        self.last_snapshot = None
+        if program is not None:
+            self.attach(program)
+        # Counters for the instrumentation / benchmark
+        self.uploads = 0
+        self.bytes_uploaded = 0
+
+    def attach(self, program):
+        # Resolve the block once per program; only the buffer binding is touched per frame
+        program[BLOCK_NAME].binding = self.binding
+
+    def set(self, name, *values):
+        i = self.index[name]
+        values = tuple(values) + (0,) * (4 - len(values))
+        if self.values[i] != values:
+            self.values[i] = values
+            struct.pack_into(self.formats[i], self.data, i * SLOT_SIZE, *values)
+            self.dirty.add(i)
+
+    def update_from_snapshot(self, snap, deep_active=0, ref_len=0, iter_cap=None):
+        # Repack state-backed slots only when their source fields were published
+        # since the last snapshot; set() then drops writes that change nothing.
+        prev = self.last_snapshot
+        if snap.changed(prev, 'power', 'color_r', 'color_g', 'color_b'):
+            self.set('shape', snap.power, snap.color_r, snap.color_g, snap.color_b)
+        max_iter = int(snap.max_iter)
+        self.set('flags', max_iter if iter_cap is None else iter_cap, deep_active, ref_len, max_iter)
+        self.last_snapshot = snap
+
+    def upload(self):
+        # One write per contiguous run of dirty slots
+        if self.dirty:
+            slots = sorted(self.dirty)
+            start = prev = slots[0]
+            for i in slots[1:] + [None]:
+                if i is not None and i == prev + 1:
+                    prev = i
+                    continue
+                lo, hi = start * SLOT_SIZE, (prev + 1) * SLOT_SIZE
+                self.buffer.write(bytes(self.data[lo:hi]), offset=lo)
+                self.uploads += 1
+                self.bytes_uploaded += hi - lo
+                if i is not None:
+                    start = prev = i
+            self.dirty.clear()
+        self.buffer.bind_to_uniform_block(self.binding)
+
+    def release(self):
+        self.buffer.release()
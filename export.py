@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Offline export: renders a zoom path to a PNG sequence at any resolution,
+without the interactive window. The path is a recorded session directory
+(recordings/<name>, its view and parameters replayed) or a keyframe JSON file:
+
+    {"fps": 30, "keyframes": [
+        {"t": 0, "offset_x": -0.75, "offset_y": 0.0, "zoom": 1.0},
+        {"t": 20, "offset_x": -0.7436439, "offset_y": 0.1318259, "zoom": 5e4, "max_iter": 600}]}
+
+A single keyframe renders one still. Frames are rendered in tiles across a
+process pool and written as they complete; run the same command again to
+resume an interrupted export.
+
+    python export.py path.json --out exports/dive --size 3840x2160 --supersample 2
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from engine.export import BACKENDS, EXPORT_TILE, EXPORTS_DIR, Exporter, load_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Session directory or keyframe JSON")
+    parser.add_argument("--out", help=f"Output directory (default {EXPORTS_DIR}/<source name>)")
+    parser.add_argument("--size", default="1920x1080", help="Output size WxH")
+    parser.add_argument("--supersample", type=int, default=2, help="Samples per pixel side")
+    parser.add_argument("--fps", type=float, help="Frames per second (default: the file's, or 30)")
+    parser.add_argument("--start", type=float, default=0.0, help="Session time to start at (s)")
+    parser.add_argument("--end", type=float, help="Session time to stop at (s)")
+    parser.add_argument("--backend", default="gl", choices=BACKENDS)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--tile", type=int, default=EXPORT_TILE, help="Tile side in output pixels")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    name = os.path.splitext(os.path.basename(os.path.normpath(args.source)))[0]
+    out = args.out or os.path.join(EXPORTS_DIR, name)
+    path = load_path(args.source, args.fps, args.start, args.end)
+    print(f"Export: {path.count} frame(s) of {width}x{height} ({args.supersample}x{args.supersample} samples) "
+          f"to {out}")
+    with Exporter(path, out, width, height, args.supersample, args.backend, args.workers, args.tile,
+                  source=args.source) as exporter:
+        try:
+            exporter.run()
+        except KeyboardInterrupt:
+            print(f"Export: interrupted after {exporter.frames_written} frame(s); run again to resume.")
+            return 1
+    print(f"Export: done, {exporter.frames_written} written, {exporter.frames_skipped} already there.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
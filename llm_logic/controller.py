@@ -0,0 +1,384 @@
+import ssl
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import urllib.parse
+from collections import OrderedDict
+
+from engine.injections import clear_injections, inject
+from engine.precision import add_offset
+from engine.tweens import EASINGS
+
+# The AI conductor. A daemon thread runs an asyncio loop that wakes every
+# `interval` seconds, turns the state into a compact observation and asks an
+# OpenAI-compatible chat completions endpoint what to do, answering with the
+# tools below. At most one request is in flight: wake-ups that arrive while
+# the model is thinking are coalesced into one, and the observation is taken
+# when the request goes out, never queued stale. Observations are delta
+# encoded: a full keyframe, then only what changed since the previous request
+# (the conversation restarts at every keyframe, so prompts stay short), and no
+# request at all when nothing did. Identical requests are answered from a
+# cache. Tool calls only ever touch the state through thread-safe writes:
+# tweens (state.tweens takes submissions from any thread) and inject() /
+# clear_injections(), which hold the state lock.
+
+DEFAULT_URL = "http://127.0.0.1:8765/v1/chat/completions" # llm_logic/standin_server.py
+DEFAULT_MODEL = "fractal-conductor"
+INTERVAL = 5.0 # Seconds between wake-ups
+KEYFRAME_EVERY = 8 # Requests per conversation before a full observation again
+TIMEOUT = 30.0
+CACHE_SIZE = 128
+
+SYSTEM_PROMPT = (
+    "You conduct a fractal visualisation for a person wearing a heart rate strap and an eye tracker. "
+    "Your goal is a calm, absorbed state: lower heart rate, higher HRV (RMSSD, SDNN). "
+    "Each message is an observation of the person and the visuals, either complete or only what changed. "
+    "Make small, slow changes with the tools, watch the effect, and do nothing when things are going well."
+)
+
+# OpenAI function-calling schemas; ranges match the control panel's sliders
+TOOLS = [
+    {"type": "function", "function": {
+        "name": "set_target_color",
+        "description": "Glide the palette tint to an RGB colour (components 0-1).",
+        "parameters": {"type": "object", "properties": {
+            "r": {"type": "number"}, "g": {"type": "number"}, "b": {"type": "number"},
+            "duration": {"type": "number", "description": "Seconds, default 5"}},
+            "required": ["r", "g", "b"]}}},
+    {"type": "function", "function": {
+        "name": "set_zoom_speed",
+        "description": "Glide the zoom speed (-1 to 1, negative zooms out).",
+        "parameters": {"type": "object", "properties": {
+            "speed": {"type": "number"}, "duration": {"type": "number"}}, "required": ["speed"]}}},
+    {"type": "function", "function": {
+        "name": "set_power",
+        "description": "Glide the fractal exponent (1-5; 2 is the Mandelbrot set).",
+        "parameters": {"type": "object", "properties": {
+            "power": {"type": "number"}, "duration": {"type": "number"}}, "required": ["power"]}}},
+    {"type": "function", "function": {
+        "name": "set_pulse_speed",
+        "description": "Glide the colour pulse speed (0-2).",
+        "parameters": {"type": "object", "properties": {
+            "speed": {"type": "number"}, "duration": {"type": "number"}}, "required": ["speed"]}}},
+    {"type": "function", "function": {
+        "name": "inject_phrase",
+        "description": "Melt a short phrase into the fractal at a screen position (0-1, 0.5 is the centre).",
+        "parameters": {"type": "object", "properties": {
+            "text": {"type": "string"}, "x": {"type": "number"}, "y": {"type": "number"},
+            "lifetime": {"type": "number", "description": "Seconds, default 30"}},
+            "required": ["text"]}}},
+    {"type": "function", "function": {
+        "name": "clear_phrases",
+        "description": "Remove every injected phrase.",
+        "parameters": {"type": "object", "properties": {}}}},
+]
+
+
+def _clamp(value, lo, hi):
+    return min(max(float(value), lo), hi)
+
+
+def observe(snap):
+    # What the model sees, rounded so sensor jitter does not read as change
+    obs = {'hr': int(snap.current_hr)}
+    windows = snap.hrv.get('windows', {}) if snap.hrv else {}
+    short = windows.get(60.0) or {}
+    if short.get('rmssd') is not None:
+        obs['rmssd'] = round(float(short['rmssd']))
+        obs['sdnn'] = round(float(short['sdnn']))
+    long = windows.get(300.0) or {}
+    if long.get('lf_hf') is not None:
+        obs['lf_hf'] = round(float(long['lf_hf']), 1)
+    if snap.use_eye_tracker:
+        obs['gaze'] = [round(snap.gaze_x, 1), round(snap.gaze_y, 1)]
+    obs['color'] = [round(snap.color_r, 2), round(snap.color_g, 2), round(snap.color_b, 2)]
+    obs['power'] = round(snap.power, 2)
+    obs['zoom_speed'] = round(snap.zoom_speed, 2)
+    obs['pulse_speed'] = round(snap.pulse_speed, 2)
+    obs['phrases'] = [inj.text for inj in snap.injections][-4:]
+    return obs
+
+
+def delta(previous, obs):
+    # Fields of obs that differ from previous
+    return {k: v for k, v in obs.items() if previous.get(k) != v}
+
+
+class _HttpError(Exception):
+    pass
+
+
+async def post_json(url, body, headers=None, timeout=TIMEOUT):
+    # Minimal HTTP/1.1 POST over asyncio streams (no client library needed):
+    # one connection per request, Content-Length or chunked responses
+    parts = urllib.parse.urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    data = json.dumps(body).encode('utf-8')
+    head = [f"POST {path} HTTP/1.1", f"Host: {parts.hostname}", "Content-Type: application/json",
+            f"Content-Length: {len(data)}", "Connection: close"]
+    head += [f"{k}: {v}" for k, v in (headers or {}).items()]
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None)
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + data)
+            await writer.drain()
+            status = await reader.readline()
+            fields = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                fields[key.strip().lower()] = value.strip()
+            if fields.get('transfer-encoding', '').lower() == 'chunked':
+                chunks = []
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    if size == 0:
+                        break
+                    chunks.append(await reader.readexactly(size))
+                    await reader.readline()
+                payload = b"".join(chunks)
+            elif 'content-length' in fields:
+                payload = await reader.readexactly(int(fields['content-length']))
+            else:
+                payload = await reader.read()
+        finally:
+            writer.close()
+        code = int(status.split()[1]) if len(status.split()) > 1 else 0
+        if code != 200:
+            raise _HttpError(f"HTTP {code}: {payload[:200].decode('utf-8', 'replace')}")
+        return json.loads(payload)
+
+    return await asyncio.wait_for(exchange(), timeout)
+
+
+class LlmController:
+    def __init__(self, state, url=DEFAULT_URL, model=DEFAULT_MODEL, interval=INTERVAL,
+                 api_key=None, keyframe_every=KEYFRAME_EVERY, timeout=TIMEOUT, aspect=16.0 / 9.0):
+        self.state = state
+        self.url = url
+        self.model = model
+        self.interval = interval
+        self.api_key = api_key
+        self.keyframe_every = keyframe_every
+        self.timeout = timeout
+        self.aspect = aspect # Screen width / height, for inject_phrase positions
+        self.messages = [] # Conversation since the last keyframe (after the system prompt)
+        self.turns = 0 # Answered requests in it
+        self.last_obs = None
+        self.last_sent = 0.0
+        self.cache = OrderedDict() # request hash -> assistant message
+        self.counters = {'wakes': 0, 'coalesced': 0, 'requests': 0, 'cached': 0, 'unchanged': 0,
+                         'errors': 0, 'tool_calls': 0}
+        self.latency = 0.0 # Seconds, last model round trip
+        self.in_flight = False
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._wake = None
+        self._ready = threading.Event()
+
+    # --- Thread ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), name="llm", daemon=True)
+            self._thread.start()
+            self._ready.wait()
+        return self
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self):
+        # Ask for a decision now instead of at the next tick (any thread)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._on_wake)
+
+    def _on_wake(self):
+        self.counters['wakes'] += 1
+        if self._wake.is_set() or self.in_flight:
+            self.counters['coalesced'] += 1 # Folded into the request already pending or running
+        self._wake.set()
+
+    async def _ticker(self):
+        while not self._stop.is_set():
+            self._on_wake()
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._ready.set()
+        ticker = asyncio.ensure_future(self._ticker())
+        stop = asyncio.ensure_future(self._stop.wait())
+        try:
+            while not self._stop.is_set():
+                wake = asyncio.ensure_future(self._wake.wait())
+                await asyncio.wait([wake, stop], return_when=asyncio.FIRST_COMPLETED)
+                wake.cancel()
+                if self._stop.is_set():
+                    break
+                self._wake.clear()
+                await self.decide()
+        finally:
+            ticker.cancel()
+            stop.cancel()
+            self._status("off")
+
+    def _status(self, text):
+        if self.state.llm_status != text:
+            self.state.llm_status = text
+
+    # --- One decision ---
+
+    def build_request(self, obs, now):
+        # (request body, whether the observation was sent) for obs; None if
+        # nothing changed since the last request
+        if self.last_obs is None or not self.messages or self.turns >= self.keyframe_every:
+            self.turns = 0
+            self.messages = [{"role": "user", "content": "Now: " + json.dumps(obs, separators=(',', ':'))}]
+        else:
+            changed = delta(self.last_obs, obs)
+            if not changed:
+                return None
+            self.messages.append({"role": "user", "content": f"+{now - self.last_sent:.0f}s: "
+                                  + json.dumps(changed, separators=(',', ':'))})
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": SYSTEM_PROMPT}] + self.messages,
+            "tools": TOOLS,
+            "temperature": 0,
+        }
+
+    async def decide(self):
+        obs = observe(self.state.snapshot())
+        now = time.monotonic()
+        body = self.build_request(obs, now)
+        if body is None:
+            self.counters['unchanged'] += 1
+            return None
+        key = hashlib.sha1(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()
+        message = self.cache.get(key)
+        if message is not None:
+            self.cache.move_to_end(key)
+            self.counters['cached'] += 1
+        else:
+            self.in_flight = True
+            self._status("thinking")
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            t0 = time.perf_counter()
+            try:
+                reply = await post_json(self.url, body, headers, self.timeout)
+                message = reply["choices"][0]["message"]
+            except Exception as e:
+                # The model never saw it: the next request is against the
+                # previous observation again
+                self.counters['errors'] += 1
+                self.messages.pop()
+                self._status(f"error: {e}")
+                return None
+            finally:
+                self.in_flight = False
+            self.latency = time.perf_counter() - t0
+            self.counters['requests'] += 1
+            self.cache[key] = message
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        self.last_obs = obs
+        self.last_sent = now
+        self.turns += 1
+        calls = message.get("tool_calls") or []
+        results = self.apply(calls)
+        reply = {"role": "assistant", "content": message.get("content") or ""}
+        if calls:
+            reply["tool_calls"] = calls
+        self.messages.append(reply)
+        for call, result in zip(calls, results):
+            self.messages.append({"role": "tool", "tool_call_id": call.get("id", ""), "content": result})
+        self._status(f"{self.counters['requests']} calls, {self.latency:.1f}s")
+        return results
+
+    # --- Tools ---
+
+    def apply(self, tool_calls):
+        # Run each call; a bad call is reported back to the model, never raised
+        results = []
+        for call in tool_calls:
+            fn = call.get("function", {})
+            name = fn.get("name", "")
+            try:
+                args = fn.get("arguments") or {}
+                if isinstance(args, str):
+                    args = json.loads(args or "{}")
+                handler = getattr(self, "_tool_" + name, None)
+                if handler is None:
+                    raise ValueError(f"unknown tool {name}")
+                results.append(handler(**args) or "ok")
+                self.counters['tool_calls'] += 1
+            except Exception as e:
+                results.append(f"error: {e}")
+        return results
+
+    def _glide(self, fields, duration, easing='ease_in_out'):
+        duration = _clamp(duration, 0.0, 60.0)
+        for field, value in fields.items():
+            self.state.tweens.submit(field, value, duration, EASINGS[easing])
+
+    def _tool_set_target_color(self, r, g, b, duration=5.0):
+        self._glide({'color_r': _clamp(r, 0.0, 1.0), 'color_g': _clamp(g, 0.0, 1.0),
+                     'color_b': _clamp(b, 0.0, 1.0)}, duration)
+
+    def _tool_set_zoom_speed(self, speed, duration=5.0):
+        self._glide({'zoom_speed': _clamp(speed, -1.0, 1.0)}, duration)
+
+    def _tool_set_power(self, power, duration=10.0):
+        self._glide({'power': _clamp(power, 1.0, 5.0)}, duration)
+
+    def _tool_set_pulse_speed(self, speed, duration=5.0):
+        self._glide({'pulse_speed': _clamp(speed, 0.0, 2.0)}, duration)
+
+    def _tool_inject_phrase(self, text, x=0.5, y=0.5, lifetime=30.0):
+        # Screen position -> point in the plane under it, locked to the current zoom
+        snap = self.state.snapshot()
+        aspect_x = max(self.aspect, 1.0)
+        aspect_y = max(1.0 / self.aspect, 1.0)
+        px, px_lo = add_offset(snap.offset_x, snap.offset_x_lo, (_clamp(x, 0.0, 1.0) - 0.5) * aspect_x / snap.zoom)
+        py, py_lo = add_offset(snap.offset_y, snap.offset_y_lo, (0.5 - _clamp(y, 0.0, 1.0)) * aspect_y / snap.zoom)
+        inject(self.state, str(text)[:32], px, py, snap.zoom, lifetime=_clamp(lifetime, 1.0, 600.0),
+               x_lo=px_lo, y_lo=py_lo)
+
+    def _tool_clear_phrases(self):
+        clear_injections(self.state)
+
+
+def setup_and_start_controller(state, url=DEFAULT_URL, **kwargs):
+    # Like the sensor workers: start in the background, never raise.
+    # url "standin" starts llm_logic/standin_server.py in-process and uses it.
+    try:
+        if url == "standin":
+            from llm_logic.standin_server import StandinServer
+            url = StandinServer().start().url
+        controller = LlmController(state, url, **kwargs).start()
+        print(f"LLM: controller started ({url}).")
+        return controller
+    except Exception as e:
+        print(f"LLM Initialization Error: {e}")
+        return None
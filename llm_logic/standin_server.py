@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an OpenAI-compatible chat completions server, so the LLM
+controller can run and be measured offline. Answers after a configurable
+latency with a small deterministic policy that uses the same tools a model
+would: cool and slow the visuals when heart rate rises above where the
+conversation started, reward a falling heart rate with a phrase, otherwise
+leave things alone.
+
+    python llm_logic/standin_server.py [--port 8765] [--latency 1.5] [--jitter 0.5]
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CALM_COLOR = (0.05, 0.15, 0.45)
+WARM_COLOR = (0.35, 0.15, 0.1)
+
+
+def current_observation(messages):
+    # Replay the keyframe and deltas of the conversation into the latest
+    # observation; also returns the first one, as the baseline
+    first = None
+    obs = {}
+    for m in messages:
+        if m.get("role") != "user":
+            continue
+        _, _, payload = m.get("content", "").partition(": ")
+        try:
+            values = json.loads(payload)
+        except ValueError:
+            continue
+        obs.update(values)
+        if first is None:
+            first = dict(values)
+    return first or {}, obs
+
+
+def policy(messages):
+    # (content, [(tool, arguments)]) for a conversation
+    first, obs = current_observation(messages)
+    hr, base = obs.get('hr', 0), first.get('hr', 0)
+    if not hr or not base:
+        return "Waiting for a heart rate.", []
+    if hr > base + 3:
+        return "Heart rate is up; calming the visuals.", [
+            ("set_target_color", dict(zip("rgb", CALM_COLOR), duration=8.0)),
+            ("set_zoom_speed", {"speed": max(0.02, obs.get('zoom_speed', 0.15) - 0.05), "duration": 8.0}),
+        ]
+    if hr < base - 3:
+        calls = [("set_target_color", dict(zip("rgb", WARM_COLOR), duration=12.0))]
+        if "SOFTEN" not in obs.get('phrases', []):
+            calls.append(("inject_phrase", {"text": "SOFTEN", "x": 0.5, "y": 0.4, "lifetime": 30.0}))
+        return "Heart rate is falling; keep going.", calls
+    return "Steady.", []
+
+
+class StandinServer:
+    # In-process server on a daemon thread; port 0 picks a free one (see .url)
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, jitter=0.0, fail_every=0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_every = fail_every # Answer every n-th request with HTTP 500 (0 = never)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0 # Most requests ever handled at once
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/v1/chat/completions"
+        self._thread = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.endswith("/chat/completions"):
+                    return self._reply(404, {"error": {"message": "not found"}})
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    return self._reply(400, {"error": {"message": "bad json"}})
+                status, reply = server.complete(request)
+                self._reply(status, reply)
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def complete(self, request):
+        with self.lock:
+            self.requests += 1
+            n = self.requests
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        try:
+            time.sleep(delay) # The model thinking
+            if self.fail_every and n % self.fail_every == 0:
+                return 500, {"error": {"message": "stand-in failure"}}
+            content, calls = policy(request.get("messages", []))
+            tool_calls = [{"id": f"call_{n}_{k}", "type": "function",
+                           "function": {"name": name, "arguments": json.dumps(args)}}
+                          for k, (name, args) in enumerate(calls)]
+            message = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return 200, {
+                "id": f"chatcmpl-standin-{n}", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "standin"),
+                "choices": [{"index": 0, "message": message,
+                             "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            }
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="llm-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.5, help="Seconds per answer")
+    parser.add_argument("--jitter", type=float, default=0.5, help="+- seconds of random latency")
+    args = parser.parse_args()
+    server = StandinServer(port=args.port, latency=args.latency, jitter=args.jitter)
+    print(f"Stand-in model at {server.url} ({args.latency}s +- {args.jitter}s)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
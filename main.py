@@ -10,15 +10,55 @@ import moderngl_window as mglw
 from engine.state import FractalState
 from engine.renderer import FractalRenderer
 from biometrics.tobii_worker import setup_and_start_tobii
+from biometrics.polar_worker import FakePolarBackend, setup_and_start_polar
+from biometrics.gaze import GazePipeline, SyntheticGaze
+from engine.recorder import SessionReplayer, start_recording
+from llm_logic.controller import setup_and_start_controller
+from engine.gui import setup_and_start_control_window
+from engine.shared_state import unshare_state
 
 if __name__ == '__main__':
     global_state = FractalState()
     
-    # 1. Fully initialize Tobii synchronously BEFORE the GPU touches the display server
-    setup_and_start_tobii(global_state)
+    # FRACTALMASSAGE_REPLAY=<session dir> feeds a recording in place of the sensors
+    replay = os.environ.get("FRACTALMASSAGE_REPLAY")
+    if replay:
+        SessionReplayer(replay, global_state).start()
+        print(f"Replay: {replay}")
+    else:
+        # 1. Fully initialize Tobii synchronously BEFORE the GPU touches the display server.
+        # FRACTALMASSAGE_FAKE_GAZE=1 replays synthetic fixations and saccades instead.
+        if os.environ.get("FRACTALMASSAGE_FAKE_GAZE") == "1":
+            SyntheticGaze().start(GazePipeline(global_state))
+            print("Gaze: streaming synthetic gaze.")
+        else:
+            setup_and_start_tobii(global_state)
+
+        # Heart rate runs its own asyncio loop and reconnects by itself.
+        # FRACTALMASSAGE_FAKE_POLAR=1 streams a synthetic strap instead.
+        fake_polar = os.environ.get("FRACTALMASSAGE_FAKE_POLAR") == "1"
+        setup_and_start_polar(global_state, FakePolarBackend() if fake_polar else None)
+
+    # FRACTALMASSAGE_RECORD=1 records the session from the start (also a UI toggle)
+    if os.environ.get("FRACTALMASSAGE_RECORD") == "1":
+        start_recording(global_state)
+
+    # FRACTALMASSAGE_LLM=<chat completions URL> lets a model conduct the visuals;
+    # "standin" runs the local stand-in (llm_logic/standin_server.py) in-process
+    llm = os.environ.get("FRACTALMASSAGE_LLM")
+    if llm:
+        setup_and_start_controller(global_state, llm, api_key=os.environ.get("FRACTALMASSAGE_LLM_KEY"))
         
+    # FRACTALMASSAGE_CONTROL_WINDOW=1 opens the tkinter panel (engine/gui.py) in its
+    # own process, reading and writing the state through shared memory
+    if os.environ.get("FRACTALMASSAGE_CONTROL_WINDOW") == "1":
+        setup_and_start_control_window(global_state)
+
     # 2. Now it is 100% safe to lock the display server for ModernGL
     mglw.settings.RESOURCE_DIRS = [os.path.dirname(os.path.abspath(__file__))]
     FractalRenderer.state = global_state
     
-    mglw.run_window_config(FractalRenderer)
\ No newline at end of file
+    try:
+        mglw.run_window_config(FractalRenderer)
+    finally:
+        unshare_state(global_state)
\ No newline at end of file
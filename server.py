@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Headless render server: hosts several independent sessions (kiosk displays,
+remote viewers), each with its own state, frame size and frame rate, renders
+their frames across a pool of worker processes and streams them, encoded, to
+clients on this machine (engine/server.py has the wire format and FrameClient).
+
+    python server.py --sessions 4 --size 1280x720 --fps 30 --port 7620
+
+A client connects to the port, sends {"session": <id>} as one JSON line, and
+reads frames; {"publish": {"zoom_speed": 0.3}} lines steer its session.
+--eye-trackers gives each session, in order, a Tobii tracker while any are free.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from engine.capture import FORMATS
+from engine.server import BACKENDS, SERVER_HOST, SERVER_PORT, RenderServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1, help="Independent sessions to host")
+    parser.add_argument("--size", default="1280x720", help="Frame size WxH of every session")
+    parser.add_argument("--fps", type=float, default=30.0, help="Target frames per second per session")
+    parser.add_argument("--format", default="JPEG", choices=FORMATS)
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--backend", default="gl", choices=BACKENDS)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--eye-trackers", action="store_true", help="Connect a Tobii tracker per session")
+    parser.add_argument("--stats", type=float, default=5.0, help="Seconds between stats lines")
+    args = parser.parse_args()
+    if not args.fps > 0:
+        parser.error("--fps must be positive")
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    with RenderServer(args.workers, args.backend, args.host, args.port) as server:
+        for _ in range(args.sessions):
+            session = server.add_session(width, height, args.fps, args.format, args.quality)
+            if args.eye_trackers:
+                # Before any worker opens a GL context, as main.py does
+                from biometrics.tobii_worker import setup_and_start_tobii
+                if setup_and_start_tobii(session.state):
+                    session.state.publish(use_eye_tracker=True)
+        print(f"Server: {args.sessions} session(s) on {args.host}:{server.port}, "
+              f"{server.workers} worker(s), backend {args.backend}")
+        server.start()
+        try:
+            while True:
+                time.sleep(args.stats)
+                for s in server.stats():
+                    print(f"Server: session {s['session']} {s['fps']:.1f}/{s['target_fps']:g} fps, "
+                          f"{s['render_ms']:.1f} ms, {s['dropped']} dropped, {s['clients']} client(s)")
+        except KeyboardInterrupt:
+            print("Server: stopping.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
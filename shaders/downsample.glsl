@@ -0,0 +1,37 @@
+#version 330
+
+#if defined VERTEX_SHADER
+in vec3 in_position;
+in vec2 in_texcoord_0;
+out vec2 uv;
+
+void main() {
+    gl_Position = vec4(in_position, 1.0);
+    uv = in_texcoord_0;
+}
+#endif
+
+#if defined FRAGMENT_SHADER
+out vec4 fragColor;
+in vec2 uv;
+
+// Shrinks a copy of the frame for engine/capture.py: a box filter made of
+// taps x taps bilinear samples spread over the target pixel's footprint, each
+// averaging 2x2 source pixels, so the snapshot does not shimmer on the
+// fractal's detail. No mipmaps, which cost a full-size pass per capture.
+uniform sampler2D source;
+uniform vec2 footprint; // Target pixel size in source uv
+uniform int taps;
+
+void main() {
+    vec2 spacing = footprint / float(taps);
+    vec2 first = uv - 0.5 * footprint + 0.5 * spacing;
+    vec3 sum = vec3(0.0);
+    for (int y = 0; y < taps; y++) {
+        for (int x = 0; x < taps; x++) {
+            sum += texture(source, first + vec2(x, y) * spacing).rgb;
+        }
+    }
+    fragColor = vec4(sum / float(taps * taps), 1.0);
+}
+#endif
@@ -0,0 +1,46 @@
+#version 330
+
+#if defined VERTEX_SHADER
+in vec3 in_position;
+in vec2 in_texcoord_0;
+out vec2 uv;
+
+void main() {
+    gl_Position = vec4(in_position, 1.0);
+    uv = in_texcoord_0;
+}
+#endif
+
+#if defined FRAGMENT_SHADER
+out vec4 fragColor;
+in vec2 uv;
+
+// Composites engine/foveation.py's layers: the coarse periphery everywhere,
+// the middle layer inside radii.y of the fixation and the full-quality fovea
+// inside radii.x, each fading out over `falloff` pixels at its edge. A layer's
+// texture only covers a rectangle around the fixation; *_map takes window uv
+// to it (tex_uv = uv * map.zw + map.xy).
+uniform sampler2D fovea;
+uniform sampler2D middle;
+uniform sampler2D periphery;
+uniform vec4 fovea_map;
+uniform vec4 middle_map;
+uniform vec4 periphery_map;
+uniform vec2 gaze;    // Fixation, framebuffer pixels
+uniform vec2 radii;   // Fovea, middle layer (px)
+uniform float falloff; // Blend width (px)
+
+void main() {
+    float d = distance(gl_FragCoord.xy, gaze);
+    vec3 color = texture(periphery, uv * periphery_map.zw + periphery_map.xy).rgb;
+    float w = 1.0 - smoothstep(radii.y - falloff, radii.y, d);
+    if (w > 0.0) {
+        color = mix(color, texture(middle, uv * middle_map.zw + middle_map.xy).rgb, w);
+    }
+    w = 1.0 - smoothstep(radii.x - falloff, radii.x, d);
+    if (w > 0.0) {
+        color = mix(color, texture(fovea, uv * fovea_map.zw + fovea_map.xy).rgb, w);
+    }
+    fragColor = vec4(color, 1.0);
+}
+#endif
@@ -1,4 +1,28 @@
 #version 330
+// precise keeps the double-float error terms from being optimised away
+#ifdef GL_ARB_gpu_shader5
+#extension GL_ARB_gpu_shader5 : enable
+#define PRECISE precise
+#else
+#define PRECISE
+#endif
+
+// Pass this program is built as, via load_program(defines={'PASS': '1'}):
+// 0 = iterate and shade in one go, 1 = reprojecting iteration pass that writes
+// the iteration buffer, 2 = shade the iteration buffer to colour
+#define PASS 0
+
+// Kernel variant, picked per frame by engine/programs.py: 0 = any power in
+// polar form, 2..5 = that integer power by complex multiplication with
+// periodicity checking (2 also skips the main cardioid and period-2 bulb)
+#define POWER 0
+
+// 0 = compile out injection blending while nothing is injected
+#define INJECTIONS 1
+
+// Arithmetic of the escape loop (engine/precision.py): 0 = float32,
+// 1 = double-float, c and z as hi + lo float pairs (integer powers only)
+#define PRECISION 0
 
 #if defined VERTEX_SHADER
 in vec3 in_position;
@@ -15,62 +39,367 @@ void main() {
 out vec4 fragColor;
 in vec2 uv;
 
-uniform vec2 resolution;
-uniform vec2 offset;
-uniform float zoom;
-uniform int max_iter;
-uniform float time;
-uniform float power;
-uniform vec3 color_tint;
+// Per-frame parameters, packed by engine/uniforms.py (std140, one vec4 per slot)
+layout(std140) uniform FrameParams {
+    vec4 u_view;    // xy = offset, z = zoom, w = time
+    vec4 u_deep;    // xy = ref_delta, zw = ref_center
+    vec4 u_shape;   // x = power, yzw = color_tint
+    vec4 u_screen;  // xy = resolution
+    ivec4 u_flags;  // x = max_iter, y = deep_zoom_active, z = ref_len, w = color_iter
+    vec4 u_warp;    // xy = previous pixel-space offset, z = previous zoom / zoom, w = max sample error (px)
+    ivec4 u_refine; // x = history valid, y = refine period, z = refine phase
+    vec4 u_view_lo; // xy = offset low words (PRECISION 1)
+};
 
-// Injection Engine
-uniform sampler2D sdf_texture;
-uniform vec2 inject_pos;
-uniform float inject_scale;
-uniform int inject_active; // CHANGED FROM BOOL TO INT
+#define offset u_view.xy
+#define zoom u_view.z
+#define time u_view.w
+#define power u_shape.x
+#define color_tint u_shape.yzw
+#define resolution u_screen.xy
+#define max_iter u_flags.x
+#define color_iter u_flags.w  // Palette scale; stays at the user's max_iter when the governor caps the loop
+#define offset_lo u_view_lo.xy
 
-void main() {
-    vec2 c = (uv - 0.5) * (resolution / min(resolution.x, resolution.y));
-    c = (c / zoom) + offset;
+// Injection Engine: up to MAX_INJECTIONS depth-locked SDFs, one array layer each
+#define MAX_INJECTIONS 16
+#if INJECTIONS
+uniform sampler2DArray sdf_textures;
+layout(std140) uniform Injections {
+    ivec4 inject_count;                  // x = number of live entries
+    vec4 inject_anchor[MAX_INJECTIONS];  // xy = anchor relative to the view centre, z = scale (zoom depth), w = fade alpha
+    vec4 inject_params[MAX_INJECTIONS];  // x = texture layer, y = pyramid level (0 = layer only), zw = first tile of the page window
+    vec4 inject_window[MAX_INJECTIONS];  // xy = top-left corner of the page window relative to the view centre
+};
+
+// SDF pyramid (engine/sdf_pyramid.py): finer levels of each injection's SDF in
+// TILE x TILE tiles with a one-texel border, and PAGE_ROWS rows of page table
+// per injection mapping its window of tiles to (tile layer or marker, levels up)
+uniform sampler2DArray sdf_tiles;
+uniform isampler2D sdf_pages;
+const vec2 SDF_SIZE = vec2(1024.0, 512.0);
+const float TILE = 256.0;
+const int PAGE_COLS = 16;
+const int PAGE_ROWS = 12;
+const int TILE_OUTSIDE = -2;
+const int TILE_INSIDE = -3;
 
+// Raw SDF value of injection i at offset d from the view centre, from the
+// finest resident tile, or -1.0 where only the base layer has it
+float pyramid_sdf(int i, vec2 d) {
+    int level = int(inject_params[i].y);
+    if (level == 0) {
+        return -1.0;
+    }
+    // Texels of the level from the window's corner, y down
+    vec2 q = (d - inject_window[i].xy) * vec2(1.0, -1.0) * (inject_anchor[i].z * 0.2 * exp2(float(level))) * SDF_SIZE;
+    ivec2 cell = ivec2(floor(q / TILE));
+    if (any(lessThan(cell, ivec2(0))) || any(greaterThanEqual(cell, ivec2(PAGE_COLS, PAGE_ROWS)))) {
+        return -1.0;
+    }
+    ivec2 entry = texelFetch(sdf_pages, ivec2(cell.x, cell.y + i * PAGE_ROWS), 0).xy;
+    if (entry.x == TILE_OUTSIDE) return 0.0;
+    if (entry.x == TILE_INSIDE) return 1.0;
+    if (entry.x < 0) return -1.0;
+    // Position in the tile entry.y levels up that covers this cell
+    int span = 1 << entry.y;
+    ivec2 tile = ivec2(inject_params[i].zw) + cell;
+    vec2 local = (vec2(tile & (span - 1)) * TILE + q - vec2(cell) * TILE) / float(span);
+    return textureLod(sdf_tiles, vec3((local + 1.0) / (TILE + 2.0), float(entry.x)), 0.0).r;
+}
+#endif
+
+// Deep Zoom (Perturbation), only built into the kernels that can run power 2
+#define DEEP_ZOOM (POWER == 0 || POWER == 2)
+#if DEEP_ZOOM
+uniform sampler2D ref_orbit; // RG32F reference orbit Z_0..Z_n, ORBIT_TEX_WIDTH texels per row
+#define deep_zoom_active u_flags.y
+#define ref_len u_flags.z
+#define ref_delta u_deep.xy   // view center minus reference center
+#define ref_center u_deep.zw
+
+const int ORBIT_TEX_WIDTH = 1024;
+
+vec2 ref_z(int m) {
+    return texelFetch(ref_orbit, ivec2(m % ORBIT_TEX_WIDTH, m / ORBIT_TEX_WIDTH), 0).xy;
+}
+#endif
+
+// d = c minus the view centre
+float melt_at(vec2 d) {
+#if !INJECTIONS
+    return 0.0;
+#else
     // INJECTION BLENDING
-    vec2 inject_uv = (c - inject_pos) * inject_scale * 0.2 + 0.5;
-    vec2 clamped_uv = clamp(vec2(inject_uv.x, 1.0 - inject_uv.y), 0.0, 1.0);
-    
-    float raw_dist = texture(sdf_texture, clamped_uv).r;
-    float sdf_dist = (0.5 - raw_dist); 
-    
-    float in_bounds = step(0.0, inject_uv.x) * step(inject_uv.x, 1.0) * step(0.0, inject_uv.y) * step(inject_uv.y, 1.0);
+    float melt_factor = 0.0;
+    for(int i = 0; i < inject_count.x; i++) {
+        vec4 anchor = inject_anchor[i];
+        vec2 inject_uv = (d - anchor.xy) * anchor.z * 0.2 + 0.5;
+        
+        float raw_dist = pyramid_sdf(i, d);
+        if (raw_dist < 0.0) {
+            vec2 clamped_uv = clamp(vec2(inject_uv.x, 1.0 - inject_uv.y), 0.0, 1.0);
+            raw_dist = texture(sdf_textures, vec3(clamped_uv, inject_params[i].x)).r;
+        }
+        float sdf_dist = (0.5 - raw_dist); 
+        
+        float in_bounds = step(0.0, inject_uv.x) * step(inject_uv.x, 1.0) * step(0.0, inject_uv.y) * step(inject_uv.y, 1.0);
+        melt_factor = max(melt_factor, smoothstep(-0.05, 0.05, sdf_dist) * in_bounds * anchor.w);
+    }
+    return melt_factor;
+#endif
+}
+
+// One step of z -> z^power + c
+vec2 advance(vec2 z, vec2 c) {
+#if POWER == 0
+    float r = length(z);
+    float theta = atan(z.y, z.x);
     
-    // Cast the int to a float for the math (0.0 or 1.0)
-    float active_float = float(inject_active);
-    float melt_factor = smoothstep(-0.05, 0.05, sdf_dist) * in_bounds * active_float;
+    r = pow(r, power);
+    theta = theta * power;
     
+    return vec2(r * cos(theta), r * sin(theta)) + c;
+#else
+    vec2 w = z;
+    for(int k = 1; k < POWER; k++) {
+        w = vec2(w.x * z.x - w.y * z.y, w.x * z.y + w.y * z.x);
+    }
+    return w + c;
+#endif
+}
+
+#if POWER == 2
+// Points in the main cardioid or the period-2 bulb never escape
+bool in_main_bulbs(vec2 c) {
+    vec2 q = c - vec2(0.25, 0.0);
+    float r2 = dot(q, q);
+    if (r2 * (r2 + q.x) <= 0.25 * c.y * c.y) return true;
+    vec2 b = c + vec2(1.0, 0.0);
+    return dot(b, b) <= 0.0625;
+}
+#endif
+
+#if PRECISION == 1 && POWER != 0
+// Double-float arithmetic, as engine/precision.py: a value is the unevaluated
+// sum x + y of two floats, and the error terms of each add and multiply are
+// carried instead of dropped
+vec2 two_sum(float a, float b) {
+    PRECISE float s = a + b;
+    PRECISE float v = s - a;
+    PRECISE float e = (a - (s - v)) + (b - v);
+    return vec2(s, e);
+}
+
+vec2 quick_two_sum(float a, float b) {
+    PRECISE float s = a + b;
+    PRECISE float e = b - (s - a);
+    return vec2(s, e);
+}
+
+vec2 split(float a) {
+    PRECISE float t = 4097.0 * a;
+    PRECISE float hi = t - (t - a);
+    PRECISE float lo = a - hi;
+    return vec2(hi, lo);
+}
+
+vec2 two_prod(float a, float b) {
+    PRECISE float p = a * b;
+    vec2 A = split(a);
+    vec2 B = split(b);
+    PRECISE float e = ((A.x * B.x - p) + A.x * B.y + A.y * B.x) + A.y * B.y;
+    return vec2(p, e);
+}
+
+vec2 df_add(vec2 a, vec2 b) {
+    vec2 s = two_sum(a.x, b.x);
+    vec2 t = two_sum(a.y, b.y);
+    s = quick_two_sum(s.x, s.y + t.x);
+    return quick_two_sum(s.x, s.y + t.y);
+}
+
+vec2 df_mul(vec2 a, vec2 b) {
+    vec2 p = two_prod(a.x, b.x);
+    PRECISE float t = a.x * b.y + a.y * b.x;
+    return quick_two_sum(p.x, p.y + t);
+}
+
+// Complex multiply on double-floats: xy = real part, zw = imaginary part
+vec4 df_cmul(vec4 a, vec4 b) {
+    return vec4(df_add(df_mul(a.xy, b.xy), -df_mul(a.zw, b.zw)),
+                df_add(df_mul(a.xy, b.zw), df_mul(a.zw, b.xy)));
+}
+#endif
+
+// Smooth iteration count for this pixel, or -1.0 inside the set
+float escape_value(vec2 pixel, vec2 c, float melt_factor) {
     c = mix(c, vec2(0.0), melt_factor);
 
     vec2 z = vec2(0.0);
     int iter = 0;
     
-    for(int i = 0; i < max_iter; i++) {
-        float r = length(z);
-        float theta = atan(z.y, z.x);
-        
-        r = pow(r, power);
-        theta = theta * power;
-        
-        z = vec2(r * cos(theta), r * sin(theta)) + c;
-        
-        if(dot(z, z) > 16.0) break; 
-        iter++;
+#if DEEP_ZOOM
+    if (deep_zoom_active == 1) {
+        // Perturbation: iterate only dz against the reference orbit Z (power 2).
+        // Rebase to Z_0 when |Z + dz| < |dz| or the orbit runs out.
+        vec2 dc = pixel / zoom + ref_delta;
+        dc = mix(dc, -ref_center, melt_factor);
+        vec2 dz = vec2(0.0);
+        int m = 0;
+
+        for(int i = 0; i < max_iter; i++) {
+            vec2 zr = ref_z(m);
+            vec2 t = 2.0 * zr + dz;
+            dz = vec2(t.x * dz.x - t.y * dz.y, t.x * dz.y + t.y * dz.x) + dc;
+            m++;
+            z = ref_z(m) + dz;
+
+            if(dot(z, z) > 16.0) break;
+            iter++;
+
+            if(dot(z, z) < dot(dz, dz) || m == ref_len - 1) {
+                dz = z;
+                m = 0;
+            }
+        }
+    } else
+#endif
+#if PRECISION == 1 && POWER != 0
+    {
+        // c = offset + pixel / zoom with the offset's low words kept. No bulb
+        // test: on c's high word it misfiles pixels along the boundary.
+        vec2 dc = pixel / zoom;
+        vec4 cd = vec4(df_add(vec2(offset.x, offset_lo.x), vec2(dc.x, 0.0)),
+                       df_add(vec2(offset.y, offset_lo.y), vec2(dc.y, 0.0)));
+        cd = vec4(df_mul(cd.xy, vec2(1.0 - melt_factor, 0.0)), df_mul(cd.zw, vec2(1.0 - melt_factor, 0.0)));
+        vec4 zd = vec4(0.0);
+        vec4 saved = vec4(0.0);
+        float cycle_eps = 1e-12 / (zoom * zoom); // Squared, scaled to the pixel size
+        int interval = 8;
+        int since = 0;
+        for(int i = 0; i < max_iter; i++) {
+            vec4 w = zd;
+            for(int k = 1; k < POWER; k++) {
+                w = df_cmul(w, zd);
+            }
+            zd = vec4(df_add(w.xy, cd.xy), df_add(w.zw, cd.zw));
+            z = zd.xz;
+
+            if(dot(z, z) > 16.0) break;
+            iter++;
+            vec2 d = vec2(df_add(zd.xy, -saved.xy).x, df_add(zd.zw, -saved.zw).x);
+            if (dot(d, d) < cycle_eps) return -1.0;
+            if (++since == interval) {
+                saved = zd;
+                since = 0;
+                interval *= 2;
+            }
+        }
     }
+#else
+    {
+#if POWER == 2
+        if (in_main_bulbs(c)) return -1.0;
+#endif
+#if POWER != 0
+        // Periodicity: an orbit that lands back on a saved point is a cycle.
+        // The save interval doubles so cycles of any length are caught.
+        // The match radius follows the pixel size, as in the double-float
+        // kernel: a fixed one covers whole pixels near float32's zoom limit
+        float cycle_eps = 1e-12 / (zoom * zoom); // Squared
+        vec2 saved = vec2(0.0);
+        int interval = 8;
+        int since = 0;
+#endif
+        for(int i = 0; i < max_iter; i++) {
+            z = advance(z, c);
+            
+            if(dot(z, z) > 16.0) break; 
+            iter++;
+#if POWER != 0
+            vec2 d = z - saved;
+            if (dot(d, d) < cycle_eps) return -1.0;
+            if (++since == interval) {
+                saved = z;
+                since = 0;
+                interval *= 2;
+            }
+#endif
+        }
+    }
+#endif
 
     if (iter == max_iter) {
-        fragColor = vec4(0.0, 0.0, 0.02, 1.0); 
+        return -1.0;
+    }
+    return float(iter) - log2(log2(max(dot(z, z), 0.00001))) + 4.0;
+}
+
+vec4 shade(float float_iter) {
+    if (float_iter < 0.0) {
+        return vec4(0.0, 0.0, 0.02, 1.0); 
+    }
+    float t = float_iter / float(color_iter);
+    vec3 base_color = vec3(0.5) + vec3(0.5) * cos(6.28318 * (vec3(1.0) * (t + time) + color_tint));
+    return vec4(base_color, 1.0);
+}
+
+// Temporal Reprojection: the previous frame's iteration buffer. Each texel is
+// x = smooth iteration count, yz = where it was sampled relative to the texel
+// centre (px), w = 1 + melt when recomputed that frame, 0 when reprojected.
+uniform sampler2D history;
+
+void main() {
+#if PASS == 2
+    fragColor = shade(texelFetch(history, ivec2(gl_FragCoord.xy), 0).x);
+#else
+    vec2 aspect = resolution / min(resolution.x, resolution.y);
+    vec2 pixel = (uv - 0.5) * aspect;
+    vec2 c = (pixel / zoom) + offset;
+    float melt_factor = melt_at(pixel / zoom);
+
+#if PASS == 1
+    // Reuse the previous frame's sample nearest to this pixel when it lies
+    // within u_warp.w pixels; recompute new, melted and stale pixels, plus one
+    // 1/period slice of the screen each frame so every pixel is refreshed. The
+    // slice is whole 8x8 tiles, so neighbouring invocations take the same branch.
+    ivec2 tile = ivec2(gl_FragCoord.xy) / 8;
+    bool fresh = melt_factor > 0.0 || u_refine.x == 0 || (tile.x + 3 * tile.y) % u_refine.y == u_refine.z;
+    vec2 sample_offset = vec2(0.0);
+    float value = 0.0;
+
+    if (!fresh) {
+        // Nearest usable sample among the 2x2 texels around this pixel's
+        // position in the previous frame
+        ivec2 size = textureSize(history, 0);
+        vec2 prev_xy = ((pixel * u_warp.z + u_warp.xy) / aspect + 0.5) * vec2(size);
+        ivec2 base = ivec2(floor(prev_xy - 0.5));
+        float best = u_warp.w;
+        fresh = true;
+        for(int i = 0; i < 4; i++) {
+            ivec2 texel = base + ivec2(i & 1, i >> 1);
+            if (any(lessThan(texel, ivec2(0))) || any(greaterThanEqual(texel, size))) continue;
+            vec4 prev = texelFetch(history, texel, 0);
+            vec2 offset_px = (vec2(texel) + 0.5 + prev.yz - prev_xy) / u_warp.z;
+            float error = length(offset_px);
+            if (prev.w <= 1.0 && error <= best) {
+                best = error;
+                sample_offset = offset_px;
+                value = prev.x;
+                fresh = false;
+            }
+        }
+    }
+
+    if (fresh) {
+        fragColor = vec4(escape_value(pixel, c, melt_factor), 0.0, 0.0, 1.0 + melt_factor);
     } else {
-        float float_iter = float(iter) - log2(log2(max(dot(z, z), 0.00001))) + 4.0;
-        float t = float_iter / float(max_iter);
-        vec3 base_color = vec3(0.5) + vec3(0.5) * cos(6.28318 * (vec3(1.0) * (t + time) + color_tint));
-        fragColor = vec4(base_color, 1.0);
+        fragColor = vec4(value, sample_offset, 0.0);
     }
+#else
+    fragColor = shade(escape_value(pixel, c, melt_factor));
+#endif
+#endif
 }
 #endif
\ No newline at end of file
@@ -0,0 +1,37 @@
+#version 330
+
+#if defined VERTEX_SHADER
+in vec3 in_position;
+in vec2 in_texcoord_0;
+out vec2 uv;
+
+void main() {
+    gl_Position = vec4(in_position, 1.0);
+    uv = in_texcoord_0;
+}
+#endif
+
+#if defined FRAGMENT_SHADER
+out vec4 fragColor;
+in vec2 uv;
+
+// Upscales the governor's reduced-resolution frame to the window with a
+// light sharpening pass (unsharp mask, clamped to the local min/max so it
+// cannot ring).
+uniform sampler2D scene;
+uniform float sharpness;
+
+void main() {
+    vec2 texel = 1.0 / vec2(textureSize(scene, 0));
+    vec3 c = texture(scene, uv).rgb;
+    vec3 n = texture(scene, uv + vec2(0.0, texel.y)).rgb;
+    vec3 s = texture(scene, uv - vec2(0.0, texel.y)).rgb;
+    vec3 e = texture(scene, uv + vec2(texel.x, 0.0)).rgb;
+    vec3 w = texture(scene, uv - vec2(texel.x, 0.0)).rgb;
+
+    vec3 lo = min(c, min(min(n, s), min(e, w)));
+    vec3 hi = max(c, max(max(n, s), max(e, w)));
+    vec3 sharpened = c + sharpness * (4.0 * c - n - s - e - w) * 0.25;
+    fragColor = vec4(clamp(sharpened, lo, hi), 1.0);
+}
+#endif
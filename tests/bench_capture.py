@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Frame-time cost of vision snapshots on a headless GL context: the fractal
+(fractal.glsl, PASS 0) rendered every frame while capturing at several rates,
+with engine.capture.FrameCapture (GPU downsample, pixel-pack buffer ring,
+encode on a worker thread) against the obvious synchronous version (read the
+full frame back in the frame, shrink and encode it there). Rates are per
+simulated second at 60 fps. Reports the whole frame and, separately, how long
+the render thread spent in the capture call. The scene is finished before
+that call: llvmpipe rasterises on the CPU at the first copy or read of the
+frame, which would bill the whole scene to whichever capture runs first. On
+a hardware GPU the synchronous read also waits there for the pipeline to
+drain, which this does not show.
+
+    python tests/bench_capture.py [--size 640x360] [--frames 120] [--max-iter 50] [--format JPEG]
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import moderngl
+import moderngl_window as mglw
+from PIL import Image
+from moderngl_window import resources
+from moderngl_window.meta import ProgramDescription
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.uniforms import UniformBuffer
+from engine.injections import InjectionPool
+from engine.capture import CaptureQueue, FrameCapture, capture_size
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATES = (0.0, 0.2, 1.0, 10.0, 60.0) # Captures per second, 60 = every frame
+
+
+def create_context():
+    try:
+        return moderngl.create_standalone_context(backend='egl')
+    except Exception:
+        return moderngl.create_standalone_context()
+
+
+class SyncCapture:
+    # The baseline: everything on the render thread, in the frame
+    def __init__(self, queue, width, format):
+        self.queue = queue
+        self.width = width
+        self.format = format
+        self.next_time = 0.0
+
+    def update(self, quad, source_fbo, interval, now):
+        if interval <= 0.0 or now < self.next_time:
+            return
+        self.next_time = now + interval
+        w, h = source_fbo.size
+        image = Image.frombytes('RGB', (w, h), source_fbo.read(components=3)).transpose(Image.FLIP_TOP_BOTTOM)
+        image = image.resize(capture_size((w, h), self.width), Image.BOX)
+        out = io.BytesIO()
+        image.save(out, self.format)
+        self.queue.put(out.getvalue())
+
+    def release(self):
+        pass
+
+
+def run(ctx, scene, size, frames, max_iter, capture, rate):
+    program, pool, uniforms, quad = scene
+    target = ctx.simple_framebuffer(size, components=3)
+    state = FractalState()
+    state.publish(offset_x=-0.743643887, offset_y=0.131825904, zoom=1.0, max_iter=max_iter)
+    interval = 1.0 / rate if rate > 0.0 else 0.0
+    frame_ms = []
+    capture_ms = []
+    for i in range(frames):
+        now = i / 60.0
+        snap = state.publish(zoom=state.zoom * 1.01)
+        uniforms.set('screen', *size)
+        uniforms.set('view', snap.offset_x, snap.offset_y, snap.zoom, now)
+        uniforms.update_from_snapshot(snap)
+        uniforms.upload()
+        pool.use()
+        t0 = time.perf_counter()
+        target.use()
+        quad.render(program)
+        ctx.finish()
+        t1 = time.perf_counter()
+        capture.update(quad, target, interval, now)
+        capture_ms.append((time.perf_counter() - t1) * 1000.0)
+        ctx.finish() # Stands in for the buffer swap
+        frame_ms.append((time.perf_counter() - t0) * 1000.0)
+    capture.release()
+    target.release()
+    return np.array(frame_ms[10:]), np.array(capture_ms[10:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="640x360", help="Render size WxH")
+    parser.add_argument("--frames", type=int, default=120, help="Frames per run")
+    parser.add_argument("--max-iter", type=int, default=50, help="Fractal iterations (scene cost)")
+    parser.add_argument("--format", default="JPEG", choices=("JPEG", "PNG"))
+    parser.add_argument("--width", type=int, default=256, help="Snapshot width")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    ctx = create_context()
+    mglw.activate_context(ctx=ctx)
+    resources.register_dir(ROOT)
+    pool = InjectionPool(ctx, sdf_cache=None)
+    program = resources.programs.load(ProgramDescription(path='shaders/fractal.glsl', defines={'PASS': '0'}))
+    pool.attach(program, texture_location=0, block_binding=0)
+    program['ref_orbit'].value = 1
+    uniforms = UniformBuffer(ctx, program)
+    scene = (program, pool, uniforms, mglw.geometry.quad_fs())
+    downsample = resources.programs.load(ProgramDescription(path='shaders/downsample.glsl'))
+
+    print("=" * 78)
+    print(f"  {size[0]}x{size[1]}, max_iter {args.max_iter}, {args.width}px {args.format} snapshots, "
+          f"{args.frames} frames per run (ms)")
+    print("=" * 78)
+    print(f"  {'':>6}  {'async':^29}  {'sync':^29}")
+    print(f"  {'per s':>6}  {'frame':>6} {'p99':>6} {'in call':>7} {'max':>7}"
+          f"  {'frame':>6} {'p99':>6} {'in call':>7} {'max':>7}  {'delivered':>9}")
+    for rate in RATES:
+        queue = CaptureQueue(maxlen=1000)
+        fast = FrameCapture(ctx, downsample, queue, args.width, args.format)
+        frame, call = run(ctx, scene, size, args.frames, args.max_iter, fast, rate)
+        baseline = SyncCapture(CaptureQueue(maxlen=1000), args.width, args.format)
+        sync_frame, sync_call = run(ctx, scene, size, args.frames, args.max_iter, baseline, rate)
+        print(f"  {rate:6.1f}  {frame.mean():6.2f} {np.percentile(frame, 99):6.2f} {call.mean():7.3f} {call.max():7.2f}"
+              f"  {sync_frame.mean():6.2f} {np.percentile(sync_frame, 99):6.2f} {sync_call.mean():7.3f} "
+              f"{sync_call.max():7.2f}  {queue.delivered:9d}")
+
+
+if __name__ == "__main__":
+    main()
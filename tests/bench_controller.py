@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+End to end llm_logic/controller.py against the local stand-in model
+(llm_logic/standin_server.py): decisions per second and wake-ups coalesced
+for several model latencies, and whether a busy controller disturbs a render
+loop on another thread (frame time percentiles, controller off vs. on).
+
+    python tests/bench_controller.py [--seconds 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from llm_logic.controller import LlmController
+from llm_logic.standin_server import StandinServer
+
+
+def drive(state, seconds):
+    # A heart rate that keeps changing, so every decision has something to send
+    t0 = time.perf_counter()
+    k = 0
+    while time.perf_counter() - t0 < seconds:
+        state.current_hr = 60 + k % 30
+        k += 1
+        time.sleep(0.005)
+
+
+def render_loop(state, seconds):
+    # Per-frame work shaped like on_render: tween step, snapshot, some numpy
+    frame = np.zeros((270, 480), np.float32)
+    times = []
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        s = time.perf_counter()
+        state.tweens.step(s)
+        snap = state.snapshot()
+        frame *= 0.5
+        frame += snap.color_r
+        times.append(time.perf_counter() - s)
+        time.sleep(max(0.0, 1.0 / 120.0 - (time.perf_counter() - s)))
+    return np.array(times) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Seconds per measurement")
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print("  LLM controller vs. stand-in model, waking every 10 ms")
+    print("=" * 64)
+    print(f"  {'latency':>8} {'decisions/s':>12} {'coalesced':>10} {'tools':>6} {'in flight':>10}")
+    for latency in (0.0, 0.05, 0.25, 1.0):
+        server = StandinServer(latency=latency).start()
+        state = FractalState()
+        c = LlmController(state, server.url, interval=0.01).start()
+        drive(state, args.seconds)
+        c.stop()
+        server.stop()
+        print(f"  {latency:7.2f}s {c.counters['requests'] / args.seconds:12.1f} "
+              f"{c.counters['coalesced']:10d} {c.counters['tool_calls']:6d} {server.max_active:10d}")
+
+    print()
+    print("  Render loop frame time (ms), 120 Hz target")
+    print(f"  {'controller':>10} {'p50':>7} {'p99':>7} {'max':>7}")
+    for on in (False, True):
+        state = FractalState()
+        server = c = None
+        if on:
+            # Worst case: no model latency, so the controller never idles
+            server = StandinServer(latency=0.0).start()
+            c = LlmController(state, server.url, interval=0.01).start()
+        driver = threading.Thread(target=drive, args=(state, args.seconds), daemon=True)
+        driver.start()
+        times = render_loop(state, args.seconds)
+        driver.join()
+        if on:
+            c.stop()
+            server.stop()
+        print(f"  {'on' if on else 'off':>10} {np.percentile(times, 50):7.3f} "
+              f"{np.percentile(times, 99):7.3f} {times.max():7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the headless CPU renderer.
+Reports pixels*iterations per second for a few scenes and pool sizes, and
+optionally writes each frame to disk as an offline render.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.cpu_renderer import CpuRenderer, frame_uniforms
+from engine.state import FractalState
+
+SCENES = {
+    "overview": {},
+    "seahorse": {"offset_x": -0.7436, "offset_y": 0.1318, "zoom": 400.0, "max_iter": 300},
+    "power_3_3": {"power": 3.3, "zoom": 1.6, "offset_x": -0.2},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", default="640x360")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--save", metavar="DIR", help="write each frame as PNG")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    print("=" * 64)
+    print(f"  CPU reference renderer  ({width}x{height})")
+    print("=" * 64)
+    print(f"{'scene':>12}  {'workers':>7}  {'frame':>9}  {'Mpix*iter/s':>12}")
+
+    for name, fields in SCENES.items():
+        state = FractalState()
+        for key, value in fields.items():
+            setattr(state, key, value)
+        u = frame_uniforms(state, width, height, elapsed=0.0)
+
+        for workers in sorted(set(args.workers)):
+            with CpuRenderer(workers=workers) as renderer:
+                renderer.render(u) # warm up the pool
+                t0 = time.perf_counter()
+                frame = renderer.render(u)
+                dt = time.perf_counter() - t0
+            print(f"{name:>12}  {workers:>7}  {dt * 1e3:7.1f}ms  {renderer.last_work / dt / 1e6:12.1f}")
+
+        if args.save:
+            from PIL import Image
+            os.makedirs(args.save, exist_ok=True)
+            Image.fromarray(frame).save(os.path.join(args.save, f"{name}.png"))
+
+
+if __name__ == "__main__":
+    main()
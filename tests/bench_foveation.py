@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Foveated rendering savings: drives the real FractalRenderer on a headless
+window at 1080p and 4K and times full frames against foveated ones
+(engine/foveation.py) with the fixation at the centre and near a corner, at
+the default fovea radius. Also reports the fragment and iteration work the
+layers plan for, as fractions of one full frame. Times are wall time of
+on_render() plus glFinish, so they include the GPU work.
+
+    python tests/bench_foveation.py [--frames 5] [--max-iter 500] [--sizes 1920x1080 3840x2160]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.foveation import foveated_work
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXATIONS = {"centre": (0.5, 0.5), "corner": (0.15, 0.2)}
+
+
+def create_renderer(size):
+    import moderngl_window as mglw
+    from moderngl_window.conf import settings
+    from engine.state import FractalState
+    from engine.renderer import FractalRenderer
+
+    settings.WINDOW['class'] = 'moderngl_window.context.headless.Window'
+    settings.WINDOW['size'] = size
+    settings.WINDOW['backend'] = 'egl'
+    mglw.settings.RESOURCE_DIRS = [ROOT]
+    FractalRenderer.state = FractalState()
+    FractalRenderer.window_size = size
+    window = mglw.create_window_from_settings()
+    app = FractalRenderer(ctx=window.ctx, wnd=window, timer=None)
+    window.config = app
+    return window, app
+
+
+def frame(window, app):
+    t0 = time.perf_counter()
+    window.clear()
+    app.on_render(time.perf_counter(), 1.0 / 60.0)
+    window.ctx.finish()
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def measure(window, app, frames, **fields):
+    app.state.publish(**fields)
+    frame(window, app)
+    return float(np.median([frame(window, app) for _ in range(frames)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=5, help="Timed frames per case")
+    parser.add_argument("--max-iter", type=int, default=500)
+    parser.add_argument("--sizes", nargs="+", default=["1920x1080", "3840x2160"])
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"  Foveated rendering, max_iter {args.max_iter}, median of {args.frames} frames")
+    print("=" * 78)
+    print(f"  {'size':<10} {'fixation':<8} {'fragments':>9} {'iters':>7} {'frame ms':>9} {'full ms':>8} {'speedup':>8}")
+    for text in args.sizes:
+        size = tuple(int(v) for v in text.split("x"))
+        window, app = create_renderer(size)
+        state = app.state
+        state.publish(zoom_speed=0.0, governor_enabled=False, reproject=False, use_eye_tracker=False,
+                      offset_x=-0.7436439, offset_y=0.1318259, zoom=400.0, max_iter=args.max_iter)
+        while app.programs.queue:
+            frame(window, app)
+        full = measure(window, app, args.frames, foveated=False)
+        for name, (x, y) in FIXATIONS.items():
+            app.mouse = (x, y)
+            ms = measure(window, app, args.frames, foveated=True)
+            radius = state.fovea_radius * size[1]
+            fragments, budget = foveated_work(size, (x * size[0], (1.0 - y) * size[1]), radius)
+            print(f"  {text:<10} {name:<8} {fragments * 100:8.1f}% {budget * 100:6.1f}% {ms:9.1f} "
+                  f"{full:8.1f} {full / ms:7.2f}x")
+        app.on_close()
+        window.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Latency and jitter of the gaze pipeline (biometrics/gaze.py) against the old
+fixed 0.15 exponential smoothing, on SyntheticGaze ground truth. Samples arrive
+at the tracker rate; a 60 Hz renderer takes the newest state at the start of
+each frame, and the frame is on screen --latency-ms later. Compared with where
+the eye really is at that moment:
+
+  fixation        : RMS error once a fixation has settled (noise that leaks through)
+  pursuit error   : RMS error while following a moving target
+  saccade landing : time from the end of a saccade until the anchor is within
+                    2% of the screen of the new target
+
+Also times the per-sample cost of reading a sample's coordinates (the old
+hasattr probes against the accessor resolved once) and of the whole callback.
+
+    python tests/bench_gaze.py [--seconds 300] [--latency-ms 25]
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.gaze import GazePipeline, OneEuroFilter, SyntheticGaze, predict_gaze, resolve_accessor
+from engine.state import FractalState
+
+FRAME_RATE = 60.0
+LANDED = 0.02
+SETTLE = 0.15 # Fixation jitter counts once the anchor has had this long to land
+
+
+class SimClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def old_smoothing(state, x, y, smoothing=0.15):
+    # What tobii_worker did before GazePipeline
+    state.publish(gaze_x=(1.0 - smoothing) * state.gaze_x + (smoothing * x),
+                  gaze_y=(1.0 - smoothing) * state.gaze_y + (smoothing * y))
+
+
+def simulate(source, seconds, latency, mode):
+    # Feed samples and render frames in simulated time; returns the metrics
+    state = FractalState()
+    clock = SimClock()
+    pipeline = GazePipeline(state, OneEuroFilter(), clock=clock)
+    samples = list(source.samples(seconds))
+    frame_dt = 1.0 / FRAME_RATE
+    k = 0
+    fix_err = []
+    pursuit_err = []
+    landings = []
+    pending = None # (target, saccade end) waiting for the anchor to land
+    t = 0.0
+    while t < seconds:
+        while k < len(samples) and samples[k][0] <= t:
+            ts, x, y = samples[k]
+            clock.t = ts
+            if mode == 'old':
+                if x == x: # The old callback had no notion of lost samples either way
+                    old_smoothing(state, x, y)
+            else:
+                pipeline.push(x, y)
+            k += 1
+        snap = state.snapshot()
+        present = t + latency
+        if mode == 'predict':
+            gx, gy = predict_gaze(snap, present)
+        else:
+            gx, gy = snap.gaze_x, snap.gaze_y
+        tx, ty = source.truth(present)
+        err = math.hypot(gx - tx, gy - ty)
+        t0, t1, kind, params = source.segment(present)
+        if kind == 'fix' and present - t0 > SETTLE:
+            fix_err.append(err)
+        elif kind == 'pursuit':
+            pursuit_err.append(err)
+        if kind == 'saccade' and (pending is None or pending[1] != t1):
+            pending = ((params[2], params[3]), t1)
+        if pending is not None and present >= pending[1]:
+            target, end = pending
+            if math.hypot(gx - target[0], gy - target[1]) < LANDED:
+                landings.append(present - end)
+                pending = None
+            elif present - end > 0.5:
+                pending = None # Never landed (next movement started); not counted
+        t += frame_dt
+
+    rms = lambda v: math.sqrt(sum(e * e for e in v) / max(len(v), 1))
+    landings.sort()
+    return {
+        'fix': rms(fix_err),
+        'pursuit': rms(pursuit_err),
+        'landing': sum(landings) / max(len(landings), 1),
+        'landing_p90': landings[int(0.9 * (len(landings) - 1))] if landings else float('nan'),
+        'landed': len(landings),
+    }
+
+
+class PositionXY:
+    def __init__(self, x, y):
+        self.position_xy = (x, y)
+
+
+def old_callback(state):
+    def on_gaze_point(timestamp, gaze_point):
+        if hasattr(gaze_point, 'position_xy'):
+            if hasattr(gaze_point.position_xy, 'x'):
+                raw_x = gaze_point.position_xy.x
+                raw_y = gaze_point.position_xy.y
+            else:
+                raw_x = gaze_point.position_xy[0]
+                raw_y = gaze_point.position_xy[1]
+        else:
+            raw_x = gaze_point.x
+            raw_y = gaze_point.y
+        old_smoothing(state, raw_x, raw_y)
+    return on_gaze_point
+
+
+def probe(gaze_point):
+    if hasattr(gaze_point, 'position_xy'):
+        if hasattr(gaze_point.position_xy, 'x'):
+            return gaze_point.position_xy.x, gaze_point.position_xy.y
+        return gaze_point.position_xy[0], gaze_point.position_xy[1]
+    return gaze_point.x, gaze_point.y
+
+
+def timed(fn, samples):
+    t0 = time.perf_counter()
+    for i, s in enumerate(samples):
+        fn(s, i / 90.0)
+    return (time.perf_counter() - t0) / len(samples)
+
+
+def per_sample_cost(n=50000):
+    samples = [PositionXY(0.5 + 0.001 * (i % 7), 0.5) for i in range(n)]
+    accessor = resolve_accessor(samples[0])
+    layout = (timed(lambda s, t: probe(s), samples), timed(lambda s, t: accessor(s), samples))
+    callback = old_callback(FractalState())
+    old = timed(lambda s, t: callback(t, s), samples)
+    new = timed(GazePipeline(FractalState()).on_sample, samples)
+    return layout, (old, new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=300.0, help="Simulated gaze to replay")
+    parser.add_argument("--latency-ms", type=float, default=25.0, help="Frame start to on screen")
+    parser.add_argument("--rate", type=float, default=90.0, help="Tracker sample rate (Hz)")
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000.0
+
+    print("=" * 76)
+    print(f"  Gaze anchor vs ground truth: {args.seconds:.0f}s at {args.rate:.0f} Hz, "
+          f"{FRAME_RATE:.0f} fps, {args.latency_ms:.0f}ms to screen")
+    print("=" * 76)
+    print(f"  {'':26} {'fixation':>10} {'pursuit':>9} {'landing':>9} {'p90':>8}")
+    for mode, label in (('old', "EMA 0.15 (before)"), ('filter', "One-Euro"),
+                        ('predict', "One-Euro + prediction")):
+        m = simulate(SyntheticGaze(rate=args.rate, seed=1), args.seconds, latency, mode)
+        print(f"  {label:26} {m['fix'] * 100:9.2f}% {m['pursuit'] * 100:8.2f}% "
+              f"{m['landing'] * 1000:7.0f}ms {m['landing_p90'] * 1000:6.0f}ms   ({m['landed']} saccades)")
+    print("  (errors in % of screen size, RMS)")
+
+    layout, callback = per_sample_cost()
+    print(f"  sample layout : hasattr probes {layout[0] * 1e6:.2f}us, resolved accessor {layout[1] * 1e6:.2f}us")
+    print(f"  whole callback: EMA + publish {callback[0] * 1e6:.2f}us, "
+          f"GazePipeline (ring, One-Euro, velocity fit, publish) {callback[1] * 1e6:.2f}us")
+
+
+if __name__ == "__main__":
+    main()
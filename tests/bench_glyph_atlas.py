@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Phrase-to-texture latency: exact create_text_sdf (rasterise + two EDTs per
+phrase) versus compositing from the precomputed glyph atlas, for batches
+of 1, 10 and 100 phrases.
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.glyph_atlas import GlyphAtlas
+from engine.sdf_maker import create_text_sdf
+
+WORDS = ["BREATHE", "slow", "down", "you", "are", "safe", "let", "go", "calm",
+         "soft", "light", "rest", "HERE", "now", "warm", "deep", "flow"]
+
+
+def phrases(n, seed=1):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) for _ in range(n)]
+
+
+def main():
+    print("=" * 64)
+    print("  Phrase -> SDF texture latency (1024x512, font_size=150)")
+    print("=" * 64)
+
+    t0 = time.perf_counter()
+    atlas = GlyphAtlas().build()
+    print(f"  atlas build (once per font): {(time.perf_counter() - t0) * 1e3:.0f}ms, "
+          f"{atlas.atlas.shape[1]}x{atlas.atlas.shape[0]}, {len(atlas.glyphs)} glyphs\n")
+
+    print(f"{'phrases':>8}  {'exact EDT':>11}  {'atlas':>9}  {'speedup':>8}  {'edge agree':>10}")
+    for n in (1, 10, 100):
+        batch = phrases(n)
+
+        t0 = time.perf_counter()
+        exact = [create_text_sdf(text)[0] for text in batch]
+        t_exact = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fast = [atlas.compose(text)[0] for text in batch]
+        t_atlas = time.perf_counter() - t0
+
+        # Fraction of pixels on the same side of the glyph edge
+        agree = np.mean([(np.frombuffer(a, np.uint8) > 128) == (np.frombuffer(b, np.uint8) > 128)
+                         for a, b in zip(exact, fast)])
+        print(f"{n:>8}  {t_exact * 1e3:9.1f}ms  {t_atlas * 1e3:7.1f}ms  "
+              f"{t_exact / t_atlas:7.1f}x  {agree * 100:9.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Convergence of the frame-time governor (engine/governor.py) on a simulated
+GPU: a frame costs its full-quality time times scale^2 (pixels) times the
+iteration fraction, plus noise. The load steps from light to heavy and back;
+for each phase the benchmark reports the frames until the frame time settles
+inside the budget, the decisions taken, reversals (a step up straight after
+a step down, or the reverse) and where scale and iterations end up.
+
+    python tests/bench_governor.py [--budget 16] [--loads 8 40 120 8] [--frames 600]
+"""
+
+import os
+import sys
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.governor import FrameGovernor
+
+
+def taken(governor):
+    # Decisions so far
+    return sum(v for k, v in governor.counters.items() if k != 'samples')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=16.0, help="Frame budget (ms)")
+    parser.add_argument("--loads", nargs="+", type=float, default=[8.0, 40.0, 120.0, 8.0],
+                        help="Full-quality GPU frame time (ms) of each phase")
+    parser.add_argument("--frames", type=int, default=600, help="Frames per phase")
+    parser.add_argument("--noise", type=float, default=0.05, help="Relative frame-time jitter")
+    args = parser.parse_args()
+    rng = random.Random(1)
+    governor = FrameGovernor(budget_ms=args.budget)
+
+    print("=" * 78)
+    print(f"  Frame governor, {args.budget:g} ms budget, {args.frames} frames per phase")
+    print("=" * 78)
+    print(f"  {'load ms':>8} {'settled':>8} {'decisions':>10} {'reversals':>10} {'scale':>6} "
+          f"{'iters':>6} {'final ms':>9}")
+    for load in args.loads:
+        settled = None
+        decisions, reversals = 0, 0
+        last = None
+        for frame in range(args.frames):
+            gpu_ms = load * governor.scale ** 2 * governor.iter_fraction * (1.0 + rng.gauss(0.0, args.noise))
+            before = taken(governor)
+            governor.update(gpu_ms)
+            if taken(governor) != before:
+                decisions += 1
+                direction = governor.last_decision.endswith('_up')
+                reversals += last is not None and direction != last
+                last = direction
+                settled = None
+            elif settled is None and gpu_ms <= args.budget * 1.05:
+                settled = frame
+        final = load * governor.scale ** 2 * governor.iter_fraction
+        print(f"  {load:8.1f} {'-' if settled is None else settled:>8} {decisions:10d} {reversals:10d} "
+              f"{governor.scale:6.2f} {governor.iter_fraction:6.2f} {final:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
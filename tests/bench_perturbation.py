@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Headless check + benchmark for the deep-zoom perturbation path.
+Compares iteration counts from engine.perturbation against plain float64
+iteration at zooms where float64 is still exact, then times both.
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.perturbation import (
+    compute_reference_orbit, iterate_direct, pixel_deltas,
+    precision_for_zoom, render_iterations,
+)
+
+# Seahorse valley: boundary detail all the way down
+CENTER_X = -0.743643887037151
+CENTER_Y = 0.131825904205330
+WIDTH, HEIGHT = 320, 180
+MAX_ITER = 500
+
+
+def main():
+    print("=" * 60)
+    print("  Perturbation vs direct float64  "
+          f"({WIDTH}x{HEIGHT}, max_iter={MAX_ITER})")
+    print("=" * 60)
+    print(f"{'zoom':>8}  {'match':>7}  {'orbit':>8}  {'direct':>8}  {'perturb':>8}")
+
+    for zoom in (1e2, 1e4, 1e6, 1e8, 1e10):
+        t0 = time.perf_counter()
+        ref = compute_reference_orbit(CENTER_X, CENTER_Y, MAX_ITER, precision_for_zoom(zoom))
+        t_orbit = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        direct, _ = iterate_direct(pixel_deltas(WIDTH, HEIGHT, zoom) + complex(CENTER_X, CENTER_Y), MAX_ITER)
+        t_direct = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        perturbed = render_iterations(CENTER_X, CENTER_Y, zoom, WIDTH, HEIGHT, MAX_ITER, ref=ref)
+        t_perturb = time.perf_counter() - t0
+
+        match = (direct == perturbed).mean() * 100.0
+        print(f"{zoom:8.0e}  {match:6.2f}%  {t_orbit * 1e3:6.1f}ms  "
+              f"{t_direct * 1e3:6.1f}ms  {t_perturb * 1e3:6.1f}ms")
+
+    # At 1e14 float64 pixels collapse into blocks; perturbation still resolves them.
+    # The anchor needs more digits than a float holds, so it is passed as strings.
+    deep_x = "-0.7436438870371587047521915061147740"
+    deep_y = "0.1318259042053119704931320563851390"
+    zoom, max_iter = 1e14, 5000
+    w, h = WIDTH // 2, HEIGHT // 2
+
+    direct, _ = iterate_direct(pixel_deltas(w, h, zoom) + complex(float(deep_x), float(deep_y)), max_iter)
+    t0 = time.perf_counter()
+    perturbed = render_iterations(deep_x, deep_y, zoom, w, h, max_iter)
+    t_deep = time.perf_counter() - t0
+    print(f"\nzoom {zoom:.0e}, max_iter={max_iter}: distinct iteration counts "
+          f"direct={len(set(direct.ravel().tolist()))}  "
+          f"perturbed={len(set(perturbed.ravel().tolist()))}  ({t_deep * 1e3:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Decode rate of biometrics/pmd.py on synthetic Polar PMD frames: H10 ECG
+(raw, 73 samples at 130 Hz) and accelerometer (delta compressed, 36 samples
+at 200 Hz), against a straightforward per-sample Python decoder of the same
+frames. Then the full path into the ring buffers (and a recording), and the
+fake strap streaming HR + ECG + ACC through PolarWorker as fast as it can.
+
+    python tests/bench_pmd.py [--seconds 3]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.pmd import ACC, COMPRESSED, ECG, H10_SETTINGS, HEADER, PmdDecoder, decode_frame
+from biometrics.polar_worker import FakePolarBackend, PolarWorker
+from engine.recorder import start_recording, stop_recording
+from engine.state import FractalState
+
+
+def decode_reference(data, settings):
+    # Sample by sample, bit by bit: what the decoder would be without arrays
+    channels = settings.channels
+    frame_type = data[9]
+    o = HEADER
+
+    def signed(value, bits):
+        return value - (1 << bits) if value >> (bits - 1) else value
+
+    if not frame_type & COMPRESSED:
+        size = 3 if data[0] == ECG else (settings.resolution + 7) // 8
+        out = []
+        while o + size * channels <= len(data):
+            out.append([signed(int.from_bytes(data[o + c * size:o + (c + 1) * size], 'little'), size * 8)
+                        for c in range(channels)])
+            o += size * channels
+        return out
+    size = (settings.resolution + 7) // 8
+    sample = [signed(int.from_bytes(data[o + c * size:o + (c + 1) * size], 'little'), size * 8)
+              for c in range(channels)]
+    out = [sample]
+    o += size * channels
+    while o + 2 <= len(data):
+        bits, count = data[o], data[o + 1]
+        o += 2
+        pos = 0
+        for _ in range(count):
+            sample = list(sample)
+            for c in range(channels):
+                value = 0
+                for b in range(bits):
+                    bit = pos + b
+                    value |= ((data[o + bit // 8] >> (bit % 8)) & 1) << b
+                sample[c] += signed(value, bits)
+                pos += bits
+            out.append(sample)
+        o += (pos + 7) // 8
+    return out
+
+
+def frames(kind, seconds):
+    # A fake H10's frames of one kind over `seconds`
+    backend = FakePolarBackend(seed=1)
+    backend.packet(backend.sim_time + seconds) # Beats for the ECG waveform
+    settings = {kind: H10_SETTINGS[kind]}
+    backend.pmd_time = {kind: backend.sim_time}
+    return [frame for _, frame in backend.pmd_frames(backend.sim_time + seconds, settings)]
+
+
+def per_frame(fn, batch, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for frame in batch:
+            fn(frame)
+        best = min(best, (time.perf_counter() - t0) / len(batch))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Wall time for the fake strap run")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print("  Polar PMD decoding")
+    print("=" * 72)
+    print(f"  {'stream':24} {'frame':>9} {'us/frame':>9} {'Msamples/s':>11} {'x realtime':>11}")
+    for kind, name in ((ECG, "H10 ECG 130 Hz (raw)"), (ACC, "H10 ACC 200 Hz (delta)")):
+        settings = H10_SETTINGS[kind]
+        batch = frames(kind, 60.0)
+        n = sum(len(decode_frame(f, settings)[2]) for f in batch) / len(batch)
+        for f in batch[:20]:
+            assert decode_reference(f, settings) == decode_frame(f, settings)[2].tolist()
+        for label, fn in (("numpy", lambda f: decode_frame(f, settings)),
+                          ("per sample", lambda f: decode_reference(f, settings))):
+            dt = per_frame(fn, batch)
+            print(f"  {name if label == 'numpy' else '  ' + label:24} {len(batch[0]):7d} B "
+                  f"{dt * 1e6:9.1f} {n / dt / 1e6:11.2f} {n / dt / settings.rate:11.0f}")
+
+    # Decode + timing + ring buffer write, without and with a recording
+    batch = [(ECG, f) for f in frames(ECG, 60.0)] + [(ACC, f) for f in frames(ACC, 60.0)]
+    root = tempfile.mkdtemp(prefix="fractal-pmd-")
+    try:
+        for recording in (False, True):
+            state = FractalState()
+            if recording:
+                start_recording(state, root)
+            clock = iter(np.arange(len(batch) * 3) * 1e-3)
+            decoder = PmdDecoder(state, H10_SETTINGS, clock=lambda: next(clock))
+            dt = per_frame(lambda f: decoder.on_data(None, f[1]), batch)
+            if recording:
+                stop_recording(state)
+            print(f"  PmdDecoder.on_data {'(recording)' if recording else '':12}: {dt * 1e6:6.1f}us/frame, "
+                  f"{decoder.samples / 3 / (dt * len(batch)) / 1e6:.2f} Msamples/s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    # Everything the fake strap sends, through the worker's asyncio loop
+    state = FractalState()
+    backend = FakePolarBackend(speed=0) # No sleeping: as fast as possible
+    worker = PolarWorker(state, backend).start()
+    time.sleep(0.2)
+    packets, samples = worker.packets, worker.pmd.samples
+    t0 = time.perf_counter()
+    time.sleep(args.seconds)
+    elapsed = time.perf_counter() - t0
+    packets, samples = worker.packets - packets, worker.pmd.samples - samples
+    worker.stop()
+    print(f"  fake H10 end to end      : {packets / elapsed:6.0f} simulated s per s "
+          f"({samples / elapsed / 1e3:.0f}k PMD samples/s, {worker.pmd.errors} errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Load test for biometrics/polar_worker.py without a strap: FakePolarBackend
+replays Heart Rate Measurement packets as fast as the worker's asyncio loop
+takes them, while this thread reads the ring buffer like a renderer would.
+Reports packets/s, parse cost per packet and whether memory grows over a
+simulated multi-hour session.
+
+    python tests/bench_polar_worker.py [--seconds 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.polar_worker import FakePolarBackend, PolarWorker, parse_hr_measurement
+from biometrics.ring_buffer import TimedRingBuffer
+from engine.state import FractalState
+
+
+def parse_cost(n=200000):
+    buf = TimedRingBuffer(4096)
+    packet = bytearray([0x10, 64, 0xC0, 0x03, 0xB0, 0x03])
+    t0 = time.perf_counter()
+    for _ in range(n):
+        parse_hr_measurement(packet, 1.0, buf)
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Wall time to stream for")
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print("  Polar worker load test (fake strap, no hardware)")
+    print("=" * 64)
+    print(f"  parse_hr_measurement : {parse_cost() * 1e6:6.2f}us/packet (2 RR beats)")
+
+    state = FractalState()
+    backend = FakePolarBackend(speed=0) # speed 0: no sleeping, as fast as possible
+    tracemalloc.start()
+    worker = PolarWorker(state, backend).start()
+    time.sleep(0.5)
+    base, _ = tracemalloc.get_traced_memory()
+    base_packets = worker.packets
+
+    reads = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < args.seconds:
+        state.rr_intervals.latest(64) # Reader on another thread, as a frame would
+        reads += 1
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    worker.stop()
+    tracemalloc.stop()
+
+    packets = worker.packets - base_packets
+    hours = packets / 3600.0 # One packet per simulated second
+    print(f"  streamed             : {packets / elapsed:8.0f} packets/s "
+          f"({hours:.1f} simulated hours, {state.rr_intervals.count} beats)")
+    print(f"  ring buffer          : {len(state.rr_intervals)} / {state.rr_intervals.capacity} slots")
+    print(f"  reader               : {reads} reads of the newest 64 beats")
+    print(f"  traced memory change : {(current - base) / 1024.0:+8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cost versus depth of each rung of the precision ladder (engine/precision.py)
+on the CPU reference path: a small frame of the seahorse valley at growing
+zoom, iterated as float32, double-float (float32 pairs, the GPU kernel's
+arithmetic), float64, double-double (float64 pairs) and with perturbation,
+which is exact at any depth and is the reference. Reports time per pixel
+iteration and how many pixels each rung gets right.
+
+    python tests/bench_precision.py [--size 64x36] [--zooms 1e2 1e4 ... 1e14]
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.perturbation import compute_reference_orbit, iterate_direct, iterate_perturbed, pixel_deltas, precision_for_zoom
+from engine.precision import iterate_double, pixel_coordinates
+
+CENTER = (Decimal("-0.743643887037158704752191506114774"), Decimal("0.131825904205311970493132056385139"))
+RUNGS = ("float32", "double-float", "float64", "double-double", "perturbation")
+
+
+def max_iter_for(zoom):
+    # Orbits near the boundary get longer with depth
+    return int(1000 + 700 * math.log10(zoom))
+
+
+def run(rung, pixel, zoom, max_iter):
+    x, y = float(CENTER[0]), float(CENTER[1])
+    lo = (float(CENTER[0] - Decimal(x)), float(CENTER[1] - Decimal(y)))
+    if rung == "float32":
+        return iterate_direct((pixel / zoom + complex(x, y)).astype(np.complex64), max_iter)[0]
+    if rung == "float64":
+        return iterate_direct(pixel / zoom + complex(x, y), max_iter)[0]
+    if rung in ("double-float", "double-double"):
+        dtype = np.float32 if rung == "double-float" else np.float64
+        cx, cy = pixel_coordinates((x, y), lo, pixel, zoom, dtype=dtype)
+        return iterate_double(cx, cy, 2, max_iter)[0]
+    ref = compute_reference_orbit(CENTER[0], CENTER[1], max_iter, precision_for_zoom(zoom))
+    return iterate_perturbed(pixel / zoom, ref, max_iter)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="64x36")
+    parser.add_argument("--zooms", nargs="+", type=float, default=[1e2, 1e4, 1e6, 1e8, 1e10, 1e12, 1e14])
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+    pixel = pixel_deltas(width, height, 1.0)
+
+    print("=" * 78)
+    print(f"  Precision ladder on the CPU, {width}x{height}: ns per pixel iteration / % pixels exact")
+    print("=" * 78)
+    print(f"  {'zoom':>7} {'iters':>6} " + " ".join(f"{r:>16}" for r in RUNGS))
+    for zoom in args.zooms:
+        max_iter = max_iter_for(zoom)
+        results = {}
+        for rung in RUNGS:
+            t0 = time.perf_counter()
+            iters = run(rung, pixel, zoom, max_iter)
+            seconds = time.perf_counter() - t0
+            work = max(1, int(np.minimum(iters + 1, max_iter).sum()))
+            results[rung] = (iters, seconds * 1e9 / work)
+        reference = results["perturbation"][0]
+        cells = [f"{ns:7.0f} / {np.mean(iters == reference) * 100:5.1f}%" for iters, ns in results.values()]
+        print(f"  {zoom:7.0e} {max_iter:6d} " + " ".join(f"{c:>16}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Cost of engine/recorder.py on the paths it hooks, and what a recording is good
+for afterwards. Times the gaze callback, the Polar packet handler and
+FractalState.publish with and without a recorder attached, raw append rates,
+replay speed of a synthetic hour (gaze at 90 Hz, frames at 60 Hz, beats and UI
+edits), and an offline HRV pass over several recorded days read in chunks
+from the memory-mapped files.
+
+    python tests/bench_recorder.py [--days 3] [--dir /tmp/fractal-bench]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.recorder import SessionReader, SessionReplayer, start_recording, stop_recording
+from engine.state import FractalState
+from biometrics.gaze import GazePipeline, SyntheticGaze
+from biometrics.hrv import HrvEngine
+from biometrics.polar_worker import FakePolarBackend, PolarWorker
+
+PACKET = bytearray([0x10, 64, 0xC0, 0x03, 0xB0, 0x03])
+
+
+def per_call(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def hook_costs(root, n=100000):
+    rows = []
+    for recording in (False, True):
+        state = FractalState()
+        recorder = start_recording(state, root) if recording else None
+        pipeline = GazePipeline(state)
+        worker = PolarWorker(state, FakePolarBackend())
+        gaze = per_call(lambda i: pipeline.push(0.5 + 1e-4 * (i % 9), 0.5), n)
+        polar = per_call(lambda i: worker.on_hr(None, PACKET), n // 10)
+        publish = per_call(lambda i: state.publish(power=2.0 + (i % 3)), n)
+        rows.append((gaze, polar, publish))
+        if recorder is not None:
+            raw = per_call(lambda i: recorder.gaze.append(float(i), 0.5, 0.5), n)
+            frames = per_call(lambda i: recorder.frames.append(float(i), 16.0, 8.0, 2.0, -0.75, 0.0), n)
+            stop_recording(state)
+    return rows, raw, frames
+
+
+def synthetic_session(root, name, seconds, start_wall=None):
+    # A recording made without the clock: each stream is appended with
+    # session-relative times directly (offsets are the recorder's own)
+    state = FractalState()
+    recorder = start_recording(state, root, name)
+    gaze = SyntheticGaze(seed=2)
+    for t, x, y in gaze.samples(seconds):
+        if x == x:
+            recorder.gaze.append(recorder.t0 + t, x, y)
+    backend = FakePolarBackend(seed=3)
+    beat = 0.0
+    while beat < seconds:
+        rr = backend.rr_ms()
+        backend.next_beat += rr / 1000.0
+        beat += rr / 1000.0
+        recorder.rr.append(recorder.started + beat, rr)
+    for k in range(int(seconds * 60)):
+        recorder.frames.append(recorder.t0 + k / 60.0, 16.6, 9.0, 1.0 + k * 1e-3, -0.75, 0.0)
+    for k in range(int(seconds / 10)):
+        recorder.params.append(recorder.t0 + 10.0 * k, recorder.field_ids['power'], 2.0 + (k % 10) * 0.1)
+    stop_recording(state)
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=3, help="Recorded days for the offline HRV pass")
+    parser.add_argument("--dir", default=None, help="Where to write sessions (default: a temp dir)")
+    args = parser.parse_args()
+    root = args.dir or tempfile.mkdtemp(prefix="fractal-recorder-")
+    os.makedirs(root, exist_ok=True)
+
+    try:
+        print("=" * 72)
+        print(f"  Session recorder ({root})")
+        print("=" * 72)
+        (off, on), raw, frames = hook_costs(root)
+        print(f"  {'us per call':24} {'off':>8} {'recording':>10}")
+        for label, a, b in zip(("gaze push", "polar packet (2 beats)", "state.publish"), off, on):
+            print(f"  {label:24} {a:8.2f} {b:10.2f}  (+{b - a:.2f})")
+        print(f"  raw append: gaze {raw:.2f}us, frames {frames:.2f}us "
+              f"({1e6 / raw / 1e3:.0f}k gaze records/s)")
+
+        hour = synthetic_session(root, "hour", 3600.0)
+        reader = SessionReader(hour.path)
+        records = sum(reader.count(s) for s in reader.meta['streams'])
+        size = sum(os.path.getsize(os.path.join(hour.path, f)) for f in os.listdir(hour.path))
+        state = FractalState()
+        replayer = SessionReplayer(hour.path, state, speed=0, drive_view=True)
+        t0 = time.perf_counter()
+        replayer.run()
+        dt = time.perf_counter() - t0
+        print(f"  replay 1 h session : {records} records, {size / 2**20:.1f} MiB on disk, "
+              f"{dt:.1f}s as fast as possible ({3600.0 / dt:.0f}x real time, "
+              f"{records / dt / 1e3:.0f}k records/s)")
+        print(f"    final state: zoom {state.zoom:.2f}, power {state.power:.1f}, "
+              f"{len(state.rr_intervals)} beats, gaze ({state.gaze_x:.2f}, {state.gaze_y:.2f})")
+
+        # Offline analysis: HRV over many days without loading them
+        for day in range(args.days):
+            state = FractalState()
+            recorder = start_recording(state, root, f"day{day}")
+            backend = FakePolarBackend(seed=10 + day)
+            t = 0.0
+            while t < 86400.0:
+                rr = backend.rr_ms()
+                backend.next_beat += rr / 1000.0
+                t += rr / 1000.0
+                recorder.rr.append(recorder.started + t, rr)
+            stop_recording(state)
+
+        def hrv_pass(days):
+            beats = 0
+            rmssd = []
+            for day in days:
+                reader = SessionReader(os.path.join(root, f"day{day}"))
+                engine = HrvEngine(windows=(300.0,))
+                for chunk in reader.chunks('rr', size=8192):
+                    for bt, rr in zip(chunk['t'].tolist(), chunk['rr'].tolist()):
+                        engine.add(bt, rr)
+                    beats += len(chunk['t'])
+                rmssd.append(engine.metrics(300.0)['rmssd'])
+            return beats, rmssd
+
+        t0 = time.perf_counter()
+        beats, rmssd = hrv_pass(range(args.days))
+        dt = time.perf_counter() - t0
+        tracemalloc.start() # Separate pass: tracing slows every allocation
+        hrv_pass([0])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  offline HRV: {args.days} days, {beats} beats in {dt:.1f}s "
+              f"({dt / beats * 1e6:.0f}us/beat), heap peak {peak / 2**20:.2f} MiB per day read "
+              f"vs {beats / args.days * 12 / 2**20:.2f} MiB of RR data per day")
+        print(f"    last-window RMSSD per day: {', '.join(f'{v:.0f}' for v in rmssd)} ms")
+    finally:
+        if args.dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Frame time during a continuous zoom on a headless GL context:
+full recompute (fractal.glsl, PASS 0) versus temporal reprojection
+(engine.reprojection.TemporalReprojector, PASS 1 + PASS 2) at several
+zoom_speed values. Also reports the share of pixels that ran the escape loop
+and how far the reprojected final frame is from a fully recomputed one.
+
+    python tests/bench_reprojection.py [--size 640x360] [--frames 120]
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+
+import numpy as np
+import moderngl
+import moderngl_window as mglw
+from moderngl_window import resources
+from moderngl_window.meta import ProgramDescription
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.uniforms import UniformBuffer
+from engine.injections import InjectionPool
+from engine.reprojection import HISTORY_LOCATION, TemporalReprojector
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEEDS = (0.1, 0.25, 0.5, 1.0, 2.0)
+
+
+def create_context():
+    try:
+        return moderngl.create_standalone_context(backend='egl')
+    except Exception:
+        return moderngl.create_standalone_context()
+
+
+def load_pass(pool, number):
+    program = resources.programs.load(ProgramDescription(path='shaders/fractal.glsl',
+                                                         defines={'PASS': str(number)}))
+    if number != 2:
+        pool.attach(program, texture_location=0, block_binding=0)
+        program['ref_orbit'].value = 1
+    if number != 0:
+        program['history'].value = HISTORY_LOCATION
+    return program
+
+
+def zoom_run(ctx, programs, size, frames, speed, reproject):
+    direct, iterate, shade, pool, uniforms = programs
+    quad = mglw.geometry.quad_fs()
+    target = ctx.simple_framebuffer(size)
+    reprojector = TemporalReprojector(ctx)
+
+    state = FractalState()
+    state.publish(offset_x=-0.743643887, offset_y=0.131825904, zoom=1.0, max_iter=400, zoom_speed=speed)
+    frame_ms = []
+    fresh = []
+    for i in range(frames):
+        snap = state.publish(zoom=state.zoom * math.exp(speed / 60.0))
+        uniforms.set('screen', *size)
+        uniforms.set('view', snap.offset_x, snap.offset_y, snap.zoom, 0.0)
+        uniforms.update_from_snapshot(snap)
+        if reproject:
+            reprojector.prepare(uniforms, size, (snap.offset_x, snap.offset_y, snap.zoom),
+                                (snap.power, snap.max_iter, 0))
+        uniforms.upload()
+        pool.use()
+
+        # Wall time up to finish(): software rasterisers (llvmpipe) report
+        # timer queries before deferred rasterisation has run
+        t0 = time.perf_counter()
+        if reproject:
+            reprojector.render(quad, target, iterate, shade)
+        else:
+            target.use()
+            quad.render(direct)
+        ctx.finish()
+        frame_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        if reproject and i % 10 == 9:
+            buf = np.frombuffer(reprojector.buffer().read(), dtype=np.float32).reshape(-1, 4)
+            fresh.append(float((buf[:, 3] >= 1.0).mean()))
+
+    frame = np.frombuffer(target.read(components=3), dtype=np.uint8).reshape(size[1], size[0], 3)
+    reprojector.release()
+    target.release()
+    # Skip the first frames: the reprojected run starts from an empty history
+    return float(np.mean(frame_ms[10:])), (float(np.mean(fresh)) if fresh else 1.0), frame.astype(np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="640x360", help="Render size WxH")
+    parser.add_argument("--frames", type=int, default=120, help="Frames per run (60 fps zoom steps)")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    ctx = create_context()
+    mglw.activate_context(ctx=ctx)
+    resources.register_dir(ROOT)
+    pool = InjectionPool(ctx, sdf_cache=None) # Empty pool: no injections bound
+    direct, iterate, shade = (load_pass(pool, number) for number in (0, 1, 2))
+    uniforms = UniformBuffer(ctx, direct)
+    uniforms.attach(iterate)
+    uniforms.attach(shade)
+    programs = (direct, iterate, shade, pool, uniforms)
+
+    print("=" * 78)
+    print(f"  Continuous zoom at {size[0]}x{size[1]}, {args.frames} frames per run, max_iter 400")
+    print("=" * 78)
+    print(f"  {'zoom_speed':>10}  {'full ms':>8}  {'reproj ms':>9}  {'speedup':>7}  "
+          f"{'recomputed':>10}  {'mean err':>8}  {'px > 16':>7}")
+    for speed in SPEEDS:
+        full_ms, _, full = zoom_run(ctx, programs, size, args.frames, speed, reproject=False)
+        reproj_ms, fresh, reproj = zoom_run(ctx, programs, size, args.frames, speed, reproject=True)
+        diff = np.abs(full - reproj)
+        print(f"  {speed:>10.2f}  {full_ms:>8.2f}  {reproj_ms:>9.2f}  {full_ms / reproj_ms:>6.2f}x  "
+              f"{fresh * 100.0:>9.1f}%  {diff.mean():>8.2f}  {(diff.max(axis=-1) > 16).mean() * 100.0:>6.2f}%")
+
+
+if __name__ == "__main__":
+    main()
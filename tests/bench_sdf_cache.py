@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Measures how much SDF work lands on the render thread for a text injection:
+the old inline create_text_sdf call versus SdfCache request/get polling
+(cold pool, in-memory LRU hit, and on-disk hit from a fresh process pool).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.sdf_cache import SdfCache
+from engine.sdf_maker import create_text_sdf
+
+PHRASES = ["BREATHE", "SLOW DOWN", "YOU ARE SAFE", "LET GO", "BREATHE"]
+
+
+def frame_cost(cache, text):
+    # Render-thread time only: one request() then one get() per "frame"
+    # until the buffer arrives. Wall time to ready is reported separately.
+    spent = 0.0
+    start = time.perf_counter()
+    t0 = time.perf_counter()
+    key = cache.request(text)
+    spent += time.perf_counter() - t0
+    frames = 0
+    while True:
+        frames += 1
+        t0 = time.perf_counter()
+        result = cache.get(key)
+        spent += time.perf_counter() - t0
+        if result is not None:
+            return spent, time.perf_counter() - start, frames
+        time.sleep(1.0 / 60.0)
+
+
+def main():
+    print("=" * 64)
+    print("  SDF injection cost on the render thread")
+    print("=" * 64)
+
+    for text in PHRASES[:2]:
+        t0 = time.perf_counter()
+        create_text_sdf(text)
+        print(f"  inline create_text_sdf({text!r}): {(time.perf_counter() - t0) * 1e3:7.2f}ms blocking")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SdfCache(cache_dir=cache_dir)
+        print()
+        for text in PHRASES:
+            spent, ready, frames = frame_cost(cache, text)
+            print(f"  cached {text!r:>16}: {spent * 1e3:7.3f}ms on thread, "
+                  f"ready after {ready * 1e3:7.1f}ms / {frames} frames")
+        cache.close()
+
+        # Fresh pool + empty LRU: everything comes back from disk
+        cache = SdfCache(cache_dir=cache_dir)
+        print()
+        for text in PHRASES[:2]:
+            spent, ready, frames = frame_cost(cache, text)
+            print(f"  disk   {text!r:>16}: {spent * 1e3:7.3f}ms on thread, "
+                  f"ready after {ready * 1e3:7.1f}ms / {frames} frames")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
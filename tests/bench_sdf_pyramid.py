@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Cost of the lazy SDF pyramid (engine/sdf_pyramid.py) as the view zooms past
+an injection: at each depth, the level a 1080p view picks, how many tiles its
+window needs, how many of those hold texels (the rest are uniform and only
+marked), the time to build them in one process, and the memory they take
+against one SDF of the whole canvas at that level. Also reports the width of
+the melt edge on screen, from the base layer alone and from the pyramid.
+
+    python tests/bench_sdf_pyramid.py [--text BREATHE] [--size 1920x1080] [--depths 1 4 16 ... 4096]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.sdf_pyramid import (
+    SDF_HEIGHT, TILE_TEXELS, UV_SCALE, coverage, level_size, page_window, tile_sdf,
+)
+
+# A point on the edge of the R of "BREATHE" at scale 1
+CENTER = (-0.575, 0.0)
+EDGE_TEXELS = 6.4 # smoothstep(-0.05, 0.05) on raw SDF values spans 0.1 * 255 / 4 texels
+
+
+def edge_pixels(level, zoom, height):
+    # Melt edge width on screen when sampling `level`
+    texel = 1.0 / (UV_SCALE * (SDF_HEIGHT << level))
+    return EDGE_TEXELS * texel * zoom * height
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--text", default="BREATHE")
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--depths", nargs="+", type=float, default=[1, 4, 16, 64, 256, 1024, 4096],
+                        help="View zoom over the injection's own depth")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    t0 = time.perf_counter()
+    coverage(args.text)
+    print("=" * 78)
+    print(f"  SDF pyramid for {args.text!r} at {width}x{height} "
+          f"(phrase rasterised once in {(time.perf_counter() - t0) * 1000:.0f} ms)")
+    print("=" * 78)
+    print(f"  {'depth':>6} {'level':>5} {'tiles':>5} {'stored':>6} {'build ms':>9} {'tile MB':>8} "
+          f"{'full MB':>9} {'edge px base':>12} {'pyramid':>8}")
+    for depth in args.depths:
+        level, tx0, ty0, tx1, ty1 = page_window(0.0, 0.0, 1.0, CENTER, depth, width, height)
+        stored = 0
+        t0 = time.perf_counter()
+        for ty in range(ty0, ty1):
+            for tx in range(tx0, tx1):
+                stored += isinstance(tile_sdf(args.text, level, tx, ty), bytes)
+        ms = (time.perf_counter() - t0) * 1000.0
+        w, h = level_size(level)
+        print(f"  {depth:6.0f} {level:5d} {(tx1 - tx0) * (ty1 - ty0):5d} {stored:6d} {ms:9.1f} "
+              f"{stored * TILE_TEXELS ** 2 / 1e6:8.2f} {w * h / 1e6:9.1f} "
+              f"{edge_pixels(0, depth, height):12.1f} {edge_pixels(level, depth, height):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Load test of the headless render server (engine/server.py): sessions are
+added to one server in steps, each with a client reading its frames over the
+socket, and at each step the benchmark reports the sustained frames per
+second every session gets (worst and mean against the target), the frames
+skipped because a session's previous frame was still rendering, the worker
+time per frame, and the frames per second that reach the clients.
+
+    python tests/bench_server.py [--sessions 1 2 4 8] [--size 640x360] [--fps 30] [--backend gl] [--workers N]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.capture import FORMATS
+from engine.server import BACKENDS, FrameClient, RenderServer
+
+
+class Reader:
+    # Counts the frames a client receives
+    def __init__(self, session_id, port):
+        self.client = FrameClient(session_id, port=port, timeout=60.0)
+        self.frames = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            while self.client.receive() is not None:
+                self.frames += 1
+        except (OSError, ValueError):
+            pass # Closed under us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--size", default="640x360")
+    parser.add_argument("--fps", type=float, default=30.0, help="Target per session")
+    parser.add_argument("--format", default="JPEG", choices=FORMATS)
+    parser.add_argument("--backend", default="gl", choices=BACKENDS)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds before each measurement")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds measured per step")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split("x"))
+
+    sessions, readers = [], []
+    with RenderServer(args.workers, args.backend, port=0) as server:
+        print("=" * 78)
+        print(f"  Render server, {args.backend} on {server.workers} worker(s): {width}x{height} "
+              f"{args.format} at {args.fps:g} fps per session")
+        print("=" * 78)
+        print(f"  {'sessions':>8} {'fps min':>8} {'fps mean':>9} {'skipped %':>10} {'render ms':>10} "
+              f"{'client fps':>11} {'total fps':>10}")
+        server.start()
+        for count in args.sessions:
+            while len(sessions) < count:
+                session = server.add_session(width, height, args.fps, args.format)
+                sessions.append(session)
+                readers.append(Reader(session.id, server.port))
+            time.sleep(args.warmup)
+
+            before = [(s.delivered, s.dropped, r.frames) for s, r in zip(sessions, readers)]
+            t0 = time.perf_counter()
+            time.sleep(args.duration)
+            seconds = time.perf_counter() - t0
+            delivered = [(s.delivered - d) / seconds for s, (d, _, _) in zip(sessions, before)]
+            skipped = sum(s.dropped - k for s, (_, k, _) in zip(sessions, before))
+            received = [(r.frames - f) / seconds for r, (_, _, f) in zip(readers, before)]
+            slots = skipped + sum(delivered) * seconds
+            print(f"  {count:8d} {min(delivered):8.1f} {sum(delivered) / count:9.1f} "
+                  f"{100.0 * skipped / max(slots, 1):10.1f} "
+                  f"{sum(s.render_ms for s in sessions) / count:10.1f} "
+                  f"{sum(received) / count:11.1f} {sum(delivered):10.1f}")
+    for reader in readers: # The server has hung up on them
+        reader.client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Throughput of the fractal.glsl kernel variants (engine.programs) on a headless
+GL context. Every integer power is drawn with the general polar kernel and with
+its specialised kernel, with injection blending compiled in and out, at a
+full-set view (interior heavy) and a seahorse-valley zoom. Also reports compile
+times and a power-slider sweep through the ProgramCache, counting frames that
+had to compile in the middle of drawing.
+
+    python tests/bench_shader_variants.py [--size 640x360] [--frames 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import moderngl
+import moderngl_window as mglw
+from moderngl_window import resources
+from moderngl_window.meta import ProgramDescription
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.uniforms import UniformBuffer
+from engine.injections import InjectionPool
+from engine.programs import SHADER_PATH, GENERAL_POWER, INTEGER_POWERS, ProgramCache, variant_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_ITER = 300
+VIEWS = (
+    ("full set", -0.75, 0.0, 1.0),
+    ("seahorse x300", -0.743643887, 0.131825904, 300.0),
+)
+
+
+def create_context():
+    try:
+        return moderngl.create_standalone_context(backend='egl')
+    except Exception:
+        return moderngl.create_standalone_context()
+
+
+class Bench:
+    def __init__(self, ctx, size):
+        self.ctx = ctx
+        self.size = size
+        self.state = FractalState()
+        self.uniforms = UniformBuffer(ctx)
+        self.pool = InjectionPool(ctx, sdf_cache=None) # Empty pool: injections compiled in but idle
+        self.cache = ProgramCache(self.load, self.setup)
+        self.quad = mglw.geometry.quad_fs()
+        self.target = ctx.simple_framebuffer(size)
+
+    def load(self, defines):
+        return resources.programs.load(ProgramDescription(path=SHADER_PATH, defines=defines))
+
+    def setup(self, program, key):
+        self.uniforms.attach(program)
+        if key[2]:
+            self.pool.attach(program, texture_location=0, block_binding=0)
+        if program.get('ref_orbit', None) is not None:
+            program['ref_orbit'].value = 1
+
+    def draw(self, program, power, x, y, zoom):
+        snap = self.state.publish(power=power, offset_x=x, offset_y=y, zoom=zoom, max_iter=MAX_ITER)
+        self.uniforms.set('screen', *self.size)
+        self.uniforms.set('view', x, y, zoom, 0.0)
+        self.uniforms.update_from_snapshot(snap)
+        self.uniforms.upload()
+        self.pool.use()
+        self.target.use()
+        self.quad.render(program)
+
+    def throughput(self, key, power, view, frames):
+        # Megapixels per second, after one warm-up frame
+        program = self.cache.compile(key)
+        self.draw(program, power, *view[1:])
+        self.ctx.finish()
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            self.draw(program, power, *view[1:])
+        self.ctx.finish()
+        dt = (time.perf_counter() - t0) / frames
+        return self.size[0] * self.size[1] / dt / 1e6
+
+    def slider_sweep(self, start, stop, frames):
+        # Drag the power slider across an integer the way the renderer does:
+        # get() for drawing, prefetch() + warm() around it
+        cache = ProgramCache(self.load, self.setup)
+        cache.compile((0, GENERAL_POWER, True))
+        stalls = 0
+        worst_ms = 0.0
+        for power in np.linspace(start, stop, frames):
+            compiled = cache.counters['compiled']
+            t0 = time.perf_counter()
+            cache.prefetch(0, power, False)
+            self.draw(cache.get(0, power, False), power, *VIEWS[0][1:])
+            stalls += cache.counters['compiled'] != compiled
+            cache.warm()
+            self.ctx.finish()
+            worst_ms = max(worst_ms, (time.perf_counter() - t0) * 1000.0)
+        return stalls, cache.counters['fallbacks'], worst_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="640x360", help="Render size WxH")
+    parser.add_argument("--frames", type=int, default=5, help="Timed frames per case")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    ctx = create_context()
+    mglw.activate_context(ctx=ctx)
+    resources.register_dir(ROOT)
+    bench = Bench(ctx, size)
+
+    print("=" * 78)
+    print(f"  fractal.glsl kernel throughput at {size[0]}x{size[1]}, max_iter {MAX_ITER} (Mpix/s)")
+    print("=" * 78)
+    for view in VIEWS:
+        print(f"  {view[0]}")
+        print(f"  {'power':>7}  {'general+inj':>11}  {'general':>9}  {'kernel+inj':>10}  {'kernel':>9}  {'speedup':>7}")
+        for power in INTEGER_POWERS + (2.5,):
+            power = float(power)
+            general = bench.throughput((0, GENERAL_POWER, True), power, view, args.frames)
+            general_lean = bench.throughput((0, GENERAL_POWER, False), power, view, args.frames)
+            kernel = bench.throughput(variant_key(0, power, True), power, view, args.frames)
+            kernel_lean = bench.throughput(variant_key(0, power, False), power, view, args.frames)
+            print(f"  {power:>7.1f}  {general:>11.2f}  {general_lean:>9.2f}  {kernel:>10.2f}  "
+                  f"{kernel_lean:>9.2f}  {kernel_lean / general:>6.2f}x")
+
+    print()
+    print("  Compile time per variant (ms):")
+    for key, ms in sorted(bench.cache.compile_ms.items()):
+        print(f"    pass {key[0]}  power {key[1] or 'any':>3}  injections {'on ' if key[2] else 'off'}  {ms:7.1f}")
+
+    stalls, fallbacks, worst = bench.slider_sweep(1.8, 3.2, 60)
+    print()
+    print(f"  Slider sweep 1.8 -> 3.2 over 60 frames: {stalls} frames compiled while drawing, "
+          f"{fallbacks} drew the general kernel, worst frame {worst:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Render-loop jitter with heavy work elsewhere: a 60 Hz loop shaped like
+on_render (pull shared writes, step tweens, snapshot, a fixed amount of
+Python work, publish the zoom, wait for the next vsync) runs while pure-Python
+analytics workers (a Lomb-Scargle periodogram over the last RR intervals,
+publishing a result every pass) run as threads in the same process, or as
+separate processes on the shared state block (engine/shared_state.py), at
+normal and at low priority. Reports how long the frame's own work took and
+how late frames started against their vsync deadline.
+
+    python tests/bench_shared_state.py [--seconds 4] [--workers 2] [--work-ms 4]
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+import threading
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.shared_state import share_state, start_state_process, unshare_state
+
+FRAME = 1.0 / 60.0
+
+
+def lomb_scargle(times, values, freqs):
+    # Deliberately pure Python: the kind of loop that holds the GIL
+    mean = sum(values) / len(values)
+    power = []
+    for f in freqs:
+        w = 2.0 * math.pi * f
+        s2 = sum(math.sin(2 * w * t) for t in times)
+        c2 = sum(math.cos(2 * w * t) for t in times)
+        tau = math.atan2(s2, c2) / (2 * w)
+        c = s = cc = ss = 0.0
+        for t, v in zip(times, values):
+            a = w * (t - tau)
+            ca, sa = math.cos(a), math.sin(a)
+            c += (v - mean) * ca
+            s += (v - mean) * sa
+            cc += ca * ca
+            ss += sa * sa
+        power.append(0.5 * (c * c / cc + s * s / ss))
+    return power
+
+
+def analytics(state, seconds):
+    # A worker: reads the view, crunches, publishes a result, until time is up
+    rng = np.random.default_rng(os.getpid())
+    rr = 0.85 + 0.05 * rng.standard_normal(120)
+    times = np.cumsum(rr).tolist()
+    freqs = np.linspace(0.04, 0.4, 24).tolist()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        zoom = state.snapshot().zoom
+        power = lomb_scargle(times, rr.tolist(), freqs)
+        state.publish(pulse_speed=min(2.0, max(power) * 0.01 + 0.1 * math.log10(zoom)))
+
+
+def calibrate(work_ms):
+    # Loop count for work_ms of the frame's own Python work, measured alone
+    n = 20000
+    while True:
+        t0 = time.perf_counter()
+        frame_work(n)
+        ms = (time.perf_counter() - t0) * 1000.0
+        if ms > 2.0:
+            return max(1, int(n * work_ms / ms))
+        n *= 2
+
+
+def frame_work(n):
+    x = 0.0
+    for i in range(n):
+        x += i * 0.5
+    return x
+
+
+def render_loop(state, seconds, n):
+    work = []
+    late = []
+    start = time.perf_counter()
+    frames = int(seconds / FRAME)
+    for k in range(frames):
+        deadline = start + k * FRAME
+        now = time.perf_counter()
+        if now < deadline:
+            time.sleep(deadline - now) # Swap buffers: waits for vsync without the GIL
+        t0 = time.perf_counter()
+        late.append((t0 - deadline) * 1000.0)
+        if state.shared is not None:
+            state.shared.pull()
+        state.tweens.step(t0)
+        snap = state.snapshot()
+        frame_work(n)
+        state.publish(zoom=snap.zoom * 1.001)
+        work.append((time.perf_counter() - t0) * 1000.0)
+    return np.array(work), np.array(late)
+
+
+def run(mode, seconds, workers, n):
+    state = FractalState()
+    threads, processes = [], []
+    if mode == "threads":
+        threads = [threading.Thread(target=analytics, args=(state, seconds + 1.0), daemon=True)
+                   for _ in range(workers)]
+        for t in threads:
+            t.start()
+    elif mode.startswith("processes"):
+        share_state(state)
+        niceness = 10 if mode.endswith("nice") else 0
+        processes = [start_state_process(state, analytics, seconds + 3.0, niceness=niceness)
+                     for _ in range(workers)]
+        time.sleep(1.5) # Spawned interpreters start up
+    work, late = render_loop(state, seconds, n)
+    pulled = state.shared.pulled if state.shared is not None else 0
+    for t in threads:
+        t.join()
+    for p in processes:
+        p.terminate()
+        p.join()
+    unshare_state(state)
+    return work, late, pulled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=4.0, help="Render loop run time per mode")
+    parser.add_argument("--workers", type=int, default=2, help="Analytics workers")
+    parser.add_argument("--work-ms", type=float, default=4.0, help="Frame's own Python work, alone")
+    args = parser.parse_args()
+    n = calibrate(args.work_ms)
+
+    print("=" * 78)
+    print(f"  60 Hz loop, {args.work_ms:.0f} ms of frame work, {args.workers} analytics workers, "
+          f"{os.cpu_count()} CPU(s) (ms)")
+    print("=" * 78)
+    print(f"  {'workers as':<16} {'work p50':>8} {'p99':>7} {'max':>7} {'late p99':>9} {'max':>7} "
+          f"{'missed':>7} {'pulled':>7}")
+    for mode in ("none", "threads", "processes", "processes-nice"):
+        work, late, pulled = run(mode, args.seconds, args.workers, n)
+        missed = np.mean(work + np.maximum(late, 0.0) > FRAME * 1000.0) * 100.0
+        print(f"  {mode:<16} {np.median(work):8.2f} {np.percentile(work, 99):7.2f} {work.max():7.2f} "
+              f"{np.percentile(late, 99):9.2f} {late.max():7.2f} {missed:6.1f}% {pulled:7d}")
+
+
+if __name__ == "__main__":
+    main()
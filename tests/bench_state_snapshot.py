@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for FractalState publish/snapshot.
+Several writer threads publish at sensor rates (gaze 120 Hz, HR 1 Hz, a
+control panel at 60 Hz, a controller at 2 Hz) while a 60 fps reader takes one
+snapshot per frame. Every writer publishes paired fields with equal values,
+so any frame that sees them differ has read a torn update. The same run with
+bare attribute pokes is shown for comparison.
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+
+DURATION = 3.0
+
+# name, rate (Hz), paired fields written together
+WRITERS = [
+    ("gaze", 120.0, ("gaze_x", "gaze_y")),
+    ("heart", 1.0, ("current_hr", "pulse_speed")),
+    ("panel", 60.0, ("color_r", "color_g")),
+    ("controller", 2.0, ("zoom_speed", "power")),
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def writer(state, rate, fields, use_publish, stop, latencies):
+    period = 1.0 / rate
+    n = 0
+    while not stop.is_set():
+        n += 1
+        t0 = time.perf_counter()
+        if use_publish:
+            state.publish(**{f: n for f in fields})
+        else:
+            for f in fields:
+                object.__setattr__(state, f, n) # Bare store, the old behaviour
+                time.sleep(0) # Yield between the stores like a busy interpreter would
+        latencies.append(time.perf_counter() - t0)
+        time.sleep(period)
+
+
+def run(use_publish):
+    state = FractalState()
+    state.publish(**{f: 0 for _, _, fields in WRITERS for f in fields})
+    stop = threading.Event()
+    write_lat = []
+    threads = [threading.Thread(target=writer, args=(state, rate, fields, use_publish, stop, write_lat),
+                                daemon=True) for _, rate, fields in WRITERS]
+    for t in threads:
+        t.start()
+
+    read_lat = []
+    torn = frames = 0
+    end = time.perf_counter() + DURATION
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        view = state.snapshot() if use_publish else state
+        values = [(getattr(view, a), getattr(view, b)) for _, _, (a, b) in WRITERS]
+        read_lat.append(time.perf_counter() - t0)
+        frames += 1
+        torn += any(a != b for a, b in values)
+        time.sleep(1.0 / 60.0)
+
+    stop.set()
+    for t in threads:
+        t.join()
+    return frames, torn, read_lat, write_lat
+
+
+def main():
+    print("=" * 64)
+    print(f"  State contention: {len(WRITERS)} writers vs 60 fps reader, {DURATION:.0f}s")
+    print("=" * 64)
+    for use_publish, label in ((False, "bare attributes"), (True, "publish/snapshot")):
+        frames, torn, read_lat, write_lat = run(use_publish)
+        print(f"\n  {label}")
+        print(f"    frames: {frames}   torn frames: {torn}")
+        print(f"    reader  p50 {percentile(read_lat, 0.5) * 1e6:6.1f}us  "
+              f"p99 {percentile(read_lat, 0.99) * 1e6:6.1f}us  max {max(read_lat) * 1e6:7.1f}us")
+        print(f"    writer  p50 {percentile(write_lat, 0.5) * 1e6:6.1f}us  "
+              f"p99 {percentile(write_lat, 0.99) * 1e6:6.1f}us  max {max(write_lat) * 1e6:7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
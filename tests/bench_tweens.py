@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Per-frame cost of engine/tweens.py: TweenScheduler.step() with 0 to all
+tweenable fields gliding, against the obvious alternative of one Python
+object per tween eased in a loop (both publish their values the same way).
+Also submission throughput from writer threads while a render thread steps.
+
+    python tests/bench_tweens.py [--frames 20000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.tweens import TWEEN_FIELDS, tween
+
+
+class ObjectTween:
+    # The per-object baseline
+    def __init__(self, field, origin, target, start, duration):
+        self.field = field
+        self.origin = origin
+        self.target = target
+        self.start = start
+        self.duration = duration
+
+    def value(self, now):
+        u = min(max((now - self.start) / self.duration, 0.0), 1.0)
+        u = u * u * (3.0 - 2.0 * u)
+        return self.origin + (self.target - self.origin) * u
+
+
+def object_step(state, tweens, now):
+    if not tweens:
+        return
+    state.publish(**{t.field: t.value(now) for t in tweens})
+    tweens[:] = [t for t in tweens if now < t.start + t.duration]
+
+
+def per_frame(step, frames):
+    t0 = time.perf_counter()
+    for k in range(frames):
+        step(k * 1e-9) # Far from the end of any tween
+    return (time.perf_counter() - t0) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=20000, help="Frames per measurement")
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print("  Tween scheduler, us per frame (including the publish)")
+    print("=" * 64)
+    print(f"  {'gliding':>8} {'scheduler':>10} {'objects':>9}")
+    fields = [f for f in TWEEN_FIELDS if f != 'max_iter']
+    for n in (0, 1, 3, len(fields)):
+        state = FractalState()
+        for field in fields[:n]:
+            tween(state, field, 1.0, duration=1e6)
+        state.tweens.step(0.0)
+        scheduler = per_frame(state.tweens.step, args.frames)
+        state = FractalState()
+        objects = [ObjectTween(f, getattr(state, f), 1.0, 0.0, 1e6) for f in fields[:n]]
+        baseline = per_frame(lambda now: object_step(state, objects, now), args.frames)
+        print(f"  {n:8d} {scheduler:10.2f} {baseline:9.2f}")
+
+    # Writers hammering submit() while the render thread steps
+    state = FractalState()
+    stop = threading.Event()
+    submitted = [0] * 4
+
+    def writer(k):
+        # Bursts of submits, like a controller answering with a batch of tool
+        # calls, far more often than any controller would
+        field = fields[k]
+        while not stop.is_set():
+            for _ in range(20):
+                tween(state, field, submitted[k] % 100, duration=0.5)
+                submitted[k] += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=writer, args=(k,), daemon=True) for k in range(4)]
+    for t in threads:
+        t.start()
+    frames = 0
+    worst = 0.0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < 1.0:
+        s = time.perf_counter()
+        state.tweens.step(s)
+        worst = max(worst, time.perf_counter() - s)
+        frames += 1
+        time.sleep(0.001)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    print(f"  4 writers: {sum(submitted) / elapsed / 1e3:.0f}k submits/s, render thread "
+          f"{frames / elapsed:.0f} steps/s, slowest step {worst * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
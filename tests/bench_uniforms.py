@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Per-frame CPU time spent uploading fractal parameters on a headless GL
+context: the old `program['name'].value = ...` path (10 lookups + driver
+calls every frame) versus engine.uniforms.UniformBuffer (std140 block,
+dirty slots only).
+"""
+
+import os
+import sys
+import time
+
+import moderngl
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.uniforms import UniformBuffer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRAMES = 5000
+
+# The uniform set on_render used to push one by one
+LEGACY_SHADER = """#version 330
+uniform vec2 resolution; uniform vec2 offset; uniform float zoom; uniform int max_iter;
+uniform float time; uniform float power; uniform vec3 color_tint;
+uniform int deep_zoom_active; uniform int ref_len; uniform vec2 ref_delta;
+out vec4 fragColor;
+void main() {
+    fragColor = vec4(resolution + offset, ref_delta)
+              + vec4(color_tint, zoom + time + power + float(max_iter + ref_len + deep_zoom_active));
+}
+"""
+VERTEX = "#version 330\nin vec2 p; void main() { gl_Position = vec4(p, 0.0, 1.0); }\n"
+
+
+def create_context():
+    try:
+        return moderngl.create_standalone_context(backend='egl')
+    except Exception:
+        return moderngl.create_standalone_context()
+
+
+def load_fractal_program(ctx):
+    with open(os.path.join(ROOT, "shaders", "fractal.glsl")) as f:
+        version, body = f.read().split("\n", 1)
+    return ctx.program(
+        vertex_shader=f"{version}\n#define VERTEX_SHADER\n{body}",
+        fragment_shader=f"{version}\n#define FRAGMENT_SHADER\n{body}",
+    )
+
+
+def legacy_frames(ctx, state):
+    program = ctx.program(vertex_shader=VERTEX, fragment_shader=LEGACY_SHADER)
+    t0 = time.perf_counter()
+    for i in range(FRAMES):
+        snap = state.snapshot()
+        program['resolution'].value = (1280, 720)
+        program['offset'].value = (snap.offset_x, snap.offset_y)
+        program['zoom'].value = snap.zoom * (1.0 + i * 1e-6)
+        program['max_iter'].value = snap.max_iter
+        program['time'].value = i / 60.0
+        program['power'].value = snap.power
+        program['color_tint'].value = (snap.color_r, snap.color_g, snap.color_b)
+        program['deep_zoom_active'].value = 0
+        program['ref_len'].value = 0
+        program['ref_delta'].value = (0.0, 0.0)
+    ctx.finish()
+    return (time.perf_counter() - t0) / FRAMES
+
+
+def ubo_frames(ctx, state):
+    program = load_fractal_program(ctx)
+    uniforms = UniformBuffer(ctx, program)
+    t0 = time.perf_counter()
+    for i in range(FRAMES):
+        if i % 600 == 0:
+            state.power = 2.0 + (i % 1200) / 1200.0 # A slider moves every ~10 s
+        snap = state.snapshot()
+        uniforms.set('screen', 1280, 720)
+        uniforms.set('view', snap.offset_x, snap.offset_y, snap.zoom * (1.0 + i * 1e-6), i / 60.0)
+        uniforms.update_from_snapshot(snap, 0, 0)
+        uniforms.upload()
+    ctx.finish()
+    dt = (time.perf_counter() - t0) / FRAMES
+    return dt, uniforms.uploads / FRAMES, uniforms.bytes_uploaded / FRAMES
+
+
+def main():
+    ctx = create_context()
+    state = FractalState()
+    print("=" * 64)
+    print(f"  Parameter upload CPU time per frame ({FRAMES} frames)")
+    print("=" * 64)
+    legacy = legacy_frames(ctx, state)
+    print(f"  program['name'].value x10 : {legacy * 1e6:7.2f}us/frame")
+    ubo, writes, nbytes = ubo_frames(ctx, state)
+    print(f"  UniformBuffer (std140)    : {ubo * 1e6:7.2f}us/frame  "
+          f"({writes:.2f} buffer writes, {nbytes:.1f} bytes/frame)")
+    print(f"  speedup                   : {legacy / ubo:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
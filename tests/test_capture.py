@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.capture import Capture, CaptureQueue, FrameCapture, capture_size, encode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def gl():
+    # Headless GL context, shared by the tests that need one
+    moderngl = pytest.importorskip("moderngl")
+    mglw = pytest.importorskip("moderngl_window")
+    from moderngl_window import resources
+    from moderngl_window.meta import ProgramDescription
+    try:
+        ctx = moderngl.create_standalone_context(backend='egl')
+    except Exception:
+        try:
+            ctx = moderngl.create_standalone_context()
+        except Exception as e:
+            pytest.skip(f"no headless GL context: {e}")
+    mglw.activate_context(ctx=ctx)
+    resources.register_dir(ROOT)
+    load = lambda: resources.programs.load(ProgramDescription(path='shaders/downsample.glsl'))
+    yield ctx, mglw.geometry.quad_fs(), load
+    ctx.release()
+
+
+def split_frame(ctx, size):
+    # Red top half, blue bottom half
+    fbo = ctx.simple_framebuffer(size, components=3)
+    fbo.use()
+    fbo.clear(0.0, 0.0, 1.0)
+    fbo.scissor = (0, size[1] // 2, size[0], size[1] - size[1] // 2)
+    fbo.clear(1.0, 0.0, 0.0)
+    fbo.scissor = None
+    return fbo
+
+
+def pixels(capture):
+    return np.asarray(capture.image()).astype(int)
+
+
+def test_queue_drops_the_oldest():
+    q = CaptureQueue(maxlen=2)
+    assert q.get(timeout=0.01) is None and q.latest() is None
+    for k in range(5):
+        q.put(Capture(k, k, 1, 1, 'RAW', b'\0\0\0'))
+    assert len(q) == 2 and q.delivered == 5 and q.dropped == 3
+    assert q.latest().frame == 4
+    assert [q.get().frame, q.get().frame] == [3, 4]
+    threading.Timer(0.05, q.put, args=(Capture(0, 9, 1, 1, 'RAW', b''),)).start()
+    assert q.get(timeout=5.0).frame == 9 # Waits for the encoder
+
+
+def test_encode_flips_gl_rows():
+    gl_rows = np.zeros((2, 3, 3), np.uint8)
+    gl_rows[0] = 255 # Bottom row in GL
+    raw = encode(gl_rows.tobytes(), 3, 2, 'RAW')
+    assert np.frombuffer(raw, np.uint8).reshape(2, 3, 3)[1].min() == 255
+    png = Capture(0, 0, 3, 2, 'PNG', encode(gl_rows.tobytes(), 3, 2, 'PNG'))
+    assert (np.asarray(png.image()) == np.frombuffer(raw, np.uint8).reshape(2, 3, 3)).all()
+    assert encode(gl_rows.tobytes(), 3, 2, 'JPEG')[:2] == b'\xff\xd8'
+
+
+def test_capture_size():
+    assert capture_size((1280, 720), 256) == (256, 144)
+    assert capture_size((100, 50), 256) == (100, 50) # Never upscaled
+
+
+def test_readback_is_deferred_and_downsampled(gl):
+    ctx, quad, load = gl
+    source = split_frame(ctx, (320, 180))
+    queue = CaptureQueue()
+    cap = FrameCapture(ctx, load(), queue, width=64, format='RAW', delay=2)
+    cap.update(quad, source, interval=10.0, now=0.0) # Issued
+    cap.update(quad, source, interval=10.0, now=0.1)
+    assert cap.in_flight and queue.get(timeout=0.2) is None # Not mapped yet
+    cap.update(quad, source, interval=10.0, now=0.2) # Mapped, handed to the encoder
+    c = queue.get(timeout=5.0)
+    assert (c.width, c.height, c.frame, c.t) == (64, 36, 0, 0.0)
+    image = pixels(c)
+    assert (image[:17] == [255, 0, 0]).all() and (image[19:] == [0, 0, 255]).all()
+    assert cap.counters['captured'] == 1 # The interval has not come round again
+    cap.release()
+
+
+def test_interval_request_and_resize(gl):
+    ctx, quad, load = gl
+    queue = CaptureQueue(maxlen=16)
+    cap = FrameCapture(ctx, load(), queue, width=32, format='PNG', backlog=8)
+    small, large = split_frame(ctx, (64, 64)), split_frame(ctx, (128, 32))
+    for frame in range(10):
+        cap.update(quad, small if frame < 5 else large, interval=0.25, now=frame * 0.1)
+    cap.request()
+    cap.update(quad, large, interval=0.0, now=1.0)
+    cap.update(quad, large, interval=0.0, now=1.1)
+    cap.release() # Maps and encodes what is still in flight
+    sizes = [(c.width, c.height) for c in iter(lambda: queue.get(timeout=0.0), None)]
+    assert sizes == [(32, 32)] * 2 + [(32, 8)] * 3
+    assert cap.counters == {'captured': 5, 'skipped': 0, 'dropped': 0, 'errors': 0}
+    assert len(cap.buffers) == 0
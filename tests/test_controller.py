@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import asyncio
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from llm_logic.controller import LlmController, delta, observe
+from llm_logic.standin_server import StandinServer, policy
+
+
+@pytest.fixture
+def server():
+    srv = StandinServer(latency=0.05).start()
+    yield srv
+    srv.stop()
+
+
+def call(name, **args):
+    return {"id": "c", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+def test_observation_is_rounded_and_deltas_carry_only_changes():
+    state = FractalState()
+    state.current_hr = 72
+    state.color_r = 0.123456
+    a = observe(state.snapshot())
+    assert a['hr'] == 72 and a['color'][0] == 0.12 and 'gaze' not in a
+    state.color_r = 0.1212 # Below the rounding: not a change
+    state.power = 3.0
+    assert delta(a, observe(state.snapshot())) == {'power': 3.0}
+
+
+def test_tools_glide_through_tweens_and_report_errors():
+    state = FractalState()
+    c = LlmController(state, url="http://127.0.0.1:9/")
+    results = c.apply([
+        call("set_target_color", r=1.0, g=2.0, b=0.0, duration=1.0), # g is clamped
+        call("set_power", power=3.0, duration=0.0),
+        call("set_zoom_speed"), # Missing argument
+        call("launch_rockets"),
+    ])
+    assert results[:2] == ["ok", "ok"]
+    assert results[2].startswith("error") and results[3].startswith("error")
+    assert state.color_r != 1.0 # Nothing snaps: the render loop glides it
+    state.tweens.step(0.0)
+    state.tweens.step(5.0)
+    assert (state.color_r, state.color_g, state.power) == (1.0, 1.0, 3.0)
+    assert c.counters['tool_calls'] == 2
+
+
+def test_phrases_land_under_the_screen_position():
+    state = FractalState()
+    state.offset_x, state.zoom = -0.5, 4.0
+    c = LlmController(state, url="http://127.0.0.1:9/", aspect=2.0)
+    c.apply([call("inject_phrase", text="BREATHE", x=1.0, y=0.5)])
+    inj = state.snapshot().injections[-1]
+    assert inj.text == "BREATHE"
+    assert inj.x == pytest.approx(-0.5 + 0.5 * 2.0 / 4.0) and inj.y == pytest.approx(0.0)
+    c.apply([call("clear_phrases")])
+    assert not state.snapshot().injections
+
+
+def test_phrases_keep_the_views_low_words_at_depth():
+    hi, lo = -0.7436438870371587, 4.5e-17
+    state = FractalState()
+    state.publish(offset_x=hi, offset_x_lo=lo, zoom=1e17)
+    c = LlmController(state, url="http://127.0.0.1:9/", aspect=2.0)
+    c.apply([call("inject_phrase", text="HERE", x=0.5, y=0.5), call("inject_phrase", text="RIGHT", x=1.0, y=0.5)])
+    here, right = state.snapshot().injections[-2:]
+    assert (here.x, here.x_lo) == (hi, lo)
+    assert here.offset_from(state.offset_x, state.offset_y, state.offset_x_lo) == (0.0, 0.0)
+    dx, _ = right.offset_from(state.offset_x, state.offset_y, state.offset_x_lo)
+    assert dx == pytest.approx(0.5 * 2.0 / 1e17) # Not rounded away into the high word
+
+
+def test_keyframe_then_deltas_then_nothing(server):
+    state = FractalState()
+    state.current_hr = 70
+    c = LlmController(state, server.url, keyframe_every=3)
+    decide = lambda: asyncio.run(c.decide())
+    decide()
+    assert c.messages[0]['content'].startswith("Now: ")
+    assert decide() is None and c.counters['unchanged'] == 1 and server.requests == 1
+    state.current_hr = 80
+    decide()
+    assert c.messages[-4]['content'].endswith('{"hr":80}') # Then the answer and two tool results
+    assert [m['role'] for m in c.messages[-2:]] == ["tool", "tool"]
+    state.current_hr = 75
+    decide()
+    state.current_hr = 76
+    decide() # Fourth turn: a fresh conversation
+    assert c.messages[0]['content'].startswith("Now: ") and '"hr":76' in c.messages[0]['content']
+    assert c.counters['requests'] == 4 == server.requests
+
+
+def test_identical_requests_are_answered_from_the_cache(server):
+    state = FractalState()
+    state.current_hr = 70
+    c = LlmController(state, server.url, keyframe_every=1)
+    asyncio.run(c.decide())
+    asyncio.run(c.decide()) # Same keyframe again
+    assert c.counters == dict(c.counters, requests=1, cached=1)
+    assert server.requests == 1
+
+
+def test_failed_request_is_retried_against_the_same_observation():
+    srv = StandinServer(latency=0.0, fail_every=2).start()
+    try:
+        state = FractalState()
+        state.current_hr = 70
+        c = LlmController(state, srv.url)
+        asyncio.run(c.decide())
+        state.current_hr = 90
+        asyncio.run(c.decide()) # HTTP 500
+        assert c.counters['errors'] == 1 and state.llm_status.startswith("error")
+        assert c.last_obs['hr'] == 70 and c.messages[-1]['role'] == "assistant"
+        asyncio.run(c.decide())
+        assert c.messages[-4]['content'].endswith('{"hr":90}')
+    finally:
+        srv.stop()
+
+
+def test_wakeups_faster_than_the_model_are_coalesced():
+    # Wake-ups every 10 ms against a model that takes 200 ms: never more than
+    # one request in flight, and the rest fold into the next one
+    srv = StandinServer(latency=0.2).start()
+    try:
+        state = FractalState()
+        c = LlmController(state, srv.url, interval=0.01).start()
+        for k in range(60):
+            state.current_hr = 60 + k # Always something new to say
+            time.sleep(0.01)
+        c.stop()
+        assert srv.max_active == 1
+        assert c.counters['coalesced'] > 3 * c.counters['requests'] > 0
+        assert c.counters['requests'] <= 5
+        assert state.llm_status == "off"
+    finally:
+        srv.stop()
+
+
+def test_standin_policy():
+    keyframe = {"role": "user", "content": 'Now: {"hr":70,"zoom_speed":0.15,"phrases":[]}'}
+    up = {"role": "user", "content": '+5s: {"hr":80}'}
+    down = {"role": "user", "content": '+5s: {"hr":60}'}
+    assert policy([keyframe])[1] == []
+    assert [name for name, _ in policy([keyframe, up])[1]] == ["set_target_color", "set_zoom_speed"]
+    assert [name for name, _ in policy([keyframe, down])[1]] == ["set_target_color", "inject_phrase"]
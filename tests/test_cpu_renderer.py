@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Golden-image tests for the headless CPU renderer (engine/cpu_renderer.py).
+Run with pytest, or `python tests/test_cpu_renderer.py --update` to rewrite
+the reference PNGs in tests/golden/ after an intentional shader change.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.cpu_renderer import CpuRenderer, cycle_eps, frame_uniforms, iterate_power, render_tile
+from engine.injections import Injection
+from engine.state import FractalState
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+WIDTH, HEIGHT = 192, 108
+
+
+def _state(**fields):
+    state = FractalState()
+    for key, value in fields.items():
+        setattr(state, key, value)
+    return state
+
+
+# name -> FractalState overrides. elapsed is pinned so the pulse is deterministic.
+SCENES = {
+    "default": {},
+    "power_3_3": {"power": 3.3, "zoom": 1.6, "offset_x": -0.2},
+    "seahorse_zoom": {"offset_x": -0.7436, "offset_y": 0.1318, "zoom": 400.0, "max_iter": 300},
+    "injection_melt": {"zoom": 0.6, "injections": [Injection("BREATHE", -0.75, 0.0, 1.6, born=0.0)]},
+}
+
+
+def render_scene(name, workers=2):
+    u = frame_uniforms(_state(**SCENES[name]), WIDTH, HEIGHT, elapsed=3.0)
+    with CpuRenderer(workers=workers, tile_size=64) as renderer:
+        return renderer.render(u)
+
+
+@pytest.mark.parametrize("name", sorted(SCENES))
+def test_golden_image(name):
+    path = os.path.join(GOLDEN_DIR, f"{name}.png")
+    if not os.path.exists(path):
+        pytest.skip(f"missing golden {path}; run with --update")
+    expected = np.asarray(Image.open(path).convert("RGB"))
+    frame = render_scene(name)
+
+    assert frame.shape == expected.shape
+    # Escape-boundary pixels can flip between libm builds; the rest must match
+    diff = np.abs(frame.astype(np.int16) - expected.astype(np.int16)).max(axis=-1)
+    assert (diff > 2).mean() < 0.005
+
+
+def test_tiling_matches_single_tile():
+    u = frame_uniforms(_state(power=2.7), 100, 60, elapsed=1.0)
+    whole, _ = render_tile(u, 0, 0, 100, 60)
+    with CpuRenderer(workers=1, tile_size=32) as renderer:
+        tiled = renderer.render(u)
+    assert np.array_equal(whole, tiled)
+
+
+def test_interior_colour():
+    # The view center of the default scene (-0.75, 0) lies inside the set
+    u = frame_uniforms(_state(), 31, 31, elapsed=0.0)
+    tile, _ = render_tile(u, 15, 15, 1, 1)
+    assert tile[0, 0].tolist() == [0, 0, 5]
+
+
+def test_periodicity_check_follows_the_pixel_size():
+    # Just past the cusp at 0.25 orbits crawl through a bottleneck for
+    # thousands of iterations before escaping. At zoom 1e3 a fixed 1e-6
+    # match radius is a pixel wide and calls them interior.
+    c = np.array([0.25 + 1e-7, 0.25 + 4e-7, 0.2501], dtype=np.complex128)
+    exact, _ = iterate_power(c, 2.0, 50000)
+    assert (exact < 50000).all()
+    u = {'power': 2.0, 'zoom': 1e3}
+    assert np.array_equal(iterate_power(c, 2.0, 50000, cycle_eps(u))[0], exact)
+    assert (iterate_power(c, 2.0, 50000, 1e-12)[0][:2] == 50000).all()
+
+    # Interior points are still caught, and only the integer kernels check
+    interior = np.array([-0.1 + 0.1j, 0.0 + 0.5j])
+    iters, _ = iterate_power(interior, 3.0, 100000, cycle_eps({'power': 3.0, 'zoom': 1.0}))
+    assert (iters == 100000).all()
+    assert cycle_eps({'power': 2.5, 'zoom': 1.0}) is None
+
+
+if __name__ == "__main__":
+    if "--update" in sys.argv:
+        os.makedirs(GOLDEN_DIR, exist_ok=True)
+        for scene in sorted(SCENES):
+            Image.fromarray(render_scene(scene)).save(os.path.join(GOLDEN_DIR, f"{scene}.png"))
+            print(f"  wrote golden/{scene}.png")
+    else:
+        sys.exit(pytest.main([__file__, "-q"]))
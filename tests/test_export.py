@@ -0,0 +1,155 @@
+import os
+import sys
+import shutil
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.cpu_renderer import render_frame
+from engine.export import Exporter, ScriptedPath, SessionPath, downsample, frame_name
+from engine.recorder import start_recording, stop_recording
+from engine.state import FractalState
+
+KEYFRAMES = [
+    {"t": 0.0, "offset_x": -0.75, "zoom": 1.0, "max_iter": 100},
+    {"t": 1.0, "offset_x": -0.7436, "offset_y": 0.1318, "zoom": 100.0, "max_iter": 300, "deep_zoom": True},
+]
+
+
+def _frames(directory, count):
+    return [np.asarray(Image.open(os.path.join(directory, frame_name(i)))) for i in range(count)]
+
+
+def test_scripted_path_interpolation():
+    path = ScriptedPath(KEYFRAMES, fps=4)
+    assert path.count == 5
+    mid = path.fields_at(0.5)
+    assert mid['zoom'] == pytest.approx(10.0) # Geometric
+    assert mid['offset_x'] == pytest.approx((-0.75 - 0.7436) / 2)
+    assert mid['max_iter'] == 200 and mid['deep_zoom'] is False
+    assert path.fields_at(1.0)['deep_zoom'] is True
+    assert path.fields_at(0.0)['power'] == 2.0 # FractalState default
+
+    still = ScriptedPath([{"zoom": 3.0}])
+    assert still.count == 1 and still.uniforms(0, 64, 32)['zoom'] == 3.0
+    with pytest.raises(ValueError):
+        ScriptedPath([{"t": 0, "zom": 3.0}])
+
+
+def test_tiles_match_a_whole_supersampled_frame(tmp_path):
+    path = ScriptedPath(KEYFRAMES[:1] + [dict(KEYFRAMES[1], deep_zoom=False)], fps=2)
+    with Exporter(path, str(tmp_path), 40, 24, supersample=2, backend='cpu', workers=1, tile_size=16) as ex:
+        ex.run()
+    assert ex.frames_written == 3 and ex.tiles_rendered == 3 * 6
+
+    state = FractalState()
+    state.publish(**path.fields_at(0.5))
+    expected = downsample(render_frame(state, 80, 48, elapsed=0.5, workers=1), 2)
+    assert np.array_equal(_frames(str(tmp_path), 3)[1], expected)
+    assert sorted(os.listdir(tmp_path)) == ["export.json"] + [frame_name(i) for i in range(3)]
+
+
+def test_resume_after_interrupt(tmp_path):
+    path = ScriptedPath(KEYFRAMES, fps=2)
+    with Exporter(path, str(tmp_path / "a"), 32, 32, backend='cpu', workers=1, tile_size=16) as ex:
+        ex.run()
+    reference = _frames(str(tmp_path / "a"), 3)
+
+    # Stop in the middle of frame 1: frame 0 written, two of frame 1's tiles kept
+    out = str(tmp_path / "b")
+    ex = Exporter(ScriptedPath(KEYFRAMES, fps=2), out, 32, 32, backend='cpu', workers=1, tile_size=16)
+    store = ex._store
+
+    def interrupted(*args):
+        if ex.tiles_rendered == 6:
+            raise KeyboardInterrupt
+        store(*args)
+
+    ex._store = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        ex.run()
+    assert sorted(os.listdir(out)) == ["export.json", frame_name(0), "frame_000001.partial", "frame_000001.tiles"]
+
+    again = Exporter(ScriptedPath(KEYFRAMES, fps=2), out, 32, 32, backend='cpu', workers=1, tile_size=16)
+    again.run()
+    assert again.frames_skipped == 1 and again.tiles_rendered == 2 + 4
+    for a, b in zip(_frames(out, 3), reference):
+        assert np.array_equal(a, b)
+    assert sorted(os.listdir(out)) == ["export.json"] + [frame_name(i) for i in range(3)]
+
+
+def test_different_settings_are_refused(tmp_path):
+    Exporter(ScriptedPath(KEYFRAMES[:1]), str(tmp_path), 16, 16, backend='cpu', workers=1).run()
+    with pytest.raises(ValueError, match="width"):
+        Exporter(ScriptedPath(KEYFRAMES[:1]), str(tmp_path), 32, 16, backend='cpu', workers=1).run()
+
+
+def test_edited_paths_and_other_ranges_are_refused(tmp_path):
+    out = str(tmp_path / "scripted")
+    Exporter(ScriptedPath(KEYFRAMES[:1]), out, 16, 16, backend='cpu', workers=1).run()
+    Exporter(ScriptedPath([dict(KEYFRAMES[0])]), out, 16, 16, backend='cpu', workers=1).run() # Same path
+    with pytest.raises(ValueError, match="path"):
+        Exporter(ScriptedPath([dict(KEYFRAMES[0], zoom=2.0)]), out, 16, 16, backend='cpu', workers=1).run()
+
+    _record(tmp_path)
+    out = str(tmp_path / "session")
+    Exporter(SessionPath(str(tmp_path / "s"), fps=10, end=0.2), out, 8, 8, backend='cpu', workers=1).run()
+    with pytest.raises(ValueError, match="start"):
+        Exporter(SessionPath(str(tmp_path / "s"), fps=10, start=0.5, end=0.7), out, 8, 8,
+                 backend='cpu', workers=1).run()
+    with pytest.raises(ValueError, match="end"):
+        Exporter(SessionPath(str(tmp_path / "s"), fps=10, end=0.3), out, 8, 8, backend='cpu', workers=1).run()
+
+    # The same range of a recording that has changed since
+    shutil.rmtree(tmp_path / "s")
+    _record(tmp_path, power=4.0)
+    with pytest.raises(ValueError, match="path"):
+        Exporter(SessionPath(str(tmp_path / "s"), fps=10, end=0.2), out, 8, 8, backend='cpu', workers=1).run()
+
+
+def _record(tmp_path, power=3.0):
+    state = FractalState()
+    recorder = start_recording(state, root=str(tmp_path), name="s")
+    t0 = recorder.t0
+    for i in range(11):
+        recorder.frames.append(t0 + i * 0.1, 16.0, 8.0, 2.0 ** i, -0.75 + 0.01 * i, 0.0)
+    recorder.params.append(t0 + 0.55, recorder.field_ids['power'], power)
+    stop_recording(state)
+
+
+def test_session_path_follows_the_recording(tmp_path):
+    _record(tmp_path)
+
+    path = SessionPath(str(tmp_path / "s"), fps=10)
+    assert path.count == 11
+    first, later = path.uniforms(0, 64, 32), path.uniforms(8, 64, 32)
+    assert first['zoom'] == 1.0 and first['power'] == 2.0
+    assert later['zoom'] == 256.0 and later['offset'][0] == pytest.approx(-0.67) and later['power'] == 3.0
+    with pytest.raises(ValueError):
+        path.uniforms(3, 64, 32)
+
+
+def test_gl_tiles_match_the_cpu_renderer():
+    pytest.importorskip("moderngl")
+    from engine.export import GlTileRenderer
+    try:
+        gl = GlTileRenderer()
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    path = ScriptedPath([{"offset_x": -0.5, "zoom": 1.5, "max_iter": 120}])
+    u = path.uniforms(0, 96, 64)
+    whole = gl.render(u, 0, 0, 96, 64)
+    tiled = np.concatenate([np.concatenate([gl.render(u, x, y, 32, 32) for x in (0, 32, 64)], axis=1)
+                            for y in (0, 32)], axis=0)
+    # No seams: the interpolated uv may round differently, nothing more
+    assert np.abs(whole.astype(np.int16) - tiled.astype(np.int16)).max() <= 1
+
+    state = FractalState()
+    state.publish(**path.fields_at(0.0))
+    cpu = render_frame(state, 96, 64, elapsed=0.0, workers=1)
+    diff = np.abs(whole.astype(np.int16) - cpu.astype(np.int16)).max(axis=-1)
+    assert (diff > 8).mean() < 0.01
+    gl.ctx.release()
@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.foveation import LAYERS, FoveatedRenderer, fixation, foveated_work, layer_radii, plan_layers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE = (320, 180)
+
+
+def test_layers_shrink_outwards_and_clip_to_the_frame():
+    size = (1920, 1080)
+    plans = plan_layers(size, (960, 540), 100)
+    (fovea, fovea_tex), (middle, middle_tex), (periphery, periphery_tex) = plans
+    assert fovea == (860, 440, 1060, 640) and fovea_tex == (200, 200)
+    assert middle == (710, 290, 1210, 790) and middle_tex == (250, 250)
+    assert periphery == (0, 0, 1920, 1080) and periphery_tex == (480, 270)
+    assert layer_radii(100) == [100, 250]
+
+    # In a corner the rings are cut by the frame edges
+    (fovea, tex), _, _ = plan_layers(size, (10, 1070), 100)
+    assert fovea == (0, 970, 110, 1080) and tex == (110, 110)
+    # Entirely off screen, a layer draws nothing
+    (fovea, tex), _, _ = plan_layers(size, (-500, -500), 100)
+    assert tex == (0, 0)
+
+
+def test_work_saved_grows_with_resolution_at_the_same_visual_angle():
+    hd = foveated_work((1920, 1080), (960, 540), 0.15 * 1080)
+    uhd = foveated_work((3840, 2160), (1920, 1080), 0.15 * 2160)
+    assert hd[0] < 0.5 and hd[1] < hd[0]
+    assert uhd == pytest.approx(hd, rel=0.01) # Fractions depend on the geometry only
+    # At full quality throughout, the overlapping layers cost more than one frame
+    overlap = (320 * 320 + 800 * 800) / (1920 * 1080)
+    assert foveated_work((1920, 1080), (960, 540), 160, layers=((1.0, 1.0),) * 3) == pytest.approx((1 + overlap,) * 2)
+
+
+def test_fixation_prefers_fresh_gaze_then_mouse_then_centre():
+    now = 100.0
+    snap = SimpleNamespace(gaze_x=0.2, gaze_y=0.7, gaze_t=now - 0.1)
+    assert fixation(snap, (0.9, 0.9), now) == ((0.2, 0.7), 'gaze')
+    assert fixation(snap, (0.9, 0.9), now, predicted=(0.25, 0.7)) == ((0.25, 0.7), 'gaze')
+    snap.gaze_t = now - 5.0 # Tracker went quiet
+    assert fixation(snap, (0.9, 0.9), now, predicted=(0.25, 0.7)) == ((0.9, 0.9), 'mouse')
+    snap.gaze_t = 0.0 # Never streamed
+    assert fixation(snap, None, now) == ((0.5, 0.5), 'centre')
+
+
+@pytest.fixture(scope="module")
+def app():
+    # The real FractalRenderer on a small headless window
+    pytest.importorskip("moderngl")
+    import moderngl_window as mglw
+    from moderngl_window.conf import settings
+    from engine.state import FractalState
+    from engine.renderer import FractalRenderer
+
+    settings.WINDOW['class'] = 'moderngl_window.context.headless.Window'
+    settings.WINDOW['size'] = SIZE
+    settings.WINDOW['backend'] = 'egl'
+    mglw.settings.RESOURCE_DIRS = [ROOT]
+    FractalRenderer.state = FractalState()
+    FractalRenderer.window_size = SIZE
+    try:
+        window = mglw.create_window_from_settings()
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    app = FractalRenderer(ctx=window.ctx, wnd=window, timer=None)
+    window.config = app
+    app.imgui.render = lambda draw_data: None # Keep the panel out of the pixels
+    app.state.publish(zoom_speed=0.0, governor_enabled=False, reproject=False, use_eye_tracker=False,
+                      offset_x=-0.7436439, offset_y=0.1318259, zoom=400.0, max_iter=300, pulse_speed=0.0)
+    while app.programs.queue: # Until the specialised kernel replaces the fallback
+        frame(window, app)
+    yield window, app
+    app.on_close()
+    window.destroy()
+
+
+def frame(window, app, **fields):
+    app.state.publish(**fields)
+    window.clear()
+    app.on_render(time.perf_counter(), 0.0)
+    window.ctx.finish()
+    pixels = np.frombuffer(window.fbo.read(components=3), dtype=np.uint8)
+    return pixels.reshape(SIZE[1], SIZE[0], 3).astype(int) # Row 0 at the bottom
+
+
+def test_uniform_layers_reproduce_the_full_frame(app):
+    window, app = app
+    full = frame(window, app, foveated=False)
+    default = app.foveation
+    app.foveation = FoveatedRenderer(window.ctx, default.composite, layers=((1.0, 1.0),) * len(LAYERS))
+    try:
+        foveated = frame(window, app, foveated=True)
+    finally:
+        app.foveation.release()
+        app.foveation = default
+    assert app.fixation_source == 'centre'
+    # The layers' uv differs in the last bit from the full quad's, which in
+    # chaotic regions flips the odd pixel (a few per frame, as for export tiles)
+    assert np.mean(np.abs(foveated - full).max(axis=2) > 1) < 0.002
+
+
+def test_fovea_is_full_quality_and_periphery_is_cheaper(app):
+    window, app = app
+    full = frame(window, app, foveated=False)
+    app.mouse = (0.25, 0.5)
+    try:
+        foveated = frame(window, app, foveated=True, fovea_radius=0.2, fovea_falloff=0.05)
+    finally:
+        app.mouse = None
+    assert app.fixation_source == 'mouse'
+    # Inside radius - falloff of the fixation only the fovea layer shows
+    cx, cy, inner = 0.25 * SIZE[0], 0.5 * SIZE[1], (0.2 - 0.05) * SIZE[1]
+    ys, xs = np.mgrid[0:SIZE[1], 0:SIZE[0]]
+    inside = np.hypot(xs + 0.5 - cx, ys + 0.5 - cy) < inner - 1
+    assert np.mean(np.abs(foveated[inside] - full[inside]).max(axis=1) > 1) < 0.002
+    # Outside it is coarser, but the same picture
+    assert not np.array_equal(foveated[~inside], full[~inside])
+    assert np.abs(foveated.mean(axis=(0, 1)) - full.mean(axis=(0, 1))).max() < 20
+    assert 0.0 < app.foveation.fragments < 1.0 and app.foveation.budget < app.foveation.fragments
+    # Off again, the renderer restores the full iteration cap
+    assert np.array_equal(frame(window, app, foveated=False), full)
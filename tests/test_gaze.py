@@ -0,0 +1,112 @@
+import os
+import sys
+import math
+import types
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.gaze import GazePipeline, OneEuroFilter, SyntheticGaze, predict_gaze, resolve_accessor
+from biometrics.ring_buffer import TimedRingBuffer
+from engine.state import FractalState
+
+
+class Clock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_accessor_handles_every_sample_layout():
+    point = types.SimpleNamespace(x=0.25, y=0.75)
+    layouts = [
+        types.SimpleNamespace(position_xy=point),
+        types.SimpleNamespace(position_xy=(0.25, 0.75)),
+        point,
+        (0.25, 0.75),
+    ]
+    for sample in layouts:
+        assert resolve_accessor(sample)(sample) == (0.25, 0.75)
+
+
+def test_one_euro_is_smooth_at_rest_and_fast_in_motion():
+    rng = np.random.default_rng(0)
+    f = OneEuroFilter()
+    out = [f(k / 90.0, 0.5 + rng.normal(0.0, 0.004), 0.5)[0] for k in range(180)]
+    assert np.std(out[90:]) < 0.5 * 0.004
+    # Jump to a new target: within 50 ms the filter is most of the way there
+    k = 180
+    for _ in range(5):
+        x = f(k / 90.0, 0.9, 0.5)[0]
+        k += 1
+    assert x > 0.8
+
+
+def test_pipeline_keeps_raw_samples_and_drops_lost_ones():
+    state = FractalState()
+    clock = Clock()
+    pipeline = GazePipeline(state, clock=clock)
+    for k, (x, y) in enumerate([(0.4, 0.6), (math.nan, math.nan), (0.41, 0.6)]):
+        clock.t = 10.0 + k / 90.0
+        pipeline.push(x, y)
+    assert pipeline.dropped == 1
+    assert len(state.gaze_samples) == 2
+    assert state.gaze_samples.last() == (clock.t, (0.41, 0.6))
+    assert state.gaze_t == clock.t
+    assert 0.4 <= state.gaze_x <= 0.41
+
+
+def test_device_timestamps_are_mapped_by_the_smallest_delay():
+    state = FractalState()
+    clock = Clock()
+    pipeline = GazePipeline(state, clock=clock)
+    for k, delay in enumerate([0.004, 0.001, 0.009]):
+        clock.t = 100.0 + k * 0.011 + delay
+        pipeline.push(0.5, 0.5, timestamp=5.0 + k * 0.011)
+    times, _ = state.gaze_samples.latest()
+    np.testing.assert_allclose(np.diff(times), [0.011, 0.011], atol=0.0031)
+    assert math.isclose(times[-1], 100.0 + 2 * 0.011 + 0.001)
+
+
+def test_prediction_extrapolates_pursuit_only():
+    snap = types.SimpleNamespace(gaze_x=0.5, gaze_y=0.5, gaze_vx=0.4, gaze_vy=0.0, gaze_t=1.0)
+    x, y = predict_gaze(snap, 1.025)
+    assert math.isclose(x, 0.51) and y == 0.5
+    assert predict_gaze(snap, 2.0)[0] == 0.5 + 0.4 * 0.05 # Horizon cap
+    snap.gaze_vx = 5.0 # Saccade
+    assert predict_gaze(snap, 1.025) == (0.5, 0.5)
+    snap.gaze_vx = 0.02 # Fixation noise
+    assert predict_gaze(snap, 1.025) == (0.5, 0.5)
+
+
+def test_pipeline_tracks_synthetic_pursuit_with_less_lag_when_predicting():
+    source = SyntheticGaze(seed=3, dropout=0.0)
+    state = FractalState()
+    clock = Clock()
+    pipeline = GazePipeline(state, clock=clock)
+    plain, predicted = [], []
+    for t, x, y in source.samples(60.0):
+        clock.t = t
+        pipeline.push(x, y)
+        if source.segment(t + 0.025)[2] != 'pursuit':
+            continue
+        snap = state.snapshot()
+        tx, ty = source.truth(t + 0.025)
+        plain.append(math.hypot(snap.gaze_x - tx, snap.gaze_y - ty))
+        px, py = predict_gaze(snap, t + 0.025)
+        predicted.append(math.hypot(px - tx, py - ty))
+    assert len(plain) > 100
+    assert np.mean(predicted) < 0.8 * np.mean(plain)
+
+
+def test_ring_buffer_stores_vectors():
+    buf = TimedRingBuffer(3, width=2)
+    for k in range(5):
+        buf.append(float(k), (k, -k))
+    times, values = buf.latest()
+    np.testing.assert_array_equal(times, [2, 3, 4])
+    np.testing.assert_array_equal(values, [[2, -2], [3, -3], [4, -4]])
+    assert buf.last() == (4.0, (4.0, -4.0))
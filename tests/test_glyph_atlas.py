@@ -0,0 +1,89 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.glyph_atlas import ATLAS_WIDTH, GlyphAtlas, compose_text_sdf, covers
+from engine.sdf_maker import create_text_sdf
+
+PHRASES = ["Relax", "AVATAR Today", "deep breath, slowly"]
+
+
+@pytest.fixture(scope="module")
+def atlas():
+    return GlyphAtlas().build()
+
+
+def _sdf(buffer):
+    data, w, h = buffer
+    return np.frombuffer(data, dtype=np.uint8).reshape(h, w).astype(int)
+
+
+def _iou(a, b):
+    a, b = a > 128, b > 128
+    return (a & b).sum() / (a | b).sum()
+
+
+@pytest.mark.parametrize("phrase", PHRASES)
+def test_composite_matches_the_exact_sdf(atlas, phrase):
+    composed = _sdf(atlas.compose(phrase))
+    exact = _sdf(create_text_sdf(phrase))
+    assert composed.shape == exact.shape == (512, 1024)
+    assert _iou(composed, exact) > 0.9 # Same letters in the same place
+    # Near the edges, where the melt reads it, the distance agrees to about a pixel
+    band = np.abs(exact - 128) < 60
+    assert np.abs(composed - exact)[band].mean() < 5.0
+
+
+def test_kerning_pulls_pairs_together(atlas):
+    assert atlas.kerning["AV"] < 0 and atlas.kerning["To"] < 0
+    assert "ll" not in atlas.kerning
+    exact = _sdf(create_text_sdf("AVATAR Today"))
+    kerned = _iou(_sdf(atlas.compose("AVATAR Today")), exact)
+    kerning, atlas.kerning = atlas.kerning, {}
+    try:
+        plain = _iou(_sdf(atlas.compose("AVATAR Today")), exact)
+    finally:
+        atlas.kerning = kerning
+    assert kerned > plain
+
+
+def test_glyphs_are_packed_inside_the_atlas_without_overlap(atlas):
+    height, width = atlas.atlas.shape
+    assert width == ATLAS_WIDTH and set(atlas.glyphs) == set(atlas.charset)
+    taken = np.zeros((height, width), dtype=bool)
+    for glyph in atlas.glyphs.values():
+        assert 0 <= glyph.x and glyph.x + glyph.w <= width
+        assert 0 <= glyph.y and glyph.y + glyph.h <= height
+        assert not taken[glyph.y:glyph.y + glyph.h, glyph.x:glyph.x + glyph.w].any()
+        taken[glyph.y:glyph.y + glyph.h, glyph.x:glyph.x + glyph.w] = True
+    # Tallest first, so no shelf is taller than the one above it
+    shelves = {}
+    for glyph in atlas.glyphs.values():
+        shelves[glyph.y] = max(shelves.get(glyph.y, 0), glyph.h)
+    tops = sorted(shelves)
+    assert all(top + shelves[top] <= below for top, below in zip(tops, tops[1:]))
+    assert [shelves[t] for t in tops] == sorted(shelves.values(), reverse=True)
+    assert tops[-1] + shelves[tops[-1]] == height # No slack at the bottom
+
+
+def test_layout_places_the_ink_where_create_text_sdf_does(atlas):
+    assert atlas.layout("   ") == [] # Nothing to draw
+    quads = atlas.layout("Relax", 1024, 512, 75)
+    assert len(quads) == 5 and all(s == 0.5 for _, _, _, s in quads)
+    xs = [x for _, x, _, _ in quads]
+    assert xs == sorted(xs)
+    box = lambda sdf: [f(axis) for axis in np.nonzero(sdf > 128) for f in (np.min, np.max)]
+    composed = box(_sdf(atlas.compose("Relax", 1024, 512, 75)))
+    exact = box(_sdf(create_text_sdf("Relax", 1024, 512, 75)))
+    assert np.abs(np.subtract(composed, exact)).max() <= 2
+
+
+def test_text_outside_the_charset_falls_back_to_the_exact_sdf():
+    assert covers("AVATAR Today") and not covers("ÉTÉ") and not covers("夏")
+    for phrase in ("ÉTÉ", "naïve café", "夏"):
+        assert compose_text_sdf(phrase) == create_text_sdf(phrase)
+    assert compose_text_sdf("ÉTÉ") != compose_text_sdf("?T?") # Not question marks
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.governor import FrameGovernor
+
+
+def _feed(governor, gpu_ms, frames):
+    for _ in range(frames):
+        governor.update(gpu_ms)
+
+
+def test_over_budget_sheds_scale_then_iterations():
+    governor = FrameGovernor(budget_ms=16.0, cooldown=0)
+    governor.update(17.5)
+    assert governor.last_decision == 'scale_down' and governor.iter_fraction == 1.0
+    assert governor.scale == pytest.approx(0.95) # One step
+    governor.update(40.0)
+    assert governor.scale == pytest.approx(0.6) # Far over: sqrt(16/40) of the pixels, in steps
+    scales_at_iter_cuts = []
+    for _ in range(20):
+        governor.update(40.0)
+        if governor.last_decision == 'iter_down':
+            scales_at_iter_cuts.append(governor.scale)
+    # Iterations only go once the scale has bottomed out
+    assert scales_at_iter_cuts and set(scales_at_iter_cuts) == {governor.min_scale}
+    assert governor.iter_fraction < 1.0
+
+
+def test_cooldown_and_remeasure():
+    governor = FrameGovernor(budget_ms=16.0, cooldown=3)
+    governor.update(30.0)
+    assert governor.counters['scale_down'] == 1
+    assert governor.gpu_ms is None # Re-measured at the new settings
+    scale = governor.scale
+    _feed(governor, 30.0, 3)
+    assert governor.scale == scale and governor.counters['scale_down'] == 1 # Cooling down
+    governor.update(30.0)
+    assert governor.counters['scale_down'] == 2
+
+    # Inside the hysteresis band nothing changes
+    governor = FrameGovernor(budget_ms=16.0, cooldown=0)
+    _feed(governor, 14.0, 50)
+    _feed(governor, 16.5, 50)
+    assert governor.last_decision == 'none'
+
+    governor.update(40.0)
+    governor.reset()
+    assert (governor.scale, governor.iter_fraction, governor.gpu_ms) == (1.0, 1.0, None)
+
+
+def test_recovery_gives_iterations_back_first():
+    governor = FrameGovernor(budget_ms=16.0, cooldown=0)
+    _feed(governor, 40.0, 30)
+    assert governor.iter_fraction < 1.0 and governor.scale < 1.0
+    decisions = [governor.last_decision]
+    for _ in range(200):
+        governor.update(5.0)
+        if governor.last_decision != decisions[-1]:
+            decisions.append(governor.last_decision)
+    assert decisions == ['iter_down', 'iter_up', 'scale_up']
+    assert governor.scale == 1.0 and governor.iter_fraction == 1.0
+
+
+def test_limits():
+    governor = FrameGovernor(budget_ms=16.0, min_scale=0.5, min_iter_fraction=0.3, cooldown=0)
+    _feed(governor, 500.0, 200)
+    assert governor.scale == 0.5 and governor.iter_fraction == pytest.approx(0.3)
+    assert governor.render_size(1920, 1080) == (960, 540)
+
+    assert governor.iter_cap(1000) == 300
+    assert governor.iter_cap(20) == 10 # Floor
+    governor.reset()
+    assert governor.iter_cap(1000) == 1000 and governor.iter_cap(5) == 5 # Never above max_iter
+
+
+def test_locked_scale_goes_straight_to_iterations():
+    # Foveated rendering sets its own resolution
+    governor = FrameGovernor(budget_ms=16.0, cooldown=0)
+    _feed(governor, 40.0, 3)
+    assert governor.scale < 1.0
+    scale_downs = governor.counters['scale_down']
+    governor.lock_scale(True)
+    assert governor.scale == 1.0 and governor.gpu_ms is None
+    _feed(governor, 40.0, 10)
+    assert governor.scale == 1.0 and governor.counters['scale_down'] == scale_downs
+    assert governor.iter_fraction < 1.0 and governor.last_decision == 'iter_down'
+    _feed(governor, 5.0, 50)
+    assert governor.iter_fraction == 1.0 and governor.counters['scale_up'] == 0
+
+    governor.lock_scale(False) # Back to the scaled render
+    _feed(governor, 40.0, 1)
+    assert governor.last_decision == 'scale_down' and governor.scale < 1.0
@@ -0,0 +1,97 @@
+import os
+import sys
+import math
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics import hrv
+from biometrics.hrv import HrvEngine
+from biometrics.ring_buffer import TimedRingBuffer
+
+
+def steady_beats(n, rr=1000.0, rsa=40.0, breath_s=4.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = 0.0
+    for _ in range(n):
+        value = rr + rsa * math.sin(2.0 * math.pi * t / breath_s) + rng.normal(0.0, 5.0)
+        t += value / 1000.0
+        yield t, value
+
+
+def test_window_metrics_match_direct_formulas():
+    engine = HrvEngine(windows=(60.0,), spectral_window=None)
+    beats = list(steady_beats(200))
+    for t, rr in beats:
+        assert engine.add(t, rr)
+    times = np.array([b[0] for b in beats])
+    rr = np.array([b[1] for b in beats])[times >= times[-1] - 60.0]
+    d = np.diff(rr)
+    m = engine.metrics(60.0)
+    assert m['beats'] == len(rr)
+    assert math.isclose(m['sdnn'], rr.std(ddof=1), rel_tol=1e-9)
+    assert math.isclose(m['rmssd'], math.sqrt(np.mean(d * d)), rel_tol=1e-9)
+    assert math.isclose(m['pnn50'], 100.0 * np.mean(np.abs(d) > 50.0), rel_tol=1e-9)
+    assert math.isclose(m['mean_hr'], 60000.0 / rr.mean(), rel_tol=1e-9)
+
+
+def test_ectopic_beat_is_rejected_and_breaks_the_difference_chain():
+    engine = HrvEngine(windows=(60.0,), spectral_window=None)
+    for t, rr in steady_beats(20, rsa=0.0):
+        engine.add(t, rr)
+    before = engine.metrics(60.0)['beats']
+    assert not engine.add(21.0, 600.0) # Premature beat
+    assert not engine.add(22.0, 5000.0) # Out of range
+    assert engine.rejected == 2
+    assert engine.add(23.0, 1000.0)
+    assert engine.metrics(60.0)['beats'] == before + 1
+    assert np.isnan(engine.diff[(engine.count - 1) % engine.capacity])
+
+
+def test_sustained_rate_change_is_accepted_after_a_few_beats():
+    engine = HrvEngine(windows=(60.0,), spectral_window=None)
+    t = 0.0
+    for _ in range(20):
+        t += 1.0
+        engine.add(t, 1000.0)
+    accepted = [engine.add(t + k * 0.6, 600.0) for k in range(1, 10)]
+    assert not accepted[0]
+    assert accepted[-1]
+
+
+def test_lf_hf_follows_the_dominant_rhythm():
+    breathing = HrvEngine()
+    for t, rr in steady_beats(400, rsa=40.0, breath_s=4.0): # 0.25 Hz, HF
+        breathing.add(t, rr)
+    mayer = HrvEngine()
+    for t, rr in steady_beats(400, rsa=40.0, breath_s=10.0): # 0.1 Hz, LF
+        mayer.add(t, rr)
+    assert breathing.metrics(300.0)['lf_hf'] < 0.5
+    assert mayer.metrics(300.0)['lf_hf'] > 2.0
+
+
+def test_rebuild_keeps_sums_exact_over_long_streams(monkeypatch):
+    monkeypatch.setattr(hrv, 'REBUILD_EVERY', 1000)
+    engine = HrvEngine()
+    for t, rr in steady_beats(5000):
+        engine.add(t, rr)
+    streamed = engine.summary()['windows']
+    engine.rebuild()
+    for window, m in engine.summary()['windows'].items():
+        for key, value in m.items():
+            assert math.isclose(streamed[window][key], value, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def test_consume_reads_only_new_beats():
+    ring = TimedRingBuffer(64)
+    engine = HrvEngine()
+    beats = list(steady_beats(10))
+    for t, rr in beats[:6]:
+        ring.append(t, rr)
+    assert engine.consume(ring) == 6
+    assert engine.consume(ring) == 0
+    for t, rr in beats[6:]:
+        ring.append(t, rr)
+    assert engine.consume(ring) == 4
+    assert engine.count == 10
@@ -0,0 +1,142 @@
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.injections import MAX_INJECTIONS, Injection, inject, prune_injections, visible_injections
+from engine.sdf_pyramid import SDF_HEIGHT, SDF_WIDTH
+from engine.state import FractalState
+
+
+def test_visible_injections_are_culled():
+    # 16:9 at zoom 1 around (-0.75, 0): the view is +-0.89 wide and +-0.5 high
+    state = FractalState()
+    state.publish(offset_x=-0.75, offset_y=0.0, zoom=1.0)
+    here = inject(state, "here", -0.75, 0.0, 1.0)
+    inject(state, "far away", 100.0, 0.0, 1.0)
+    inject(state, "behind", -0.75, 0.0, 1e6) # Smaller than a pixel
+    edge = -0.75 + 0.5 * 16 / 9 + 0.25 # Footprint of scale 10 is +-0.25
+    near = inject(state, "near the edge", edge - 0.01, 0.0, 10.0)
+    inject(state, "past the edge", edge + 0.01, 0.0, 10.0)
+    inject(state, "not yet", -0.75, 0.0, 1.0).born += 60.0
+    now = here.born + 5.0
+    assert [inj for inj, _ in visible_injections(state, 1920, 1080, now)] == [here, near]
+
+    # Zooming in brings the deep one into view and pushes the others out
+    state.publish(zoom=1e6)
+    assert [inj.text for inj, _ in visible_injections(state, 1920, 1080, now)] == ["here", "behind"]
+
+
+def test_at_most_max_injections_newest_kept():
+    state = FractalState()
+    made = [inject(state, f"phrase {i}", state.offset_x, state.offset_y, 1.0, fade=0.0)
+            for i in range(MAX_INJECTIONS + 4)]
+    visible = visible_injections(state, 640, 480, made[-1].born)
+    assert [inj for inj, _ in visible] == made[4:]
+    assert all(a == 1.0 for _, a in visible)
+
+
+def test_anchors_keep_their_digits_at_depth():
+    # Past 1e15 a float64 centre cannot tell apart points a screen apart; the
+    # double-double tail can
+    hi, lo = -0.7436438870371587, 4.5e-17
+    state = FractalState()
+    state.publish(offset_x=hi, offset_x_lo=lo, offset_y=0.1318259042053119, zoom=1e17)
+    here = inject(state, "here", hi, state.offset_y, 1e17, x_lo=lo)
+    inject(state, "hi only", hi, state.offset_y, 1e17) # 4.5 screens to the left
+    assert here.offset_from(state.offset_x, state.offset_y, state.offset_x_lo) == (0.0, 0.0)
+    visible = visible_injections(state, 1920, 1080, here.born + 5.0)
+    assert [inj for inj, _ in visible] == [here]
+
+    # Half a screen to the right of the centre, by the tail alone
+    half = 0.5 / 1e17
+    state.publish(offset_x_lo=lo - half)
+    dx, dy = here.offset_from(state.offset_x, state.offset_y, state.offset_x_lo)
+    assert dx == pytest.approx(half, rel=1e-9) and dy == 0.0
+    assert [inj for inj, _ in visible_injections(state, 1920, 1080, here.born + 5.0)] == [here]
+
+
+def test_fade_and_expiry():
+    inj = Injection("fading", 0.0, 0.0, 1.0, lifetime=10.0, fade=2.0, born=100.0)
+    assert inj.alpha(99.0) == 0.0 # Not born yet
+    assert inj.alpha(101.0) == pytest.approx(0.5) and inj.alpha(105.0) == 1.0
+    assert inj.alpha(109.0) == pytest.approx(0.5) and inj.alpha(110.0) == 0.0
+    assert not inj.expired(109.9) and inj.expired(110.0)
+    assert Injection("pop", 0.0, 0.0, 1.0, fade=0.0, born=100.0).alpha(100.0) == 1.0
+    forever = Injection("forever", 0.0, 0.0, 1.0, born=100.0)
+    assert forever.alpha(1e9) == 1.0 and not forever.expired(1e9)
+
+    state = FractalState()
+    state.injections = [inj, forever]
+    prune_injections(state, 105.0)
+    assert state.injections == [inj, forever]
+    prune_injections(state, 110.0)
+    assert state.injections == [forever]
+
+
+class SdfCache:
+    # Everything is ready at once, except texts listed as pending
+    def __init__(self):
+        self.pending = set()
+
+    def request(self, text, width, height):
+        return text
+
+    def get(self, key):
+        return None if key in self.pending else (bytes(SDF_WIDTH * SDF_HEIGHT), SDF_WIDTH, SDF_HEIGHT)
+
+
+@pytest.fixture
+def pool():
+    moderngl = pytest.importorskip("moderngl")
+    try:
+        ctx = moderngl.create_standalone_context(backend='egl')
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    from engine.injections import InjectionPool
+    pool = InjectionPool(ctx, SdfCache(), layers=2)
+    yield pool
+    pool.release()
+    ctx.release()
+
+
+def test_pool_recycles_the_least_recently_drawn_layer(pool):
+    a = pool._layer_for("a", set(), 1.0)
+    b = pool._layer_for("b", set(), 2.0)
+    assert {a, b} == {0, 1} and pool.free == []
+    assert pool._layer_for("a", set(), 3.0) == a # Shared, not uploaded again
+
+    # "b" was drawn longest ago, so "c" takes its layer
+    assert pool._layer_for("c", set(), 4.0) == b
+    assert pool.layers == {"a": a, "c": b}
+
+    # A layer in use this frame is never taken, even when it is the oldest
+    assert pool._layer_for("d", {a}, 5.0) == b
+    assert pool.layers == {"a": a, "d": b}
+    assert pool._layer_for("e", {a, b}, 6.0) is None # Waits for a later frame
+    assert pool.layers == {"a": a, "d": b}
+
+    pool.sdf_cache.pending.add("f")
+    assert pool._layer_for("f", set(), 7.0) is None and "f" not in pool.layers
+
+
+def test_pool_draws_what_fits(pool):
+    visible = [(Injection(text, 0.0, 0.0, 1.0, born=0.0), 1.0) for text in ("a", "b", "a", "c")]
+    pool.update(visible, 1.0, (0.0, 0.0), 1.0, (320, 180))
+    # The second "a" shares the first one's layer; "c" finds none free this frame
+    assert pool.count == 3 and set(pool.layers) == {"a", "b"}
+    pool.update(visible[3:], 2.0, (0.0, 0.0), 1.0, (320, 180))
+    assert pool.count == 1 and "c" in pool.layers
+
+
+def test_pool_uploads_anchors_relative_to_a_deep_centre(pool):
+    hi, lo = -0.7436438870371587, 4.5e-17
+    inj = Injection("a", hi, 0.0, 1e17, born=0.0, x_lo=lo + 2e-18)
+    pool.update([(inj, 1.0)], 1.0, (hi, 0.0), 1e17, (320, 180), (lo, 0.0))
+    blob = pool.ubo.read()
+    assert struct.unpack_from('4i', blob)[0] == 1
+    dx, dy, scale, alpha = struct.unpack_from('4f', blob, 16)
+    assert dx == pytest.approx(2e-18, rel=1e-6) and dy == 0.0 and alpha == 1.0
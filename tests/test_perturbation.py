@@ -0,0 +1,47 @@
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.perturbation import (
+    compute_reference_orbit, iterate_direct, iterate_perturbed, pixel_deltas, render_iterations,
+)
+
+# Seahorse valley, shallow enough for float64 to be exact
+CENTER = (Decimal("-0.743643887037158704752191506114774"), Decimal("0.131825904205311970493132056385139"))
+
+
+def test_perturbation_matches_direct_iteration():
+    zoom, max_iter = 200.0, 600
+    pixel = pixel_deltas(64, 36, zoom)
+    direct, _ = iterate_direct(pixel + complex(float(CENTER[0]), float(CENTER[1])), max_iter)
+    perturbed = render_iterations(CENTER[0], CENTER[1], zoom, 64, 36, max_iter)
+    assert perturbed.shape == direct.shape == (36, 64)
+    assert np.mean(perturbed == direct) > 0.99
+    assert np.mean(np.abs(perturbed.astype(int) - direct) <= 1) > 0.999
+
+
+def test_rebasing_recovers_from_a_reference_that_escapes():
+    # The reference escapes within a few iterations; pixels inside the set
+    # outlive it and only stay right by restarting at the orbit's start
+    ref = compute_reference_orbit(Decimal("0.3"), Decimal(0), 400)
+    assert ref.escaped and len(ref) < 50
+    c = pixel_deltas(48, 27, 1.5) + complex(-0.5, 0.0)
+    direct, _ = iterate_direct(c, 400)
+    perturbed, _ = iterate_perturbed(c - 0.3, ref, 400)
+    assert (direct == 400).mean() > 0.2 # Some pixels outlive the reference
+    assert np.mean(perturbed == direct) > 0.98
+
+
+def test_extended_orbit_continues_where_it_stopped():
+    short = compute_reference_orbit(CENTER[0], CENTER[1], 100)
+    longer = short.extended(300)
+    assert len(short) == 101 and len(longer) == 301 # The original is left alone
+    full = compute_reference_orbit(CENTER[0], CENTER[1], 300)
+    assert np.array_equal(longer.orbit, full.orbit)
+    assert short.extended(50).orbit is short.orbit # Nothing to add
+    assert longer.covers(CENTER[0], CENTER[1], 1.0, 300) and not short.covers(CENTER[0], CENTER[1], 1.0, 300)
+    assert not longer.covers(CENTER[0], CENTER[1], 1e3, 300) # Needs more digits than it has
@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.pmd import (
+    ACC, ECG, H10_SETTINGS, PVS_SETTINGS, PmdDecoder, PmdSettings, decode_frame, encode_frame,
+)
+from biometrics.polar_worker import FakePolarBackend, PolarWorker
+from biometrics.ring_buffer import TimedRingBuffer
+from engine.recorder import SessionReader, start_recording, stop_recording
+from engine.state import FractalState
+
+STAMP = (123456789).to_bytes(8, 'little')
+
+
+def test_raw_ecg_frame():
+    data = bytes([ECG]) + STAMP + bytes([0x00, 0xFF, 0xFF, 0xFF, 0x01, 0x00, 0x00, 0x00, 0x00, 0x80])
+    kind, timestamp, samples = decode_frame(data)
+    assert (kind, timestamp) == (ECG, 123456789)
+    assert samples.tolist() == [[-1], [1], [-8388608]]
+
+
+def test_raw_acc_frame_types():
+    for frame_type, dtype in ((0, '<i1'), (1, '<i2'), (2, None)):
+        values = np.array([[5, -6, 7], [-100, 0, 100]])
+        if dtype is None:
+            body = b''.join(int(v).to_bytes(3, 'little', signed=True) for v in values.ravel())
+        else:
+            body = values.astype(dtype).tobytes()
+        _, _, samples = decode_frame(bytes([ACC]) + STAMP + bytes([frame_type]) + body)
+        assert samples.tolist() == values.tolist()
+
+
+def test_compressed_frame_by_hand():
+    # Reference (100, -200, 1000), then one block: 3-bit deltas (1, -1, 3)
+    ref = np.array([100, -200, 1000], dtype='<i2').tobytes()
+    data = bytes([ACC]) + STAMP + bytes([0x80]) + ref + bytes([3, 1, 0xF9, 0x00])
+    _, _, samples = decode_frame(data, PVS_SETTINGS[ACC])
+    assert samples.tolist() == [[100, -200, 1000], [101, -201, 1003]]
+
+
+def test_encode_decode_round_trip_across_blocks():
+    rng = np.random.default_rng(1)
+    settings = PmdSettings(52, 16, 3)
+    steps = rng.integers(-300, 300, (120, 3)) * (rng.random((120, 1)) < 0.2) + rng.integers(-3, 4, (120, 3))
+    samples = np.cumsum(steps, axis=0)
+    data = encode_frame(ACC, 42, samples, settings, compressed=True, block=7)
+    assert len(data) < 10 + 120 * 6 # Smaller than the raw frame
+    _, timestamp, decoded = decode_frame(data, settings)
+    assert timestamp == 42
+    np.testing.assert_array_equal(decoded, samples)
+    ecg = rng.integers(-2**20, 2**20, (73, 1))
+    np.testing.assert_array_equal(decode_frame(encode_frame(ECG, 0, ecg, H10_SETTINGS[ECG]))[2], ecg)
+
+
+def test_ring_buffer_extend_matches_append():
+    for n in (3, 7, 30):
+        a, b = TimedRingBuffer(10, width=3), TimedRingBuffer(10, width=3)
+        for k in range(4):
+            a.append(float(k), (k, k, k))
+            b.append(float(k), (k, k, k))
+        times = np.arange(4.0, 4.0 + n)
+        values = np.repeat(times[:, None], 3, axis=1)
+        a.extend(times, values)
+        for t, v in zip(times, values):
+            b.append(t, v)
+        assert a.count == b.count
+        for x, y in zip(a.latest(), b.latest()):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_decoder_times_samples_and_records(tmp_path):
+    state = FractalState()
+    recorder = start_recording(state, str(tmp_path), 's')
+    now = [recorder.started]
+    decoder = PmdDecoder(state, H10_SETTINGS, clock=lambda: now[0])
+    settings = H10_SETTINGS[ACC]
+    sensor = 1000.0 # Sensor clock, s
+    for frame in range(3):
+        samples = np.full((36, 3), frame)
+        end = sensor + (frame + 1) * 36 / 201.0 # Runs a little slower than nominal
+        now[0] = recorder.started + 0.5 + frame * 0.2 + (0.01 if frame else 0.0)
+        decoder.on_data(None, encode_frame(ACC, int(end * 1e9), samples, settings, compressed=True))
+    decoder.on_data(None, bytes([ACC, 1, 2])) # Truncated: counted, not raised
+    stop_recording(state)
+
+    assert (decoder.frames, decoder.samples, decoder.errors) == (3, 108, 1)
+    times, values = state.acc_samples.latest()
+    assert len(times) == 108
+    np.testing.assert_allclose(np.diff(times[36:]), 1 / 201.0, atol=1e-6)
+    assert times[-1] <= now[0]
+    assert values[-1].tolist() == [2.0, 2.0, 2.0]
+    acc = SessionReader(recorder.path).stream('acc')
+    np.testing.assert_allclose(acc['t'], times - recorder.started, atol=1e-6)
+    assert acc['z'][-1] == 2
+
+
+def test_fake_strap_streams_ecg_and_acc():
+    state = FractalState()
+    backend = FakePolarBackend(bpm=60.0, speed=50.0)
+    worker = PolarWorker(state, backend).start()
+    try:
+        deadline = time.time() + 10.0
+        while len(state.ecg_samples) < 130 * 5 and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        worker.stop()
+    assert worker.pmd.errors == 0
+    times, ecg = state.ecg_samples.latest()
+    assert len(times) >= 130 * 5
+    np.testing.assert_allclose(np.diff(times), 1 / 130.0, rtol=1e-3)
+    # One R peak per beat: about as many as seconds at 60 bpm
+    peaks = np.sum((ecg[1:-1] > 800) & (ecg[1:-1] >= ecg[:-2]) & (ecg[1:-1] > ecg[2:]))
+    assert abs(peaks - (times[-1] - times[0])) <= 2
+    _, acc = state.acc_samples.latest()
+    assert -1100 < acc[:, 1].mean() < -900 # Gravity
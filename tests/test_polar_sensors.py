@@ -4,11 +4,17 @@ Simple console script to scan and connect to a Polar heart rate monitor.
 Supports: Polar H10 and Polar Verity Sense
 """
 
+import os
+import sys
 import asyncio
 import struct
 import logging
 from bleak import BleakClient, BleakScanner
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.pmd import H10_SETTINGS, KIND_NAMES, PVS_SETTINGS, decode_frame
+
 # ── UUIDs ──────────────────────────────────────────────────────────────────────
 HR_MEASUREMENT_UUID = "00002a37-0000-1000-8000-00805f9b34fb"
 PMD_CONTROL_UUID    = "fb005c81-02e7-f387-1cad-8acd2d8df0c8"
@@ -22,6 +28,9 @@ PVS_PREFIXES = ("Polar Sense", "Polar Verity Sense")
 SDK_MODE_ENABLE  = bytearray([0x02, 0x09])
 SDK_MODE_DISABLE = bytearray([0x03, 0x09])
 
+# Streams the connected sensor was asked for (compressed frames need them to decode)
+pmd_settings = H10_SETTINGS
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s  %(message)s")
 log = logging.getLogger("polar_connect")
 
@@ -49,9 +58,14 @@ def on_pmd_data(sender, data: bytearray):
     if len(data) < 1:
         return
     meas_type = data[0]
-    type_names = {0x02: "ACC", 0x05: "GYR", 0x06: "MAG", 0x03: "PPI"}
-    print(f"  📡 PMD data [{type_names.get(meas_type, f'0x{meas_type:02x}')}]"
-          f"  {len(data)} bytes")
+    name = KIND_NAMES.get(meas_type, f'0x{meas_type:02x}')
+    try:
+        _, _, samples = decode_frame(data, pmd_settings.get(meas_type))
+    except ValueError as e:
+        print(f"  📡 PMD data [{name}]  {len(data)} bytes, undecodable: {e}")
+        return
+    print(f"  📡 PMD data [{name}]  {len(data)} bytes, {len(samples)} samples,"
+          f" last {samples[-1].tolist() if len(samples) else '-'}")
 
 
 def on_disconnect(client):
@@ -139,6 +153,8 @@ async def connect_h10():
 # ── PVS connect ────────────────────────────────────────────────────────────────
 
 async def connect_pvs():
+    global pmd_settings
+    pmd_settings = PVS_SETTINGS
     print("\nScanning for Polar Verity Sense (up to 10 s)...")
     device = await BleakScanner.find_device_by_filter(
         lambda d, ad: d.name and any(d.name.startswith(p) for p in PVS_PREFIXES),
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biometrics.ring_buffer import TimedRingBuffer
+from biometrics.polar_worker import FakePolarBackend, PolarWorker, parse_hr_measurement
+from engine.state import FractalState
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_parse_uint8_hr_with_rr():
+    buf = TimedRingBuffer(8)
+    # flags: RR present; 60 bpm; RR 1024/1024 s and 512/1024 s
+    hr = parse_hr_measurement(bytearray([0x10, 60, 0x00, 0x04, 0x00, 0x02]), 100.0, buf)
+    assert hr == 60
+    times, values = buf.latest()
+    np.testing.assert_allclose(values, [1000.0, 500.0])
+    np.testing.assert_allclose(times, [99.5, 100.0]) # Newest beat ends at `now`
+
+
+def test_parse_uint16_hr_and_energy_expended():
+    buf = TimedRingBuffer(8)
+    data = bytearray([0x19, 0x2C, 0x01, 0xFF, 0xFF, 0x00, 0x04])
+    assert parse_hr_measurement(data, 5.0, buf) == 300
+    assert buf.last() == (5.0, 1000.0)
+
+
+def test_parse_without_rr_leaves_buffer_alone():
+    buf = TimedRingBuffer(8)
+    assert parse_hr_measurement(bytearray([0x00, 72]), 1.0, buf) == 72
+    assert len(buf) == 0
+
+
+def test_ring_buffer_wraps_without_growing():
+    buf = TimedRingBuffer(4)
+    storage = buf.values
+    for i in range(10):
+        buf.append(float(i), float(i * 10))
+    assert len(buf) == 4
+    assert buf.values is storage
+    times, values = buf.latest()
+    np.testing.assert_array_equal(times, [6, 7, 8, 9])
+    np.testing.assert_array_equal(buf.latest(2)[1], [80, 90])
+    np.testing.assert_array_equal(buf.since(8.0)[0], [8, 9])
+
+
+def test_parse_does_not_allocate_per_packet():
+    buf = TimedRingBuffer(1024)
+    packet = bytearray([0x10, 64, 0xC0, 0x03, 0xB0, 0x03])
+    for _ in range(100):
+        parse_hr_measurement(packet, 1.0, buf) # Warm up
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(2000):
+        parse_hr_measurement(packet, 1.0, buf)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename")
+                if stat.traceback[0].filename.endswith(("polar_worker.py", "ring_buffer.py")))
+    assert grown < 4096
+
+
+def test_fake_strap_streams_into_state():
+    state = FractalState()
+    backend = FakePolarBackend(bpm=60.0, speed=50.0)
+    worker = PolarWorker(state, backend).start()
+    try:
+        assert wait_for(lambda: len(state.rr_intervals) >= 20)
+        assert state.polar_status.startswith("connected")
+        assert 50 <= state.current_hr <= 70
+        times, rr = state.rr_intervals.latest()
+        assert np.all(np.diff(times) > 0)
+        assert 850.0 < rr.mean() < 1150.0
+    finally:
+        worker.stop()
+    assert state.polar_status == "off"
+    assert state.current_hr == 0
+
+
+def test_reconnects_after_drops_and_failed_scans():
+    state = FractalState()
+    backend = FakePolarBackend(speed=100.0, session_s=5.0, missing_scans=2)
+    worker = PolarWorker(state, backend, min_backoff=0.01, max_backoff=0.05).start()
+    try:
+        assert wait_for(lambda: backend.connects >= 3)
+        assert wait_for(lambda: len(state.rr_intervals) > 0)
+    finally:
+        worker.stop()
+    assert worker.sessions >= 3
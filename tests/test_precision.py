@@ -0,0 +1,124 @@
+import os
+import sys
+from decimal import Decimal, localcontext
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import export
+from engine.cpu_renderer import frame_uniforms, render_tile, uses_double_double
+from engine.perturbation import iterate_direct, pixel_deltas, render_iterations
+from engine.precision import (
+    FLOAT32_ZOOM_LIMIT, FLOAT64_ZOOM_LIMIT, add_offset, iterate_double, pixel_coordinates,
+    split_float32, view_center, view_precision,
+)
+from engine.programs import variant_key
+from engine.state import FractalState
+
+# A boundary point of the seahorse valley, to more digits than a double holds
+CENTER = (Decimal("-0.743643887037158704752191506114774"), Decimal("0.131825904205311970493132056385139"))
+
+
+def _double_double(value):
+    hi = float(value)
+    return hi, float(value - Decimal(hi))
+
+
+def test_accumulated_offsets_do_not_drift():
+    # A slow zoom towards a point away from the centre, as on_render pulls it
+    hi, lo, plain = -0.75, 0.0, -0.75
+    with localcontext() as ctx:
+        ctx.prec = 60
+        exact = Decimal(-0.75)
+        zoom = 1.0
+        for _ in range(20000):
+            zoom *= 1.002
+            delta = 0.3 * 0.002 / zoom
+            hi, lo = add_offset(hi, lo, delta)
+            plain += delta
+            exact += Decimal(delta)
+        dd_error = abs(Decimal(hi) + Decimal(lo) - exact)
+        plain_error = abs(Decimal(plain) - exact)
+    assert zoom > 1e17
+    assert dd_error < Decimal("1e-28") and plain_error > Decimal("1e-18")
+
+
+def test_publishing_an_offset_alone_clears_its_tail():
+    state = FractalState()
+    state.publish(offset_x=-0.75, offset_x_lo=1e-20, offset_y=0.1, offset_y_lo=-1e-20)
+    state.publish(offset_x=-0.5)
+    assert state.offset_x_lo == 0.0 and state.offset_y_lo == -1e-20
+
+
+def test_float32_split_keeps_the_tail():
+    hi, lo = _double_double(CENTER[0])
+    hi32, lo32 = split_float32(hi, lo)
+    assert hi32 == float(np.float32(hi))
+    assert abs(Decimal(hi32) + Decimal(lo32) - CENTER[0]) < Decimal(2.0 ** -46)
+    assert view_center((hi, 0.0), (lo, 0.0))[0] - CENTER[0] < Decimal("1e-30")
+
+
+def test_precision_ladder_rungs():
+    assert view_precision(FLOAT32_ZOOM_LIMIT / 2) == 0 and view_precision(FLOAT32_ZOOM_LIMIT) == 1
+    assert variant_key(0, 3.0, False, 1) == (0, 3, False, 1)
+    assert variant_key(0, 2.5, False, 1) == (0, 0, False, 0) # No double-float polar kernel
+    u = frame_uniforms(FractalState(), 8, 8, elapsed=0.0)
+    assert not uses_double_double(u)
+    assert uses_double_double(dict(u, zoom=FLOAT64_ZOOM_LIMIT))
+    assert not uses_double_double(dict(u, zoom=1e12, power=2.5))
+
+
+def _matching(a, b):
+    return np.mean(a == b)
+
+
+def test_double_float_resolves_where_float32_runs_out():
+    zoom, max_iter = 1e7, 1500
+    (x, x_lo), (y, y_lo) = _double_double(CENTER[0]), _double_double(CENTER[1])
+    pixel = pixel_deltas(48, 27, 1.0)
+    reference, _ = iterate_direct(pixel / zoom + complex(x, y), max_iter)
+    single, _ = iterate_direct((pixel / zoom + complex(x, y)).astype(np.complex64), max_iter)
+    cx, cy = pixel_coordinates((x, y), (x_lo, y_lo), pixel, zoom, dtype=np.float32)
+    pair, _ = iterate_double(cx, cy, 2, max_iter)
+    assert _matching(pair, reference) > 0.9
+    assert _matching(single, reference) < 0.5
+
+
+def test_cpu_renderer_goes_double_double_past_float64():
+    zoom, max_iter = 1e13, 9000
+    (x, x_lo), (y, y_lo) = _double_double(CENTER[0]), _double_double(CENTER[1])
+    reference = render_iterations(CENTER[0], CENTER[1], zoom, 48, 27, max_iter)
+    pixel = pixel_deltas(48, 27, 1.0)
+    cx, cy = pixel_coordinates((x, y), (x_lo, y_lo), pixel, zoom)
+    double_double, _ = iterate_double(cx, cy, 2, max_iter)
+    plain, _ = iterate_direct(pixel / zoom + complex(x, y), max_iter)
+    assert _matching(double_double, reference) > 0.9
+    assert _matching(plain, reference) < 0.5
+
+    state = FractalState()
+    state.publish(offset_x=x, offset_x_lo=x_lo, offset_y=y, offset_y_lo=y_lo, zoom=zoom, max_iter=300)
+    u = frame_uniforms(state, 16, 9, elapsed=0.0)
+    assert uses_double_double(u)
+    tile, work = render_tile(u, 0, 0, 16, 9)
+    assert tile.shape == (9, 16, 3) and work > 0
+
+
+def test_gl_double_float_kernel_matches_the_cpu(monkeypatch):
+    pytest.importorskip("moderngl")
+    try:
+        gl = export.GlTileRenderer()
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    (x, x_lo), (y, y_lo) = _double_double(CENTER[0]), _double_double(CENTER[1])
+    state = FractalState()
+    state.publish(offset_x=x, offset_x_lo=x_lo, offset_y=y, offset_y_lo=y_lo, zoom=1e7, max_iter=1500)
+    u = frame_uniforms(state, 96, 54, elapsed=0.0)
+    cpu, _ = render_tile(u, 0, 0, 96, 54)
+    off = lambda frame: np.mean(np.abs(frame.astype(np.int16) - cpu.astype(np.int16)).max(axis=-1) > 8)
+
+    assert off(gl.render(u, 0, 0, 96, 54)) < 0.05
+    monkeypatch.setattr(export, "view_precision", lambda zoom: 0)
+    assert off(gl.render(u, 0, 0, 96, 54)) > 0.3 # The float32 kernel has gone blocky
+    gl.ctx.release()
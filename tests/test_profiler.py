@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.profiler import GpuTimer, Histogram, Profiler
+
+
+def test_percentiles_are_within_a_bin_of_exact():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(mean=0.0, sigma=1.0, size=20000) # ms
+    h = Histogram()
+    for v in values:
+        h.record(float(v))
+    s = h.summary()
+    assert s['count'] == 20000 and s['max_ms'] == values.max()
+    assert s['mean_ms'] == pytest.approx(values.mean())
+    for q, key in ((50, 'p50_ms'), (99, 'p99_ms')):
+        assert s[key] == pytest.approx(np.percentile(values, q), rel=0.09)
+
+
+def test_extremes_and_empty():
+    h = Histogram()
+    assert h.summary()['p99_ms'] == 0.0
+    h.record(0.0)
+    h.record(1e9) # Past the last bin
+    assert h.percentile(100.0) == 1e9 and h.percentile(1.0) <= 1e-3
+
+
+def test_laps_and_frames():
+    prof = Profiler()
+    for _ in range(3):
+        prof.frame()
+        prof.lap('a')
+        prof.lap('b')
+    s = prof.summary()
+    assert s['cpu.a']['count'] == 3 and s['cpu.b']['count'] == 3
+    assert s['cpu.frame']['count'] == 2 # Recorded when the next frame starts
+    assert list(s) == sorted(s)
+
+
+def test_spans_from_sensor_threads():
+    prof = Profiler()
+
+    def sensor(name):
+        for _ in range(1000):
+            with prof.span(name):
+                pass
+
+    threads = [threading.Thread(target=sensor, args=(f"sensor{k}",)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [prof.summary()[f"sensor{k}"]['count'] for k in range(4)] == [1000] * 4
+
+
+def test_export_and_reset(tmp_path):
+    prof = Profiler()
+    prof.record('cpu.scene', 2.0)
+    prof.record('cpu.scene', 4.0)
+    path = prof.export(root=str(tmp_path))
+    with open(path) as f:
+        data = json.load(f)
+    scene = data['spans']['cpu.scene']
+    assert scene['count'] == 2 and scene['max_ms'] == 4.0 and sum(scene['bins'].values()) == 2
+    prof.reset()
+    assert prof.summary() == {}
+
+
+def test_gpu_timer_reads_a_frame_ring_behind():
+    moderngl = pytest.importorskip("moderngl")
+    try:
+        ctx = moderngl.create_standalone_context(backend='egl')
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    prof = Profiler()
+    timer = GpuTimer(ctx, prof, 'gpu.clear', ring=3)
+    fbo = ctx.simple_framebuffer((64, 64))
+    for frame in range(5):
+        with timer:
+            fbo.use()
+            fbo.clear(0.5, 0.5, 0.5)
+    # Frames 0 and 1 were read back when their queries were reused (frames 3 and 4)
+    assert prof.summary()['gpu.clear']['count'] == 2 and timer.ms >= 0.0
+    ctx.release()
@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.programs import GENERAL_POWER, ProgramCache, power_variant, variant_defines, variant_key
+
+
+class Program:
+    def __init__(self, defines):
+        self.defines = defines
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+def _cache():
+    compiled = []
+    setups = []
+
+    def load(defines):
+        compiled.append(defines)
+        return Program(defines)
+
+    return ProgramCache(load, lambda program, key: setups.append(key)), compiled, setups
+
+
+def test_variant_keys():
+    assert power_variant(3.0) == 3 and power_variant(3.0000001) == 3
+    assert power_variant(2.5) == GENERAL_POWER and power_variant(7.0) == GENERAL_POWER
+    assert variant_key(0, 4.0, [1], 1) == (0, 4, True, 1)
+    assert variant_key(2, 4.0, True, 1) == (2, GENERAL_POWER, False, 0)
+    assert variant_defines((1, 0, False, 0)) == {'PASS': '1', 'POWER': '0', 'INJECTIONS': '0', 'PRECISION': '0'}
+
+
+def test_compiles_lazily_and_falls_back_to_the_general_kernel():
+    cache, compiled, setups = _cache()
+    assert compiled == [] # Nothing until a frame asks
+
+    # A variant that is not compiled yet draws with the general kernel
+    program = cache.get(0, 3.0, False)
+    assert program.defines['POWER'] == '0' and program.defines['INJECTIONS'] == '1'
+    assert len(compiled) == 1 and setups == [(0, GENERAL_POWER, True, 0)]
+    assert cache.queue == [(0, 3, False, 0)] and cache.counters['fallbacks'] == 1
+
+    # One compile per frame, after drawing; then the frame gets its own kernel
+    cache.warm()
+    assert len(compiled) == 2 and cache.queue == []
+    program = cache.get(0, 3.0, False)
+    assert program.defines['POWER'] == '3' and cache.counters['hits'] == 1
+    assert len(compiled) == 2
+
+    # The general kernel itself and the shade pass compile when first needed
+    assert cache.get(0, 2.5, True).defines['POWER'] == '0'
+    assert cache.get(2, 3.0, False).defines['PASS'] == '2'
+    assert cache.counters['fallbacks'] == 1 and cache.counters['compiled'] == 3
+
+
+def test_prefetch_queues_the_neighbouring_integers():
+    cache, compiled, _ = _cache()
+    cache.prefetch(0, 2.4, False)
+    assert set(cache.queue) == {(0, 2, False, 0), (0, 2, True, 0), (0, 3, False, 0), (0, 3, True, 0)}
+    cache.prefetch(0, 2.4, False) # Not queued twice
+    assert len(cache.queue) == 4
+    for frame in range(4):
+        cache.warm()
+        assert len(compiled) == frame + 1
+    cache.warm()
+    assert len(compiled) == 4 and cache.queue == []
+
+    programs = list(cache.programs.values())
+    cache.release()
+    assert all(p.released for p in programs) and cache.programs == {}
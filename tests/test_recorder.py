@@ -0,0 +1,129 @@
+import os
+import sys
+import math
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import recorder as rec
+from engine.recorder import (
+    CLEAR, INJECT, RecordStream, SessionReader, SessionReplayer, list_sessions,
+    start_recording, stop_recording,
+)
+from engine.injections import clear_injections, inject
+from engine.state import FractalState
+from biometrics.gaze import GazePipeline
+from biometrics.polar_worker import PolarWorker
+
+
+def test_stream_grows_across_chunks_and_trims_on_close(tmp_path):
+    stream = RecordStream(str(tmp_path), 'gaze', rec.STREAMS['gaze'], offset=100.0, chunk=8)
+    for k in range(20):
+        stream.append(100.0 + k, k * 0.5, -k)
+    assert stream.capacity == 24
+    stream.close()
+    stream.append(200.0, 0.0, 0.0) # After close: dropped, not a crash
+    assert os.path.getsize(tmp_path / 'gaze.x.bin') == 20 * 4
+    t = np.fromfile(tmp_path / 'gaze.t.bin', dtype='<f8')
+    np.testing.assert_array_equal(t, np.arange(20.0))
+
+
+def test_unclosed_session_is_readable_up_to_the_last_record(tmp_path):
+    state = FractalState()
+    recorder = start_recording(state, str(tmp_path), 'crashed')
+    for k in range(5):
+        recorder.gaze.append(recorder.t0 + k * 0.01, 0.5, 0.25)
+    # No stop_recording: files still have their preallocated size
+    reader = SessionReader(recorder.path)
+    gaze = reader.stream('gaze')
+    assert len(gaze['t']) == 5
+    np.testing.assert_allclose(gaze['t'], np.arange(5) * 0.01)
+    np.testing.assert_allclose(gaze['y'], 0.25)
+    assert list_sessions(str(tmp_path)) == [recorder.path]
+
+
+def test_publish_records_params_and_injections(tmp_path):
+    state = FractalState()
+    recorder = start_recording(state, str(tmp_path), 's')
+    state.publish(power=3.0, zoom=5.0) # zoom is per-frame view state, not a param
+    state.max_iter = 200
+    inject(state, "CALM", 0.1, 0.2, 4.0, lifetime=30.0)
+    clear_injections(state)
+    stop_recording(state)
+    assert state.recorder is None
+
+    reader = SessionReader(recorder.path)
+    params = reader.stream('params')
+    fields = [reader.fields[int(f)] for f in params['field']]
+    n = len(rec.PARAM_FIELDS)
+    assert fields[n:] == ['power', 'max_iter'] # After the initial values
+    assert params['value'][n] == 3.0
+    events = reader.stream('events')
+    kinds = events['kind'].tolist()
+    assert INJECT in kinds and CLEAR in kinds
+    i = kinds.index(INJECT)
+    assert bytes(events['text'][i]) == b"CALM"
+    assert (events['x'][i], events['scale'][i], events['lifetime'][i]) == (0.1, 4.0, 30.0)
+
+
+class FixedClockBackend:
+    def __init__(self, now):
+        self.now = now
+
+    def clock(self):
+        return self.now
+
+
+def test_sensor_hooks_record_gaze_and_beats(tmp_path):
+    state = FractalState()
+    recorder = start_recording(state, str(tmp_path), 's')
+    pipeline = GazePipeline(state)
+    pipeline.push(0.3, 0.4)
+    worker = PolarWorker(state, backend=FixedClockBackend(recorder.started + 2.0))
+    worker.on_hr(None, bytearray([0x10, 60, 0x00, 0x04, 0x00, 0x02]))
+    stop_recording(state)
+
+    reader = SessionReader(recorder.path)
+    assert reader.stream('gaze')['x'].tolist() == [np.float32(0.3)]
+    np.testing.assert_allclose(reader.stream('rr')['rr'], [1000.0, 500.0])
+    np.testing.assert_allclose(reader.stream('rr')['t'], [1.5, 2.0])
+    assert reader.stream('hr')['bpm'].tolist() == [60]
+
+
+def test_replay_reproduces_state(tmp_path):
+    source = FractalState()
+    recorder = start_recording(source, str(tmp_path), 's')
+    clock = [recorder.t0]
+    pipeline = GazePipeline(source, clock=lambda: clock[0])
+    for k in range(40):
+        clock[0] = recorder.t0 + k / 90.0
+        pipeline.push(0.2 + 0.01 * k, 0.5)
+    for k in range(10):
+        recorder.rr.append(recorder.started + k, 1000.0 + 10.0 * (k % 2))
+    source.publish(power=4.0, color_r=0.7, reproject=True)
+    inject(source, "HELLO", -0.5, 0.1, 2.0)
+    stop_recording(source)
+
+    target = FractalState()
+    replayer = SessionReplayer(recorder.path, target, speed=0)
+    replayer.run()
+    assert replayer.finished()
+    assert (target.power, target.color_r, target.reproject) == (4.0, 0.7, True)
+    assert isinstance(target.reproject, bool)
+    assert [inj.text for inj in target.injections] == ["HELLO"]
+    assert math.isclose(target.gaze_x, source.gaze_x, rel_tol=1e-6)
+    assert math.isclose(target.gaze_vx, source.gaze_vx, rel_tol=1e-4)
+    assert len(target.rr_intervals) == 10
+    assert target.hrv['accepted'] == 10
+
+
+def test_reader_chunks_cover_the_stream(tmp_path):
+    state = FractalState()
+    recorder = start_recording(state, str(tmp_path), 's')
+    for k in range(1000):
+        recorder.rr.append(recorder.started + k, 900.0 + k % 7)
+    stop_recording(state)
+    reader = SessionReader(recorder.path)
+    total = sum(float(c['rr'].sum()) for c in reader.chunks('rr', size=300))
+    assert total == float(np.sum(900.0 + np.arange(1000) % 7))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Frame-time regression suite: drives the real FractalRenderer on a headless
+(software) GL context across resolutions, max_iter and zoom depths and
+compares the median frame time with tests/golden/render_perf.json. Run with
+pytest, or `python tests/test_render_perf.py --update` to measure this
+machine and rewrite the baseline after an intentional change. Timings are
+wall time of on_render() plus glFinish, so they include the GPU work.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "render_perf.json")
+RESOLUTIONS = ((160, 90), (320, 180))
+MAX_ITERS = (100, 500)
+# name -> view; "deep" is past the float32 limit, so it renders with perturbation
+DEPTHS = {
+    "shallow": {"offset_x": -0.75, "offset_y": 0.0, "zoom": 1.0, "deep_zoom": False},
+    "seahorse": {"offset_x": -0.7436439, "offset_y": 0.1318259, "zoom": 400.0, "deep_zoom": False},
+    "deep": {"offset_x": -0.743643887037151, "offset_y": 0.131825904205330, "zoom": 1e7, "deep_zoom": True},
+}
+FRAMES = 20
+TOLERANCE = 2.5 # Fail when the median frame is this many times the baseline...
+SLACK_MS = 2.0 # ...plus this, so tiny baselines do not fail on noise
+
+
+def case_id(size, max_iter, depth):
+    return f"{size[0]}x{size[1]}-iter{max_iter}-{depth}"
+
+
+def create_renderer(size):
+    # A FractalRenderer on a headless window of the given size
+    import moderngl_window as mglw
+    from moderngl_window.conf import settings
+    from engine.state import FractalState
+    from engine.renderer import FractalRenderer
+
+    settings.WINDOW['class'] = 'moderngl_window.context.headless.Window'
+    settings.WINDOW['size'] = size
+    settings.WINDOW['backend'] = 'egl'
+    mglw.settings.RESOURCE_DIRS = [ROOT]
+    FractalRenderer.state = FractalState()
+    FractalRenderer.window_size = size
+    window = mglw.create_window_from_settings()
+    app = FractalRenderer(ctx=window.ctx, wnd=window, timer=None)
+    window.config = app
+    return window, app
+
+
+def measure(window, app, max_iter, depth, frames=FRAMES):
+    # Median and p90 frame time (ms) for one case, after warming up
+    state = app.state
+    state.publish(max_iter=max_iter, zoom_speed=0.0, governor_enabled=False, reproject=False,
+                  use_eye_tracker=False, **DEPTHS[depth])
+
+    def frame():
+        t0 = time.perf_counter()
+        window.clear()
+        app.on_render(time.perf_counter(), 1.0 / 60.0)
+        window.ctx.finish()
+        return (time.perf_counter() - t0) * 1000.0
+
+    # Until every kernel variant is compiled and, at depth, the reference orbit is on the GPU
+    deadline = time.perf_counter() + 30.0
+    warm = 0
+    while time.perf_counter() < deadline:
+        frame()
+        warm += 1
+        ready = not app.programs.queue and (state.deep_zoom_active or not state.deep_zoom)
+        if ready and warm >= 3:
+            break
+    state.profiler.reset()
+    times = np.array([frame() for _ in range(frames)])
+    return float(np.median(times)), float(np.percentile(times, 90))
+
+
+def load_baseline():
+    try:
+        with open(BASELINE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@pytest.fixture(scope="module", params=RESOLUTIONS, ids=lambda s: f"{s[0]}x{s[1]}")
+def renderer(request):
+    try:
+        window, app = create_renderer(request.param)
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    yield request.param, window, app
+    app.on_close()
+    window.destroy()
+
+
+@pytest.mark.parametrize("depth", DEPTHS)
+@pytest.mark.parametrize("max_iter", MAX_ITERS)
+def test_frame_time(renderer, max_iter, depth):
+    size, window, app = renderer
+    p50, _ = measure(window, app, max_iter, depth)
+    assert app.state.deep_zoom_active == DEPTHS[depth]["deep_zoom"]
+
+    # Every phase of the frame was profiled, and the GPU timers report
+    phases = app.state.profiler.summary()
+    for name in ('cpu.tweens', 'cpu.injections', 'cpu.uniforms', 'cpu.scene', 'cpu.ui', 'gpu.scene', 'gpu.ui'):
+        assert phases[name]['count'] > 0, name
+
+    expected = load_baseline().get(case_id(size, max_iter, depth))
+    if expected is None:
+        pytest.skip(f"no baseline for {case_id(size, max_iter, depth)} (median {p50:.2f} ms)")
+    assert p50 <= expected * TOLERANCE + SLACK_MS, \
+        f"{case_id(size, max_iter, depth)}: median {p50:.2f} ms, baseline {expected:.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help=f"Rewrite {os.path.relpath(BASELINE, ROOT)}")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    args = parser.parse_args()
+
+    baseline = load_baseline()
+    measured = {}
+    print(f"  {'case':<28} {'median':>8} {'p90':>8} {'baseline':>9}")
+    for size in RESOLUTIONS:
+        window, app = create_renderer(size)
+        for max_iter in MAX_ITERS:
+            for depth in DEPTHS:
+                name = case_id(size, max_iter, depth)
+                p50, p90 = measure(window, app, max_iter, depth, args.frames)
+                measured[name] = round(p50, 3)
+                old = baseline.get(name)
+                print(f"  {name:<28} {p50:8.2f} {p90:8.2f} {old if old is not None else '-':>9}")
+        app.on_close()
+        window.destroy()
+    if args.update:
+        with open(BASELINE, "w") as f:
+            json.dump(measured, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Wrote {BASELINE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.reprojection import HISTORY_LOCATION, TemporalReprojector
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE = (160, 90)
+VIEW = (-0.743643887, 0.131825904, 100.0)
+KEY = (2.0, 400, 0)
+
+
+class Stub:
+    # Stands in for GL objects: every call does nothing
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: Stub()
+
+
+class Uniforms:
+    def __init__(self):
+        self.slots = {}
+
+    def set(self, name, *values):
+        self.slots[name] = values
+
+
+def _frame(reprojector, view=VIEW, key=KEY, size=SIZE):
+    # prepare() and a stubbed render(); returns the warp and refine slots
+    uniforms = Uniforms()
+    reprojector.prepare(uniforms, size, view, key)
+    reprojector.render(Stub(), Stub(), None, None)
+    return uniforms.slots['warp'], uniforms.slots['refine']
+
+
+def _pan(pixels, view=VIEW, size=SIZE):
+    # The view moved right by a number of pixels
+    x, y, zoom = view
+    return (x + pixels / (zoom * min(size)), y, zoom)
+
+
+def test_history_is_kept_while_nothing_else_changes():
+    reprojector = TemporalReprojector(Stub())
+    warp, refine = _frame(reprojector)
+    assert warp == (0.0, 0.0, 1.0, 0.75) and refine[0] == 0 # No history yet
+    warp, refine = _frame(reprojector, _pan(3))
+    assert refine[0] == 1 and warp[2] == 1.0 and warp[3] == 0.75
+    assert warp[0] == pytest.approx(3.0 / min(SIZE)) and warp[1] == 0.0 # In pixel space, not px
+    warp, refine = _frame(reprojector, (VIEW[0], VIEW[1], VIEW[2] * 1.05))
+    assert refine[0] == 1 and warp[2] == pytest.approx(1.0 / 1.05)
+    assert reprojector.counters['invalidations'] == 0
+
+
+@pytest.mark.parametrize("key", [(3.0, 400, 0), (2.0, 200, 0), (2.0, 400, 1)], ids=["power", "max_iter", "deep"])
+def test_history_is_dropped_when_the_iteration_changes(key):
+    reprojector = TemporalReprojector(Stub())
+    _frame(reprojector)
+    _frame(reprojector)
+    _, refine = _frame(reprojector, key=key)
+    assert refine[0] == 0 and reprojector.counters['invalidations'] == 1
+    _, refine = _frame(reprojector, key=key)
+    assert refine[0] == 1
+
+
+def test_history_is_dropped_on_a_resize_or_a_jump():
+    reprojector = TemporalReprojector(Stub())
+    _frame(reprojector)
+    _, refine = _frame(reprojector, size=(320, 180))
+    assert refine[0] == 0 and reprojector.size == (320, 180)
+
+    # Panned by a whole frame: nothing overlaps
+    reprojector = TemporalReprojector(Stub())
+    _frame(reprojector)
+    assert _frame(reprojector, _pan(150))[1][0] == 1 # Still overlapping
+    assert _frame(reprojector, _pan(330, _pan(150)))[1][0] == 0
+    # Zoomed by more than max_zoom_step in one frame
+    _frame(reprojector) # Back where it started: another cut
+    assert _frame(reprojector, (VIEW[0], VIEW[1], VIEW[2] * 3.9))[1][0] == 1
+    assert _frame(reprojector, (VIEW[0], VIEW[1], VIEW[2] * 3.9 * 5.0))[1][0] == 0
+    assert reprojector.counters['invalidations'] == 3
+
+
+def test_max_error_reaches_the_shader():
+    reprojector = TemporalReprojector(Stub(), max_error=0.3)
+    assert _frame(reprojector)[0][3] == 0.3
+    assert _frame(reprojector, _pan(1))[0][3] == 0.3
+
+
+def test_refine_phase_rotates_through_the_period():
+    reprojector = TemporalReprojector(Stub(), refine_period=4)
+    phases = [_frame(reprojector)[1] for _ in range(9)]
+    assert all(period == 4 for _, period, _ in phases)
+    assert [phase for _, _, phase in phases[1:]] == [1, 2, 3, 0, 1, 2, 3, 0]
+
+
+# --- On the GPU ---
+
+@pytest.fixture(scope="module")
+def passes():
+    moderngl = pytest.importorskip("moderngl")
+    import moderngl_window as mglw
+    from moderngl_window import resources
+    from moderngl_window.meta import ProgramDescription
+    from engine.injections import InjectionPool
+    from engine.uniforms import UniformBuffer
+    try:
+        ctx = moderngl.create_standalone_context(backend='egl')
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    mglw.activate_context(ctx=ctx)
+    resources.register_dir(ROOT)
+    pool = InjectionPool(ctx, sdf_cache=None) # Empty pool: no injections bound
+    programs = []
+    for number in (1, 2):
+        program = resources.programs.load(ProgramDescription(path='shaders/fractal.glsl',
+                                                             defines={'PASS': str(number)}))
+        if number == 1:
+            pool.attach(program, texture_location=0, block_binding=0)
+            program['ref_orbit'].value = 1
+        program['history'].value = HISTORY_LOCATION
+        programs.append(program)
+    uniforms = UniformBuffer(ctx, programs[0])
+    uniforms.attach(programs[1])
+    yield ctx, mglw.geometry.quad_fs(), programs, pool, uniforms
+    uniforms.release()
+    pool.release()
+    ctx.release()
+
+
+def _recomputed(passes, max_error, shift):
+    # Share of pixels that ran the escape loop on the frame after a pan of `shift` px
+    ctx, quad, (iterate, shade), pool, uniforms = passes
+    target = ctx.simple_framebuffer(SIZE)
+    reprojector = TemporalReprojector(ctx, max_error=max_error)
+    for view in (VIEW, _pan(shift)):
+        uniforms.set('screen', *SIZE)
+        uniforms.set('view', view[0], view[1], view[2], 0.0)
+        uniforms.set('shape', KEY[0], 1.0, 1.0, 1.0)
+        uniforms.set('flags', KEY[1], 0, 0, KEY[1])
+        reprojector.prepare(uniforms, SIZE, view, KEY)
+        uniforms.upload()
+        pool.use()
+        reprojector.render(quad, target, iterate, shade)
+    buffer = np.frombuffer(reprojector.buffer().read(), dtype=np.float32).reshape(-1, 4)
+    reprojector.release()
+    target.release()
+    return float((buffer[:, 3] >= 1.0).mean())
+
+
+def test_samples_further_than_max_error_are_recomputed(passes):
+    # Half a pixel: every old sample sits 0.5 px from a new pixel centre
+    assert _recomputed(passes, 0.75, 0.5) < 0.2 # The refresh slice, plus the column that came into view
+    assert _recomputed(passes, 0.25, 0.5) == 1.0
+    assert _recomputed(passes, 0.75, 0.0) < 0.2
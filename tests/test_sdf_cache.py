@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import sdf_cache
+from engine.sdf_cache import SdfCache, _disk_path, sdf_key
+from engine.sdf_maker import create_text_sdf
+
+SIZE = dict(width=128, height=64, font_size=40) # Small, so the workers are quick
+
+
+def _wait(cache, key, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = cache.get(key)
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError(f"{key[0]!r} never finished")
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = SdfCache(cache_dir=str(tmp_path), workers=1, **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_lru_is_bounded(make_cache):
+    cache = make_cache(capacity=2)
+    a = cache.request("alpha", **SIZE)
+    _wait(cache, a)
+    b = cache.request("beta", **SIZE)
+    _wait(cache, b)
+    assert cache.get(a) is not None # Now the most recently used
+    c = cache.request("gamma", **SIZE)
+    _wait(cache, c)
+    assert cache.get(b) is None and cache.get(a) is not None
+    assert set(cache._lru) == {a, c}
+
+
+def test_disk_cache_round_trip(make_cache, tmp_path):
+    cache = make_cache()
+    key = cache.request("round trip", **SIZE)
+    data, w, h = _wait(cache, key)
+    assert (w, h) == (128, 64) and len(data) == w * h
+    path = _disk_path(str(tmp_path), key, True)
+    assert os.listdir(tmp_path) == [os.path.basename(path)] # No temporary files left behind
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+    # A fresh cache (a new session) reads the file instead of building the SDF
+    with open(path, "wb") as f:
+        f.write(bytes([7]) * (w * h))
+    fresh = make_cache()
+    assert fresh.request("round trip", **SIZE) == key
+    assert _wait(fresh, key)[0] == bytes([7]) * (w * h)
+
+    # A file of the wrong size is rebuilt and replaced
+    with open(path, "wb") as f:
+        f.write(b"partial")
+    again = make_cache()
+    assert _wait(again, again.request("round trip", **SIZE))[0] == data
+    assert os.path.getsize(path) == w * h
+
+    # The glyph atlas and the EDT build different buffers, so they never share a file
+    assert _disk_path(str(tmp_path), key, False) != path
+
+
+def test_requests_are_deduplicated(make_cache, monkeypatch):
+    submitted = []
+    submit = sdf_cache.submit_restarting
+
+    def counting(owner, fn, *args):
+        submitted.append(args[0])
+        return submit(owner, fn, *args)
+
+    monkeypatch.setattr(sdf_cache, "submit_restarting", counting)
+    cache = make_cache()
+    key = cache.request("once", **SIZE)
+    assert key == sdf_key("once", **SIZE)
+    for _ in range(5):
+        assert cache.request("once", **SIZE) == key # Pending: not submitted again
+    assert cache.is_pending(key)
+    _wait(cache, key)
+    assert not cache.is_pending(key)
+    cache.request("once", **SIZE) # Ready: served from memory
+    assert submitted == [key]
+
+
+def test_text_the_atlas_lacks_is_built_exactly(make_cache, tmp_path):
+    cache = make_cache()
+    key = cache.request("ÉTÉ", **SIZE)
+    data, w, h = _wait(cache, key)
+    assert data == create_text_sdf("ÉTÉ", w, h, SIZE['font_size'])[0]
+    # Stored as an EDT, apart from any atlas composite an older version left
+    assert os.listdir(tmp_path) == [os.path.basename(_disk_path(str(tmp_path), key, False))]
+
+
+def test_requests_lost_to_a_dead_worker_are_retried(make_cache):
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+
+    def lost(cache, text, error):
+        # As if the request was in flight when `error` ended it
+        key = sdf_key(text, **SIZE)
+        future = Future()
+        future.set_exception(error)
+        cache._pending[key] = future
+        cache._finish(key, future, 0.0)
+        return key
+
+    cache = make_cache()
+    key = lost(cache, "survivor", BrokenProcessPool("a worker died"))
+    assert key not in cache._failed and not cache.is_pending(key)
+    assert cache.request("survivor", **SIZE) == key and cache.is_pending(key) # Straight back in
+    assert _wait(cache, key) is not None
+
+    # A real build error still backs off
+    key = lost(cache, "broken", RuntimeError("no such font"))
+    assert key in cache._failed
+    cache.request("broken", **SIZE)
+    assert not cache.is_pending(key) and cache.get(key) is None
@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import cpu_renderer
+from engine.cpu_renderer import frame_uniforms, melt_factor, render_tile
+from engine.sdf_maker import create_image_sdf, create_text_sdf, is_mask, load_mask, mask_rect, register_mask
+from engine.sdf_pyramid import (
+    MAX_LEVEL, PAGE_COLS, PAGE_ROWS, TILE, TILE_INSIDE, TILE_MISSING, TILE_OUTSIDE, TILE_TEXELS,
+    TileCache, level_for, page_window, tile_grid, tile_sdf,
+)
+from engine.injections import Injection
+from engine.state import FractalState
+
+PHRASE = "BREATHE"
+
+
+def _stitch(source, level, **kwargs):
+    cols, rows = tile_grid(level)
+    canvas = np.zeros((rows * TILE, cols * TILE), dtype=np.uint8)
+    for ty in range(rows):
+        for tx in range(cols):
+            tile = tile_sdf(source, level, tx, ty, **kwargs)
+            if isinstance(tile, int):
+                value = 0 if tile == TILE_OUTSIDE else 255
+            else:
+                value = np.frombuffer(tile, dtype=np.uint8).reshape(TILE_TEXELS, TILE_TEXELS)[1:-1, 1:-1]
+            canvas[ty * TILE:(ty + 1) * TILE, tx * TILE:(tx + 1) * TILE] = value
+    return canvas
+
+
+def test_level_follows_the_zoom_past_the_injection():
+    # At its own depth on a 1080p view a level-0 texel is ~10 pixels tall
+    assert level_for(1.0, 1.0, 1080) == 3
+    assert level_for(1.0, 0.1, 1080) == 0
+    assert level_for(1.0, 2.0, 1080) == 4 # One level per doubling
+    assert level_for(1.0, 1e9, 1080) == MAX_LEVEL
+
+    level, tx0, ty0, tx1, ty1 = page_window(0.0, 0.0, 1.0, (0.0, 0.0), 1.0, 1920, 1080)
+    assert level == 3 and 0 < tx1 - tx0 <= PAGE_COLS and 0 < ty1 - ty0 <= PAGE_ROWS
+    # A view wider than a page table holds falls back a level
+    level, tx0, _, tx1, _ = page_window(0.0, 0.0, 1.0, (0.0, 0.0), 1.0, 8000, 1080)
+    assert level < 3 and tx1 - tx0 <= PAGE_COLS
+    # Out of view, nothing is paged
+    assert page_window(0.0, 0.0, 1.0, (100.0, 0.0), 1.0, 1920, 1080)[0] == 0
+
+
+def test_tiles_match_a_full_resolution_sdf():
+    data, w, h = create_text_sdf(PHRASE, 2048, 1024, 300)
+    reference = np.frombuffer(data, dtype=np.uint8).reshape(h, w)
+    stitched = _stitch(PHRASE, 1)
+    assert np.mean((stitched > 128) == (reference > 128)) > 0.995
+    assert np.abs(stitched.astype(int) - reference).mean() < 1.0
+
+
+def test_tiles_join_without_seams_and_uniform_tiles_are_markers():
+    cols, rows = tile_grid(3)
+    assert tile_sdf(PHRASE, 3, 0, 0) == TILE_OUTSIDE
+    pairs = 0
+    for tx in range(cols - 1):
+        a, b = tile_sdf(PHRASE, 3, tx, rows // 2), tile_sdf(PHRASE, 3, tx + 1, rows // 2)
+        if isinstance(a, bytes) and isinstance(b, bytes):
+            a = np.frombuffer(a, dtype=np.uint8).reshape(TILE_TEXELS, TILE_TEXELS)
+            b = np.frombuffer(b, dtype=np.uint8).reshape(TILE_TEXELS, TILE_TEXELS)
+            # The border texels are the neighbour's first ones
+            assert np.array_equal(a[:, -2:], b[:, :2])
+            pairs += 1
+    assert pairs > 0
+
+
+def test_image_masks(tmp_path):
+    # A disc on a transparent background; the mask comes from the alpha
+    image = Image.new('RGBA', (200, 200), (255, 255, 255, 0))
+    ImageDraw.Draw(image).ellipse((20, 20, 180, 180), fill=(0, 0, 0, 255))
+    name = register_mask(image, mask_dir=str(tmp_path))
+    assert is_mask(name) and not is_mask("mask:hello") and not is_mask(PHRASE)
+    assert register_mask(image, mask_dir=str(tmp_path)) == name
+    assert load_mask(name, mask_dir=str(tmp_path)).size == (200, 200)
+
+    # The canvas covers a square of the plane, so a square image fills it and
+    # a wide one is letterboxed
+    assert mask_rect((200, 200)) == (0.0, 0.0, 1024.0, 512.0)
+    assert mask_rect((400, 200)) == (0.0, 128.0, 1024.0, 256.0)
+    data, w, h = create_image_sdf(image)
+    inside = np.frombuffer(data, dtype=np.uint8).reshape(h, w) > 128
+    ys, xs = np.nonzero(inside)
+    assert (xs.max() - xs.min()) / (ys.max() - ys.min()) == pytest.approx(2.0, rel=0.02)
+
+    # Deep tiles come from the image, uniform inside the disc
+    cols, rows = tile_grid(4)
+    assert tile_sdf(name, 4, cols // 2, rows // 2, mask_dir=str(tmp_path)) == TILE_INSIDE
+    stitched = _stitch(name, 1, mask_dir=str(tmp_path))
+    assert np.mean((stitched > 128)[::2, ::2] == inside) > 0.995
+
+
+def test_tile_cache_is_bounded_and_drops_tiles_out_of_view():
+    cache = TileCache(capacity=3, workers=1, max_pending=4)
+    try:
+        keys = [(PHRASE, 2, tx, 3) for tx in range(4, 10)]
+        for key in keys:
+            cache.request(key)
+        assert cache.pending() == 4 # The rest are asked for again next frame
+        cache.retain(set(keys[:2])) # The view moved on
+        deadline = time.time() + 60.0
+        while cache.pending() and time.time() < deadline:
+            time.sleep(0.05)
+        assert cache.pending() == 0
+        assert cache.get(keys[0]) is not None and cache.get(keys[5]) is None
+        for key in keys[2:5]:
+            cache.request(key)
+        while cache.pending() and time.time() < deadline:
+            time.sleep(0.05)
+        assert len(cache._lru) == 3
+    finally:
+        cache.close()
+
+
+def test_missing_masks_fail_once(tmp_path, capsys):
+    # A recording replayed on a machine that never registered its mask
+    from engine.sdf_cache import SdfCache
+    name = "mask:" + "0" * 16
+    tiles = TileCache(workers=1, mask_dir=str(tmp_path))
+    sdfs = SdfCache(cache_dir=str(tmp_path / "sdf"), workers=1, mask_dir=str(tmp_path))
+    try:
+        keys = [(name, 3, tx, 4) for tx in range(3)]
+        deadline = time.time() + 60.0
+        for frame in range(30):
+            for key in keys:
+                tiles.request(key)
+            sdf_key = sdfs.request(name, 1024, 512)
+            while (tiles.pending() or sdfs.is_pending(sdf_key)) and time.time() < deadline:
+                time.sleep(0.02)
+            assert not tiles.pending() and not sdfs.is_pending(sdf_key) # Not queued again
+        assert all(tiles.get(key) == TILE_OUTSIDE for key in keys)
+        assert sdfs.get(sdf_key) is None
+        out = capsys.readouterr().out
+        assert out.count("SDF Pyramid:") == 1 and out.count("SDF Cache:") == 1
+    finally:
+        tiles.close()
+        sdfs.close()
+
+
+def test_tiles_lost_to_a_dead_worker_are_not_holes():
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+    tiles = TileCache(workers=1)
+    try:
+        key = (PHRASE, 2, 1, 1)
+        future = Future()
+        future.set_exception(BrokenProcessPool("a worker died"))
+        tiles._pending[key] = future
+        tiles._finish(key, future, 0.0)
+        assert tiles.get(key) is None and not tiles.pending() and PHRASE not in tiles._failed
+        tiles.request(key) # Built by a fresh pool
+        deadline = time.time() + 60.0
+        while tiles.pending() and time.time() < deadline:
+            time.sleep(0.02)
+        assert tiles.get(key) == tile_sdf(*key)
+    finally:
+        tiles.close()
+
+
+def _injected_view(zoom, size=(96, 54)):
+    # The edge of the R in the phrase, well past the injection's own depth
+    state = FractalState()
+    state.publish(offset_x=-0.575, offset_y=0.0, zoom=zoom, max_iter=64, pulse_speed=0.0)
+    state.injections = [Injection(PHRASE, 0.0, 0.0, 1.0, born=0.0)]
+    return frame_uniforms(state, *size, elapsed=10.0)
+
+
+def _melt(u, tiles):
+    width, height = u['resolution']
+    sdfs = {PHRASE: cpu_renderer._load_sdf(PHRASE)}
+    short = min(width, height)
+    x = ((np.arange(width) + 0.5) / width - 0.5) * width / short
+    y = (0.5 - (np.arange(height) + 0.5) / height) * height / short
+    return melt_factor((x[np.newaxis, :] + 1j * y[:, np.newaxis]) / u['zoom'], u, sdfs, tiles)
+
+
+def test_pyramid_keeps_melt_edges_sharp():
+    u = _injected_view(16.0)
+    coarse = _melt(u, None)
+    fine = _melt(u, cpu_renderer._load_tile)
+    soft = lambda m: np.mean((m > 0.01) & (m < 0.99))
+    assert 0.1 < np.mean(fine > 0.5) < 0.9 # The edge is in view
+    assert np.mean((fine > 0.5) == (coarse > 0.5)) > 0.9 # Same letter
+    assert soft(fine) < 0.25 * soft(coarse)
+
+
+def test_tile_atlas_pages_fall_back_to_coarser_tiles():
+    moderngl = pytest.importorskip("moderngl")
+    try:
+        ctx = moderngl.create_standalone_context(backend='egl')
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    from engine.sdf_pyramid import TileAtlas
+
+    class Tiles:
+        def __init__(self):
+            self.ready, self.requested = {}, set()
+
+        def request(self, key):
+            self.requested.add(key)
+
+        def get(self, key):
+            return self.ready.get(key)
+
+        def retain(self, keys):
+            pass
+
+    tiles = Tiles()
+    atlas = TileAtlas(ctx, tiles, slots=2, layers=4)
+    view = (0.0, 0.0, 1.0, (0.0, 0.0), 16.0, (320, 180))
+    atlas.begin()
+    level, tx0, ty0, _, _ = atlas.page(1, PHRASE, *view)
+    atlas.end()
+    assert level > 1 and all(k[1] == level for k in tiles.requested)
+    rows = atlas.table[PAGE_ROWS:2 * PAGE_ROWS]
+    assert (rows[..., 0] == TILE_MISSING).all() and atlas.misses > 0
+
+    # Only the level above is ready: cells point one level up
+    for tx in range(tx0 >> 1, (tx0 >> 1) + 4):
+        for ty in range(ty0 >> 1, (ty0 >> 1) + 4):
+            tiles.ready[(PHRASE, level - 1, tx, ty)] = tile_sdf(PHRASE, level - 1, tx, ty)
+    atlas.begin()
+    atlas.page(1, PHRASE, *view)
+    atlas.end()
+    used = rows[rows[..., 0] != TILE_MISSING]
+    assert len(used) and (used[:, 1] == 1).all()
+    assert len(atlas.resident) <= 4 # Bounded by the layers
+    atlas.release()
+    ctx.release()
+
+
+def test_gl_pyramid_matches_the_cpu():
+    pytest.importorskip("moderngl")
+    from engine import export
+    try:
+        gl = export.GlTileRenderer()
+    except Exception as e:
+        pytest.skip(f"no headless GL context: {e}")
+    u = _injected_view(16.0)
+    cpu, _ = render_tile(u, 0, 0, 96, 54, sdfs={PHRASE: cpu_renderer._load_sdf(PHRASE)},
+                         tiles=cpu_renderer._load_tile)
+    frame = gl.render(u, 0, 0, 96, 54)
+    assert gl.pool.atlas.resident # Drawn from pyramid tiles
+    assert np.mean(np.abs(frame.astype(np.int16) - cpu.astype(np.int16)).max(axis=-1) > 8) < 0.03
+    gl.ctx.release()
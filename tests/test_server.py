@@ -0,0 +1,174 @@
+import io
+import os
+import sys
+import math
+import time
+import socket
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.precision import advance_view
+from engine.server import FrameClient, RenderServer, RenderSession
+from engine.state import FractalState
+
+
+def test_advance_view_pulls_towards_the_target():
+    state = FractalState()
+    state.publish(offset_x=-0.75, offset_y=0.0, zoom=2.0)
+    snap = advance_view(state, 2.0, 0.5, 0.1, (0.4, -0.2))
+    assert snap.zoom == pytest.approx(2.0 * math.exp(0.05))
+    # The target point stays put on screen: 1/old_zoom - 1/zoom of view units
+    pull = 1.0 / 2.0 - 1.0 / snap.zoom
+    assert snap.offset_x + snap.offset_x_lo == pytest.approx(-0.75 + 0.4 * pull)
+    assert snap.offset_y + snap.offset_y_lo == pytest.approx(-0.2 * pull)
+    assert advance_view(state, snap.zoom, 0.5, 0.0).zoom == snap.zoom
+
+
+def test_session_follows_its_own_gaze():
+    session = RenderSession(0, 64, 32, fps=10.0)
+    session.state.publish(use_eye_tracker=True, gaze_x=1.0, gaze_y=0.5, zoom_speed=1.0)
+    session.step(0.0)
+    u = session.step(0.5)
+    assert u['resolution'] == (64, 32) and u['zoom'] == pytest.approx(math.exp(0.5))
+    assert u['offset'][0] > -0.75 and u['offset'][1] == 0.0 # Towards the right edge
+    with pytest.raises(ValueError):
+        RenderSession(1, 64, 32, format='GIF')
+    for fps in (0.0, -5.0, float('nan')):
+        with pytest.raises(ValueError, match="fps"):
+            RenderSession(1, 64, 32, fps=fps)
+
+
+def test_sessions_are_independent_and_scheduled_fairly():
+    with RenderServer(workers=1, backend='cpu', port=None) as server:
+        fast = server.add_session(32, 18, fps=20.0, format='RAW')
+        slow = server.add_session(48, 27, fps=5.0, format='RAW')
+        slow.state.publish(zoom_speed=0.0, power=3.0)
+        t = 0.0
+        while t < 2.0:
+            server.tick(t)
+            t += 0.01
+        # Each on its own clock, in order, at its own size
+        assert abs(fast.delivered - 40) <= 2 and abs(slow.delivered - 10) <= 1
+        assert fast.dropped == 0 and slow.dropped == 0
+        assert fast.latest[0] == fast.delivered - 1
+        assert len(fast.latest[1]) == 32 * 18 * 3 and len(slow.latest[1]) == 48 * 27 * 3
+        assert fast.state.zoom > 1.0 and slow.state.zoom == 1.0
+        assert slow.state.power == 3.0 and fast.state.power == 2.0
+
+        # A session that falls behind skips frame slots instead of queueing them
+        server.tick(5.0)
+        assert fast.dropped > 0 and fast.next_due > 5.0
+
+
+def test_frames_stream_to_clients_in_order():
+    with RenderServer(workers=2, backend='cpu', port=0) as server:
+        sessions = [server.add_session(64, 36, fps=8.0) for _ in range(2)]
+        server.start()
+        with FrameClient(sessions[1].id, port=server.port, timeout=60.0) as client:
+            indices = []
+            for _ in range(3):
+                index, width, height, format, payload = client.receive()
+                indices.append(index)
+                image = Image.open(io.BytesIO(payload))
+                assert format == 'JPEG' and image.size == (width, height) == (64, 36)
+                assert np.asarray(image).std() > 1.0 # A fractal, not a blank frame
+            assert indices == sorted(indices) and len(set(indices)) == 3
+
+            client.publish(zoom_speed=0.0, max_iter=77, not_a_field=1)
+            deadline = time.time() + 10.0
+            while sessions[1].state.max_iter != 77 and time.time() < deadline:
+                time.sleep(0.02)
+            assert sessions[1].state.max_iter == 77 and sessions[1].state.zoom_speed == 0.0
+            assert sessions[0].state.zoom_speed == FractalState().zoom_speed
+        stats = server.stats()
+        assert [s['session'] for s in stats] == [0, 1] and all(s['delivered'] > 0 for s in stats)
+
+
+def test_bad_messages_are_dropped_and_the_connection_stays_up(capsys):
+    with RenderServer(workers=1, backend='cpu', port=0) as server:
+        session = server.add_session(16, 9, fps=1.0)
+        # Field by field: the good ones still apply
+        server._publish(session, {'zoom': None, 'max_iter': "lots", 'power': 3.0, 'deep_zoom': 1,
+                                  'color_r': float('inf'), 'frame_budget_ms': 0, 'not_a_field': 1})
+        state = session.state
+        assert state.power == 3.0 and state.deep_zoom is True
+        assert (state.zoom, state.max_iter, state.color_r) == (1.0, FractalState().max_iter, FractalState().color_r)
+        assert state.frame_budget_ms == FractalState().frame_budget_ms
+        out = capsys.readouterr().out
+        for name in ('zoom', 'max_iter', 'color_r', 'frame_budget_ms', 'not_a_field'):
+            assert f"dropped {name!r}" in out
+
+        # Over the socket, malformed lines do not end the handler
+        with FrameClient(session.id, port=server.port) as client:
+            for line in (b'{"publish": {"zoom": null}}', b'[1]', b'{"publish": [1]}', b'not json', b'"text"'):
+                client.sock.sendall(line + b"\n")
+            client.publish(max_iter=55)
+            deadline = time.time() + 10.0
+            while state.max_iter != 55 and time.time() < deadline:
+                time.sleep(0.02)
+            assert state.max_iter == 55 and state.zoom == 1.0
+        out = capsys.readouterr().out
+        assert out.count("bad message") == 4 and "dropped 'zoom'" in out
+
+        # A handshake that names no session closes just that connection
+        for hello in (b'[1]', b'{"session": [0]}', b'{"session": 7}'):
+            with socket.create_connection((server.host, server.port), timeout=10.0) as sock:
+                sock.sendall(hello + b"\n")
+                assert sock.recv(1) == b""
+        assert capsys.readouterr().out.count("closing connection") == 3
+
+
+def test_a_failed_frame_does_not_stall_its_session(monkeypatch):
+    from concurrent.futures import Future
+    from engine import server as server_module
+
+    render = server_module.render_frame
+    failures = []
+
+    def flaky(*args):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("worker died")
+        return render(*args)
+
+    monkeypatch.setattr(server_module, "render_frame", flaky)
+    with RenderServer(workers=1, backend='cpu', port=None) as server:
+        session = server.add_session(16, 9, fps=10.0, format='RAW')
+        t = 0.0
+        while t < 1.0:
+            server.tick(t)
+            t += 0.01
+        assert failures and not session.in_flight
+        assert abs(session.delivered - 9) <= 1 # Every frame but the one that failed
+
+        # A worker's frame that fails releases the session as well
+        future = Future()
+        future.set_exception(RuntimeError("worker died"))
+        session.in_flight = True
+        server._pending[future] = session.id
+        server._collect([future])
+        assert not session.in_flight and server._due(t + 1.0) == [session]
+
+
+def test_a_broken_worker_pool_is_restarted():
+    from concurrent.futures.process import BrokenProcessPool
+
+    class Broken:
+        def submit(self, *args):
+            raise BrokenProcessPool("a worker died")
+
+        def shutdown(self, **kwargs):
+            pass
+
+    with RenderServer(workers=2, backend='cpu', port=None) as server:
+        session = server.add_session(16, 9, fps=10.0, format='RAW')
+        server._pool = Broken()
+        assert server.tick(0.0) == 1 and not isinstance(server._pool, Broken)
+        deadline = time.time() + 60.0
+        while session.delivered == 0 and time.time() < deadline:
+            server._wait(time.perf_counter())
+        assert session.delivered == 1 and not session.in_flight
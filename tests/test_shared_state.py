@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.shared_state import RemoteState, SharedStateBlock, share_state, start_state_process, unshare_state
+
+
+@pytest.fixture
+def state():
+    state = FractalState()
+    share_state(state)
+    yield state
+    unshare_state(state)
+
+
+def _wait(condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_fields_round_trip_with_their_types(state):
+    remote = RemoteState(state.shared.handle())
+    assert remote.max_iter == 150 and isinstance(remote.max_iter, int)
+    assert remote.governor_enabled is True and remote['inject_text'] == "BREATHE"
+
+    state.publish(zoom=12.5, inject_text="SOFTEN", current_hr=71)
+    snap = remote.snapshot()
+    assert (snap.zoom, snap.inject_text, snap.current_hr) == (12.5, "SOFTEN", 71)
+    assert remote.snapshot() is snap # Nothing written since
+    with pytest.raises(AttributeError):
+        remote.publish(injections=[])
+    remote.close()
+
+
+def test_pull_publishes_only_remote_writes(state):
+    remote = RemoteState(state.shared.handle())
+    assert state.shared.pull() is None
+    state.publish(zoom=3.0) # Local writes are not echoed back
+    assert state.shared.pull() is None
+
+    before = state.snapshot()
+    remote.publish(power=3.5, max_iter=400)
+    remote['llm_status'] = "thinking"
+    snap = state.shared.pull()
+    assert (snap.power, snap.max_iter, snap.llm_status) == (3.5, 400, "thinking")
+    assert snap.changed(before, 'power') and not snap.changed(before, 'zoom')
+    assert state.shared.pull() is None and state.shared.pulled == 3
+    remote.close()
+
+
+def test_layout_mismatch_is_refused(state):
+    name, lock, types, fields, texts = state.shared.handle()
+    with pytest.raises(ValueError):
+        SharedStateBlock.attach((name, lock, types, fields[:-1], texts))
+
+
+def _tear_writer(remote, count):
+    # offset_y is always -offset_x within one write
+    for k in range(1, count + 1):
+        remote.publish(offset_x=float(k), offset_y=-float(k))
+    remote.publish(llm_status="done")
+
+
+def test_reads_never_see_half_a_write(state):
+    state.publish(offset_x=0.0, offset_y=0.0)
+    process = start_state_process(state, _tear_writer, 20000)
+    remote = RemoteState(state.shared.handle())
+    reads = 0
+    deadline = time.monotonic() + 60.0
+    while remote.snapshot().llm_status != "done":
+        assert time.monotonic() < deadline and process.exitcode in (None, 0)
+        snap = remote.snapshot()
+        assert snap.offset_y == -snap.offset_x
+        state.shared.pull()
+        assert state.offset_y == -state.offset_x
+        reads += 1
+    process.join(10)
+    assert process.exitcode == 0 and reads > 0
+    state.shared.pull()
+    assert state.offset_x == 20000.0
+    remote.close()
+
+
+def _conductor(remote):
+    # Waits for the renderer's zoom, then answers through a field
+    while remote.zoom < 100.0:
+        time.sleep(0.005)
+    remote.publish(power=remote.zoom / 50.0, llm_status="seen")
+
+
+def test_another_process_reads_and_writes(state):
+    process = start_state_process(state, _conductor)
+    state.publish(zoom=250.0)
+    _wait(lambda: state.shared.pull() is not None or state.llm_status == "seen")
+    process.join(10)
+    assert state.power == 5.0 and state.llm_status == "seen"
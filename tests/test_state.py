@@ -0,0 +1,97 @@
+import os
+import sys
+import importlib
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState, StateSnapshot
+
+
+def test_one_version_per_publish():
+    state = FractalState()
+    before = state.snapshot()
+    snap = state.publish(zoom=2.0, power=3.0, max_iter=200)
+    assert snap is state.snapshot() and snap.version == before.version + 1
+    assert snap.versions['zoom'] == before.versions['zoom'] + 1
+    assert snap.versions['power'] == before.versions['power'] + 1
+    assert snap.versions['color_r'] == before.versions['color_r']
+    state.zoom = 4.0 # Plain assignment publishes that one field
+    assert state.snapshot().version == snap.version + 1
+    assert state.snapshot().versions['zoom'] == snap.versions['zoom'] + 1
+    assert state.snapshot().versions['power'] == snap.versions['power']
+
+
+def test_changed():
+    state = FractalState()
+    first = state.snapshot()
+    state.publish(power=3.0)
+    second = state.snapshot()
+    assert second.changed(first, 'power') and second.changed(first, 'zoom', 'power')
+    assert not second.changed(first, 'zoom', 'max_iter')
+    assert not second.changed(second, 'power')
+    assert second.changed(None, 'zoom') # Nothing seen yet
+    state.publish(power=3.0) # Same value, still a publish
+    assert state.snapshot().changed(second, 'power')
+
+
+def test_snapshots_are_immutable():
+    state = FractalState()
+    snap = state.snapshot()
+    state.publish(zoom=8.0, offset_x=-0.5)
+    assert snap.zoom == 1.0 and snap.offset_x == -0.75
+    assert state.zoom == 8.0 and state.snapshot().zoom == 8.0
+    with pytest.raises(AttributeError, match="read-only"):
+        snap.zoom = 3.0
+    with pytest.raises(AttributeError):
+        snap.not_a_field
+    assert isinstance(snap, StateSnapshot) and snap.zoom == 1.0
+
+
+def test_publishing_an_offset_clears_its_tail():
+    state = FractalState()
+    state.publish(offset_x=-0.75, offset_x_lo=1e-20, offset_y=0.1, offset_y_lo=-1e-20)
+    state.offset_y = 0.2
+    snap = state.snapshot()
+    assert snap.offset_y_lo == 0.0 and snap.offset_x_lo == 1e-20
+    state.publish(offset_x=-0.5, offset_x_lo=3e-20) # Given together, the tail is kept
+    assert state.offset_x_lo == 3e-20
+
+
+def test_snapshots_are_never_torn():
+    # Writers publish (zoom, offset) pairs that belong together
+    state = FractalState()
+    state.publish(zoom=1.0, offset_x=-1.0)
+    stop = threading.Event()
+
+    def writer(k):
+        i = 0
+        while not stop.is_set():
+            i += 1
+            value = float(k * 1000000 + i)
+            state.publish(zoom=value, offset_x=-value)
+
+    threads = [threading.Thread(target=writer, args=(k,)) for k in range(3)]
+    for t in threads:
+        t.start()
+    try:
+        torn = 0
+        for _ in range(20000):
+            snap = state.snapshot()
+            torn += snap.zoom != -snap.offset_x
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert torn == 0
+
+
+def test_importable_without_gl(monkeypatch):
+    # Headless tools (the session server, exports) build FractalState with no GL stack
+    monkeypatch.setitem(sys.modules, 'moderngl', None)
+    for name in ('engine.state', 'engine.capture'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    state = importlib.import_module('engine.state').FractalState()
+    assert state.snapshot().zoom == 1.0 and len(state.captures) == 0
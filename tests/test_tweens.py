@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.tweens import EASE_IN, EASE_IN_OUT, EASE_OUT, LINEAR, ease, tween
+
+
+def test_linear_glide_reaches_the_target_and_retires():
+    state = FractalState()
+    tween(state, 'power', 4.0, duration=2.0, easing='linear')
+    assert state.power == 2.0 # Nothing moves until the next frame
+    state.tweens.step(10.0)
+    state.tweens.step(11.0)
+    assert state.power == 3.0
+    state.tweens.step(12.5)
+    assert state.power == 4.0
+    assert state.tweens.count == 0 and state.tweens.finished == 1
+    assert state.tweens.step(13.0) == {}
+
+
+def test_all_running_tweens_publish_together():
+    state = FractalState()
+    for field, target in (('color_r', 1.0), ('color_g', 0.5), ('max_iter', 300)):
+        tween(state, field, target, duration=1.0)
+    state.tweens.step(0.0)
+    version = state.snapshot().version
+    out = state.tweens.step(0.5)
+    assert state.snapshot().version == version + 1
+    assert set(out) == {'color_r', 'color_g', 'max_iter'}
+    assert isinstance(state.max_iter, int) and state.max_iter == 225
+    assert out['color_r'] == pytest.approx(0.5)
+
+
+def test_new_tween_supersedes_from_the_current_value():
+    state = FractalState()
+    tween(state, 'pulse_speed', 1.2, duration=1.0, easing=LINEAR)
+    state.tweens.step(0.0)
+    state.tweens.step(0.5)
+    assert state.pulse_speed == pytest.approx(0.7)
+    tween(state, 'pulse_speed', 0.0, duration=1.0, easing=LINEAR)
+    state.tweens.step(1.0)
+    assert state.tweens.count == 1
+    assert state.pulse_speed == pytest.approx(0.7) # No jump
+    state.tweens.step(1.5)
+    assert state.pulse_speed == pytest.approx(0.35)
+
+
+def test_cancel_and_zero_duration():
+    state = FractalState()
+    tween(state, 'color_b', 1.0, duration=1.0, easing=LINEAR)
+    tween(state, 'zoom_speed', -0.5, duration=1.0)
+    state.tweens.step(0.0)
+    state.tweens.step(0.25)
+    state.tweens.cancel('color_b', 'offset_x') # Unknown names are ignored
+    state.tweens.step(0.5)
+    assert state.color_b == pytest.approx(0.2 + 0.8 * 0.25)
+    assert state.tweens.active() == ['zoom_speed']
+    tween(state, 'power', 3.0, duration=0.0)
+    state.tweens.step(0.6)
+    assert state.power == 3.0 and 'power' not in state.tweens.active()
+
+
+def test_bad_requests_raise_on_the_caller():
+    state = FractalState()
+    with pytest.raises(ValueError):
+        tween(state, 'zoom', 10.0)
+    with pytest.raises(ValueError):
+        tween(state, 'power', float('nan'))
+
+
+def test_easings():
+    u = np.linspace(0.0, 1.0, 11)
+    for easing in (LINEAR, EASE_IN, EASE_OUT, EASE_IN_OUT):
+        e = ease(u, np.full(11, easing))
+        assert e[0] == 0.0 and e[-1] == 1.0 and np.all(np.diff(e) >= 0.0)
+    assert ease(np.array([0.5]), np.array([EASE_IN_OUT]))[0] == 0.5
+    assert ease(np.array([0.5]), np.array([EASE_IN]))[0] < 0.5 < ease(np.array([0.5]), np.array([EASE_OUT]))[0]
+
+
+def test_submissions_from_many_threads():
+    state = FractalState()
+    fields = ['color_r', 'color_g', 'color_b', 'power']
+
+    def writer(field):
+        for k in range(500):
+            tween(state, field, k, duration=0.1)
+
+    threads = [threading.Thread(target=writer, args=(f,)) for f in fields]
+    for t in threads:
+        t.start()
+    now = 0.0
+    while any(t.is_alive() for t in threads):
+        now += 0.01
+        state.tweens.step(now) # The render thread keeps going meanwhile
+    for t in threads:
+        t.join()
+    state.tweens.step(now + 0.01)
+    state.tweens.step(now + 1.0)
+    assert [getattr(state, f) for f in fields] == [499.0] * 4
+    assert state.tweens.count == 0
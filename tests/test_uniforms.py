@@ -0,0 +1,82 @@
+import os
+import sys
+import struct
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.state import FractalState
+from engine.uniforms import SLOT_SIZE, SLOTS, UniformBuffer
+
+
+class Buffer:
+    # Records writes instead of uploading them
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.writes = []
+        self.bound = None
+
+    def write(self, data, offset=0):
+        self.writes.append((offset, len(data)))
+        self.data[offset:offset + len(data)] = data
+
+    def bind_to_uniform_block(self, binding):
+        self.bound = binding
+
+
+class Context:
+    def buffer(self, data):
+        return Buffer(data)
+
+
+def _slot(name):
+    return [s[0] for s in SLOTS].index(name)
+
+
+def test_dirty_runs_are_coalesced():
+    ubo = UniformBuffer(Context())
+    names = [s[0] for s in SLOTS]
+    for i in (0, 1, 4):
+        ubo.set(names[i], 1.0 if SLOTS[i][1] == '4f' else 1)
+    ubo.upload()
+    # Slots 0-1 go as one write, slot 4 as another
+    assert ubo.buffer.writes == [(0, 2 * SLOT_SIZE), (4 * SLOT_SIZE, SLOT_SIZE)]
+    assert ubo.uploads == 2 and ubo.bytes_uploaded == 3 * SLOT_SIZE
+    assert ubo.buffer.bound == ubo.binding and ubo.dirty == set()
+    assert struct.unpack_from('4i', ubo.buffer.data, 4 * SLOT_SIZE) == (1, 0, 0, 0)
+
+    ubo.buffer.writes.clear()
+    ubo.upload() # Nothing dirty: just the bind
+    assert ubo.buffer.writes == []
+
+
+def test_set_drops_writes_that_change_nothing():
+    ubo = UniformBuffer(Context())
+    ubo.set('view', -0.75, 0.0, 1.0, 0.0)
+    ubo.upload()
+    ubo.buffer.writes.clear()
+    ubo.set('view', -0.75, 0.0, 1.0, 0.0)
+    ubo.set('screen', 0.0) # Padded to (0, 0, 0, 0), unlike the initial None
+    ubo.upload()
+    assert ubo.buffer.writes == [(_slot('screen') * SLOT_SIZE, SLOT_SIZE)]
+
+
+def test_snapshot_slots_follow_published_fields():
+    state = FractalState()
+    ubo = UniformBuffer(Context())
+    ubo.update_from_snapshot(state.snapshot())
+    ubo.upload()
+    assert ubo.uploads == 2 # shape and flags, which are not neighbours
+    ubo.buffer.writes.clear()
+
+    state.publish(zoom=2.0) # Not in any state-backed slot
+    ubo.update_from_snapshot(state.snapshot())
+    ubo.upload()
+    assert ubo.buffer.writes == []
+
+    state.publish(power=3.0)
+    ubo.update_from_snapshot(state.snapshot(), iter_cap=50)
+    ubo.upload()
+    shape, flags = _slot('shape'), _slot('flags')
+    assert sorted(ubo.buffer.writes) == [(shape * SLOT_SIZE, SLOT_SIZE), (flags * SLOT_SIZE, SLOT_SIZE)]
+    assert struct.unpack_from('4f', ubo.buffer.data, shape * SLOT_SIZE)[0] == 3.0
+    assert struct.unpack_from('4i', ubo.buffer.data, flags * SLOT_SIZE)[0] == 50